@@ -0,0 +1,291 @@
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, takewhile
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from codificacao import datetime_para_int
+from historico import DESCARTE, ITEM, ITEM_ALTERADO, PRODUTO, PRODUTO_TOCADO, ler_eventos
+
+try:
+    import numpy
+except ImportError: # Opcional: sem numpy, `prever` faz o mesmo cálculo em colunas com a biblioteca padrão
+    numpy = None
+
+MICROSSEGUNDOS_POR_DIA = 86_400_000_000
+
+class PrevisaoReposicao(NamedTuple):
+    """Consumo recente de um produto em uma casa e quando o estoque deve acabar."""
+    casa: str
+    produto_id: UUID
+    saldo: int # Na unidade base do produto (ver `unidades`)
+    taxa_diaria: float # Unidades base consumidas por dia na janela
+    esgota_em: Optional[date] # None se não houve consumo na janela
+
+class ColunasConsumo(NamedTuple):
+    """
+    Várias séries de consumo lado a lado, para cálculos em lote.
+
+    A série `i` é `chaves[i]`, com `saldos[i]`, o primeiro evento em
+    `primeiros[i]` e os consumos em ordem de momento em
+    `momentos[limites[i]:limites[i + 1]]` e `consumos[limites[i]:limites[i + 1]]`.
+    """
+    chaves: List[Tuple[str, UUID]]
+    saldos: array
+    primeiros: array
+    limites: array
+    momentos: array
+    consumos: array
+
+class SerieConsumo:
+    """
+    Eventos de um produto em uma casa, em colunas.
+
+    Guarda o saldo e, para as saídas, dois `array("q")` paralelos: o momento
+    (microssegundos desde a época) e a quantidade consumida. Com os momentos
+    em ordem, uma janela de tempo é um par de `bisect` e o consumo nela é um
+    `sum` sobre a fatia, ambos em C.
+    """
+
+    __slots__ = ("saldo", "primeiro", "momentos", "consumos", "ordenada")
+
+    def __init__(self):
+        self.saldo = 0
+        self.primeiro: Optional[int] = None
+        self.momentos = array("q")
+        self.consumos = array("q")
+        self.ordenada = True
+
+    def registrar(self, momento: int, delta: int) -> None:
+        self.saldo += delta
+        if self.primeiro is None or momento < self.primeiro:
+            self.primeiro = momento
+        if delta < 0:
+            if self.momentos and momento < self.momentos[-1]:
+                self.ordenada = False
+            self.momentos.append(momento)
+            self.consumos.append(-delta)
+
+    def _ordenar(self) -> None:
+        if not self.ordenada:
+            pares = sorted(zip(self.momentos, self.consumos))
+            self.momentos = array("q", (momento for momento, _ in pares))
+            self.consumos = array("q", (consumo for _, consumo in pares))
+            self.ordenada = True
+
+    def consumo_entre(self, inicio: int, fim: int) -> int:
+        """Total consumido em [inicio, fim), com momentos em microssegundos."""
+        self._ordenar()
+        momentos = self.momentos
+        return sum(self.consumos[bisect_left(momentos, inicio):bisect_left(momentos, fim)])
+
+class AnaliseConsumo:
+    """
+    Séries de consumo por casa e produto, e previsão de quando cada estoque acaba.
+
+    Os eventos (entradas e saídas de estoque, com o momento em que ocorreram)
+    chegam por `registrar` ou são extraídos do log de um
+    `historico.InventarioComHistorico` (`importar_historico`). Cada par (casa,
+    produto) tem sua `SerieConsumo` colunar, usada nas consultas de uma série.
+
+    A previsão noturna (`prever`), com numpy instalado, junta as séries em
+    `ColunasConsumo` (um `array("q")` por campo) e calcula todas de uma vez
+    sobre os buffers das colunas: a soma acumulada dos consumos da janela,
+    tomada nos limites das séries, e as taxas e datas por operações sobre as
+    colunas, sem laço Python. Sem numpy, percorre as séries, com dois
+    `bisect` e uma soma sobre a fatia da janela em C para cada uma; juntar as
+    colunas só para calculá-las com laços Python sairia mais caro. Os dois
+    caminhos dão o mesmo resultado, e `a_repor` descarta as séries que não
+    esgotam a tempo antes de criar as previsões.
+
+    A taxa de consumo é o total consumido na janela dividido pelos dias
+    observados (a janela, ou menos se a série começou depois dela), e a data
+    prevista de esgotamento é hoje mais saldo / taxa.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, UUID], SerieConsumo] = {}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def serie(self, casa: str, produto_id: UUID) -> SerieConsumo:
+        chave = (casa, produto_id)
+        serie = self._series.get(chave)
+        if serie is None:
+            serie = self._series[chave] = SerieConsumo()
+        return serie
+
+    def registrar(self, casa: str, produto_id: UUID, momento: datetime, delta: int) -> None:
+        """Registra uma variação de estoque (negativa para consumo) do produto na casa."""
+        self.serie(casa, produto_id).registrar(datetime_para_int(momento), delta)
+
+    def importar_historico(self, caminho_log: str, casa: str) -> int:
+        """
+        Extrai as variações de quantidade do log de eventos de uma casa.
+
+        Itens registrados são entradas; alterações valem a diferença de
+        quantidade; descartes consomem o que restava do item, no momento do
+        último evento anterior (o toque no produto da mesma operação).
+
+        Returns:
+            Quantas variações foram registradas.
+        """
+        itens: Dict[UUID, Tuple[UUID, int]] = {}
+        ultimo = 0
+        variacoes = 0
+        for evento in ler_eventos(caminho_log):
+            tipo = evento[0]
+            if tipo == ITEM_ALTERADO:
+                produto_id, anterior = itens[evento[1]]
+                ultimo = datetime_para_int(evento[6])
+                itens[evento[1]] = (produto_id, evento[2])
+                delta = evento[2] - anterior
+            elif tipo == ITEM:
+                item = evento[1]
+                ultimo = datetime_para_int(item.adicionado_em)
+                itens[item.id] = (item.produto_id, item.quantidade)
+                produto_id, delta = item.produto_id, item.quantidade
+            elif tipo == DESCARTE:
+                produto_id, anterior = itens.pop(evento[1])
+                delta = -anterior
+            else:
+                if tipo == PRODUTO_TOCADO:
+                    ultimo = datetime_para_int(evento[2])
+                elif tipo == PRODUTO:
+                    ultimo = datetime_para_int(evento[1].atualizado_em)
+                continue
+            if delta:
+                self.serie(casa, produto_id).registrar(ultimo, delta)
+                variacoes += 1
+        return variacoes
+
+    def consumo_diario(self, casa: str, produto_id: UUID, fim: date, dias: int) -> List[int]:
+        """Consumo em cada um dos `dias` dias que terminam em `fim` (inclusive), do mais antigo ao mais recente."""
+        serie = self._series.get((casa, produto_id))
+        if serie is None:
+            return [0] * dias
+        serie._ordenar()
+        limite = datetime_para_int(datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+        fronteiras = [bisect_left(serie.momentos, limite - d * MICROSSEGUNDOS_POR_DIA) for d in range(dias, -1, -1)]
+        consumos = serie.consumos
+        return [sum(consumos[a:b]) for a, b in zip(fronteiras, fronteiras[1:])]
+
+    def taxas_moveis(self, casa: str, produto_id: UUID, fim: date, dias: int, janela: int = 7) -> List[float]:
+        """Média móvel, em `janela` dias, do consumo diário de cada um dos `dias` dias que terminam em `fim`."""
+        diario = self.consumo_diario(casa, produto_id, fim, dias + janela - 1)
+        acumulado = [0]
+        for consumo in diario:
+            acumulado.append(acumulado[-1] + consumo)
+        return [(acumulado[i + janela] - acumulado[i]) / janela for i in range(dias)]
+
+    def _selecionadas(self, casas: Optional[Iterable[str]]) -> List[Tuple[Tuple[str, UUID], SerieConsumo]]:
+        filtro = set(casas) if casas is not None else None
+        return [
+            (chave, serie) for chave, serie in self._series.items()
+            if serie.saldo > 0 and (filtro is None or chave[0] in filtro)
+        ]
+
+    def colunas(self, casas: Optional[Iterable[str]] = None) -> ColunasConsumo:
+        """As séries com saldo positivo (das `casas`, se dadas) lado a lado em `ColunasConsumo`."""
+        selecionadas = self._selecionadas(casas)
+        for _, serie in selecionadas:
+            serie._ordenar()
+        momentos, consumos = array("q"), array("q")
+        momentos.frombytes(b"".join([serie.momentos.tobytes() for _, serie in selecionadas]))
+        consumos.frombytes(b"".join([serie.consumos.tobytes() for _, serie in selecionadas]))
+        return ColunasConsumo(
+            [chave for chave, _ in selecionadas],
+            array("q", [serie.saldo for _, serie in selecionadas]),
+            array("q", [serie.primeiro for _, serie in selecionadas]), # type: ignore[misc]
+            array("q", accumulate([len(serie.momentos) for _, serie in selecionadas], initial=0)),
+            momentos,
+            consumos,
+        )
+
+    def prever(
+        self, agora: Optional[datetime] = None, janela_dias: int = 28, casas: Optional[Iterable[str]] = None,
+        ate: Optional[date] = None,
+    ) -> List[PrevisaoReposicao]:
+        """
+        Previsões de esgotamento de todas as séries com saldo positivo.
+
+        Com numpy, calcula em lote sobre `colunas`; sem, série a série (ver
+        a descrição da classe).
+
+        Args:
+            agora: Momento de referência; por padrão, o atual.
+            janela_dias: Dias de consumo considerados na taxa.
+            casas: Restringe a previsão a essas casas; por padrão, todas.
+            ate: Só as previsões que esgotam até essa data; por padrão, todas.
+
+        Returns:
+            As previsões, das que esgotam primeiro às sem consumo na janela.
+        """
+        agora = agora or datetime.now()
+        hoje = agora.date()
+        fim = datetime_para_int(agora)
+        inicio = fim - janela_dias * MICROSSEGUNDOS_POR_DIA
+        maximo = (date.max - hoje).days
+        if numpy is not None:
+            colunas = self.colunas(casas)
+            chaves, saldos = colunas.chaves, colunas.saldos
+            taxas, dias, ordem = _prever_com_numpy(colunas, inicio, fim, maximo)
+        else:
+            selecionadas = self._selecionadas(casas)
+            chaves = [chave for chave, _ in selecionadas]
+            saldos = [serie.saldo for _, serie in selecionadas]
+            taxas, dias, ordem = _prever_por_serie([serie for _, serie in selecionadas], inicio, fim, maximo)
+
+        if ate is not None:
+            limite = (ate - hoje).days
+            ordem = list(takewhile(lambda i: dias[i] <= limite, ordem))
+        datas = {dia: hoje + timedelta(days=dia) for dia in set(dias) if dia <= maximo}
+        return list(map(PrevisaoReposicao._make, (
+            (*chaves[i], saldos[i], taxas[i], datas.get(dias[i])) for i in ordem
+        )))
+
+    def a_repor(self, ate: date, agora: Optional[datetime] = None, janela_dias: int = 28) -> List[PrevisaoReposicao]:
+        """Previsões cujo estoque acaba até `ate`, em ordem de esgotamento."""
+        return self.prever(agora, janela_dias, ate=ate)
+
+_Previsao = Tuple[List[float], List[int], List[int]]
+
+def _prever_por_serie(series: List[SerieConsumo], inicio: int, fim: int, maximo: int) -> _Previsao:
+    """
+    Taxas diárias, dias até esgotar e a ordem de esgotamento das `series`.
+
+    Considera o consumo em [inicio, fim]. Séries sem consumo têm taxa 0.0 e
+    `maximo + 1` dias; as demais, no máximo `maximo`.
+    """
+    taxas: List[float] = []
+    dias: List[int] = []
+    for serie in series:
+        consumo = serie.consumo_entre(inicio, fim + 1)
+        if consumo:
+            observado = fim - max(inicio, serie.primeiro) # type: ignore[type-var]
+            taxa = consumo / max(observado, MICROSSEGUNDOS_POR_DIA) * MICROSSEGUNDOS_POR_DIA
+            taxas.append(taxa)
+            dias.append(min(int(serie.saldo / taxa), maximo))
+        else:
+            taxas.append(0.0)
+            dias.append(maximo + 1)
+    return taxas, dias, sorted(range(len(dias)), key=dias.__getitem__)
+
+def _prever_com_numpy(colunas: ColunasConsumo, inicio: int, fim: int, maximo: int) -> _Previsao:
+    """O mesmo que `_prever_por_serie`, com numpy sobre os buffers de `colunas`, sem laço por série."""
+    momentos = numpy.frombuffer(colunas.momentos, dtype=numpy.int64)
+    consumos = numpy.frombuffer(colunas.consumos, dtype=numpy.int64)
+    limites = numpy.frombuffer(colunas.limites, dtype=numpy.int64)
+    primeiros = numpy.frombuffer(colunas.primeiros, dtype=numpy.int64)
+    saldos = numpy.frombuffer(colunas.saldos, dtype=numpy.int64)
+
+    acumulado = numpy.concatenate(([0], numpy.cumsum(numpy.where((momentos >= inicio) & (momentos <= fim), consumos, 0))))
+    na_janela = acumulado[limites[1:]] - acumulado[limites[:-1]]
+    observado = numpy.maximum(fim - numpy.maximum(primeiros, inicio), MICROSSEGUNDOS_POR_DIA)
+    taxas = na_janela / observado * MICROSSEGUNDOS_POR_DIA
+    sem_consumo = na_janela == 0
+    dias = numpy.floor(numpy.minimum(saldos / numpy.where(sem_consumo, 1.0, taxas), maximo))
+    dias = numpy.where(sem_consumo, maximo + 1, dias).astype(numpy.int64)
+    return taxas.tolist(), dias.tolist(), numpy.argsort(dias, kind="stable").tolist()
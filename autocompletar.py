@@ -0,0 +1,242 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from repositorio import RepositorioEstoque
+
+_RE_TOKEN = re.compile(r"[^\W_]+")
+_FIM_DO_PREFIXO = chr(0x10FFFF)
+_COM_ESTOQUE = 1 << 62
+
+def tokens_de_busca(texto: str) -> List[str]:
+    """Palavras de um texto sem acentos e em minúsculas ("Moça" -> ["moca"])."""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _RE_TOKEN.findall(texto)
+
+class IndiceAutocompletar:
+    """
+    Sugestões por prefixo sobre nome e marca dos produtos, para a digitação.
+
+    Nomes e marcas viram palavras sem acentos e em minúsculas
+    (`tokens_de_busca`). Uma consulta sugere os produtos em que cada palavra
+    digitada é início de alguma palavra do produto ("lei int" acha "Leite
+    Integral"), primeiro os que têm estoque e, em cada grupo, os
+    movimentados mais recentemente.
+
+    O vocabulário fica em uma lista ordenada, então as palavras com um
+    prefixo são uma faixa achada por `bisect`, cada uma com os produtos que a
+    contêm. O ranking é mantido em duas `OrderedDict` (com e sem estoque, da
+    movimentação mais antiga à mais recente) e em uma chave inteira por
+    produto. Se a palavra mais seletiva da consulta tem até
+    `LIMITE_CANDIDATOS` produtos, eles são intersectados com os das outras
+    palavras e os k melhores saem de `heapq.nlargest`. Senão as palavras são
+    comuns, e a consulta percorre o ranking conferindo cada produto (um
+    `in` no texto com as suas palavras) até achar k; se não os achar em
+    `LIMITE_VARREDURA` produtos (a combinação é rara), volta à interseção.
+
+    Ao ser criado com um repositório, o índice fica registrado em
+    `repositorio.autocompletar`: cada operação de estoque informa a variação
+    do saldo do produto (`estoque_alterado`), o que também o torna o mais
+    recente, e produtos novos (por código de barras ou por cupom) entram no
+    índice na primeira movimentação. Renomear um produto (inclusive pelo
+    `catalogo_gtin.EnriquecedorProdutos`) ou sobrescrevê-lo reindexa suas
+    palavras (`produto_alterado`). As notificações chegam de qualquer thread
+    e são serializadas por uma trava interna.
+
+    O conteúdo inicial vem de `produtos` e `estoque` (por exemplo
+    `Inventario.produtos` e `Inventario.estoque`), com a recência dada por
+    `Produto.atualizado_em`.
+    """
+
+    LIMITE_CANDIDATOS = 4_000
+    LIMITE_VARREDURA = 2_000
+
+    def __init__(
+        self,
+        repositorio: Optional[RepositorioEstoque] = None,
+        produtos: Iterable[Produto] = (),
+        estoque: Iterable[ItemEstoque] = (),
+    ):
+        self.repositorio = repositorio
+        self._produtos: List[Produto] = []
+        # Palavras de cada produto, cada uma precedida de espaço: " leite integral itambe".
+        self._textos: List[str] = []
+        self._saldos: List[int] = []
+        # Chave do ranking: a sequência da última movimentação, somada a
+        # `_COM_ESTOQUE` se o produto tem estoque.
+        self._chaves: List[int] = []
+        self._sequencia = 0
+        self._posicao: Dict[UUID, int] = {}
+        self._postagens: Dict[str, Set[int]] = {}
+        self._vocabulario: List[str] = []
+        self._com_estoque: "OrderedDict[int, None]" = OrderedDict()
+        self._sem_estoque: "OrderedDict[int, None]" = OrderedDict()
+        self._trava = threading.Lock()
+
+        saldos: Dict[UUID, int] = {}
+        for item in estoque:
+            saldos[item.produto_id] = saldos.get(item.produto_id, 0) + item.quantidade
+        for produto in sorted(produtos, key=lambda p: p.atualizado_em):
+            if produto.id not in self._posicao:
+                self._indexar(produto, saldos.get(produto.id, 0))
+        if repositorio is not None:
+            repositorio.autocompletar = self
+
+    def desconectar(self) -> None:
+        """Deixa de receber as operações do repositório."""
+        if self.repositorio is not None and self.repositorio.autocompletar is self:
+            self.repositorio.autocompletar = None
+
+    def __len__(self) -> int:
+        return len(self._produtos)
+
+    def saldo(self, produto_id: UUID) -> int:
+        posicao = self._posicao.get(produto_id)
+        return self._saldos[posicao] if posicao is not None else 0
+
+    # Manutenção
+
+    def _indexar(self, produto: Produto, saldo: int) -> None:
+        posicao = len(self._produtos)
+        self._produtos.append(produto)
+        self._textos.append("")
+        self._saldos.append(saldo)
+        self._chaves.append(0)
+        self._posicao[produto.id] = posicao
+        self._definir_tokens(posicao, produto)
+        self._movimentar(posicao)
+
+    def _definir_tokens(self, posicao: int, produto: Produto) -> None:
+        for token in self._textos[posicao].split():
+            postagem = self._postagens[token]
+            postagem.discard(posicao)
+            if not postagem:
+                del self._postagens[token]
+                del self._vocabulario[bisect_left(self._vocabulario, token)]
+        tokens = tuple(dict.fromkeys(tokens_de_busca(f"{produto.nome} {produto.marca or ''}")))
+        self._textos[posicao] = "".join(f" {token}" for token in tokens)
+        for token in tokens:
+            postagem = self._postagens.get(token)
+            if postagem is None:
+                postagem = self._postagens[token] = set()
+                insort(self._vocabulario, token)
+            postagem.add(posicao)
+
+    def _movimentar(self, posicao: int) -> None:
+        self._sequencia += 1
+        if self._saldos[posicao] > 0:
+            self._chaves[posicao] = _COM_ESTOQUE + self._sequencia
+            destino, origem = self._com_estoque, self._sem_estoque
+        else:
+            self._chaves[posicao] = self._sequencia
+            destino, origem = self._sem_estoque, self._com_estoque
+        origem.pop(posicao, None)
+        destino[posicao] = None
+        destino.move_to_end(posicao) # Se já estava lá
+
+    def estoque_alterado(self, produto_id: UUID, delta: int) -> None:
+        """Aplica a variação do saldo do produto e o torna o mais recente."""
+        # Produto novo: é buscado antes de pegar a trava do índice.
+        produto = (
+            self.repositorio.buscar_produto_por_id(produto_id)
+            if produto_id not in self._posicao and self.repositorio is not None else None
+        )
+        with self._trava:
+            posicao = self._posicao.get(produto_id)
+            if posicao is None:
+                if produto is not None:
+                    self._indexar(produto, delta)
+                return
+            self._saldos[posicao] += delta
+            self._movimentar(posicao)
+
+    def produto_alterado(self, produto: Produto) -> None:
+        """Reindexa nome e marca do produto (o objeto também substitui o anterior de mesmo id)."""
+        with self._trava:
+            posicao = self._posicao.get(produto.id)
+            if posicao is None:
+                self._indexar(produto, 0)
+                return
+            self._produtos[posicao] = produto
+            self._definir_tokens(posicao, produto)
+
+    # Consulta
+
+    def _faixa(self, prefixo: str) -> Tuple[int, int]:
+        return (
+            bisect_left(self._vocabulario, prefixo),
+            bisect_left(self._vocabulario, prefixo + _FIM_DO_PREFIXO),
+        )
+
+    def sugerir(self, texto: str, k: int = 10) -> List[Produto]:
+        """
+        Até `k` produtos cujas palavras começam com as palavras de `texto`.
+
+        Returns:
+            Os produtos com estoque antes dos sem estoque; em cada grupo, do
+            movimentado mais recentemente ao mais antigo.
+        """
+        prefixos = list(dict.fromkeys(tokens_de_busca(texto)))
+        if not prefixos or k <= 0:
+            return []
+        with self._trava:
+            faixas = []
+            for prefixo in prefixos:
+                inicio, fim = self._faixa(prefixo)
+                if inicio == fim:
+                    return []
+                faixas.append((self._contar(inicio, fim), inicio, fim))
+            faixas.sort()
+
+            if faixas[0][0] > self.LIMITE_CANDIDATOS:
+                escolhidos = self._varrer_ranking([f" {prefixo}" for prefixo in prefixos], k)
+                if escolhidos is not None:
+                    return [self._produtos[posicao] for posicao in escolhidos]
+
+            _, inicio, fim = faixas[0]
+            candidatos = self._reunir(inicio, fim)
+            for _, inicio, fim in faixas[1:]:
+                candidatos = candidatos & self._reunir(inicio, fim) # Não altera os conjuntos do índice
+            escolhidos = heapq.nlargest(k, candidatos, key=self._chaves.__getitem__)
+            return [self._produtos[posicao] for posicao in escolhidos]
+
+    def _contar(self, inicio: int, fim: int) -> int:
+        """Produtos das palavras da faixa, contados só até passar de `LIMITE_CANDIDATOS`."""
+        total = 0
+        for i in range(inicio, fim):
+            total += len(self._postagens[self._vocabulario[i]])
+            if total > self.LIMITE_CANDIDATOS:
+                break
+        return total
+
+    def _reunir(self, inicio: int, fim: int) -> Set[int]:
+        """Produtos com alguma das palavras da faixa (o conjunto não deve ser alterado)."""
+        if fim - inicio == 1:
+            return self._postagens[self._vocabulario[inicio]]
+        reunidos: Set[int] = set()
+        for i in range(inicio, fim):
+            reunidos |= self._postagens[self._vocabulario[i]]
+        return reunidos
+
+    def _varrer_ranking(self, marcas: List[str], k: int) -> Optional[List[int]]:
+        """Os k primeiros do ranking com todas as `marcas` no texto, ou None se não aparecerem logo."""
+        textos = self._textos
+        primeira, outras = marcas[0], marcas[1:]
+        escolhidos: List[int] = []
+        for passos, posicao in enumerate(chain(reversed(self._com_estoque), reversed(self._sem_estoque))):
+            if passos == self.LIMITE_VARREDURA:
+                return None
+            texto = textos[posicao]
+            if primeira in texto and (not outras or all(marca in texto for marca in outras)):
+                escolhidos.append(posicao)
+                if len(escolhidos) == k:
+                    break
+        return escolhidos
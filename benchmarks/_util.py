@@ -0,0 +1,37 @@
+"""Utilitários compartilhados pelos benchmarks (execute com `python -m benchmarks.<nome>`)."""
+import sys
+import time
+from typing import Callable, List, Sequence, Tuple
+
+from models import Produto, ItemEstoque
+
+TAMANHOS_PADRAO = (1_000, 10_000, 100_000, 1_000_000)
+
+def tamanhos_da_linha_de_comando(padrao: Sequence[int] = TAMANHOS_PADRAO) -> List[int]:
+    """Lê tamanhos passados como argumentos (ex.: `1000 10000`) ou usa o padrão."""
+    if len(sys.argv) > 1:
+        return [int(arg) for arg in sys.argv[1:]]
+    return list(padrao)
+
+def cronometrar(funcao: Callable[[], object], repeticoes: int = 1) -> float:
+    """Retorna o tempo médio, em segundos, de `repeticoes` chamadas a `funcao`."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+def codigo_de_barras(i: int) -> str:
+    return f"789{i:010d}"
+
+def gerar_catalogo(n: int, com_estoque: bool = True) -> Tuple[List[Produto], List[ItemEstoque]]:
+    """Gera `n` produtos sintéticos e, opcionalmente, um item de estoque para cada um."""
+    produtos = [Produto(nome=f"Produto Sintetico {i}", codigo_de_barras=codigo_de_barras(i)) for i in range(n)]
+    estoque = [ItemEstoque(produto_id=p.id, quantidade=5) for p in produtos] if com_estoque else []
+    return produtos, estoque
+
+def formatar_tempo(segundos: float) -> str:
+    if segundos < 1e-3:
+        return f"{segundos * 1e6:9.1f} µs"
+    if segundos < 1:
+        return f"{segundos * 1e3:9.2f} ms"
+    return f"{segundos:9.2f} s "
@@ -0,0 +1,80 @@
+"""
+Previsão noturna de reposição sobre milhões de eventos de estoque.
+
+Gera `CASAS` casas com `PRODUTOS` produtos cada e distribui N eventos (um
+terço entradas, dois terços consumos) ao longo de 180 dias. Mede a carga
+dos eventos nas séries colunares, a previsão de todas as séries com
+`AnaliseConsumo.prever` em lote (só com numpy instalado) e série a série
+(o caminho sem numpy, forçado aqui para comparação), e `a_repor` dos
+próximos 7 dias. Os tempos de `prever` incluem criar uma
+`PrevisaoReposicao` por série, igual nos dois caminhos.
+
+Uso: python -m benchmarks.bench_analise_consumo [quantidades de eventos...]
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import analise_consumo
+from analise_consumo import AnaliseConsumo, MICROSSEGUNDOS_POR_DIA
+from codificacao import datetime_para_int
+from benchmarks._util import formatar_tempo, tamanhos_da_linha_de_comando
+
+CASAS = 1_000
+PRODUTOS = 100
+DIAS = 180
+AGORA = datetime(2024, 6, 30)
+JANELA_DIAS = 28
+
+def main() -> None:
+    com_numpy = analise_consumo.numpy
+    if com_numpy is None:
+        print("numpy não instalado: sem a coluna da previsão em lote")
+    print(
+        f"{'eventos':>10} | {'séries':>7} | {'carga':>12} | {'em lote':>12} | "
+        f"{'série a série':>13} | {'a repor':>12} | {'a repor em 7 dias':>17}"
+    )
+    for n in tamanhos_da_linha_de_comando((1_000_000, 10_000_000)):
+        aleatorio = random.Random(4)
+        analise = AnaliseConsumo()
+        produtos = [uuid4() for _ in range(PRODUTOS)]
+        series = [analise.serie(f"casa{c}", p) for c in range(CASAS) for p in produtos]
+        fim = datetime_para_int(AGORA)
+        por_serie = n // len(series)
+
+        inicio = time.perf_counter()
+        for serie in series:
+            momentos = sorted(fim - aleatorio.randrange(DIAS * MICROSSEGUNDOS_POR_DIA) for _ in range(por_serie))
+            for i, momento in enumerate(momentos):
+                serie.registrar(momento, 2 if i % 3 == 0 else -1)
+        t_carga = time.perf_counter() - inicio
+
+        t_lote = None
+        if com_numpy is not None:
+            inicio = time.perf_counter()
+            em_lote = analise.prever(AGORA, JANELA_DIAS)
+            t_lote = time.perf_counter() - inicio
+
+        analise_consumo.numpy = None
+        try:
+            inicio = time.perf_counter()
+            previsoes = analise.prever(AGORA, JANELA_DIAS)
+            t_por_serie = time.perf_counter() - inicio
+        finally:
+            analise_consumo.numpy = com_numpy
+        if com_numpy is not None:
+            assert [p.esgota_em for p in em_lote] == [p.esgota_em for p in previsoes]
+
+        inicio = time.perf_counter()
+        a_repor = analise.a_repor(AGORA.date() + timedelta(days=7), AGORA, JANELA_DIAS)
+        t_a_repor = time.perf_counter() - inicio
+
+        print(
+            f"{por_serie * len(series):>10} | {len(series):>7} | {formatar_tempo(t_carga):>12} | "
+            f"{formatar_tempo(t_lote) if t_lote is not None else '-':>12} | {formatar_tempo(t_por_serie):>13} | "
+            f"{formatar_tempo(t_a_repor):>12} | {len(a_repor):>17}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Latência por tecla das sugestões por prefixo (`autocompletar.IndiceAutocompletar`).
+
+Gera N produtos com nomes e marcas combinados de listas de palavras (com
+acentos), 60% deles com estoque e datas de atualização sorteadas, e digita
+consultas letra a letra, medindo cada tecla (p50, p99, máximo e a fração
+das teclas respondidas em até 1 ms). Com poucas palavras distintas, cada
+uma aparece em dezenas de milhares de produtos: é o pior caso para
+combinações raras de palavras comuns ("refri zero"). A referência é uma
+varredura linear dos produtos para uma consulta, como as buscas de
+`stock_management`. Também mede a construção do índice e o custo que ele
+acrescenta a cada leitura de código de barras no `Inventario`.
+
+Uso: python -m benchmarks.bench_autocompletar [tamanhos...]
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+from autocompletar import IndiceAutocompletar, tokens_de_busca
+from benchmarks._util import cronometrar, formatar_tempo, tamanhos_da_linha_de_comando
+
+TIPOS = [
+    "Leite", "Leite Condensado", "Creme de Leite", "Iogurte", "Queijo Minas", "Requeijão", "Manteiga",
+    "Margarina", "Pão de Forma", "Biscoito", "Café", "Chá", "Açúcar", "Arroz", "Feijão", "Macarrão",
+    "Molho de Tomate", "Azeite", "Óleo de Soja", "Sabão em Pó", "Detergente", "Papel Higiênico",
+    "Lenço de Papel", "Chocolate", "Refrigerante", "Suco", "Água Mineral", "Cerveja", "Farinha de Trigo",
+    "Fubá", "Aveia", "Granola", "Maçã", "Banana", "Limão", "Tomate", "Cebola", "Batata", "Frango", "Linguiça",
+]
+VARIANTES = [
+    "Integral", "Desnatado", "Light", "Zero", "Tradicional", "Orgânico", "Sem Lactose", "Morango",
+    "Chocolate", "Limão", "Baunilha", "Picante", "Extra Virgem", "Tipo 1", "Família", "Premium",
+]
+TAMANHOS = ["200g", "500g", "1kg", "2kg", "350ml", "1L", "2L", "6un", "12un"]
+MARCAS = 2_000
+
+CONSULTAS = ["leite int", "acucar", "moca", "pap hig", "refri zero", "cafe", "marca 17", "x", "sabao em po", "choc"]
+OPERACOES = 20_000
+
+def gerar_produtos(n: int):
+    aleatorio = random.Random(21)
+    inicio = datetime(2023, 1, 1)
+    produtos, estoque = [], []
+    for i in range(n):
+        nome = f"{aleatorio.choice(TIPOS)} {aleatorio.choice(VARIANTES)} {aleatorio.choice(TAMANHOS)}"
+        produto = Produto(nome=nome, codigo_de_barras=f"789{i:010d}", marca=f"Marca {aleatorio.randrange(MARCAS)}")
+        produto.atualizado_em = inicio + timedelta(seconds=aleatorio.randrange(40_000_000))
+        produtos.append(produto)
+        if aleatorio.random() < 0.6:
+            estoque.append(ItemEstoque(produto.id, aleatorio.randint(1, 5)))
+    return produtos, estoque
+
+def varredura_linear(produtos, estoque, texto: str, k: int = 10):
+    prefixos = tokens_de_busca(texto)
+    com_estoque = {item.produto_id for item in estoque}
+    achados = [
+        p for p in produtos
+        if all(any(t.startswith(q) for t in tokens_de_busca(f"{p.nome} {p.marca}")) for q in prefixos)
+    ]
+    achados.sort(key=lambda p: (p.id in com_estoque, p.atualizado_em), reverse=True)
+    return achados[:k]
+
+def main() -> None:
+    print(
+        f"{'N':>9} | {'construção':>12} | {'tecla p50':>12} | {'tecla p99':>12} | {'tecla máx.':>12} | "
+        f"{'até 1 ms':>8} | {'linear':>12} | {'leitura':>12} | {'leitura+índice':>14}"
+    )
+    for n in tamanhos_da_linha_de_comando((50_000, 500_000)):
+        produtos, estoque = gerar_produtos(n)
+        inventario = Inventario(produtos, estoque)
+        aleatorio = random.Random(1)
+        codigos = [produtos[aleatorio.randrange(n)].codigo_de_barras for _ in range(OPERACOES)]
+
+        def leituras():
+            for codigo in codigos:
+                inventario.adicionar_produto_por_codigo_de_barras(codigo)
+
+        # Custo nas leituras: o mesmo Inventario antes e depois de conectar o índice.
+        sem_indice = min(cronometrar(leituras) for _ in range(3)) / OPERACOES
+        inicio = time.perf_counter()
+        indice = IndiceAutocompletar(inventario, produtos, estoque)
+        construcao = time.perf_counter() - inicio
+        com_indice = min(cronometrar(leituras) for _ in range(3)) / OPERACOES
+
+        tempos = []
+        for consulta in CONSULTAS:
+            for fim in range(1, len(consulta) + 1):
+                parcial = consulta[:fim]
+                tempos.append(min(cronometrar(lambda: indice.sugerir(parcial)) for _ in range(3)))
+        tempos.sort()
+        p50, p99, maximo = tempos[len(tempos) // 2], tempos[int(len(tempos) * 0.99)], tempos[-1]
+        linear = cronometrar(lambda: varredura_linear(produtos, estoque, "leite int"))
+        print(
+            f"{n:>9} | {formatar_tempo(construcao)} | {formatar_tempo(p50)} | {formatar_tempo(p99)} | "
+            f"{formatar_tempo(maximo)} | {sum(t <= 1e-3 for t in tempos) / len(tempos):>8.0%} | "
+            f"{formatar_tempo(linear)} | {formatar_tempo(sem_indice)} | "
+            f"{formatar_tempo(com_indice):>14}"
+        )
+
+if __name__ == "__main__":
+    main()
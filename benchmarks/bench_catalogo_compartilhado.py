@@ -0,0 +1,84 @@
+"""
+Memória de muitas casas com produtos duplicados por casa e com o catálogo compartilhado.
+
+Cada uma de N casas lê `PRODUTOS_POR_CASA` códigos sorteados de um catálogo
+de `CATALOGO` GTINs. Na disposição duplicada (a atual), cada casa cria o
+seu `Produto` para cada código; na internada, as casas usam o
+`CatalogoCompartilhado`, e o `Produto` de cada GTIN existe uma vez no
+processo. Uma fração das casas sobrescreve o nome de alguns produtos, o que
+cria cópias só para elas. A memória é a alocada pelo Python (tracemalloc) e
+inclui os itens de estoque e índices das casas; o arquivo mapeado, que fica
+no cache de páginas e é compartilhado entre processos, aparece à parte.
+
+Uso: python -m benchmarks.bench_catalogo_compartilhado [quantidades de casas...]
+"""
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import List, Optional
+
+from inventario import Inventario
+from catalogo_gtin import MetadadosGTIN, digito_verificador_gtin
+from catalogo_compartilhado import CatalogoCompartilhado, gravar_catalogo
+from benchmarks._util import formatar_tempo, tamanhos_da_linha_de_comando
+
+CATALOGO = 100_000
+PRODUTOS_POR_CASA = 200
+FRACAO_COM_SOBRESCRITA = 0.1
+SOBRESCRITAS_POR_CASA = 5
+
+def ean13(i: int) -> str:
+    corpo = f"789{i:09d}"
+    return corpo + str(digito_verificador_gtin(corpo))
+
+def montar_casas(n: int, catalogo: Optional[CatalogoCompartilhado]) -> List[Inventario]:
+    aleatorio = random.Random(6)
+    casas = []
+    for _ in range(n):
+        casa = Inventario(catalogo=catalogo)
+        codigos = [ean13(aleatorio.randrange(CATALOGO)) for _ in range(PRODUTOS_POR_CASA)]
+        resultados = casa.adicionar_produtos_por_codigos_de_barras(codigos)
+        if catalogo is not None and aleatorio.random() < FRACAO_COM_SOBRESCRITA:
+            for produto, _ in list(resultados.values())[:SOBRESCRITAS_POR_CASA]:
+                casa.sobrescrever_produto(produto.id, nome=f"{produto.nome} da casa")
+        casas.append(casa)
+    return casas
+
+def medir(n: int, catalogo: Optional[CatalogoCompartilhado]):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    casas = montar_casas(n, catalogo)
+    duracao = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del casas
+    return memoria, duracao
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "catalogo.bin")
+        gravar_catalogo(caminho, (
+            (ean13(i), MetadadosGTIN(f"Produto Sintetico {i}", f"Marca {i % 500}", "un")) for i in range(CATALOGO)
+        ))
+        print(f"catálogo de {CATALOGO} GTINs: arquivo de {os.path.getsize(caminho) / 1e6:.1f} MB (mapeado, compartilhado)")
+        print(
+            f"{'casas':>8} | {'duplicado':>12} | {'por casa':>10} | {'internado':>12} | {'por casa':>10} | "
+            f"{'economia':>8} | {'tempo dup.':>12} | {'tempo int.':>12}"
+        )
+        for n in tamanhos_da_linha_de_comando((100, 1_000)):
+            duplicado, t_duplicado = medir(n, None)
+            catalogo = CatalogoCompartilhado(caminho)
+            internado, t_internado = medir(n, catalogo)
+            catalogo.fechar()
+            print(
+                f"{n:>8} | {duplicado / 1e6:>9.1f} MB | {duplicado / n / 1e3:>7.1f} kB | "
+                f"{internado / 1e6:>9.1f} MB | {internado / n / 1e3:>7.1f} kB | "
+                f"{1 - internado / duplicado:>7.0%} | {formatar_tempo(t_duplicado):>12} | {formatar_tempo(t_internado):>12}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Cache local de metadados por GTIN: importação em massa e buscas por segundo.
+
+Gera um CSV com N EAN-13 válidos, importa para um `CacheGTIN` em arquivo e
+mede buscas individuais (acertos, códigos válidos ausentes e códigos com
+dígito verificador errado, recusados sem consulta) e em lote com
+`buscar_varios`.
+
+Uso: python -m benchmarks.bench_catalogo_gtin [quantidades de registros...]
+"""
+import os
+import random
+import tempfile
+import time
+
+from catalogo_gtin import CacheGTIN, digito_verificador_gtin
+from benchmarks._util import tamanhos_da_linha_de_comando
+
+BUSCAS = 200_000
+LOTE = 256
+
+def ean13(i: int) -> str:
+    corpo = f"789{i:09d}"
+    return corpo + str(digito_verificador_gtin(corpo))
+
+def main() -> None:
+    print(
+        f"{'registros':>10} | {'importação (reg/s)':>18} | {'arquivo':>9} | {'acertos/s':>10} | "
+        f"{'ausentes/s':>10} | {'DV inválido/s':>13} | {'em lote/s':>10}"
+    )
+    for n in tamanhos_da_linha_de_comando((100_000, 1_000_000, 5_000_000)):
+        aleatorio = random.Random(9)
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho_csv = os.path.join(diretorio, "dump.csv")
+            with open(caminho_csv, "w", encoding="utf-8") as arquivo:
+                arquivo.write("gtin,nome,marca,unidade\n")
+                for i in range(0, 2 * n, 2): # só os pares, para sobrar códigos válidos ausentes
+                    arquivo.write(f"{ean13(i)},Produto {i},Marca {i % 997},un\n")
+
+            caminho = os.path.join(diretorio, "gtin.db")
+            cache = CacheGTIN(caminho)
+            inicio = time.perf_counter()
+            importados, _ = cache.importar_csv(caminho_csv)
+            t_importacao = time.perf_counter() - inicio
+
+            acertos = [ean13(2 * aleatorio.randrange(n)) for _ in range(BUSCAS)]
+            ausentes = [ean13(2 * aleatorio.randrange(n) + 1) for _ in range(BUSCAS)]
+            invalidos = [codigo[:-1] + str((int(codigo[-1]) + 1) % 10) for codigo in acertos]
+            vazoes = []
+            for codigos in (acertos, ausentes, invalidos):
+                inicio = time.perf_counter()
+                for codigo in codigos:
+                    cache.buscar(codigo)
+                vazoes.append(BUSCAS / (time.perf_counter() - inicio))
+            inicio = time.perf_counter()
+            for j in range(0, BUSCAS, LOTE):
+                cache.buscar_varios(acertos[j:j + LOTE])
+            vazoes.append(BUSCAS / (time.perf_counter() - inicio))
+            tamanho = os.path.getsize(caminho) / 1e6
+            cache.fechar()
+
+        print(
+            f"{n:>10} | {importados / t_importacao:>18,.0f} | {tamanho:>6.0f} MB | {vazoes[0]:>10,.0f} | "
+            f"{vazoes[1]:>10,.0f} | {vazoes[2]:>13,.0f} | {vazoes[3]:>10,.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
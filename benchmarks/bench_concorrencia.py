@@ -0,0 +1,70 @@
+"""
+Vazão de `InventarioConcorrente` por número de threads: travas listradas contra uma trava global.
+
+Cada thread adiciona e remove unidades de produtos próprios. Com `latência`
+> 0, cada gravação de item espera esse tempo dentro da trava, como faria uma
+escrita em disco ou rede, que libera o GIL. Sem latência o trabalho é só
+CPU e o GIL limita a vazão de qualquer forma; a coluna mostra então apenas
+o custo das travas.
+
+Uso: python -m benchmarks.bench_concorrencia [quantidades de threads...]
+"""
+import threading
+import time
+
+from concorrencia import InventarioConcorrente
+from benchmarks._util import tamanhos_da_linha_de_comando
+
+OPERACOES_POR_THREAD = 2_000
+PRODUTOS_POR_THREAD = 50
+LATENCIAS = (0.0, 0.0002)
+
+class InventarioComLatencia(InventarioConcorrente):
+    def __init__(self, latencia: float, **opcoes):
+        self.latencia = latencia
+        super().__init__(**opcoes)
+
+    def atualizar_item(self, item) -> None:
+        super().atualizar_item(item)
+        if self.latencia:
+            time.sleep(self.latencia)
+
+def medir(threads: int, listras: int, latencia: float) -> float:
+    inventario = InventarioComLatencia(latencia, listras=listras)
+    operacoes = OPERACOES_POR_THREAD if latencia == 0 else OPERACOES_POR_THREAD // 10
+    barreira = threading.Barrier(threads + 1)
+
+    def trabalhar(indice: int) -> None:
+        codigos = [f"T{indice}P{p}" for p in range(PRODUTOS_POR_THREAD)]
+        for codigo in codigos:
+            inventario.adicionar_produto_por_codigo_de_barras(codigo)
+        barreira.wait()
+        for j in range(operacoes):
+            codigo = codigos[j % PRODUTOS_POR_THREAD]
+            if j % 2:
+                inventario.remover_produto_por_codigo_de_barras(codigo)
+            else:
+                inventario.adicionar_produto_por_codigo_de_barras(codigo)
+
+    trabalhadores = [threading.Thread(target=trabalhar, args=(i,)) for i in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    barreira.wait()
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    return threads * operacoes / (time.perf_counter() - inicio)
+
+def main() -> None:
+    print(f"{'threads':>7} | {'latência':>9} | {'trava global (op/s)':>20} | {'listradas (op/s)':>17} | {'ganho':>6}")
+    for threads in tamanhos_da_linha_de_comando((1, 2, 4, 8, 16)):
+        for latencia in LATENCIAS:
+            global_ = medir(threads, 1, latencia)
+            listradas = medir(threads, 64, latencia)
+            print(
+                f"{threads:>7} | {latencia * 1e6:>6.0f} µs | {global_:>20,.0f} | {listradas:>17,.0f} | "
+                f"{listradas / global_:>5.1f}x"
+            )
+
+if __name__ == "__main__":
+    main()
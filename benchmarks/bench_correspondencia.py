@@ -0,0 +1,89 @@
+"""
+Latência e acerto da correspondência aproximada sobre um corpus sintético de cupons.
+
+O catálogo combina categorias, variantes, marcas e tamanhos; cada linha de
+cupom é derivada de um nome do catálogo com as deformações típicas de NFC-e
+(caixa alta, sem acentos, abreviações, tokens truncados e medidas reescritas).
+
+Uso: python -m benchmarks.bench_correspondencia [tamanhos de catálogo...]
+"""
+import random
+import time
+import unicodedata
+
+from correspondencia import IndiceCorrespondencia
+from benchmarks._util import formatar_tempo, tamanhos_da_linha_de_comando
+
+CATEGORIAS = [
+    "Arroz", "Feijão", "Leite", "Macarrão", "Café", "Açúcar", "Biscoito", "Chocolate", "Refrigerante",
+    "Sabão", "Detergente", "Iogurte", "Queijo", "Manteiga", "Margarina", "Farinha", "Óleo", "Azeite",
+    "Cerveja", "Suco", "Papel Higiênico", "Shampoo", "Condicionador", "Sabonete", "Molho", "Extrato",
+]
+VARIANTES = [
+    "Tipo 1", "Integral", "Desnatado", "Carioca", "Preto", "Espaguete", "Parafuso", "Tradicional",
+    "Extra Forte", "Cristal", "Refinado", "Recheado", "Ao Leite", "Meio Amargo", "Cola", "Guaraná",
+    "Em Pó", "Líquido", "Natural", "Morango", "Mussarela", "Prato", "Com Sal", "Sem Sal", "Uva", "Laranja",
+]
+TAMANHOS = ["1kg", "5kg", "500g", "200g", "1L", "2L", "350ml", "1,5L", "90g", "400g"]
+ABREVIAR = {"Leite": "LTE", "Feijão": "FEIJ", "Refrigerante": "REFRIG", "Tipo": "TP", "Integral": "INT", "Tradicional": "TRAD"}
+MEDIDAS_CUPOM = {"1kg": "1KG", "5kg": "5 KG", "500g": "0,5KG", "1L": "1LT", "2L": "2 LT", "1,5L": "1.5L"}
+
+def gerar_nomes(n: int, aleatorio: random.Random) -> list:
+    silabas = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "zo"]
+    quantidade_marcas = max(1, n // (len(CATEGORIAS) * len(VARIANTES))) + 1
+    marcas = set()
+    while len(marcas) < quantidade_marcas:
+        marcas.add("".join(aleatorio.choice(silabas) for _ in range(3)).capitalize())
+    marcas = sorted(marcas)
+    nomes = set()
+    while len(nomes) < n:
+        nomes.add(" ".join((
+            aleatorio.choice(CATEGORIAS), aleatorio.choice(VARIANTES),
+            aleatorio.choice(marcas), aleatorio.choice(TAMANHOS),
+        )))
+    return sorted(nomes)
+
+def deformar(nome: str, aleatorio: random.Random) -> str:
+    """Reescreve um nome como ele apareceria em uma NFC-e."""
+    palavras = []
+    for palavra in nome.split():
+        palavra = MEDIDAS_CUPOM.get(palavra, palavra)
+        if palavra in ABREVIAR and aleatorio.random() < 0.7:
+            palavra = ABREVIAR[palavra]
+        elif len(palavra) > 6 and aleatorio.random() < 0.3:
+            palavra = palavra[:aleatorio.randint(4, 6)]
+        palavras.append(palavra)
+    texto = unicodedata.normalize("NFKD", " ".join(palavras))
+    return "".join(c for c in texto if not unicodedata.combining(c)).upper()
+
+def main() -> None:
+    aleatorio = random.Random(7)
+    print(f"{'catálogo':>9} | {'indexação':>10} | {'p50':>10} | {'p99':>10} | {'acerto@1':>8}")
+    for n in tamanhos_da_linha_de_comando((1_000, 10_000, 100_000)):
+        nomes = gerar_nomes(n, aleatorio)
+        indice: IndiceCorrespondencia[str] = IndiceCorrespondencia()
+        inicio = time.perf_counter()
+        for nome in nomes:
+            indice.adicionar(nome, nome)
+        t_indexacao = time.perf_counter() - inicio
+
+        amostra = aleatorio.sample(nomes, min(2_000, n))
+        latencias = []
+        acertos = 0
+        for nome in amostra:
+            linha = deformar(nome, aleatorio)
+            inicio = time.perf_counter()
+            resultado = indice.buscar(linha)
+            latencias.append(time.perf_counter() - inicio)
+            acertos += resultado is not None and resultado[0] == nome
+
+        latencias.sort()
+        p50 = latencias[len(latencias) // 2]
+        p99 = latencias[int(len(latencias) * 0.99)]
+        print(
+            f"{n:>9} | {formatar_tempo(t_indexacao):>10} | {formatar_tempo(p50):>10} | "
+            f"{formatar_tempo(p99):>10} | {acertos / len(amostra):>8.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
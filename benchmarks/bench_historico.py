@@ -0,0 +1,74 @@
+"""
+Log de eventos do estoque: vazão de gravação, tamanho do log e reprodução na abertura.
+
+Aplica leituras de código de barras (com 1 remoção a cada 4 leituras) sobre um
+catálogo de `TAMANHO_CATALOGO` códigos, mede a reabertura reproduzindo o
+log inteiro e a reabertura a partir de um instantâneo tirado em 90% das
+operações (só a cauda é reproduzida).
+
+Uso: python -m benchmarks.bench_historico [quantidades de operações...]
+"""
+import os
+import random
+import tempfile
+import time
+
+from inventario import Inventario
+from historico import InventarioComHistorico, ler_eventos
+from benchmarks._util import codigo_de_barras, formatar_tempo, tamanhos_da_linha_de_comando
+
+TAMANHO_CATALOGO = 10_000
+
+def operar(inventario, codigos) -> float:
+    inicio = time.perf_counter()
+    for i, codigo in enumerate(codigos):
+        if i % 4 == 3:
+            inventario.remover_produto_por_codigo_de_barras(codigo)
+        else:
+            inventario.adicionar_produto_por_codigo_de_barras(codigo)
+    return time.perf_counter() - inicio
+
+def main() -> None:
+    print(
+        f"{'operações':>10} | {'sem log (op/s)':>15} | {'com log (op/s)':>15} | {'eventos/s':>10} | "
+        f"{'MB/1M eventos':>13} | {'reprodução total':>16} | {'instantâneo + cauda':>19}"
+    )
+    for n in tamanhos_da_linha_de_comando((100_000, 1_000_000)):
+        aleatorio = random.Random(1)
+        codigos = [codigo_de_barras(aleatorio.randrange(TAMANHO_CATALOGO)) for _ in range(n)]
+        corte = n * 9 // 10
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            t_sem_log = operar(Inventario(), codigos)
+
+            inventario = InventarioComHistorico(diretorio)
+            t_com_log = operar(inventario, codigos)
+            inventario.fechar()
+            caminho_log = os.path.join(diretorio, InventarioComHistorico.ARQUIVO_LOG)
+            eventos = sum(1 for _ in ler_eventos(caminho_log))
+            # Bytes por evento equivalem a MB por milhão de eventos.
+            bytes_por_evento = os.path.getsize(caminho_log) / eventos
+
+            inicio = time.perf_counter()
+            InventarioComHistorico(diretorio).fechar()
+            t_reproducao_total = time.perf_counter() - inicio
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            inventario = InventarioComHistorico(diretorio)
+            operar(inventario, codigos[:corte])
+            inventario.salvar_instantaneo()
+            operar(inventario, codigos[corte:])
+            inventario.fechar()
+
+            inicio = time.perf_counter()
+            InventarioComHistorico(diretorio).fechar()
+            t_instantaneo = time.perf_counter() - inicio
+
+        print(
+            f"{n:>10} | {n / t_sem_log:>15,.0f} | {n / t_com_log:>15,.0f} | {eventos / t_com_log:>10,.0f} | "
+            f"{bytes_por_evento:>13.1f} | {formatar_tempo(t_reproducao_total):>16} | "
+            f"{formatar_tempo(t_instantaneo):>19}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Importação em massa de cupons de um JSONL: vazão e pico de memória.
+
+Grava em fluxo um arquivo com N cupons (5 linhas cada, sorteadas de um
+catálogo de `PRODUTOS` nomes) e o importa com `ImportadorCupons` no
+`Inventario` em memória e no `RepositorioSQLite` em arquivo. Cada
+importação roda em um processo novo, para que o pico de memória residente
+(`ru_maxrss`) seja só dela; o pico é mostrado a cada quinto do arquivo, e
+deve parar de crescer depois que o catálogo inteiro foi visto. A última
+linha é o modo antigo no SQLite, um `adicionar_produtos_por_cupom_fiscal`
+(uma transação) por cupom, medido em uma amostra.
+
+Uso: python -m benchmarks.bench_importacao_cupons [quantidades de cupons...]
+"""
+import json
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from importacao_cupons import ImportadorCupons, ler_cupons_jsonl
+from benchmarks._util import tamanhos_da_linha_de_comando
+
+PRODUTOS = 5_000
+ITENS_POR_CUPOM = 5
+AMOSTRA_ANTIGA = 5_000
+
+def gravar_cupons(caminho: str, n: int) -> None:
+    aleatorio = random.Random(8)
+    inicio = date(2019, 1, 1)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for i in range(n):
+            itens = [
+                {"nome": f"Produto {aleatorio.randrange(PRODUTOS)}", "quantidade": aleatorio.randint(1, 3),
+                 "preco_unitario": 9.9}
+                for _ in range(ITENS_POR_CUPOM)
+            ]
+            arquivo.write(json.dumps({
+                "dados_qr_code": f"qr{i}",
+                "data_compra": (inicio + timedelta(days=i % 1_800)).isoformat(),
+                "nome_loja": "Mercado",
+                "itens": itens,
+            }))
+            arquivo.write("\n")
+
+def pico_de_memoria_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB no Linux
+
+def importar(backend: str, caminho: str, diretorio: str, n: int, saida) -> None:
+    repositorio = Inventario() if backend == "Inventario" else RepositorioSQLite(os.path.join(diretorio, "estoque.db"))
+    marcas = []
+    inicio = time.perf_counter()
+
+    def progresso(resumo):
+        if resumo.lidos % max(1, n // 5) == 0 or resumo.lidos == n:
+            marcas.append((resumo.lidos, pico_de_memoria_mb()))
+
+    importador = ImportadorCupons(repositorio, cupons_por_transacao=2_000, progresso=progresso)
+    resumo = importador.importar(ler_cupons_jsonl(caminho))
+    saida.put((resumo.importados / (time.perf_counter() - inicio), marcas))
+
+def importar_um_por_vez(caminho: str, diretorio: str, saida) -> None:
+    repositorio = RepositorioSQLite(os.path.join(diretorio, "antigo.db"))
+    cupons = [lido.cupom for lido in islice(ler_cupons_jsonl(caminho), AMOSTRA_ANTIGA)]
+    inicio = time.perf_counter()
+    for cupom in cupons:
+        repositorio.adicionar_produtos_por_cupom_fiscal(cupom) # type: ignore[arg-type]
+    saida.put((len(cupons) / (time.perf_counter() - inicio), []))
+
+def em_processo_novo(alvo, *argumentos):
+    saida: multiprocessing.Queue = multiprocessing.Queue()
+    processo = multiprocessing.Process(target=alvo, args=(*argumentos, saida))
+    processo.start()
+    resultado = saida.get()
+    processo.join()
+    return resultado
+
+def main() -> None:
+    print(f"{'cupons':>10} | {'backend':>22} | {'cupons/s':>9} | pico de memória (MB) ao longo do arquivo")
+    for n in tamanhos_da_linha_de_comando((100_000, 1_000_000)):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "cupons.jsonl")
+            gravar_cupons(caminho, n)
+            for backend in ("Inventario", "RepositorioSQLite"):
+                vazao, marcas = em_processo_novo(importar, backend, caminho, diretorio, n)
+                pico = "  ".join(f"{lidos // 1000}k: {mb:.0f}" for lidos, mb in marcas)
+                print(f"{n:>10} | {backend:>22} | {vazao:>9,.0f} | {pico}")
+            vazao, _ = em_processo_novo(importar_um_por_vez, caminho, diretorio)
+            print(f"{n:>10} | {'SQLite, um por cupom':>22} | {vazao:>9,.0f} |")
+
+if __name__ == "__main__":
+    main()
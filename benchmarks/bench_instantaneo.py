@@ -0,0 +1,145 @@
+"""
+Instantâneo binário do estoque (`instantaneo`) contra JSON e pickle.
+
+Gera N itens de estoque sobre N/10 produtos (com marcas e unidades
+repetidas, datas de compra e, em metade dos itens, validade e cupom de
+origem) e mede, para cada formato, o tamanho do arquivo, a gravação, a
+abertura até o primeiro item utilizável e a carga de todos os objetos. No
+JSON os objetos são recriados com `restaurar`, como no binário; o pickle
+recria os objetos sozinho. Na carga do binário o `Inventario` é montado
+sem índices, para medir só a criação dos objetos, como nos outros formatos.
+
+Uso: python -m benchmarks.bench_instantaneo [quantidades de itens...]
+"""
+import json
+import os
+import pickle
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from models import Produto, ItemEstoque
+from instantaneo import Instantaneo, gravar_instantaneo
+from benchmarks._util import codigo_de_barras, formatar_tempo, tamanhos_da_linha_de_comando
+
+MARCAS = [f"Marca {i}" for i in range(200)]
+UNIDADES = ["un", "kg", "g", "l", "ml"]
+
+def gerar(n: int):
+    aleatorio = random.Random(23)
+    inicio = datetime(2023, 1, 1)
+    produtos = [
+        Produto(f"Produto {i}", codigo_de_barras(i), aleatorio.choice(MARCAS), aleatorio.choice(UNIDADES))
+        for i in range(max(1, n // 10))
+    ]
+    cupons = [uuid.uuid4() for _ in range(max(1, n // 20))]
+    estoque = []
+    for _ in range(n):
+        compra = date(2023, 1, 1) + timedelta(days=aleatorio.randrange(365))
+        com_cupom = aleatorio.random() < 0.5
+        item = ItemEstoque(
+            aleatorio.choice(produtos).id, aleatorio.randint(1, 5000), compra,
+            compra + timedelta(days=aleatorio.randrange(30, 400)) if com_cupom else None,
+            aleatorio.choice(cupons) if com_cupom else None,
+        )
+        item.adicionado_em = item.ultima_atualizacao = inicio + timedelta(microseconds=aleatorio.randrange(10**13))
+        estoque.append(item)
+    return produtos, estoque
+
+def _data(valor):
+    return valor.isoformat() if valor is not None else None
+
+def gravar_json(caminho, produtos, estoque):
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "produtos": [[
+                p.id.hex, p.nome, p.codigo_de_barras, p.marca, p.unidade, _data(p.data_de_validade_padrao),
+                p.url_imagem, p.criado_em.isoformat(), p.atualizado_em.isoformat(),
+            ] for p in produtos],
+            "estoque": [[
+                i.id.hex, i.produto_id.hex, i.quantidade, _data(i.data_compra), _data(i.data_validade_especifica),
+                i.id_cupom_fiscal_origem.hex if i.id_cupom_fiscal_origem else None,
+                i.adicionado_em.isoformat(), i.ultima_atualizacao.isoformat(),
+            ] for i in estoque],
+        }, arquivo, separators=(",", ":"))
+
+def carregar_json(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    de_data = lambda v: date.fromisoformat(v) if v is not None else None
+    produtos = [
+        Produto.restaurar(UUID(p[0]), p[1], p[2], p[3], p[4], de_data(p[5]), p[6],
+                          datetime.fromisoformat(p[7]), datetime.fromisoformat(p[8]))
+        for p in dados["produtos"]
+    ]
+    estoque = [
+        ItemEstoque.restaurar(UUID(i[0]), UUID(i[1]), i[2], de_data(i[3]), de_data(i[4]), UUID(i[5]) if i[5] else None,
+                              datetime.fromisoformat(i[6]), datetime.fromisoformat(i[7]))
+        for i in dados["estoque"]
+    ]
+    return produtos, estoque
+
+def gravar_pickle(caminho, produtos, estoque):
+    with open(caminho, "wb") as arquivo:
+        pickle.dump((produtos, estoque), arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+def carregar_pickle(caminho):
+    with open(caminho, "rb") as arquivo:
+        return pickle.load(arquivo)
+
+UUID = uuid.UUID
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+def main() -> None:
+    print(
+        f"{'itens':>9} | {'formato':>8} | {'arquivo':>9} | {'gravar':>12} | "
+        f"{'abrir + 1º item':>15} | {'carregar tudo':>13}"
+    )
+    for n in tamanhos_da_linha_de_comando((100_000, 1_000_000)):
+        produtos, estoque = gerar(n)
+        with tempfile.TemporaryDirectory() as diretorio:
+            binario = os.path.join(diretorio, "estoque.inst")
+            gravar_bin, _ = medir(lambda: gravar_instantaneo(binario, produtos, estoque))
+
+            def abrir_binario():
+                instantaneo = Instantaneo(binario)
+                return instantaneo, instantaneo.estoque[0]
+
+            abrir_bin, (instantaneo, _) = medir(abrir_binario)
+            instantaneo.fechar()
+
+            def carregar_binario():
+                instantaneo = Instantaneo(binario)
+                inventario = instantaneo.carregar(indexar=False)
+                instantaneo.fechar()
+                return inventario
+
+            carregar_bin, inventario = medir(carregar_binario)
+            assert inventario.estoque[-1].id == estoque[-1].id
+            del inventario
+
+            for formato, caminho, tempos in (
+                ("binário", binario, (gravar_bin, abrir_bin, carregar_bin)),
+                ("JSON", os.path.join(diretorio, "estoque.json"), None),
+                ("pickle", os.path.join(diretorio, "estoque.pickle"), None),
+            ):
+                if tempos is None:
+                    gravar, carregar = (gravar_json, carregar_json) if formato == "JSON" else (gravar_pickle, carregar_pickle)
+                    gravacao, _ = medir(lambda: gravar(caminho, produtos, estoque))
+                    carga, carregados = medir(lambda: carregar(caminho))
+                    assert carregados[1][-1].id == estoque[-1].id
+                    del carregados
+                    tempos = (gravacao, carga, carga) # Sem carga parcial: o primeiro item exige o arquivo inteiro
+                print(
+                    f"{n:>9} | {formato:>8} | {os.path.getsize(caminho) / 1e6:>6.1f} MB | {formatar_tempo(tempos[0])} | "
+                    f"{formatar_tempo(tempos[1]):>15} | {formatar_tempo(tempos[2]):>13}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compara a busca linear original com o `Inventario` indexado.
+
+Uso: python -m benchmarks.bench_inventario [tamanhos...]
+"""
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from stock_management import adicionar_produto_por_codigo_de_barras
+from benchmarks._util import (
+    codigo_de_barras, cronometrar, formatar_tempo, gerar_catalogo, tamanhos_da_linha_de_comando,
+)
+
+ITENS_POR_CUPOM = 20
+
+def busca_linear(codigo, produtos, estoque):
+    """Reproduz as duas varreduras feitas pelas funções antes do `Inventario`."""
+    for p in produtos:
+        if p.codigo_de_barras == codigo:
+            for item in estoque:
+                if item.produto_id == p.id:
+                    return p, item
+            return p, None
+    return None, None
+
+def main() -> None:
+    print(f"{'produtos':>10} | {'busca linear':>12} | {'API de listas':>13} | {'Inventario':>12} | {'cupom (Inventario)':>18}")
+    for n in tamanhos_da_linha_de_comando():
+        produtos, estoque = gerar_catalogo(n)
+        # Pior caso da busca linear: o produto mais recente, no fim das listas.
+        alvo = codigo_de_barras(n - 1)
+        repeticoes_lentas = max(1, 200_000 // n)
+
+        t_linear = cronometrar(lambda: busca_linear(alvo, produtos, estoque), repeticoes_lentas)
+        t_listas = cronometrar(
+            lambda: adicionar_produto_por_codigo_de_barras(alvo, produtos, estoque), repeticoes_lentas
+        )
+
+        inventario = Inventario(produtos, estoque)
+        t_inventario = cronometrar(lambda: inventario.adicionar_produto_por_codigo_de_barras(alvo), 10_000)
+
+        cupom = CupomFiscal(
+            dados_qr_code="",
+            data_compra_cupom=date.today(),
+            detalhes_produtos_cupom=[
+                DetalheProdutoCupom(f"Produto Sintetico {n - 1 - i}", 1) for i in range(ITENS_POR_CUPOM)
+            ],
+        )
+        t_cupom = cronometrar(lambda: inventario.adicionar_produtos_por_cupom_fiscal(cupom), 1_000)
+
+        print(
+            f"{n:>10} | {formatar_tempo(t_linear):>12} | {formatar_tempo(t_listas):>13} | "
+            f"{formatar_tempo(t_inventario):>12} | {formatar_tempo(t_cupom):>18}"
+        )
+
+if __name__ == "__main__":
+    main()
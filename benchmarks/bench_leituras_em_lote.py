@@ -0,0 +1,38 @@
+"""
+Vazão da ingestão em lote de leituras de código de barras contra o laço de chamadas individuais.
+
+Simula a varredura de uma prateleira: muitas leituras, com repetições, sobre
+um catálogo já carregado em um `Inventario`.
+
+Uso: python -m benchmarks.bench_leituras_em_lote [leituras por rajada...]
+"""
+import random
+
+from inventario import Inventario
+from benchmarks._util import codigo_de_barras, cronometrar, gerar_catalogo, tamanhos_da_linha_de_comando
+
+TAMANHO_CATALOGO = 10_000
+CODIGOS_DISTINTOS_POR_RAJADA = 40
+
+def main() -> None:
+    produtos, estoque = gerar_catalogo(TAMANHO_CATALOGO)
+    inventario = Inventario(produtos, estoque)
+    aleatorio = random.Random(42)
+
+    print(f"{'leituras':>9} | {'individual (leit/s)':>20} | {'lote (leit/s)':>15} | {'ganho':>6}")
+    for n in tamanhos_da_linha_de_comando((100, 500, 5_000)):
+        distintos = [codigo_de_barras(aleatorio.randrange(TAMANHO_CATALOGO)) for _ in range(CODIGOS_DISTINTOS_POR_RAJADA)]
+        # Alguns códigos fora do catálogo, como leituras de produtos novos.
+        distintos += [f"NOVO{i}" for i in range(4)]
+        rajada = [aleatorio.choice(distintos) for _ in range(n)]
+
+        def individual():
+            for codigo in rajada:
+                inventario.adicionar_produto_por_codigo_de_barras(codigo)
+
+        t_individual = cronometrar(individual, 20)
+        t_lote = cronometrar(lambda: inventario.adicionar_produtos_por_codigos_de_barras(rajada), 20)
+        print(f"{n:>9} | {n / t_individual:>20,.0f} | {n / t_lote:>15,.0f} | {t_individual / t_lote:>5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Lista de compras incremental contra o recálculo completo a cada leitura.
+
+Um catálogo de N produtos, todos com nível mínimo, recebe uma sequência de
+leituras e remoções sorteadas. Mede o custo por operação do inventário sem
+lista, com a `ListaDeCompras` acompanhando as operações e com um recálculo da
+lista inteira (soma dos itens por produto e filtro pelo mínimo) depois de
+cada operação, além do tempo de `alteracoes_desde` para um cliente que
+ficou 100 operações sem sincronizar.
+
+Uso: python -m benchmarks.bench_lista_compras [tamanhos do catálogo...]
+"""
+import random
+import time
+from typing import Dict
+from uuid import UUID
+
+from inventario import Inventario
+from lista_compras import ListaDeCompras
+from benchmarks._util import codigo_de_barras, formatar_tempo, gerar_catalogo, tamanhos_da_linha_de_comando
+
+OPERACOES = 2_000
+MINIMO = 5
+ATRASO = 100
+
+def recalcular(inventario: Inventario, minimos: Dict[UUID, int]) -> Dict[UUID, int]:
+    saldos: Dict[UUID, int] = {}
+    for item in inventario.estoque:
+        saldos[item.produto_id] = saldos.get(item.produto_id, 0) + item.quantidade
+    return {p: m - saldos.get(p, 0) for p, m in minimos.items() if saldos.get(p, 0) < m}
+
+def main() -> None:
+    print(
+        f"{'produtos':>10} | {'sem lista':>12} | {'incremental':>12} | "
+        f"{'recálculo':>12} | {'alterações (100 ops)':>20}"
+    )
+    for n in tamanhos_da_linha_de_comando((1_000, 10_000, 100_000)):
+        aleatorio = random.Random(5)
+        codigos = [codigo_de_barras(aleatorio.randrange(n)) for _ in range(OPERACOES)]
+        remover = [aleatorio.random() < 0.5 for _ in range(OPERACOES)]
+
+        tempos = []
+        for modo in ("sem lista", "incremental", "recálculo"):
+            produtos, estoque = gerar_catalogo(n)
+            inventario = Inventario(produtos, estoque)
+            minimos = {produto.id: MINIMO for produto in produtos}
+            lista = ListaDeCompras(inventario, inventario.estoque, minimos) if modo == "incremental" else None
+            # O recálculo é caro; nos catálogos grandes mede só uma amostra das operações.
+            total = OPERACOES if modo != "recálculo" else min(OPERACOES, max(20, 2_000_000 // n))
+            versao = 0
+            inicio = time.perf_counter()
+            for i in range(total):
+                if remover[i]:
+                    inventario.remover_produto_por_codigo_de_barras(codigos[i])
+                else:
+                    inventario.adicionar_produto_por_codigo_de_barras(codigos[i])
+                if modo == "recálculo":
+                    recalcular(inventario, minimos)
+                if i == total - ATRASO - 1 and lista is not None:
+                    versao = lista.versao
+            tempos.append((time.perf_counter() - inicio) / total)
+
+            if lista is not None:
+                inicio = time.perf_counter()
+                lista.alteracoes_desde(versao)
+                t_alteracoes = time.perf_counter() - inicio
+
+        print(
+            f"{n:>10} | {formatar_tempo(tempos[0]):>12} | {formatar_tempo(tempos[1]):>12} | "
+            f"{formatar_tempo(tempos[2]):>12} | {formatar_tempo(t_alteracoes):>20}"
+        )
+
+if __name__ == "__main__":
+    main()
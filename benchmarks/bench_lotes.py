@@ -0,0 +1,68 @@
+"""
+Lotes FIFO/FEFO: vazão de entrada e de consumo conforme cresce o número de lotes por produto.
+
+Uma casa com `PRODUTOS` produtos recebe cupons cuja linha cria um lote novo
+(data de compra e validade sorteadas) e depois consome, por código de
+barras, metade das unidades. A coluna "sem lotes" é o modo antigo, em que
+tudo é somado a um único item por produto. O consumo deve ficar estável
+mesmo com milhares de lotes por produto.
+
+Uso: python -m benchmarks.bench_lotes [lotes por produto...]
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from models import Produto, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from benchmarks._util import codigo_de_barras, tamanhos_da_linha_de_comando
+
+PRODUTOS = 50
+UNIDADES_POR_LOTE = 4
+INICIO = date(2023, 1, 1)
+
+def medir(lotes_por_produto: int, politica):
+    aleatorio = random.Random(7)
+    produtos = [
+        Produto(nome=f"Produto Sintetico {i}", codigo_de_barras=codigo_de_barras(i),
+                data_de_validade_padrao=INICIO + timedelta(days=aleatorio.randrange(365)))
+        for i in range(PRODUTOS)
+    ]
+    inventario = Inventario(produtos, [], lotes=politica)
+    cupons = []
+    for j in range(lotes_por_produto):
+        cupons.append(CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=INICIO + timedelta(days=aleatorio.randrange(365)),
+            detalhes_produtos_cupom=[
+                DetalheProdutoCupom(produto.nome, UNIDADES_POR_LOTE) for produto in produtos
+            ],
+        ))
+
+    inicio = time.perf_counter()
+    for cupom in cupons:
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+    t_entrada = time.perf_counter() - inicio
+
+    remocoes = [produto.codigo_de_barras for produto in produtos] * (lotes_por_produto * UNIDADES_POR_LOTE // 2)
+    aleatorio.shuffle(remocoes)
+    inicio = time.perf_counter()
+    for codigo in remocoes:
+        inventario.remover_produto_por_codigo_de_barras(codigo)
+    t_consumo = time.perf_counter() - inicio
+
+    linhas = lotes_por_produto * PRODUTOS
+    return linhas / t_entrada, len(remocoes) / t_consumo, len(inventario.estoque)
+
+def main() -> None:
+    print(
+        f"{'lotes/produto':>13} | {'política':>9} | {'entrada (lotes/s)':>17} | "
+        f"{'consumo (un/s)':>14} | {'itens no fim':>12}"
+    )
+    for lotes_por_produto in tamanhos_da_linha_de_comando((10, 100, 1_000, 5_000)):
+        for nome, politica in (("sem lotes", None), ("fifo", "fifo"), ("fefo", "fefo")):
+            entrada, consumo, itens = medir(lotes_por_produto, politica)
+            print(f"{lotes_por_produto:>13} | {nome:>9} | {entrada:>17,.0f} | {consumo:>14,.0f} | {itens:>12}")
+
+if __name__ == "__main__":
+    main()
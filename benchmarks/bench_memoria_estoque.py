@@ -0,0 +1,64 @@
+"""
+Memória por item de estoque: classe com __dict__, ItemEstoque com __slots__ e EstoqueColunar.
+
+Uso: python -m benchmarks.bench_memoria_estoque [quantidades de itens...]
+"""
+import gc
+import tracemalloc
+from datetime import date, datetime
+from typing import Callable
+from uuid import uuid4
+
+from models import ItemEstoque
+from estoque_colunar import EstoqueColunar
+from benchmarks._util import tamanhos_da_linha_de_comando
+
+PRODUTOS_DISTINTOS = 10_000
+
+class ItemEstoqueComDict:
+    """Cópia do ItemEstoque anterior aos __slots__, usada como referência."""
+
+    def __init__(self, produto_id, quantidade, data_compra=None, data_validade_especifica=None, id_cupom_fiscal_origem=None):
+        self.id = uuid4()
+        self.produto_id = produto_id
+        self.quantidade = quantidade
+        self.data_compra = data_compra
+        self.data_validade_especifica = data_validade_especifica
+        self.id_cupom_fiscal_origem = id_cupom_fiscal_origem
+        self.adicionado_em = datetime.now()
+        self.ultima_atualizacao = datetime.now()
+
+def medir(construir: Callable[[], object]) -> int:
+    """Retorna os bytes alocados e ainda vivos após `construir()`."""
+    gc.collect()
+    tracemalloc.start()
+    antes, _ = tracemalloc.get_traced_memory()
+    resultado = construir()
+    depois, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return depois - antes
+
+def main() -> None:
+    produto_ids = [uuid4() for _ in range(PRODUTOS_DISTINTOS)]
+    validade = date(2025, 1, 1)
+
+    def com_dict(n):
+        return [ItemEstoqueComDict(produto_ids[i % PRODUTOS_DISTINTOS], 1, data_validade_especifica=validade) for i in range(n)]
+
+    def com_slots(n):
+        return [ItemEstoque(produto_ids[i % PRODUTOS_DISTINTOS], 1, data_validade_especifica=validade) for i in range(n)]
+
+    def colunar(n):
+        estoque = EstoqueColunar()
+        for i in range(n):
+            estoque.adicionar(produto_ids[i % PRODUTOS_DISTINTOS], 1, data_validade_especifica=validade)
+        return estoque
+
+    print(f"{'itens':>10} | {'__dict__ (B/item)':>18} | {'__slots__ (B/item)':>19} | {'colunar (B/item)':>17}")
+    for n in tamanhos_da_linha_de_comando((1_000_000,)):
+        medidas = [medir(lambda: construir(n)) / n for construir in (com_dict, com_slots, colunar)]
+        print(f"{n:>10} | {medidas[0]:>18.1f} | {medidas[1]:>19.1f} | {medidas[2]:>17.1f}")
+
+if __name__ == "__main__":
+    main()
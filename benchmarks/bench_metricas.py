@@ -0,0 +1,116 @@
+"""
+Custo das métricas nas operações de estoque, desligadas e ligadas.
+
+Três cenários sobre um catálogo de N produtos: leituras de códigos
+existentes em um `Inventario` (indexado), cupons de 5 linhas no mesmo
+`Inventario`, e as leituras pela função
+`stock_management.adicionar_produto_por_codigo_de_barras` (que cria um
+`Inventario` sem índices por chamada, logo é linear; a amostra é menor).
+
+- referência: no `Inventario`, a classe sem instrumentar; nas funções, o
+  corpo delas antes das métricas, copiado aqui.
+- desligadas: o código atual sem métricas (no `Inventario`, o mesmo que a
+  referência, depois de instrumentar e desinstrumentar).
+- operações: `instrumentar(..., primitivas=False)`.
+- completas: operações, buscas e gravações.
+
+As variantes são medidas alternadamente e cada uma fica com a menor de
+`RODADAS` medidas.
+
+Uso: python -m benchmarks.bench_metricas [tamanhos...]
+"""
+import random
+from datetime import date
+
+import stock_management
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from metricas import Metricas
+from benchmarks._util import codigo_de_barras, cronometrar, formatar_tempo, gerar_catalogo, tamanhos_da_linha_de_comando
+
+OPERACOES = 20_000
+RODADAS = 7
+
+def adicionar_antes_das_metricas(codigo, produtos, estoque):
+    return Inventario(produtos, estoque, indexar=False).adicionar_produto_por_codigo_de_barras(codigo)
+
+def medir_alternando(variantes, quantidade: int):
+    """Menor tempo por operação de cada variante (preparar, executar, desfazer), alternando as rodadas."""
+    melhores = [float("inf")] * len(variantes)
+    for _ in range(RODADAS):
+        for i, (preparar, executar, desfazer) in enumerate(variantes):
+            preparar()
+            try:
+                melhores[i] = min(melhores[i], cronometrar(executar) / quantidade)
+            finally:
+                desfazer()
+    return melhores
+
+def linha(n: int, cenario: str, tempos) -> str:
+    referencia = tempos[0]
+    colunas = " | ".join(
+        f"{formatar_tempo(t)} {t / referencia - 1:>+6.1%}" if t is not None else f"{'—':>20}" for t in tempos[1:]
+    )
+    return f"{n:>9} | {cenario:>20} | {formatar_tempo(referencia)} | {colunas}"
+
+def main() -> None:
+    print(
+        f"{'N':>9} | {'cenário':>20} | {'referência':>12} | {'desligadas':>20} | "
+        f"{'operações':>20} | {'completas':>20}"
+    )
+    for n in tamanhos_da_linha_de_comando((1_000, 10_000, 100_000)):
+        produtos, estoque = gerar_catalogo(n)
+        aleatorio = random.Random(20)
+        codigos = [codigo_de_barras(aleatorio.randrange(n)) for _ in range(OPERACOES)]
+        cupons = [
+            CupomFiscal("qr", date(2024, 1, 1), [
+                DetalheProdutoCupom(f"Produto Sintetico {aleatorio.randrange(n)}", 1) for _ in range(5)
+            ])
+            for _ in range(OPERACOES // 5)
+        ]
+
+        inventario = Inventario(produtos, estoque)
+        nada = lambda: None
+        desinstrumentar = lambda: Metricas.desinstrumentar(inventario)
+
+        def leituras():
+            for codigo in codigos:
+                inventario.adicionar_produto_por_codigo_de_barras(codigo)
+
+        def cupons_fiscais():
+            for cupom in cupons:
+                inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+
+        for cenario, executar, quantidade in (
+            ("Inventario, leituras", leituras, len(codigos)), ("Inventario, cupons", cupons_fiscais, len(cupons))
+        ):
+            print(linha(n, cenario, medir_alternando([
+                (nada, executar, nada),
+                (lambda: (Metricas().instrumentar(inventario), desinstrumentar()), executar, nada),
+                (lambda: Metricas().instrumentar(inventario, primitivas=False), executar, desinstrumentar),
+                (lambda: Metricas().instrumentar(inventario), executar, desinstrumentar),
+            ], quantidade)))
+
+        amostra = codigos[:max(20, 1_000_000 // n)]
+
+        def definir(metricas):
+            stock_management.metricas = metricas
+
+        def chamar_antes():
+            for codigo in amostra:
+                adicionar_antes_das_metricas(codigo, produtos, estoque)
+
+        def chamar_funcao():
+            for codigo in amostra:
+                stock_management.adicionar_produto_por_codigo_de_barras(codigo, produtos, estoque)
+
+        # As funções não têm o modo só de operações.
+        antes, desligadas, completas = medir_alternando([
+            (nada, chamar_antes, nada),
+            (nada, chamar_funcao, nada),
+            (lambda: definir(Metricas()), chamar_funcao, lambda: definir(None)),
+        ], len(amostra))
+        print(linha(n, "stock_management", [antes, desligadas, None, completas]))
+
+if __name__ == "__main__":
+    main()
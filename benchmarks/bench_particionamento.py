@@ -0,0 +1,82 @@
+"""
+Vazão de ponta a ponta do `EstoqueParticionado` de 1 a N processos.
+
+Gera uma carga de leituras, remoções e cupons para `CASAS` casas e a envia
+em lotes de `LOTE` comandos. A primeira linha é a mesma carga aplicada no
+próprio processo, um `Inventario` por casa, sem pipes. A escala só aparece
+com núcleos livres: com um único núcleo, mais partições só somam a troca de
+mensagens.
+
+Uso: python -m benchmarks.bench_particionamento [números de partições...]
+"""
+import os
+import random
+import time
+from datetime import date
+from typing import Dict, List
+
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from particionamento import Comando, EstoqueParticionado
+from benchmarks._util import codigo_de_barras, tamanhos_da_linha_de_comando
+
+CASAS = 256
+PRODUTOS_POR_CASA = 500
+COMANDOS = 200_000
+LOTE = 5_000
+
+def gerar_comandos() -> List[Comando]:
+    aleatorio = random.Random(3)
+    comandos: List[Comando] = []
+    for _ in range(COMANDOS):
+        casa = f"casa{aleatorio.randrange(CASAS)}"
+        sorteio = aleatorio.random()
+        if sorteio < 0.02:
+            cupom = CupomFiscal(
+                dados_qr_code="qr",
+                data_compra_cupom=date(2024, 1, 10),
+                detalhes_produtos_cupom=[
+                    DetalheProdutoCupom(f"Produto {codigo_de_barras(aleatorio.randrange(PRODUTOS_POR_CASA))}", 1)
+                    for _ in range(10)
+                ],
+            )
+            comandos.append((casa, "adicionar_produtos_por_cupom_fiscal", (cupom,)))
+        elif sorteio < 0.35:
+            codigo = codigo_de_barras(aleatorio.randrange(PRODUTOS_POR_CASA))
+            comandos.append((casa, "remover_produto_por_codigo_de_barras", (codigo,)))
+        else:
+            codigo = codigo_de_barras(aleatorio.randrange(PRODUTOS_POR_CASA))
+            comandos.append((casa, "adicionar_produto_por_codigo_de_barras", (codigo,)))
+    return comandos
+
+def main() -> None:
+    nucleos = os.cpu_count() or 1
+    padrao = sorted({1, 2, 4, 8, nucleos} & set(range(1, nucleos + 1))) or [1]
+    comandos = gerar_comandos()
+    print(f"{nucleos} núcleo(s) disponível(is); {COMANDOS} comandos para {CASAS} casas em lotes de {LOTE}")
+    print(f"{'partições':>12} | {'comandos/s':>12} | {'escala':>7} | {'casas por partição':>20}")
+
+    casas: Dict[str, Inventario] = {}
+    inicio = time.perf_counter()
+    for casa, operacao, argumentos in comandos:
+        inventario = casas.get(casa)
+        if inventario is None:
+            inventario = casas[casa] = Inventario()
+        getattr(inventario, operacao)(*argumentos)
+    base = COMANDOS / (time.perf_counter() - inicio)
+    print(f"{'no processo':>12} | {base:>12,.0f} | {'':>7} | {'':>20}")
+
+    for particoes in tamanhos_da_linha_de_comando(padrao):
+        with EstoqueParticionado(particoes) as estoque:
+            inicio = time.perf_counter()
+            for i in range(0, COMANDOS, LOTE):
+                estoque.executar(comandos[i:i + LOTE], resultados=False)
+            vazao = COMANDOS / (time.perf_counter() - inicio)
+            distribuicao = estoque.casas_por_particao()
+        print(
+            f"{particoes:>12} | {vazao:>12,.0f} | {vazao / base:>6.2f}x | "
+            f"{min(distribuicao):>9} a {max(distribuicao):<8}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Interpretação de QR Codes de cupons: conteúdos distintos (sem cache) e releituras (com cache).
+
+Uso: python -m benchmarks.bench_qrcode_cupom [quantidades de conteúdos...]
+"""
+import random
+import time
+
+from qrcode_cupom import digito_verificador_chave, interpretar_qr_code
+from benchmarks._util import tamanhos_da_linha_de_comando
+
+CUPONS_DISTINTOS_NA_RELEITURA = 5_000
+
+def gerar_conteudo(i: int) -> str:
+    sem_dv = f"35240112345678000195650010{i:08d}1{i % 10**8:08d}"[:43]
+    chave = sem_dv + str(digito_verificador_chave(sem_dv))
+    if i % 3 == 0:
+        return f"{chave}|20240115103000|{i % 500}.90||assinatura"
+    return f"https://www.nfce.fazenda.sp.gov.br/qrcode?p={chave}|2|1|1|{i:040x}"
+
+def medir(conteudos) -> float:
+    interpretar_qr_code.cache_clear()
+    inicio = time.perf_counter()
+    for conteudo in conteudos:
+        interpretar_qr_code(conteudo)
+    return time.perf_counter() - inicio
+
+def main() -> None:
+    aleatorio = random.Random(3)
+    print(f"{'conteúdos':>10} | {'distintos (QR/s)':>17} | {'releituras (QR/s)':>18} | {'acertos de cache':>16}")
+    for n in tamanhos_da_linha_de_comando((1_000_000,)):
+        distintos = [gerar_conteudo(i) for i in range(n)]
+        t_distintos = medir(distintos)
+
+        # Releituras: o mesmo conjunto pequeno de cupons escaneado várias vezes.
+        base = distintos[:CUPONS_DISTINTOS_NA_RELEITURA]
+        releituras = [aleatorio.choice(base) for _ in range(n)]
+        t_releituras = medir(releituras)
+        info = interpretar_qr_code.cache_info()
+
+        print(
+            f"{n:>10} | {n / t_distintos:>17,.0f} | {n / t_releituras:>18,.0f} | "
+            f"{info.hits / (info.hits + info.misses):>16.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Quantidades em ponto fixo: vazão das operações contadas (un) e fracionadas (kg).
+
+As leituras de código de barras (com 1 remoção a cada 4 leituras) somam e
+subtraem inteiros nos dois casos; para produtos em kg o passo é 1000000 mg.
+Nos cupons, as linhas em un usam quantidades inteiras e as linhas em kg usam
+quantidades como 0,35, convertidas para miligramas na entrada.
+
+Uso: python -m benchmarks.bench_quantidades [quantidades de operações...]
+"""
+import random
+import time
+from datetime import date
+
+from models import Produto, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from benchmarks._util import codigo_de_barras, tamanhos_da_linha_de_comando
+
+TAMANHO_CATALOGO = 10_000
+LINHAS_POR_CUPOM = 20
+
+def catalogo(unidade):
+    return [
+        Produto(nome=f"Produto Sintetico {i}", codigo_de_barras=codigo_de_barras(i), unidade=unidade)
+        for i in range(TAMANHO_CATALOGO)
+    ]
+
+def leituras(unidade, codigos) -> float:
+    inventario = Inventario(catalogo(unidade), [])
+    inicio = time.perf_counter()
+    for i, codigo in enumerate(codigos):
+        if i % 4 == 3:
+            inventario.remover_produto_por_codigo_de_barras(codigo)
+        else:
+            inventario.adicionar_produto_por_codigo_de_barras(codigo)
+    return len(codigos) / (time.perf_counter() - inicio)
+
+def cupons(unidade, indices, quantidades) -> float:
+    inventario = Inventario(catalogo(unidade), [])
+    lista = [
+        CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[
+                DetalheProdutoCupom(f"Produto Sintetico {indice}", quantidade, unidade_cupom=unidade)
+                for indice, quantidade in zip(indices[j:j + LINHAS_POR_CUPOM], quantidades[j:j + LINHAS_POR_CUPOM])
+            ],
+        )
+        for j in range(0, len(indices), LINHAS_POR_CUPOM)
+    ]
+    inicio = time.perf_counter()
+    for cupom in lista:
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+    return len(indices) / (time.perf_counter() - inicio)
+
+def main() -> None:
+    print(
+        f"{'operações':>10} | {'leituras un (op/s)':>18} | {'leituras kg (op/s)':>18} | "
+        f"{'cupom un (linhas/s)':>19} | {'cupom kg (linhas/s)':>19}"
+    )
+    for n in tamanhos_da_linha_de_comando((100_000, 1_000_000)):
+        aleatorio = random.Random(3)
+        indices = [aleatorio.randrange(TAMANHO_CATALOGO) for _ in range(n)]
+        codigos = [codigo_de_barras(i) for i in indices]
+        inteiras = [aleatorio.randint(1, 5) for _ in range(n)]
+        fracionadas = [aleatorio.randint(1, 2000) / 1000 for _ in range(n)]
+
+        print(
+            f"{n:>10} | {leituras(None, codigos):>18,.0f} | {leituras('kg', codigos):>18,.0f} | "
+            f"{cupons(None, indices, inteiras):>19,.0f} | {cupons('kg', indices, fracionadas):>19,.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
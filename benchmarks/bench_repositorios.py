@@ -0,0 +1,68 @@
+"""
+Cupons por segundo e leituras por segundo nos dois backends de repositório.
+
+O `Inventario` fica em memória; o `RepositorioSQLite` grava em um arquivo
+temporário, com uma transação por cupom, por leitura avulsa e por rajada.
+
+Uso: python -m benchmarks.bench_repositorios [tamanhos de catálogo...]
+"""
+import os
+import random
+import tempfile
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from benchmarks._util import codigo_de_barras, cronometrar, gerar_catalogo, tamanhos_da_linha_de_comando
+
+LINHAS_POR_CUPOM = 20
+LEITURAS_POR_RAJADA = 100
+REPETICOES = 200
+
+def medir(repositorio, n: int, aleatorio: random.Random):
+    cupons = [
+        CupomFiscal(
+            dados_qr_code=f"qr{i}",
+            data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[
+                DetalheProdutoCupom(f"PRODUTO SINTETICO {aleatorio.randrange(n)}", 1)
+                for _ in range(LINHAS_POR_CUPOM)
+            ],
+        )
+        for i in range(REPETICOES)
+    ]
+    leituras = [codigo_de_barras(aleatorio.randrange(n)) for _ in range(REPETICOES * LEITURAS_POR_RAJADA)]
+    rajadas = [leituras[i:i + LEITURAS_POR_RAJADA] for i in range(0, len(leituras), LEITURAS_POR_RAJADA)]
+    fila_cupons, fila_leituras, fila_rajadas = iter(cupons), iter(leituras), iter(rajadas)
+
+    t_cupom = cronometrar(lambda: repositorio.adicionar_produtos_por_cupom_fiscal(next(fila_cupons)), REPETICOES)
+    t_leitura = cronometrar(
+        lambda: repositorio.adicionar_produto_por_codigo_de_barras(next(fila_leituras)), REPETICOES
+    )
+    t_rajada = cronometrar(
+        lambda: repositorio.adicionar_produtos_por_codigos_de_barras(next(fila_rajadas)), REPETICOES
+    )
+    return 1 / t_cupom, 1 / t_leitura, LEITURAS_POR_RAJADA / t_rajada
+
+def main() -> None:
+    print(
+        f"{'catálogo':>9} | {'backend':>10} | {'cupons/s':>10} | {'leituras avulsas/s':>18} | {'leituras em rajada/s':>20}"
+    )
+    for n in tamanhos_da_linha_de_comando((1_000, 10_000, 100_000)):
+        produtos, estoque = gerar_catalogo(n)
+        with tempfile.TemporaryDirectory() as diretorio:
+            sqlite = RepositorioSQLite(os.path.join(diretorio, "estoque.db"))
+            with sqlite.transacao():
+                for produto in produtos:
+                    sqlite.registrar_produto(produto)
+                for item in estoque:
+                    sqlite.registrar_item(item)
+
+            for nome, repositorio in (("memória", Inventario(produtos, estoque)), ("sqlite", sqlite)):
+                cupons, avulsas, rajada = medir(repositorio, n, random.Random(7))
+                print(f"{n:>9} | {nome:>10} | {cupons:>10,.0f} | {avulsas:>18,.0f} | {rajada:>20,.0f}")
+            sqlite.fechar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Teste de carga do `ServicoEstoque`: latência (p50/p99) e vazão com muitos clientes simultâneos.
+
+Cada cliente é uma tarefa asyncio que faz requisições em sequência (leituras
+de código de barras, remoções e, de vez em quando, um cupom) para uma de
+`CASAS` casas. Mede o backend em memória no event loop e o SQLite em
+arquivo, com os lotes aplicados em uma thread auxiliar.
+
+Uso: python -m benchmarks.bench_servico [quantidades de clientes...]
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from servico import ServicoEstoque
+from benchmarks._util import codigo_de_barras, tamanhos_da_linha_de_comando
+
+CASAS = 20
+REQUISICOES_POR_CLIENTE = 20
+PRODUTOS_POR_CASA = 500
+
+async def cliente(servico: ServicoEstoque, aleatorio: random.Random, latencias: list) -> None:
+    casa = f"casa{aleatorio.randrange(CASAS)}"
+    for _ in range(REQUISICOES_POR_CLIENTE):
+        sorteio = aleatorio.random()
+        inicio = time.perf_counter()
+        if sorteio < 0.05:
+            cupom = CupomFiscal(
+                dados_qr_code="qr",
+                data_compra_cupom=date(2024, 1, 10),
+                detalhes_produtos_cupom=[
+                    DetalheProdutoCupom(f"Produto {codigo_de_barras(aleatorio.randrange(PRODUTOS_POR_CASA))}", 1)
+                    for _ in range(10)
+                ],
+            )
+            await servico.adicionar_produtos_por_cupom_fiscal(casa, cupom)
+        elif sorteio < 0.35:
+            await servico.remover_produto_por_codigo_de_barras(casa, codigo_de_barras(aleatorio.randrange(PRODUTOS_POR_CASA)))
+        else:
+            await servico.adicionar_produto_por_codigo_de_barras(casa, codigo_de_barras(aleatorio.randrange(PRODUTOS_POR_CASA)))
+        latencias.append(time.perf_counter() - inicio)
+
+async def carga(servico: ServicoEstoque, clientes: int):
+    aleatorio = random.Random(5)
+    latencias: list = []
+    inicio = time.perf_counter()
+    async with servico:
+        await asyncio.gather(*(cliente(servico, random.Random(aleatorio.random()), latencias) for _ in range(clientes)))
+    duracao = time.perf_counter() - inicio
+    percentis = statistics.quantiles(latencias, n=100)
+    return percentis[49], percentis[98], len(latencias) / duracao
+
+def main() -> None:
+    print(f"{'clientes':>8} | {'backend':>8} | {'p50':>9} | {'p99':>9} | {'req/s':>9}")
+    for clientes in tamanhos_da_linha_de_comando((100, 1_000)):
+        with tempfile.TemporaryDirectory() as diretorio:
+            repositorios = []
+
+            def sqlite(casa):
+                repositorio = RepositorioSQLite(os.path.join(diretorio, f"{casa}.db"))
+                repositorios.append(repositorio)
+                return repositorio
+
+            backends = (
+                ("memória", ServicoEstoque(lambda casa: Inventario(), em_thread=False)),
+                ("sqlite", ServicoEstoque(sqlite)),
+            )
+            for nome, servico in backends:
+                p50, p99, vazao = asyncio.run(carga(servico, clientes))
+                print(f"{clientes:>8} | {nome:>8} | {p50 * 1e3:>6.2f} ms | {p99 * 1e3:>6.2f} ms | {vazao:>9,.0f}")
+            for repositorio in repositorios:
+                repositorio.fechar()
+
+if __name__ == "__main__":
+    main()
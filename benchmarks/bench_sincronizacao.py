@@ -0,0 +1,75 @@
+"""
+Tamanho das alterações e tempo de combinação da sincronização (`sincronizacao`).
+
+Um servidor com N produtos, cada um com um item, e um celular que recebeu
+tudo na primeira sincronização. Os dois ficam offline e fazem `OPERACOES`
+operações cada (leituras, remoções e algumas renomeações) sobre os mesmos
+produtos mais usados, o que gera conflitos de quantidade e de nome. Na
+volta, o celular envia as suas alterações e o servidor as combina.
+
+Compara o envio das listas inteiras (o estado completo do celular, como
+`alteracoes_desde(0)`, já em JSON compacto) com o das alterações, e mede
+o cálculo das alterações no celular e a sua aplicação no servidor, contra
+aplicar as listas inteiras.
+
+Uso: python -m benchmarks.bench_sincronizacao [tamanhos...]
+"""
+import random
+
+from sincronizacao import InventarioSincronizado, codificar_alteracoes, decodificar_alteracoes
+from benchmarks._util import codigo_de_barras, cronometrar, formatar_tempo, gerar_catalogo, tamanhos_da_linha_de_comando
+
+OPERACOES = 1_000
+MAIS_USADOS = 500
+
+def sessao_offline(inventario: InventarioSincronizado, semente: int, n: int) -> None:
+    aleatorio = random.Random(semente)
+    usados = min(n, MAIS_USADOS)
+    for i in range(OPERACOES):
+        codigo = codigo_de_barras(aleatorio.randrange(usados))
+        sorteio = aleatorio.random()
+        if sorteio < 0.7:
+            inventario.adicionar_produto_por_codigo_de_barras(codigo)
+        elif sorteio < 0.98:
+            inventario.remover_produto_por_codigo_de_barras(codigo)
+        else:
+            produto = inventario.buscar_produto_por_codigo_de_barras(codigo)
+            inventario.renomear_produto(produto, f"{produto.nome} ({semente}.{i})")
+
+def main() -> None:
+    print(
+        f"{'N':>9} | {'listas inteiras':>15} | {'alterações':>12} | {'razão':>7} | "
+        f"{'calcular':>12} | {'aplicar alter.':>14} | {'aplicar listas':>14}"
+    )
+    for n in tamanhos_da_linha_de_comando((1_000, 10_000, 100_000)):
+        servidor = InventarioSincronizado("servidor", *gerar_catalogo(n))
+        celular = InventarioSincronizado("celular")
+        celular.aplicar(servidor.alteracoes_desde(0, para="celular"))
+        cursor_celular = celular.versao
+
+        sessao_offline(servidor, 1, n)
+        sessao_offline(celular, 2, n)
+
+        alteracoes = celular.alteracoes_desde(cursor_celular, para="servidor")
+        calcular = min(cronometrar(lambda: celular.alteracoes_desde(cursor_celular, para="servidor")) for _ in range(5))
+        completas = celular.alteracoes_desde(0)
+        tamanho_delta = len(codificar_alteracoes(alteracoes))
+        tamanho_completo = len(codificar_alteracoes(completas))
+
+        # Aplica em cópias do servidor, para que as duas medidas partam do mesmo estado.
+        copia_a = InventarioSincronizado("servidor")
+        copia_a.aplicar(servidor.alteracoes_desde(0))
+        copia_b = InventarioSincronizado("servidor")
+        copia_b.aplicar(servidor.alteracoes_desde(0))
+        recebidas = decodificar_alteracoes(codificar_alteracoes(alteracoes))
+        aplicar_delta = cronometrar(lambda: copia_a.aplicar(recebidas))
+        aplicar_tudo = cronometrar(lambda: copia_b.aplicar(completas))
+        assert sorted((i.id, i.quantidade) for i in copia_a.estoque) == sorted((i.id, i.quantidade) for i in copia_b.estoque)
+
+        print(
+            f"{n:>9} | {tamanho_completo:>13,} B | {tamanho_delta:>10,} B | {tamanho_completo / tamanho_delta:>6.0f}x | "
+            f"{formatar_tempo(calcular)} | {formatar_tempo(aplicar_delta):>14} | {formatar_tempo(aplicar_tudo):>14}"
+        )
+
+if __name__ == "__main__":
+    main()
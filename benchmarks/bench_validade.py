@@ -0,0 +1,54 @@
+"""
+Consultas "a vencer em 7 dias" e "vencidos": índice de validade contra varredura do estoque.
+
+Metade dos itens tem validade específica e a outra metade herda a validade
+padrão do produto, espalhadas por dois anos em torno da data de referência.
+
+Uso: python -m benchmarks.bench_validade [quantidades de itens...]
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from inventario import Inventario
+from benchmarks._util import cronometrar, formatar_tempo, gerar_catalogo, tamanhos_da_linha_de_comando
+
+HOJE = date(2024, 6, 1)
+DIAS_ESPALHADOS = 730
+
+def main() -> None:
+    aleatorio = random.Random(11)
+    print(
+        f"{'itens':>9} | {'construção':>12} | {'a vencer (varredura)':>20} | {'a vencer (índice)':>17} | "
+        f"{'vencidos (varredura)':>20} | {'vencidos (índice)':>17} | {'k a vencer':>10}"
+    )
+    for n in tamanhos_da_linha_de_comando((10_000, 100_000, 1_000_000)):
+        produtos, estoque = gerar_catalogo(n)
+        for i, (produto, item) in enumerate(zip(produtos, estoque)):
+            validade = HOJE + timedelta(days=aleatorio.randrange(-DIAS_ESPALHADOS // 2, DIAS_ESPALHADOS // 2))
+            if i % 2:
+                item.data_validade_especifica = validade
+            else:
+                produto.data_de_validade_padrao = validade
+
+        varredura = Inventario(produtos, estoque)
+        inicio = time.perf_counter()
+        indexado = Inventario(produtos, estoque, indexar_validades=True)
+        t_construcao = time.perf_counter() - inicio
+
+        repeticoes = 3 if n >= 1_000_000 else 10
+        t_vencer_varredura = cronometrar(lambda: varredura.itens_a_vencer(7, HOJE), repeticoes)
+        t_vencer_indice = cronometrar(lambda: indexado.itens_a_vencer(7, HOJE), 100)
+        t_vencidos_varredura = cronometrar(lambda: varredura.itens_vencidos(HOJE), repeticoes)
+        t_vencidos_indice = cronometrar(lambda: indexado.itens_vencidos(HOJE), repeticoes)
+        k = len(indexado.itens_a_vencer(7, HOJE))
+        assert k == len(varredura.itens_a_vencer(7, HOJE))
+
+        print(
+            f"{n:>9} | {formatar_tempo(t_construcao):>12} | {formatar_tempo(t_vencer_varredura):>20} | "
+            f"{formatar_tempo(t_vencer_indice):>17} | {formatar_tempo(t_vencidos_varredura):>20} | "
+            f"{formatar_tempo(t_vencidos_indice):>17} | {k:>10}"
+        )
+
+if __name__ == "__main__":
+    main()
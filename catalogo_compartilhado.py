@@ -0,0 +1,201 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from models import Produto
+from catalogo_gtin import MetadadosGTIN, gtin_como_inteiro
+from codificacao import datetime_para_int, int_para_datetime
+
+MAGICA = b"CATG"
+VERSAO = 1
+
+# Cabeçalho: mágica, versão, registros, posição dos registros, posição da
+# tabela de textos e momento da geração (microssegundos desde a época).
+_CABECALHO = struct.Struct("<4sIQQQq")
+# Um registro por GTIN, na ordem dos GTINs: posições na tabela de textos do
+# código de barras, nome, marca, unidade e URL da imagem.
+_REGISTRO = struct.Struct("<5I")
+_TAMANHO_TEXTO = struct.Struct("<H")
+_SEM_TEXTO = 0xFFFFFFFF
+
+# Ids dos produtos do catálogo: os 64 bits altos são fixos (com a versão 8 do
+# RFC 9562) e os baixos trazem a variante e o GTIN, então o GTIN é recuperado
+# do id sem índice reverso, e todo processo chega ao mesmo id.
+_PREFIXO_ID = 0x63617461_6C6F_8000
+_VARIANTE_ID = 1 << 63
+_MASCARA_GTIN = (1 << 62) - 1
+
+def id_do_gtin(gtin: int) -> UUID:
+    return UUID(int=(_PREFIXO_ID << 64) | _VARIANTE_ID | gtin)
+
+def gtin_do_id(produto_id: UUID) -> Optional[int]:
+    """GTIN de um id gerado por `id_do_gtin`, ou None se o id não for do catálogo."""
+    valor = produto_id.int
+    if valor >> 64 != _PREFIXO_ID:
+        return None
+    return valor & _MASCARA_GTIN
+
+def _codificar_texto(valor: str) -> bytes:
+    """UTF-8 de `valor`, cortado em até 0xFFFF bytes sem partir um caractere."""
+    codificado = valor.encode("utf-8")
+    if len(codificado) > 0xFFFF:
+        codificado = codificado[:0xFFFF].decode("utf-8", "ignore").encode("utf-8")
+    return codificado
+
+def gravar_catalogo(caminho: str, registros: Iterable[Tuple[str, MetadadosGTIN]]) -> int:
+    """
+    Gera o arquivo de um `CatalogoCompartilhado`.
+
+    Os textos repetidos (marcas e unidades, sobretudo) são gravados uma vez
+    só. Registros com código inválido ou sem nome são ignorados; um GTIN
+    repetido fica com o último registro.
+
+    Args:
+        caminho: Arquivo a gerar (substituído se existir).
+        registros: Pares (código de barras, metadados), por exemplo de um
+            dump já validado com `catalogo_gtin.CacheGTIN`.
+
+    Returns:
+        Quantos produtos foram gravados.
+    """
+    por_gtin: Dict[int, Tuple[str, MetadadosGTIN]] = {}
+    for codigo, metadados in registros:
+        gtin = gtin_como_inteiro(codigo)
+        if gtin is not None and metadados.nome:
+            por_gtin[gtin] = (codigo, metadados)
+    gtins = sorted(por_gtin)
+
+    textos = bytearray()
+    posicoes: Dict[str, int] = {}
+
+    def texto(valor: Optional[str]) -> int:
+        if valor is None:
+            return _SEM_TEXTO
+        posicao = posicoes.get(valor)
+        if posicao is None:
+            codificado = _codificar_texto(valor)
+            posicao = posicoes[valor] = len(textos)
+            textos.extend(_TAMANHO_TEXTO.pack(len(codificado)))
+            textos.extend(codificado)
+        return posicao
+
+    registros_binarios = bytearray()
+    for gtin in gtins:
+        codigo, metadados = por_gtin[gtin]
+        registros_binarios.extend(_REGISTRO.pack(
+            texto(codigo), texto(metadados.nome), texto(metadados.marca),
+            texto(metadados.unidade), texto(metadados.url_imagem),
+        ))
+
+    inicio_registros = _CABECALHO.size + 8 * len(gtins)
+    inicio_textos = inicio_registros + len(registros_binarios)
+    # Escreve ao lado e renomeia: processos com o catálogo anterior mapeado
+    # continuam com o arquivo antigo (truncá-lo no lugar os mataria com
+    # SIGBUS ao ler além do novo fim), e uma queda no meio não o corrompe.
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(_CABECALHO.pack(
+            MAGICA, VERSAO, len(gtins), inicio_registros, inicio_textos, datetime_para_int(datetime.now())
+        ))
+        arquivo.write(array("Q", gtins).tobytes()) # Lida de volta com memoryview.cast("Q")
+        arquivo.write(registros_binarios)
+        arquivo.write(textos)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+    return len(gtins)
+
+class CatalogoCompartilhado:
+    """
+    Catálogo global e somente leitura de produtos por GTIN, em um arquivo mapeado em memória.
+
+    O arquivo (gerado por `gravar_catalogo`) tem os GTINs ordenados em uma
+    coluna de inteiros de 64 bits, um registro de largura fixa por GTIN e uma
+    tabela de textos sem repetições. É aberto com `mmap` somente leitura: as
+    páginas vêm do cache do sistema operacional e são compartilhadas por
+    todos os processos que abrem o mesmo arquivo (as partições de
+    `particionamento.EstoqueParticionado`, por exemplo), sem cópia.
+
+    Uma busca é um `bisect` sobre a coluna de GTINs. O `Produto` de cada GTIN
+    é criado na primeira busca e guardado (internado): todas as casas do
+    processo recebem o mesmo objeto, com id derivado do GTIN (`id_do_gtin`),
+    e ele não deve ser alterado. Para divergir do catálogo, a casa faz uma
+    cópia própria (ver `Inventario(catalogo=...)` e
+    `Inventario.sobrescrever_produto`).
+
+    Raises:
+        ValueError: Se o arquivo não for um catálogo desta versão.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        with open(caminho, "rb") as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        magica, versao, total, inicio_registros, inicio_textos, gerado_em = _CABECALHO.unpack_from(self._mapa)
+        if magica != MAGICA or versao != VERSAO:
+            self._mapa.close()
+            raise ValueError(f"{caminho} não é um catálogo compartilhado (versão {VERSAO}).")
+        self._total = total
+        self._inicio_registros = inicio_registros
+        self._inicio_textos = inicio_textos
+        self._gtins = memoryview(self._mapa)[_CABECALHO.size:inicio_registros].cast("Q")
+        # Um único datetime para todos os produtos: o momento em que o catálogo foi gerado.
+        self.gerado_em = int_para_datetime(gerado_em)
+        self._internados: Dict[int, Produto] = {}
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._total
+
+    def fechar(self) -> None:
+        self._gtins.release()
+        self._mapa.close()
+
+    def _texto(self, posicao: int) -> Optional[str]:
+        if posicao == _SEM_TEXTO:
+            return None
+        inicio = self._inicio_textos + posicao
+        (tamanho,) = _TAMANHO_TEXTO.unpack_from(self._mapa, inicio)
+        inicio += _TAMANHO_TEXTO.size
+        return self._mapa[inicio:inicio + tamanho].decode("utf-8")
+
+    def _produto(self, gtin: int) -> Optional[Produto]:
+        produto = self._internados.get(gtin)
+        if produto is not None:
+            return produto
+        indice = bisect_left(self._gtins, gtin)
+        if indice == self._total or self._gtins[indice] != gtin:
+            return None
+        codigo, nome, marca, unidade, url = (
+            self._texto(posicao)
+            for posicao in _REGISTRO.unpack_from(self._mapa, self._inicio_registros + indice * _REGISTRO.size)
+        )
+        novo = Produto.restaurar(
+            id_do_gtin(gtin), nome, codigo, marca, unidade, None, url, self.gerado_em, self.gerado_em, # type: ignore[arg-type]
+        )
+        with self._trava:
+            return self._internados.setdefault(gtin, novo)
+
+    def buscar(self, codigo_de_barras: str) -> Optional[Produto]:
+        """O produto do catálogo com esse GTIN (em qualquer grafia equivalente), ou None."""
+        gtin = gtin_como_inteiro(codigo_de_barras)
+        return self._produto(gtin) if gtin is not None else None
+
+    def buscar_por_id(self, produto_id: UUID) -> Optional[Produto]:
+        gtin = gtin_do_id(produto_id)
+        return self._produto(gtin) if gtin is not None else None
+
+    def compartilhado(self, produto: Produto) -> bool:
+        """Se o objeto é o produto internado do catálogo (e não uma cópia de uma casa)."""
+        gtin = gtin_do_id(produto.id)
+        return gtin is not None and self._internados.get(gtin) is produto
+
+    def internados(self) -> List[Produto]:
+        """Produtos já materializados neste processo."""
+        return list(self._internados.values())
@@ -0,0 +1,287 @@
+import csv
+import json
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from operator import mul
+from typing import Deque, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional, TextIO, Tuple, Union
+
+from repositorio import RepositorioEstoque
+from unidades import unidade_base
+
+# Pesos do dígito verificador GTIN para os 13 primeiros dígitos do código em
+# 14 posições: 3 e 1 alternados, com peso 3 no dígito vizinho ao verificador.
+_PESOS_GTIN = (3, 1) * 6 + (3,)
+_AJUSTE_ASCII_GTIN = ord("0") * sum(_PESOS_GTIN)
+_TAMANHOS_GTIN = frozenset((8, 12, 13, 14)) # EAN-8, UPC-A, EAN-13, GTIN-14
+
+# Nomes de coluna aceitos para o código nos arquivos importados.
+_COLUNAS_CODIGO = ("gtin", "ean", "codigo_de_barras", "codigo")
+# Linhas por `executemany` na importação e chaves por consulta `IN (...)`.
+_LOTE_IMPORTACAO = 10_000
+_LOTE_CONSULTA = 500
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS metadados_gtin (
+    gtin INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    marca TEXT,
+    unidade TEXT,
+    url_imagem TEXT
+)
+"""
+_SQL_BUSCAR = "SELECT nome, marca, unidade, url_imagem FROM metadados_gtin WHERE gtin = ?"
+_SQL_GRAVAR = "INSERT OR REPLACE INTO metadados_gtin (gtin, nome, marca, unidade, url_imagem) VALUES (?, ?, ?, ?, ?)"
+
+class MetadadosGTIN(NamedTuple):
+    """Dados de cadastro de um produto conhecidos pelo seu GTIN."""
+    nome: str
+    marca: Optional[str] = None
+    unidade: Optional[str] = None
+    url_imagem: Optional[str] = None
+
+def digito_verificador_gtin(codigo_sem_dv: str) -> int:
+    """Calcula o dígito verificador (módulo 10, pesos 3 e 1) de um GTIN sem o último dígito."""
+    soma = sum(map(mul, codigo_sem_dv.rjust(13, "0").encode("ascii"), _PESOS_GTIN)) - _AJUSTE_ASCII_GTIN
+    return -soma % 10
+
+def gtin_como_inteiro(codigo: str) -> Optional[int]:
+    """
+    Valida um EAN-8, UPC-A, EAN-13 ou GTIN-14 e o devolve como inteiro.
+
+    Como o inteiro ignora zeros à esquerda, um UPC-A e o EAN-13 equivalente
+    ("0" + UPC) viram a mesma chave. Retorna None se o código tiver tamanho
+    ou dígito verificador inválido.
+    """
+    codigo = codigo.strip()
+    if len(codigo) not in _TAMANHOS_GTIN or not codigo.isascii() or not codigo.isdigit():
+        return None
+    if digito_verificador_gtin(codigo[:-1]) != ord(codigo[-1]) - 48:
+        return None
+    return int(codigo)
+
+def validar_gtin(codigo: str) -> bool:
+    """Verifica tamanho e dígito verificador de um EAN-8, UPC-A, EAN-13 ou GTIN-14."""
+    return gtin_como_inteiro(codigo) is not None
+
+def _texto_ou_none(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+class CacheGTIN:
+    """
+    Cache local de metadados de produtos por GTIN, em um arquivo SQLite.
+
+    O GTIN validado é a chave primária inteira da tabela (o rowid), então uma
+    busca é uma única descida na árvore da tabela, sem índice secundário, e o
+    arquivo é lido por mmap. Códigos com dígito verificador inválido são
+    recusados antes de qualquer consulta.
+
+    O conteúdo vem de dumps em CSV ou JSONL (`importar_csv`,
+    `importar_jsonl`), gravados em uma única transação. A conexão é
+    compartilhada entre threads sob uma trava.
+    """
+
+    def __init__(self, caminho: str = ":memory:", mmap: int = 1 << 30):
+        self._conexao = sqlite3.connect(caminho, isolation_level=None, check_same_thread=False, cached_statements=64)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(f"PRAGMA mmap_size={int(mmap)}")
+        self._conexao.execute(_ESQUEMA)
+        self._trava = threading.Lock()
+
+    def fechar(self) -> None:
+        self._conexao.close()
+
+    def __len__(self) -> int:
+        with self._trava:
+            return self._conexao.execute("SELECT COUNT(*) FROM metadados_gtin").fetchone()[0]
+
+    def buscar(self, codigo: str) -> Optional[MetadadosGTIN]:
+        """Metadados do código, ou None se ele for inválido ou desconhecido."""
+        chave = gtin_como_inteiro(codigo)
+        if chave is None:
+            return None
+        with self._trava:
+            linha = self._conexao.execute(_SQL_BUSCAR, (chave,)).fetchone()
+        return MetadadosGTIN(*linha) if linha is not None else None
+
+    def buscar_varios(self, codigos: Iterable[str]) -> Dict[str, MetadadosGTIN]:
+        """Metadados dos códigos conhecidos, em poucas consultas `IN (...)`."""
+        por_chave: Dict[int, list] = {}
+        for codigo in codigos:
+            chave = gtin_como_inteiro(codigo)
+            if chave is not None:
+                por_chave.setdefault(chave, []).append(codigo)
+        chaves = list(por_chave)
+        encontrados: Dict[str, MetadadosGTIN] = {}
+        with self._trava:
+            for inicio in range(0, len(chaves), _LOTE_CONSULTA):
+                lote = chaves[inicio:inicio + _LOTE_CONSULTA]
+                linhas = self._conexao.execute(
+                    "SELECT gtin, nome, marca, unidade, url_imagem FROM metadados_gtin "
+                    f"WHERE gtin IN ({', '.join('?' * len(lote))})",
+                    lote,
+                )
+                for gtin, *dados in linhas:
+                    metadados = MetadadosGTIN(*dados)
+                    for codigo in por_chave[gtin]:
+                        encontrados[codigo] = metadados
+        return encontrados
+
+    def importar(self, registros: Iterable[Mapping[str, object]]) -> Tuple[int, int]:
+        """
+        Grava registros (`gtin`/`ean`/`codigo_de_barras`, `nome`, `marca`,
+        `unidade`, `url_imagem`), substituindo os GTINs já existentes.
+
+        Returns:
+            A quantidade de registros importados e a de recusados (sem nome ou
+            com código inválido).
+        """
+        contagem = [0, 0]
+
+        def linhas() -> Iterator[tuple]:
+            for registro in registros:
+                codigo = next((registro[c] for c in _COLUNAS_CODIGO if registro.get(c) is not None), None)
+                chave = gtin_como_inteiro(str(codigo)) if codigo is not None else None
+                nome = _texto_ou_none(registro.get("nome"))
+                if chave is None or nome is None:
+                    contagem[1] += 1
+                    continue
+                contagem[0] += 1
+                yield (
+                    chave, nome, _texto_ou_none(registro.get("marca")),
+                    _texto_ou_none(registro.get("unidade")), _texto_ou_none(registro.get("url_imagem")),
+                )
+
+        with self._trava:
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                pendentes = linhas()
+                while True:
+                    lote = list(islice(pendentes, _LOTE_IMPORTACAO))
+                    if not lote:
+                        break
+                    self._conexao.executemany(_SQL_GRAVAR, lote)
+                self._conexao.execute("COMMIT")
+            except BaseException:
+                self._conexao.execute("ROLLBACK")
+                raise
+        return contagem[0], contagem[1]
+
+    def importar_csv(self, arquivo: Union[str, TextIO], delimitador: str = ",") -> Tuple[int, int]:
+        """Importa um CSV com cabeçalho (ver `importar`), lido em fluxo."""
+        if isinstance(arquivo, str):
+            with open(arquivo, newline="", encoding="utf-8") as aberto:
+                return self.importar_csv(aberto, delimitador)
+        return self.importar(csv.DictReader(arquivo, delimiter=delimitador))
+
+    def importar_jsonl(self, arquivo: Union[str, TextIO]) -> Tuple[int, int]:
+        """Importa um arquivo com um objeto JSON por linha (ver `importar`), lido em fluxo."""
+        if isinstance(arquivo, str):
+            with open(arquivo, encoding="utf-8") as aberto:
+                return self.importar_jsonl(aberto)
+        return self.importar(json.loads(linha) for linha in arquivo if linha.strip())
+
+def nome_provisorio(codigo_de_barras: str) -> str:
+    """Nome dado a um produto novo lido sem nenhum dado além do código de barras."""
+    return f"Produto {codigo_de_barras}"
+
+class EnriquecedorProdutos:
+    """
+    Completa, em segundo plano e em lotes, os produtos criados só com o
+    código de barras.
+
+    Ao ser criado, fica registrado em `repositorio.enriquecedor`; as operações
+    de leitura então só enfileiram o código de cada produto novo sem nome
+    (uma inserção em uma deque), sem consultar o cache no caminho da leitura.
+    Uma thread junta os códigos pendentes, busca todos de uma vez no
+    `CacheGTIN` e aplica os metadados em uma transação do repositório, sob as
+    travas de cada código.
+
+    Só produtos que ainda têm o nome provisório são alterados; marca, unidade
+    e imagem só são preenchidas se estiverem vazias, e a unidade só se for da
+    mesma grandeza da atual, pois as quantidades já lidas estão nela.
+
+    Com `em_thread=True`, o repositório é usado a partir de outra thread e
+    precisa ser seguro para isso (`concorrencia.InventarioConcorrente` ou
+    `repositorio_sqlite.RepositorioSQLite`). Com `em_thread=False`, quem usa
+    chama `processar_pendentes()` quando quiser.
+    """
+
+    def __init__(
+        self,
+        repositorio: RepositorioEstoque,
+        cache: CacheGTIN,
+        lote: int = 256,
+        intervalo: float = 0.5,
+        em_thread: bool = True,
+    ):
+        self.repositorio = repositorio
+        self.cache = cache
+        self.lote = lote
+        self.intervalo = intervalo
+        self._pendentes: Deque[str] = deque()
+        self._acordar = threading.Event()
+        self._parar = False
+        self._thread: Optional[threading.Thread] = None
+        repositorio.enriquecedor = self
+        if em_thread:
+            self._thread = threading.Thread(target=self._executar, name="enriquecedor-produtos", daemon=True)
+            self._thread.start()
+
+    def enfileirar(self, codigo_de_barras: str) -> None:
+        self._pendentes.append(codigo_de_barras)
+        if len(self._pendentes) >= self.lote:
+            self._acordar.set()
+
+    def _executar(self) -> None:
+        while not self._parar:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            self.processar_pendentes()
+
+    def processar_pendentes(self) -> int:
+        """Aplica os metadados a todos os códigos pendentes; retorna quantos produtos mudaram."""
+        alterados = 0
+        while self._pendentes:
+            codigos = []
+            while self._pendentes and len(codigos) < self.lote:
+                codigos.append(self._pendentes.popleft())
+            alterados += self._aplicar(self.cache.buscar_varios(codigos))
+        return alterados
+
+    def _aplicar(self, metadados: Dict[str, MetadadosGTIN]) -> int:
+        if not metadados:
+            return 0
+        repositorio = self.repositorio
+        alterados = 0
+        now = datetime.now()
+        with repositorio.transacao():
+            repositorio.precarregar_produtos(codigos_de_barras=metadados)
+            for codigo, dados in metadados.items():
+                with repositorio.travar_chave(codigo):
+                    produto = repositorio.buscar_produto_por_codigo_de_barras(codigo)
+                    if produto is None or produto.nome != nome_provisorio(codigo):
+                        continue
+                    produto.marca = produto.marca or dados.marca
+                    produto.url_imagem = produto.url_imagem or dados.url_imagem
+                    if dados.unidade and unidade_base(dados.unidade) == unidade_base(produto.unidade):
+                        produto.unidade = produto.unidade or dados.unidade
+                    produto.atualizado_em = now
+                    repositorio.renomear_produto(produto, dados.nome)
+                    alterados += 1
+        return alterados
+
+    def fechar(self) -> None:
+        """Para a thread e aplica o que ainda estiver pendente."""
+        self._parar = True
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.processar_pendentes()
+        if self.repositorio.enriquecedor is self:
+            self.repositorio.enriquecedor = None
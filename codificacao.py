@@ -0,0 +1,55 @@
+import struct
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+from uuid import UUID
+
+from models import Produto
+
+# Codificações compartilhadas pelos formatos binários e pelas colunas do
+# estoque (`estoque_colunar`, `historico`, `instantaneo`, `catalogo_compartilhado`
+# e `sincronizacao`): datetimes em microssegundos desde a época, datas como
+# ordinal, UUIDs opcionais em 16 bytes e textos em UTF-8 prefixados pelo
+# tamanho em 32 bits.
+
+EPOCA = datetime(1970, 1, 1)
+SEM_DATA = 0 # date.toordinal() nunca é 0, então 0 representa None
+SEM_UUID = bytes(16) # uuid4() nunca gera o UUID nulo
+TAMANHO_TEXTO = struct.Struct("<I")
+_MICROSSEGUNDO = timedelta(microseconds=1)
+
+def datetime_para_int(valor: datetime) -> int:
+    """Converte um datetime (ingênuo, como os de datetime.now()) em microssegundos desde a época."""
+    return (valor - EPOCA) // _MICROSSEGUNDO
+
+def int_para_datetime(valor: int) -> datetime:
+    return EPOCA + timedelta(microseconds=valor)
+
+def date_para_int(valor: Optional[date]) -> int:
+    return valor.toordinal() if valor is not None else SEM_DATA
+
+def int_para_date(valor: int) -> Optional[date]:
+    return date.fromordinal(valor) if valor != SEM_DATA else None
+
+def uuid_para_bytes(valor: Optional[UUID]) -> bytes:
+    return valor.bytes if valor is not None else SEM_UUID
+
+def bytes_para_uuid(valor: bytes) -> Optional[UUID]:
+    return UUID(bytes=valor) if valor != SEM_UUID else None
+
+def codificar_texto(valor: str) -> bytes:
+    """UTF-8 de `valor`, inteiro, precedido do tamanho em bytes (`TAMANHO_TEXTO`)."""
+    codificado = valor.encode("utf-8")
+    return TAMANHO_TEXTO.pack(len(codificado)) + codificado
+
+def ler_texto(dados: bytes, posicao: int) -> Tuple[str, int]:
+    """Lê um texto de `codificar_texto` em `posicao` e retorna `(texto, fim)`."""
+    (tamanho,) = TAMANHO_TEXTO.unpack_from(dados, posicao)
+    posicao += TAMANHO_TEXTO.size
+    return str(dados[posicao:posicao + tamanho], "utf-8"), posicao + tamanho
+
+def dados_do_produto(produto: Produto) -> tuple:
+    """Campos de cadastro do produto, sem `atualizado_em`, para saber se algo além do toque mudou."""
+    return (
+        produto.nome, produto.codigo_de_barras, produto.marca, produto.unidade,
+        produto.data_de_validade_padrao, produto.url_imagem, produto.criado_em,
+    )
@@ -0,0 +1,111 @@
+import threading
+from datetime import date
+from typing import ContextManager, List, Optional, Tuple
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+
+LISTRAS_PADRAO = 64
+
+class InventarioConcorrente(Inventario):
+    """
+    `Inventario` que pode ser compartilhado por várias threads.
+
+    Em vez de uma trava global, usa travas listradas: a chave de busca
+    (código de barras ou nome) e o produto_id escolhem, por hash, uma entre
+    `listras` travas de cada conjunto. Operações sobre produtos diferentes
+    quase sempre caem em listras diferentes e seguem em paralelo; operações
+    sobre o mesmo produto são serializadas, então nenhum incremento ou
+    decremento de quantidade se perde e um código de barras novo lido ao
+    mesmo tempo por duas threads gera um único produto.
+
+    As travas de chave são sempre adquiridas antes das de produto e nunca
+    duas do mesmo conjunto ao mesmo tempo, o que exclui deadlocks. Mudanças
+    estruturais nas listas e índices compartilhados (registrar ou descartar,
+    que troca itens de posição) ficam sob uma trava curta à parte.
+
+    Quem usar as listas com várias threads deve compartilhar uma única
+    instância desta classe; as funções de `stock_management` criam um
+    `Inventario` novo a cada chamada e não são seguras entre threads.
+    """
+
+    def __init__(
+        self,
+        produtos: Optional[List[Produto]] = None,
+        estoque: Optional[List[ItemEstoque]] = None,
+        listras: int = LISTRAS_PADRAO,
+        **opcoes,
+    ):
+        self._travas_chave = [threading.RLock() for _ in range(listras)]
+        self._travas_produto = [threading.RLock() for _ in range(listras)]
+        self._trava_estrutura = threading.RLock()
+        super().__init__(produtos, estoque, **opcoes)
+
+    def travar_chave(self, chave: str) -> ContextManager:
+        return self._travas_chave[hash(chave) % len(self._travas_chave)]
+
+    def travar_produto(self, produto_id: UUID) -> ContextManager:
+        return self._travas_produto[produto_id.int % len(self._travas_produto)]
+
+    def reindexar(self) -> None:
+        with self._trava_estrutura:
+            super().reindexar()
+
+    # Leituras que atravessam estruturas alteradas por outros produtos
+
+    def buscar_produto_parecido(self, nome: str) -> Optional[Produto]:
+        with self._trava_estrutura:
+            return super().buscar_produto_parecido(nome)
+
+    def buscar_item_por_id(self, item_id: UUID) -> Optional[ItemEstoque]:
+        # A posição do item muda quando outro item é descartado.
+        with self._trava_estrutura:
+            return super().buscar_item_por_id(item_id)
+
+    def _itens_com_validade_entre(
+        self, inicio: Optional[date], fim: Optional[date]
+    ) -> List[Tuple[date, ItemEstoque]]:
+        with self._trava_estrutura:
+            return super()._itens_com_validade_entre(inicio, fim)
+
+    # Mutações estruturais
+
+    def registrar_produto(self, produto: Produto) -> None:
+        with self._trava_estrutura:
+            super().registrar_produto(produto)
+
+    def registrar_item(self, item: ItemEstoque) -> None:
+        with self._trava_estrutura:
+            super().registrar_item(item)
+
+    def descartar_item(self, item: ItemEstoque) -> None:
+        with self._trava_estrutura:
+            super().descartar_item(item)
+
+    def renomear_produto(self, produto: Produto, nome: str) -> None:
+        # Mesma ordem de `atualizar_produto`, chamado em seguida: produto, depois estrutura.
+        with self.travar_produto(produto.id), self._trava_estrutura:
+            super().renomear_produto(produto, nome)
+
+    def sobrescrever_produto(self, produto_id: UUID, **campos) -> Optional[Produto]:
+        with self.travar_produto(produto_id), self._trava_estrutura:
+            return super().sobrescrever_produto(produto_id, **campos)
+
+    def atualizar_item(self, item: ItemEstoque) -> None:
+        if self.indice_validade is not None:
+            with self._trava_estrutura:
+                super().atualizar_item(item)
+        elif self.lotes is not None:
+            # Os lotes são por produto, e os itens são sempre alterados sob a
+            # trava do produto.
+            super().atualizar_item(item)
+
+    def atualizar_produto(self, produto: Produto) -> None:
+        if self.indice_validade is not None:
+            with self.travar_produto(produto.id), self._trava_estrutura:
+                super().atualizar_produto(produto)
+        elif self.lotes is not None:
+            # Pode reordenar os lotes do produto, que só são lidos sob a trava dele.
+            with self.travar_produto(produto.id):
+                super().atualizar_produto(produto)
@@ -0,0 +1,269 @@
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Abreviações frequentes nas descrições de itens de NFC-e, que costumam ser
+# truncadas para caber no layout do cupom.
+ABREVIACOES: Dict[str, str] = {
+    "arr": "arroz",
+    "az": "azeite",
+    "bisc": "biscoito",
+    "beb": "bebida",
+    "cerv": "cerveja",
+    "choc": "chocolate",
+    "cx": "caixa",
+    "deterg": "detergente",
+    "desn": "desnatado",
+    "feij": "feijao",
+    "fgo": "frango",
+    "hig": "higienico",
+    "int": "integral",
+    "iog": "iogurte",
+    "lte": "leite",
+    "mac": "macarrao",
+    "marg": "margarina",
+    "mant": "manteiga",
+    "moc": "mocarela",
+    "pap": "papel",
+    "pct": "pacote",
+    "pt": "pacote",
+    "queij": "queijo",
+    "refr": "refrigerante",
+    "refri": "refrigerante",
+    "refrig": "refrigerante",
+    "sab": "sabao",
+    "semidesn": "semidesnatado",
+    "tp": "tipo",
+    "trad": "tradicional",
+}
+
+# Unidades sem número que acompanham o nome (ex.: "LEITE INTEGRAL LT").
+UNIDADES_SOLTAS: Dict[str, str] = {
+    "lt": "l", "lts": "l", "litro": "l", "litros": "l",
+    "kilo": "kg", "quilo": "kg", "kgs": "kg",
+    "gr": "g", "grs": "g", "gramas": "g",
+    "und": "un", "unid": "un", "unidade": "un", "unidades": "un",
+}
+
+STOPWORDS = frozenset({"de", "da", "do", "das", "dos", "com", "c", "e", "em", "p", "para"})
+
+# Fatores para a unidade base: massas em gramas e volumes em mililitros,
+# de modo que "0,5KG" e "500G" gerem o mesmo token.
+_FATORES_UNIDADE: Dict[str, Tuple[float, str]] = {
+    "kg": (1000, "g"), "kilo": (1000, "g"), "quilo": (1000, "g"),
+    "g": (1, "g"), "gr": (1, "g"), "grs": (1, "g"), "gramas": (1, "g"),
+    "l": (1000, "ml"), "lt": (1000, "ml"), "lts": (1000, "ml"), "litro": (1000, "ml"), "litros": (1000, "ml"),
+    "ml": (1, "ml"),
+    "un": (1, "un"), "und": (1, "un"), "unid": (1, "un"),
+}
+
+_RE_DECIMAL = re.compile(r"(\d),(\d)")
+_RE_MULTIPLO = re.compile(r"(\d+)x(?=\d)")
+_RE_MEDIDA = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(kg|kilo|quilo|gramas|grs|gr|g|litros|litro|lts|lt|ml|l|unid|und|un)(?![a-z])"
+)
+_RE_LETRAS_NUMERO = re.compile(r"\b([a-z]{2,})(\d)")
+_RE_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+def _formatar_medida(correspondencia: "re.Match[str]") -> str:
+    fator, unidade = _FATORES_UNIDADE[correspondencia.group(2)]
+    valor = float(correspondencia.group(1)) * fator
+    numero = str(int(valor)) if valor == int(valor) else f"{valor:g}"
+    return f" {numero}{unidade} "
+
+def tokens_normalizados(texto: str) -> List[str]:
+    """
+    Normaliza uma descrição de produto em uma lista de tokens comparáveis.
+
+    Remove acentos e caixa, expande abreviações comuns de NFC-e, descarta
+    palavras vazias e converte medidas para a unidade base (ex.: "1,5LT" vira
+    "1500ml" e "1KG" vira "1000g").
+    """
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = _RE_DECIMAL.sub(r"\1.\2", texto)
+    texto = _RE_MULTIPLO.sub(r"\1x ", texto)
+    texto = _RE_MEDIDA.sub(_formatar_medida, texto)
+    texto = _RE_LETRAS_NUMERO.sub(r"\1 \2", texto) # "TP1" -> "tp 1"
+
+    tokens: List[str] = []
+    for token in _RE_TOKEN.findall(texto):
+        token = ABREVIACOES.get(token) or UNIDADES_SOLTAS.get(token) or token
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+def normalizar_nome(texto: str) -> str:
+    """Forma normalizada de uma descrição, como string (ver `tokens_normalizados`)."""
+    return " ".join(tokens_normalizados(texto))
+
+def _similaridade_token(consulta: str, candidato: str) -> float:
+    if consulta == candidato:
+        return 1.0
+    # Descrição truncada: o token do cupom é prefixo do token cadastrado.
+    if len(consulta) >= IndiceCorrespondencia.TAMANHO_MINIMO_PREFIXO and candidato.startswith(consulta):
+        return 0.6 + 0.4 * len(consulta) / len(candidato)
+    return 0.0
+
+class IndiceCorrespondencia(Generic[T]):
+    """
+    Índice invertido de tokens para associar descrições de cupom a produtos cadastrados.
+
+    Cada nome é normalizado uma única vez, na inserção. Uma consulta expande
+    seus tokens (inclusive por prefixo, para descrições truncadas) e intersecta
+    as listas invertidas do token mais raro para o mais comum, ignorando tokens
+    cuja interseção ficaria vazia. Só os poucos candidatos restantes recebem a
+    pontuação final: um coeficiente de Dice ponderado por IDF, entre 0 e 1.
+    """
+
+    TAMANHO_MINIMO_PREFIXO = 3
+    MAX_EXPANSOES_PREFIXO = 32
+    CANDIDATOS_PONTUADOS = 16
+
+    def __init__(self, limiar: float = 0.6):
+        self.limiar = limiar
+        self._valores: List[T] = []
+        self._tokens: List[Tuple[str, ...]] = []
+        self._indice: Dict[str, Set[int]] = {}
+        self._vocabulario: List[str] = [] # ordenado, para busca por prefixo
+
+    def __len__(self) -> int:
+        return len(self._valores)
+
+    def adicionar(self, nome: str, valor: T) -> None:
+        """Indexa `valor` sob o nome informado."""
+        posicao = len(self._valores)
+        tokens = tuple(dict.fromkeys(tokens_normalizados(nome)))
+        self._valores.append(valor)
+        self._tokens.append(tokens)
+        for token in tokens:
+            posicoes = self._indice.get(token)
+            if posicoes is None:
+                self._indice[token] = {posicao}
+                insort(self._vocabulario, token)
+            else:
+                posicoes.add(posicao)
+
+    def _expandir(self, token: str) -> List[str]:
+        """Tokens do vocabulário iguais a `token` ou que o têm como prefixo."""
+        if len(token) < self.TAMANHO_MINIMO_PREFIXO:
+            return [token] if token in self._indice else []
+        expansoes: List[str] = []
+        i = bisect_left(self._vocabulario, token)
+        while i < len(self._vocabulario) and len(expansoes) < self.MAX_EXPANSOES_PREFIXO:
+            candidato = self._vocabulario[i]
+            if not candidato.startswith(token):
+                break
+            expansoes.append(candidato)
+            i += 1
+        return expansoes
+
+    def _peso(self, frequencia: int) -> float:
+        return math.log(1 + len(self._valores) / max(frequencia, 1))
+
+    def _reunir_candidatos(self, ordem: List[str], expansoes: Dict[str, List[str]], vistos: Set[int]) -> List[int]:
+        """
+        Intersecta as listas invertidas dos tokens na ordem dada (do mais raro ao mais comum).
+
+        Retorna as posições que casaram mais tokens primeiro, completadas pelas
+        etapas anteriores da interseção até `CANDIDATOS_PONTUADOS` posições,
+        ignorando as que já estão em `vistos` (que é atualizado).
+        """
+        etapas: List[Set[int]] = []
+        for token in ordem:
+            listas = [self._indice[e] for e in expansoes[token]]
+            if not listas:
+                continue
+            if not etapas:
+                etapas.append(set().union(*listas))
+                continue
+            # set.intersection percorre sempre o menor dos dois conjuntos.
+            intersecao = set().union(*(etapas[-1].intersection(lista) for lista in listas))
+            if intersecao:
+                etapas.append(intersecao)
+
+        reunidos: List[int] = []
+        for etapa in reversed(etapas):
+            faltam = self.CANDIDATOS_PONTUADOS - len(reunidos)
+            if faltam <= 0:
+                break
+            novos = etapa - vistos if vistos else etapa
+            if len(novos) <= faltam:
+                escolhidos = list(novos)
+            elif len(novos) <= 8 * self.CANDIDATOS_PONTUADOS:
+                # Entre candidatos da mesma etapa, nomes mais curtos têm Dice maior.
+                escolhidos = heapq.nsmallest(faltam, novos, key=lambda p: len(self._tokens[p]))
+            else:
+                # Etapa larga demais para ordenar dentro do orçamento da consulta.
+                escolhidos = list(islice(novos, faltam))
+            reunidos.extend(escolhidos)
+            vistos.update(escolhidos)
+        return reunidos
+
+    def candidatos(self, nome: str, k: int = 5) -> List[Tuple[T, float]]:
+        """Retorna até `k` valores com as maiores pontuações para o nome, em ordem decrescente."""
+        consulta = tuple(dict.fromkeys(tokens_normalizados(nome)))
+        if not consulta or not self._valores:
+            return []
+
+        expansoes = {token: self._expandir(token) for token in consulta}
+        frequencias = {
+            token: sum(len(self._indice[e]) for e in expansoes[token]) for token in consulta
+        }
+        ordem = sorted(consulta, key=frequencias.__getitem__)
+        vistos: Set[int] = set()
+        reunidos = self._reunir_candidatos(ordem, expansoes, vistos)
+        # Segunda passada sem o token mais raro, caso ele seja ruído do cupom
+        # (ex.: um token truncado que casou por prefixo com o produto errado).
+        if len(ordem) > 1:
+            reunidos += self._reunir_candidatos(ordem[1:], expansoes, vistos)
+
+        pesos_consulta = {token: self._peso(frequencias[token]) for token in consulta}
+        peso_total_consulta = sum(pesos_consulta.values())
+        # Contribuição de cada token cadastrado que casa com algum token da
+        # consulta, para pontuar cada candidato com uma única passada.
+        contribuicoes: Dict[str, Tuple[str, float]] = {}
+        for q in consulta:
+            for t in expansoes[q]:
+                valor = pesos_consulta[q] * _similaridade_token(q, t)
+                if valor > contribuicoes.get(t, ("", 0.0))[1]:
+                    contribuicoes[t] = (q, valor)
+
+        pesos_candidato: Dict[str, float] = {}
+        pontuados: List[Tuple[float, int]] = []
+        for posicao in reunidos:
+            peso_candidato = 0.0
+            ganhos: Dict[str, float] = {}
+            for t in self._tokens[posicao]:
+                peso = pesos_candidato.get(t)
+                if peso is None:
+                    peso = pesos_candidato[t] = self._peso(len(self._indice[t]))
+                peso_candidato += peso
+                contribuicao = contribuicoes.get(t)
+                if contribuicao is not None and contribuicao[1] > ganhos.get(contribuicao[0], 0.0):
+                    ganhos[contribuicao[0]] = contribuicao[1]
+            semelhanca = sum(ganhos.values())
+            pontuados.append((2 * semelhanca / (peso_total_consulta + peso_candidato), posicao))
+
+        pontuados.sort(key=lambda par: (-par[0], par[1]))
+        return [(self._valores[posicao], pontuacao) for pontuacao, posicao in pontuados[:k]]
+
+    def buscar(self, nome: str, limiar: Optional[float] = None) -> Optional[Tuple[T, float]]:
+        """
+        Retorna o melhor valor e sua pontuação, ou None se a pontuação ficar abaixo do limiar.
+
+        Args:
+            nome: Descrição a buscar, por exemplo o nome de um item de cupom fiscal.
+            limiar: Pontuação mínima; usa `self.limiar` se omitido.
+        """
+        resultado = self.candidatos(nome, k=1)
+        minimo = self.limiar if limiar is None else limiar
+        if resultado and resultado[0][1] >= minimo:
+            return resultado[0]
+        return None
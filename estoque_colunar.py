@@ -0,0 +1,222 @@
+from array import array
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from uuid import UUID, uuid4
+
+from models import ItemEstoque
+from codificacao import datetime_para_int, int_para_datetime, date_para_int, int_para_date
+
+_SEM_REFERENCIA = -1
+
+class ItemEstoqueView:
+    """
+    Visão leve de uma linha de `EstoqueColunar` com a mesma API de atributos de `ItemEstoque`.
+
+    A visão guarda apenas a referência ao estoque e o número da linha; cada
+    atributo é lido (e escrito) diretamente nas colunas. Depois que a linha é
+    removida com `EstoqueColunar.remover`, a visão não deve mais ser usada.
+    """
+
+    __slots__ = ("_estoque", "_linha")
+
+    def __init__(self, estoque: "EstoqueColunar", linha: int):
+        self._estoque = estoque
+        self._linha = linha
+
+    def __eq__(self, outro: object) -> bool:
+        return (
+            isinstance(outro, ItemEstoqueView)
+            and outro._estoque is self._estoque
+            and outro._linha == self._linha
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self._estoque), self._linha))
+
+    @property
+    def id(self) -> UUID:
+        inicio = self._linha * 16
+        return UUID(bytes=bytes(self._estoque._ids[inicio:inicio + 16]))
+
+    @property
+    def produto_id(self) -> UUID:
+        return self._estoque._produto_ids[self._estoque._produto[self._linha]]
+
+    @produto_id.setter
+    def produto_id(self, valor: UUID) -> None:
+        self._estoque._produto[self._linha] = self._estoque._indice_produto(valor)
+
+    @property
+    def quantidade(self) -> int:
+        return self._estoque._quantidade[self._linha]
+
+    @quantidade.setter
+    def quantidade(self, valor: int) -> None:
+        self._estoque._quantidade[self._linha] = valor
+
+    @property
+    def data_compra(self) -> Optional[date]:
+        return int_para_date(self._estoque._data_compra[self._linha])
+
+    @data_compra.setter
+    def data_compra(self, valor: Optional[date]) -> None:
+        self._estoque._data_compra[self._linha] = date_para_int(valor)
+
+    @property
+    def data_validade_especifica(self) -> Optional[date]:
+        return int_para_date(self._estoque._data_validade[self._linha])
+
+    @data_validade_especifica.setter
+    def data_validade_especifica(self, valor: Optional[date]) -> None:
+        self._estoque._data_validade[self._linha] = date_para_int(valor)
+
+    @property
+    def id_cupom_fiscal_origem(self) -> Optional[UUID]:
+        indice = self._estoque._cupom[self._linha]
+        return self._estoque._cupom_ids[indice] if indice != _SEM_REFERENCIA else None
+
+    @id_cupom_fiscal_origem.setter
+    def id_cupom_fiscal_origem(self, valor: Optional[UUID]) -> None:
+        self._estoque._cupom[self._linha] = self._estoque._indice_cupom(valor)
+
+    @property
+    def adicionado_em(self) -> datetime:
+        return int_para_datetime(self._estoque._adicionado_em[self._linha])
+
+    @adicionado_em.setter
+    def adicionado_em(self, valor: datetime) -> None:
+        self._estoque._adicionado_em[self._linha] = datetime_para_int(valor)
+
+    @property
+    def ultima_atualizacao(self) -> datetime:
+        return int_para_datetime(self._estoque._ultima_atualizacao[self._linha])
+
+    @ultima_atualizacao.setter
+    def ultima_atualizacao(self, valor: datetime) -> None:
+        self._estoque._ultima_atualizacao[self._linha] = datetime_para_int(valor)
+
+class EstoqueColunar:
+    """
+    Armazenamento colunar opcional para grandes volumes de itens de estoque.
+
+    Em vez de um objeto por item, cada atributo fica em um `array` paralelo:
+    índice do produto, quantidade, datas como inteiros (ordinal para `date`,
+    microssegundos desde a época para `datetime`) e o id do item em 16 bytes.
+    Os UUIDs de produtos e cupons são internados em tabelas, de modo que cada
+    linha guarda só um índice inteiro. O acesso é feito por `ItemEstoqueView`.
+
+    Linhas removidas são reaproveitadas por inserções seguintes, então os
+    números de linha das demais visões continuam estáveis.
+    """
+
+    def __init__(self):
+        self._ids = bytearray()
+        self._produto = array("i")
+        self._quantidade = array("q")
+        self._data_compra = array("i")
+        self._data_validade = array("i")
+        self._cupom = array("i")
+        self._adicionado_em = array("q")
+        self._ultima_atualizacao = array("q")
+        self._ativa = bytearray()
+        self._linhas_livres: List[int] = []
+
+        self._produto_ids: List[UUID] = []
+        self._indice_por_produto: Dict[UUID, int] = {}
+        self._cupom_ids: List[UUID] = []
+        self._indice_por_cupom: Dict[UUID, int] = {}
+
+    @classmethod
+    def de_itens(cls, itens: Iterable[ItemEstoque]) -> "EstoqueColunar":
+        """Cria um estoque colunar copiando os itens informados, preservando ids e timestamps."""
+        estoque = cls()
+        for item in itens:
+            view = estoque.adicionar(
+                item.produto_id,
+                item.quantidade,
+                data_compra=item.data_compra,
+                data_validade_especifica=item.data_validade_especifica,
+                id_cupom_fiscal_origem=item.id_cupom_fiscal_origem,
+                id=item.id,
+                adicionado_em=item.adicionado_em,
+            )
+            view.ultima_atualizacao = item.ultima_atualizacao
+        return estoque
+
+    def _indice_produto(self, produto_id: UUID) -> int:
+        indice = self._indice_por_produto.get(produto_id)
+        if indice is None:
+            indice = len(self._produto_ids)
+            self._produto_ids.append(produto_id)
+            self._indice_por_produto[produto_id] = indice
+        return indice
+
+    def _indice_cupom(self, cupom_id: Optional[UUID]) -> int:
+        if cupom_id is None:
+            return _SEM_REFERENCIA
+        indice = self._indice_por_cupom.get(cupom_id)
+        if indice is None:
+            indice = len(self._cupom_ids)
+            self._cupom_ids.append(cupom_id)
+            self._indice_por_cupom[cupom_id] = indice
+        return indice
+
+    def adicionar(
+        self,
+        produto_id: UUID,
+        quantidade: int,
+        data_compra: Optional[date] = None,
+        data_validade_especifica: Optional[date] = None,
+        id_cupom_fiscal_origem: Optional[UUID] = None,
+        id: Optional[UUID] = None,
+        adicionado_em: Optional[datetime] = None,
+    ) -> ItemEstoqueView:
+        """
+        Adiciona uma linha com os mesmos campos do construtor de `ItemEstoque`.
+
+        `id` e `adicionado_em` são gerados como no construtor quando omitidos.
+        """
+        id_bytes = (id if id is not None else uuid4()).bytes
+        momento = datetime_para_int(adicionado_em if adicionado_em is not None else datetime.now())
+        valores = (
+            self._indice_produto(produto_id),
+            quantidade,
+            date_para_int(data_compra),
+            date_para_int(data_validade_especifica),
+            self._indice_cupom(id_cupom_fiscal_origem),
+            momento,
+            momento,
+        )
+        colunas = (
+            self._produto, self._quantidade, self._data_compra, self._data_validade,
+            self._cupom, self._adicionado_em, self._ultima_atualizacao,
+        )
+
+        if self._linhas_livres:
+            linha = self._linhas_livres.pop()
+            self._ids[linha * 16:linha * 16 + 16] = id_bytes
+            for coluna, valor in zip(colunas, valores):
+                coluna[linha] = valor
+            self._ativa[linha] = 1
+        else:
+            linha = len(self._ativa)
+            self._ids += id_bytes
+            for coluna, valor in zip(colunas, valores):
+                coluna.append(valor)
+            self._ativa.append(1)
+        return ItemEstoqueView(self, linha)
+
+    def remover(self, item: ItemEstoqueView) -> None:
+        """Remove a linha da visão; ela será reaproveitada na próxima inserção."""
+        if item._estoque is not self or not self._ativa[item._linha]:
+            raise ValueError("Item não pertence a este estoque ou já foi removido.")
+        self._ativa[item._linha] = 0
+        self._linhas_livres.append(item._linha)
+
+    def __len__(self) -> int:
+        return len(self._ativa) - len(self._linhas_livres)
+
+    def __iter__(self) -> Iterator[ItemEstoqueView]:
+        for linha, ativa in enumerate(self._ativa):
+            if ativa:
+                yield ItemEstoqueView(self, linha)
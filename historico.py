@@ -0,0 +1,434 @@
+import os
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+from codificacao import (
+    bytes_para_uuid, codificar_texto, dados_do_produto, date_para_int, datetime_para_int, int_para_date,
+    int_para_datetime, ler_texto, uuid_para_bytes,
+)
+
+# Tipos de evento. Cada evento é um byte de tipo seguido de campos de tamanho fixo
+# (UUIDs em 16 bytes, quantidades em 64 bits, datas como ordinal, datetimes em
+# microssegundos desde a época) e, no caso de produtos, textos opcionais: um byte
+# de presença seguido, se houver texto, de `codificacao.codificar_texto`.
+PRODUTO = 1 # produto completo (registrado ou com dados alterados)
+PRODUTO_TOCADO = 2 # só atualizado_em mudou
+ITEM = 3 # item completo (registrado)
+ITEM_ALTERADO = 4 # campos mutáveis de um item já registrado
+DESCARTE = 5 # item saiu do estoque
+
+_PRODUTO = struct.Struct("<B16sqqi")
+_PRODUTO_TOCADO = struct.Struct("<B16sq")
+_ITEM = struct.Struct("<B16s16sqii16sqq")
+_ITEM_ALTERADO = struct.Struct("<B16sqii16sq")
+_DESCARTE = struct.Struct("<B16s")
+_SEM_TEXTO, _COM_TEXTO = b"\0", b"\1"
+
+# Quadro: tamanho e CRC32 da carga, seguidos da carga (os eventos de uma operação).
+_QUADRO = struct.Struct("<II")
+# O log começa com um cabeçalho de versão; o instantâneo traz a versão no
+# mágico. A versão 2 passou os textos a um byte de presença e tamanho de 32
+# bits; arquivos da versão 1 são recusados.
+_MAGICO_LOG = b"ESTQLOG2"
+_MAGICO_INSTANTANEO = b"ESTQINS2"
+_CABECALHO_INSTANTANEO = struct.Struct("<8sQ")
+_EVENTOS_POR_QUADRO_INSTANTANEO = 4_096
+
+class HistoricoCorrompido(ValueError):
+    """Um quadro do log ou do instantâneo não confere com seu CRC."""
+
+def _texto(valor: Optional[str]) -> bytes:
+    if valor is None:
+        return _SEM_TEXTO
+    return _COM_TEXTO + codificar_texto(valor)
+
+def _ler_texto(carga: bytes, posicao: int) -> Tuple[Optional[str], int]:
+    if carga[posicao] == 0:
+        return None, posicao + 1
+    return ler_texto(carga, posicao + 1)
+
+def codificar_produto(produto: Produto) -> bytes:
+    return b"".join((
+        _PRODUTO.pack(
+            PRODUTO, produto.id.bytes, datetime_para_int(produto.criado_em),
+            datetime_para_int(produto.atualizado_em), date_para_int(produto.data_de_validade_padrao),
+        ),
+        _texto(produto.nome), _texto(produto.codigo_de_barras), _texto(produto.marca),
+        _texto(produto.unidade), _texto(produto.url_imagem),
+    ))
+
+def codificar_item(item: ItemEstoque) -> bytes:
+    return _ITEM.pack(
+        ITEM, item.id.bytes, item.produto_id.bytes, item.quantidade, date_para_int(item.data_compra),
+        date_para_int(item.data_validade_especifica), uuid_para_bytes(item.id_cupom_fiscal_origem),
+        datetime_para_int(item.adicionado_em), datetime_para_int(item.ultima_atualizacao),
+    )
+
+def decodificar_evento(carga: bytes, posicao: int) -> Tuple[tuple, int]:
+    """
+    Decodifica o evento que começa em `posicao` e retorna `(evento, fim)`.
+
+    Os eventos são `(PRODUTO, Produto)`, `(PRODUTO_TOCADO, id, atualizado_em)`,
+    `(ITEM, ItemEstoque)`, `(ITEM_ALTERADO, id, quantidade, data_compra,
+    data_validade_especifica, id_cupom_fiscal_origem, ultima_atualizacao)` e
+    `(DESCARTE, id)`.
+
+    Raises:
+        HistoricoCorrompido: Se o byte de tipo não for conhecido.
+    """
+    tipo = carga[posicao]
+    if tipo == ITEM_ALTERADO:
+        _, item_id, quantidade, compra, validade, cupom, atualizacao = _ITEM_ALTERADO.unpack_from(carga, posicao)
+        return (
+            ITEM_ALTERADO, UUID(bytes=item_id), quantidade, int_para_date(compra),
+            int_para_date(validade), bytes_para_uuid(cupom), int_para_datetime(atualizacao),
+        ), posicao + _ITEM_ALTERADO.size
+    if tipo == PRODUTO_TOCADO:
+        _, produto_id, atualizado_em = _PRODUTO_TOCADO.unpack_from(carga, posicao)
+        return (PRODUTO_TOCADO, UUID(bytes=produto_id), int_para_datetime(atualizado_em)), posicao + _PRODUTO_TOCADO.size
+    if tipo == ITEM:
+        _, item_id, produto_id, quantidade, compra, validade, cupom, adicionado, atualizacao = (
+            _ITEM.unpack_from(carga, posicao)
+        )
+        return (ITEM, ItemEstoque.restaurar(
+            UUID(bytes=item_id), UUID(bytes=produto_id), quantidade, int_para_date(compra),
+            int_para_date(validade), bytes_para_uuid(cupom), int_para_datetime(adicionado),
+            int_para_datetime(atualizacao),
+        )), posicao + _ITEM.size
+    if tipo == DESCARTE:
+        _, item_id = _DESCARTE.unpack_from(carga, posicao)
+        return (DESCARTE, UUID(bytes=item_id)), posicao + _DESCARTE.size
+    if tipo == PRODUTO:
+        _, produto_id, criado_em, atualizado_em, validade = _PRODUTO.unpack_from(carga, posicao)
+        posicao += _PRODUTO.size
+        nome, posicao = _ler_texto(carga, posicao)
+        codigo, posicao = _ler_texto(carga, posicao)
+        marca, posicao = _ler_texto(carga, posicao)
+        unidade, posicao = _ler_texto(carga, posicao)
+        url, posicao = _ler_texto(carga, posicao)
+        return (PRODUTO, Produto.restaurar(
+            UUID(bytes=produto_id), nome, codigo, marca, unidade, int_para_date(validade), url,
+            int_para_datetime(criado_em), int_para_datetime(atualizado_em),
+        )), posicao
+    raise HistoricoCorrompido(f"Tipo de evento desconhecido: {tipo}")
+
+def decodificar_eventos(carga: bytes) -> Iterator[tuple]:
+    """Decodifica a carga de um quadro em eventos (ver `decodificar_evento`)."""
+    posicao = 0
+    while posicao < len(carga):
+        evento, posicao = decodificar_evento(carga, posicao)
+        yield evento
+
+def ler_quadros(caminho: str, inicio: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """
+    Lê os quadros de um arquivo a partir do byte `inicio`.
+
+    Gera `(fim, carga)`, em que `fim` é a posição logo após o quadro. Para no
+    primeiro quadro incompleto ou com CRC errado, que é o que sobra de uma
+    escrita interrompida no fim do log.
+    """
+    with open(caminho, "rb") as arquivo:
+        arquivo.seek(inicio)
+        posicao = inicio
+        while True:
+            cabecalho = arquivo.read(_QUADRO.size)
+            if len(cabecalho) < _QUADRO.size:
+                return
+            tamanho, crc = _QUADRO.unpack(cabecalho)
+            carga = arquivo.read(tamanho)
+            if len(carga) < tamanho or zlib.crc32(carga) != crc:
+                return
+            posicao += _QUADRO.size + tamanho
+            yield posicao, carga
+
+def inicio_do_log(caminho: str) -> int:
+    """
+    Posição do primeiro quadro do log, logo após o cabeçalho de versão.
+
+    Raises:
+        HistoricoCorrompido: Se o arquivo não começar com o cabeçalho da
+            versão atual (por exemplo, um log da versão 1, sem cabeçalho).
+    """
+    with open(caminho, "rb") as arquivo:
+        magico = arquivo.read(len(_MAGICO_LOG))
+    # Um arquivo vazio é um log recém-criado cujo cabeçalho ainda não foi escrito.
+    if magico and magico != _MAGICO_LOG:
+        raise HistoricoCorrompido(f"{caminho} não é um log de eventos na versão atual.")
+    return len(_MAGICO_LOG)
+
+def ler_eventos(caminho: str, inicio: Optional[int] = None) -> Iterator[tuple]:
+    """
+    Todos os eventos do log, na ordem em que foram gravados (ver `decodificar_eventos`).
+
+    Sem `inicio`, lê desde o primeiro quadro (ver `inicio_do_log`).
+    """
+    if inicio is None:
+        inicio = inicio_do_log(caminho)
+    for _, carga in ler_quadros(caminho, inicio):
+        yield from decodificar_eventos(carga)
+
+class LogEventos:
+    """
+    Arquivo de log só de acréscimo, com um quadro por operação.
+
+    Um arquivo novo recebe o cabeçalho de versão antes do primeiro quadro.
+
+    Cada quadro vai para o sistema operacional em uma única escrita, de modo
+    que a queda do processo perde no máximo o quadro em andamento. O `fsync`
+    é feito em lote: no máximo uma vez a cada `intervalo_fsync` segundos (0
+    sincroniza todo quadro; None só em `sincronizar()` e `fechar()`).
+    """
+
+    def __init__(self, caminho: str, intervalo_fsync: Optional[float] = 0.05):
+        self.caminho = caminho
+        self.intervalo_fsync = intervalo_fsync
+        self._arquivo = open(caminho, "ab", buffering=0)
+        if self._arquivo.tell() == 0:
+            self._arquivo.write(_MAGICO_LOG)
+        self._pendente = False
+        self._ultimo_fsync = time.monotonic()
+
+    @property
+    def tamanho(self) -> int:
+        return self._arquivo.tell()
+
+    def anexar(self, carga: bytes) -> None:
+        self._arquivo.write(_QUADRO.pack(len(carga), zlib.crc32(carga)) + carga)
+        self._pendente = True
+        if self.intervalo_fsync is not None and time.monotonic() - self._ultimo_fsync >= self.intervalo_fsync:
+            self.sincronizar()
+
+    def sincronizar(self) -> None:
+        if self._pendente:
+            os.fsync(self._arquivo.fileno())
+            self._pendente = False
+        self._ultimo_fsync = time.monotonic()
+
+    def fechar(self) -> None:
+        if not self._arquivo.closed:
+            self.sincronizar()
+            self._arquivo.close()
+
+class InventarioComHistorico(Inventario):
+    """
+    `Inventario` que grava cada mutação em um log de eventos e se reconstrói dele.
+
+    Cada operação (leitura, lote, cupom, remoção) vira um quadro com os
+    eventos das primitivas que ela chamou: produtos e itens registrados,
+    alterados ou descartados. Como os eventos guardam ids e timestamps, a
+    reprodução do log recria exatamente o mesmo estado, e o log inteiro é o
+    histórico de cada item.
+
+    Em `diretorio` ficam `eventos.log` e `instantaneo.bin`. O instantâneo
+    guarda o estado completo e a posição do log em que foi tirado; na
+    abertura, carrega-se o instantâneo e reproduz-se apenas a cauda do log.
+    Com `operacoes_por_instantaneo`, um novo instantâneo é salvo
+    automaticamente a cada tantas operações.
+    """
+
+    ARQUIVO_LOG = "eventos.log"
+    ARQUIVO_INSTANTANEO = "instantaneo.bin"
+
+    def __init__(
+        self,
+        diretorio: str,
+        intervalo_fsync: Optional[float] = 0.05,
+        operacoes_por_instantaneo: Optional[int] = None,
+        **opcoes,
+    ):
+        super().__init__(**opcoes)
+        self.diretorio = diretorio
+        self.operacoes_por_instantaneo = operacoes_por_instantaneo
+        self._pendentes: List[bytes] = []
+        self._profundidade = 0
+        self._operacoes_desde_instantaneo = 0
+        # Dados do produto na última vez que foram gravados, para gravar só o
+        # timestamp quando nada mais mudou.
+        self._dados_gravados: Dict[UUID, tuple] = {}
+
+        os.makedirs(diretorio, exist_ok=True)
+        caminho_log = os.path.join(diretorio, self.ARQUIVO_LOG)
+        self._reproduzir(caminho_log)
+        self._log = LogEventos(caminho_log, intervalo_fsync)
+
+    def fechar(self) -> None:
+        self._log.fechar()
+
+    # Carga
+
+    def _reproduzir(self, caminho_log: str) -> None:
+        inicio = self._carregar_instantaneo()
+        if not os.path.exists(caminho_log):
+            return
+        if not inicio:
+            inicio = inicio_do_log(caminho_log)
+        fim = self._aplicar(ler_quadros(caminho_log, inicio)) or inicio
+        # Descarta o que sobrou de uma escrita interrompida, para que os
+        # próximos quadros não fiquem depois de lixo.
+        if os.path.getsize(caminho_log) > fim:
+            os.truncate(caminho_log, fim)
+
+    def _carregar_instantaneo(self) -> int:
+        caminho = os.path.join(self.diretorio, self.ARQUIVO_INSTANTANEO)
+        if not os.path.exists(caminho):
+            return 0
+        with open(caminho, "rb") as arquivo:
+            magico, posicao_log = _CABECALHO_INSTANTANEO.unpack(arquivo.read(_CABECALHO_INSTANTANEO.size))
+            tamanho = os.fstat(arquivo.fileno()).st_size
+        if magico != _MAGICO_INSTANTANEO:
+            raise HistoricoCorrompido(f"{caminho} não é um instantâneo de estoque na versão atual.")
+        fim = self._aplicar(ler_quadros(caminho, _CABECALHO_INSTANTANEO.size)) or _CABECALHO_INSTANTANEO.size
+        if fim != tamanho:
+            raise HistoricoCorrompido(f"Instantâneo {caminho} truncado ou corrompido.")
+        return posicao_log
+
+    def _aplicar(self, quadros: Iterator[Tuple[int, bytes]]) -> Optional[int]:
+        """
+        Reproduz os quadros sobre o estado atual e retorna o fim do último.
+
+        Usa as primitivas de `Inventario` diretamente, então nada é gravado de
+        volta no log. Alterações de item e toques de produto trazem valores
+        absolutos, então só o último de cada registro é aplicado, no final;
+        até lá ficam crus, indexados pelos 16 bytes do id.
+        """
+        itens = {item.id.bytes: item for item in self.estoque}
+        produtos = {produto.id.bytes: produto for produto in self.produtos}
+        alteracoes: Dict[bytes, tuple] = {}
+        toques: Dict[bytes, int] = {}
+        fim = None
+        for fim, carga in quadros:
+            posicao = 0
+            while posicao < len(carga):
+                tipo = carga[posicao]
+                if tipo == ITEM_ALTERADO:
+                    campos = _ITEM_ALTERADO.unpack_from(carga, posicao)
+                    alteracoes[campos[1]] = campos
+                    posicao += _ITEM_ALTERADO.size
+                elif tipo == PRODUTO_TOCADO:
+                    _, chave, atualizado_em = _PRODUTO_TOCADO.unpack_from(carga, posicao)
+                    toques[chave] = atualizado_em
+                    posicao += _PRODUTO_TOCADO.size
+                elif tipo == DESCARTE:
+                    _, chave = _DESCARTE.unpack_from(carga, posicao)
+                    alteracoes.pop(chave, None)
+                    super().descartar_item(itens.pop(chave))
+                    posicao += _DESCARTE.size
+                else:
+                    evento, posicao = decodificar_evento(carga, posicao)
+                    if tipo == ITEM:
+                        itens[evento[1].id.bytes] = evento[1]
+                        super().registrar_item(evento[1])
+                    else:
+                        toques.pop(evento[1].id.bytes, None)
+                        produtos[evento[1].id.bytes] = self._aplicar_produto(evento[1])
+
+        for chave, atualizado_em in toques.items():
+            produtos[chave].atualizado_em = int_para_datetime(atualizado_em)
+        for _, chave, quantidade, compra, validade, cupom, atualizacao in alteracoes.values():
+            item = itens[chave]
+            item.quantidade = quantidade
+            item.data_compra = int_para_date(compra)
+            item.data_validade_especifica = int_para_date(validade)
+            item.id_cupom_fiscal_origem = bytes_para_uuid(cupom)
+            item.ultima_atualizacao = int_para_datetime(atualizacao)
+            super().atualizar_item(item)
+        return fim
+
+    def _aplicar_produto(self, produto: Produto) -> Produto:
+        existente = super().buscar_produto_por_id(produto.id)
+        self._dados_gravados[produto.id] = dados_do_produto(produto)
+        if existente is None:
+            super().registrar_produto(produto)
+            return produto
+        for campo in Produto.__slots__:
+            setattr(existente, campo, getattr(produto, campo))
+        super().atualizar_produto(existente)
+        return existente
+
+    # Gravação
+
+    @contextmanager
+    def transacao(self) -> Iterator[None]:
+        self._profundidade += 1
+        try:
+            yield
+        finally:
+            # Sem rollback em memória: mesmo com exceção, o que foi alterado vai para o log.
+            self._profundidade -= 1
+            if self._profundidade == 0:
+                self._gravar_pendentes()
+
+    def _anotar(self, evento: bytes) -> None:
+        self._pendentes.append(evento)
+        if self._profundidade == 0:
+            self._gravar_pendentes()
+
+    def _gravar_pendentes(self) -> None:
+        if not self._pendentes:
+            return
+        self._log.anexar(b"".join(self._pendentes))
+        self._pendentes.clear()
+        self._operacoes_desde_instantaneo += 1
+        if self.operacoes_por_instantaneo and self._operacoes_desde_instantaneo >= self.operacoes_por_instantaneo:
+            self.salvar_instantaneo()
+
+    def registrar_produto(self, produto: Produto) -> None:
+        super().registrar_produto(produto)
+        self._dados_gravados[produto.id] = dados_do_produto(produto)
+        self._anotar(codificar_produto(produto))
+
+    def atualizar_produto(self, produto: Produto) -> None:
+        super().atualizar_produto(produto)
+        dados = dados_do_produto(produto)
+        if self._dados_gravados.get(produto.id) == dados:
+            self._anotar(_PRODUTO_TOCADO.pack(PRODUTO_TOCADO, produto.id.bytes, datetime_para_int(produto.atualizado_em)))
+        else:
+            self._dados_gravados[produto.id] = dados
+            self._anotar(codificar_produto(produto))
+
+    def registrar_item(self, item: ItemEstoque) -> None:
+        super().registrar_item(item)
+        self._anotar(codificar_item(item))
+
+    def atualizar_item(self, item: ItemEstoque) -> None:
+        super().atualizar_item(item)
+        self._anotar(_ITEM_ALTERADO.pack(
+            ITEM_ALTERADO, item.id.bytes, item.quantidade, date_para_int(item.data_compra),
+            date_para_int(item.data_validade_especifica), uuid_para_bytes(item.id_cupom_fiscal_origem),
+            datetime_para_int(item.ultima_atualizacao),
+        ))
+
+    def descartar_item(self, item: ItemEstoque) -> None:
+        super().descartar_item(item)
+        self._anotar(_DESCARTE.pack(DESCARTE, item.id.bytes))
+
+    # Instantâneos
+
+    def salvar_instantaneo(self) -> None:
+        """
+        Grava o estado completo e a posição atual do log, de forma atômica.
+
+        O arquivo é escrito ao lado, sincronizado e só então renomeado sobre
+        o instantâneo anterior; uma queda no meio mantém o anterior válido.
+        """
+        self._log.sincronizar()
+        caminho = os.path.join(self.diretorio, self.ARQUIVO_INSTANTANEO)
+        temporario = caminho + ".tmp"
+        eventos = [codificar_produto(produto) for produto in self.produtos]
+        eventos.extend(codificar_item(item) for item in self.estoque)
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(_CABECALHO_INSTANTANEO.pack(_MAGICO_INSTANTANEO, self._log.tamanho))
+            for inicio in range(0, len(eventos), _EVENTOS_POR_QUADRO_INSTANTANEO):
+                carga = b"".join(eventos[inicio:inicio + _EVENTOS_POR_QUADRO_INSTANTANEO])
+                arquivo.write(_QUADRO.pack(len(carga), zlib.crc32(carga)))
+                arquivo.write(carga)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+        self._operacoes_desde_instantaneo = 0
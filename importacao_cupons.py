@@ -0,0 +1,362 @@
+import gzip
+import json
+import time
+from datetime import date
+from itertools import islice
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from repositorio import RepositorioEstoque
+from registro_cupons import CupomEmProcessamento, RegistroCupons, chave_natural_do_cupom
+
+class CupomLido(NamedTuple):
+    """Um cupom lido de um arquivo, ou o motivo de não ter sido possível lê-lo."""
+    origem: str # Ex.: "cupons.jsonl:12" (linha) ou "notas.xml#3" (posição da nota)
+    cupom: Optional[CupomFiscal]
+    erro: Optional[str] = None
+
+class ErroImportacao(NamedTuple):
+    origem: str
+    mensagem: str
+
+class ResumoImportacao:
+    """Contagens de uma importação em andamento ou concluída."""
+
+    __slots__ = ("lidos", "importados", "repetidos", "recusados", "itens", "erros")
+
+    def __init__(self):
+        self.lidos = 0
+        self.importados = 0
+        self.repetidos = 0 # Já importados antes, segundo o `RegistroCupons`
+        self.recusados = 0
+        self.itens = 0 # Linhas de produto dos cupons importados
+        self.erros: List[ErroImportacao] = [] # Só os primeiros `limite_erros`
+
+    def __repr__(self) -> str:
+        return (
+            f"ResumoImportacao(lidos={self.lidos}, importados={self.importados}, "
+            f"repetidos={self.repetidos}, recusados={self.recusados}, itens={self.itens})"
+        )
+
+# Leitura em fluxo
+
+def _abrir(caminho: str, modo: str) -> IO:
+    codificacao = "utf-8" if "t" in modo else None
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, modo, encoding=codificacao)
+    return open(caminho, modo, encoding=codificacao)
+
+def _data(valor: object) -> date:
+    if isinstance(valor, str) and len(valor) >= 10:
+        return date.fromisoformat(valor[:10])
+    raise ValueError(f"Data de compra inválida: {valor!r}")
+
+def _numero(valor: object) -> Optional[float]:
+    if isinstance(valor, str):
+        valor = valor.strip().replace(",", ".")
+    if valor is None or valor == "" or isinstance(valor, bool):
+        return None
+    try:
+        return valor if isinstance(valor, int) else float(valor) # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+def _detalhe(nome: object, quantidade: object, preco: object, unidade: object) -> DetalheProdutoCupom:
+    if not isinstance(nome, str) or not nome.strip():
+        raise ValueError("Item sem nome.")
+    unidade = unidade if isinstance(unidade, str) and unidade.strip() else None
+    numero = _numero(quantidade)
+    # Valida o número já na leitura; a conversão para a unidade do produto fica para a importação.
+    if numero is None or numero != numero or numero in (float("inf"), float("-inf")) or numero <= 0:
+        raise ValueError(f"Quantidade inválida para {nome.strip()!r}: {quantidade!r}")
+    return DetalheProdutoCupom(nome.strip(), numero, _numero(preco), unidade)
+
+def cupom_de_registro(registro: Mapping[str, object]) -> CupomFiscal:
+    """
+    Monta um cupom a partir de um objeto JSON com `dados_qr_code`,
+    `data_compra` (ISO 8601), `nome_loja` e `itens`, cada item com `nome`,
+    `quantidade`, `preco_unitario` e `unidade`.
+
+    Raises:
+        ValueError: Se faltar a data ou os itens, ou se algum item não tiver
+            nome ou quantidade positiva.
+    """
+    itens = registro.get("itens")
+    if not isinstance(itens, list) or not itens:
+        raise ValueError("Cupom sem itens.")
+    detalhes = []
+    for item in itens:
+        if not isinstance(item, dict):
+            raise ValueError(f"Item não é um objeto: {item!r}")
+        detalhes.append(
+            _detalhe(item.get("nome"), item.get("quantidade"), item.get("preco_unitario"), item.get("unidade"))
+        )
+    nome_loja = registro.get("nome_loja")
+    return CupomFiscal(
+        dados_qr_code=str(registro.get("dados_qr_code") or ""),
+        data_compra_cupom=_data(registro.get("data_compra")),
+        detalhes_produtos_cupom=detalhes,
+        nome_loja=nome_loja if isinstance(nome_loja, str) else None,
+    )
+
+def ler_cupons_jsonl(arquivo: Union[str, IO[str]]) -> Iterator[CupomLido]:
+    """
+    Lê um cupom por linha (ver `cupom_de_registro`), em fluxo.
+
+    Aceita um caminho (`.gz` é descompactado) ou um arquivo de texto aberto.
+    Linhas inválidas viram um `CupomLido` com o erro, sem interromper a leitura.
+    """
+    if isinstance(arquivo, str):
+        with _abrir(arquivo, "rt") as aberto:
+            yield from _ler_jsonl(aberto, arquivo)
+    else:
+        yield from _ler_jsonl(arquivo, getattr(arquivo, "name", "jsonl"))
+
+def _ler_jsonl(arquivo: IO[str], nome: str) -> Iterator[CupomLido]:
+    for numero, linha in enumerate(arquivo, 1):
+        if not linha.strip():
+            continue
+        origem = f"{nome}:{numero}"
+        try:
+            registro = json.loads(linha)
+            if not isinstance(registro, dict):
+                raise ValueError("A linha não é um objeto JSON.")
+            yield CupomLido(origem, cupom_de_registro(registro))
+        except ValueError as erro: # json.JSONDecodeError também é ValueError
+            yield CupomLido(origem, None, str(erro))
+
+def _local(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+def _filho(elemento: ElementTree.Element, nome: str) -> Optional[ElementTree.Element]:
+    for filho in elemento:
+        if _local(filho.tag) == nome:
+            return filho
+    return None
+
+def _texto(elemento: Optional[ElementTree.Element], nome: str) -> Optional[str]:
+    filho = _filho(elemento, nome) if elemento is not None else None
+    return filho.text.strip() if filho is not None and filho.text else None
+
+def cupom_de_nfe(nfe: ElementTree.Element) -> CupomFiscal:
+    """
+    Monta um cupom a partir do elemento `<NFe>` do XML de uma NFC-e.
+
+    Usa o QR Code de `infNFeSupl` ou, na falta dele, a chave de acesso do
+    atributo `Id` de `infNFe`; a data de `dhEmi` (ou `dEmi`); a loja de
+    `emit/xFant` (ou `xNome`); e cada `det/prod` (`xProd`, `qCom`, `uCom`,
+    `vUnCom`).
+
+    Raises:
+        ValueError: Se faltar `infNFe`, a data ou os itens, ou se algum item
+            não tiver nome ou quantidade positiva.
+    """
+    inf = _filho(nfe, "infNFe")
+    if inf is None:
+        raise ValueError("NFe sem infNFe.")
+    ide, emitente = _filho(inf, "ide"), _filho(inf, "emit")
+    detalhes = []
+    for det in inf:
+        if _local(det.tag) == "det":
+            prod = _filho(det, "prod")
+            detalhes.append(_detalhe(
+                _texto(prod, "xProd"), _texto(prod, "qCom"), _texto(prod, "vUnCom"), _texto(prod, "uCom")
+            ))
+    if not detalhes:
+        raise ValueError("Cupom sem itens.")
+    suplementar = _filho(nfe, "infNFeSupl")
+    qr_code = _texto(suplementar, "qrCode") or inf.get("Id", "").removeprefix("NFe")
+    return CupomFiscal(
+        dados_qr_code=qr_code,
+        data_compra_cupom=_data(_texto(ide, "dhEmi") or _texto(ide, "dEmi")),
+        detalhes_produtos_cupom=detalhes,
+        nome_loja=_texto(emitente, "xFant") or _texto(emitente, "xNome"),
+    )
+
+def ler_cupons_xml(arquivo: Union[str, IO[bytes]]) -> Iterator[CupomLido]:
+    """
+    Lê as NFC-e (`<NFe>`, soltas ou dentro de `<nfeProc>`) de um XML, em fluxo.
+
+    O XML é percorrido com `iterparse` e cada nota é descartada da árvore
+    assim que vira cupom, então a memória não cresce com o tamanho do
+    arquivo. Aceita um caminho (`.gz` é descompactado) ou um arquivo binário
+    aberto. Um XML malformado interrompe a leitura com um último
+    `CupomLido` de erro.
+    """
+    if isinstance(arquivo, str):
+        with _abrir(arquivo, "rb") as aberto:
+            yield from _ler_xml(aberto, arquivo)
+    else:
+        yield from _ler_xml(arquivo, getattr(arquivo, "name", "xml"))
+
+def _ler_xml(arquivo: IO[bytes], nome: str) -> Iterator[CupomLido]:
+    raiz: Optional[ElementTree.Element] = None
+    numero = 0
+    try:
+        for evento, elemento in ElementTree.iterparse(arquivo, events=("start", "end")):
+            if raiz is None:
+                raiz = elemento
+            if evento != "end" or _local(elemento.tag) != "NFe":
+                continue
+            numero += 1
+            try:
+                yield CupomLido(f"{nome}#{numero}", cupom_de_nfe(elemento))
+            except ValueError as erro:
+                yield CupomLido(f"{nome}#{numero}", None, str(erro))
+            if elemento is not raiz:
+                raiz.clear()
+    except ElementTree.ParseError as erro:
+        yield CupomLido(f"{nome}#{numero + 1}", None, f"XML malformado: {erro}")
+
+def ler_cupons(caminho: str) -> Iterator[CupomLido]:
+    """Escolhe o leitor pela extensão: `.xml` ou `.jsonl`/`.json`, opcionalmente com `.gz`."""
+    extensao = caminho.removesuffix(".gz").rpartition(".")[2].lower()
+    if extensao == "xml":
+        return ler_cupons_xml(caminho)
+    if extensao in ("jsonl", "json"):
+        return ler_cupons_jsonl(caminho)
+    raise ValueError(f"Formato de arquivo de cupons desconhecido: {caminho}")
+
+# Importação
+
+class ImportadorCupons:
+    """
+    Importa grandes volumes de cupons fiscais lidos em fluxo.
+
+    Os cupons (de `ler_cupons_jsonl`, `ler_cupons_xml` ou qualquer iterável
+    de `CupomLido`) são consumidos em grupos de `cupons_por_transacao`. Cada
+    grupo roda em uma única `transacao()` do repositório, precedida de um
+    `precarregar_produtos` com os nomes de todas as linhas do grupo, o que
+    nos backends persistentes troca uma busca por linha por algumas
+    consultas `IN (...)` e um commit por grupo. Só um grupo fica em memória
+    por vez.
+
+    Cada cupom é conferido antes de ser aplicado: quantidades em unidades
+    incompatíveis com as do produto já cadastrado recusam o cupom inteiro,
+    sem alterar o estoque. Cupons recusados, na leitura ou na conferência,
+    são contados no resumo, guardados nele até `limite_erros` e passados a
+    `ao_falhar`; a importação continua. Uma falha do próprio repositório
+    (ex.: no commit) interrompe a importação e desfaz o grupo em andamento.
+
+    Com `registro`, cupons já importados (mesma chave de acesso) são pulados.
+    Os cupons de um grupo ficam só reservados no registro até o commit do
+    grupo, e só então são marcados como processados; se o grupo falhar, as
+    reservas são liberadas. Em um backend persistente, os cupons do grupo
+    desfeito voltam a ser importados na próxima tentativa. O `Inventario` não
+    tem rollback: lá o estoque do grupo interrompido fica aplicado, e
+    repetir a importação o aplicaria de novo. Um cupom que outro worker está
+    processando não é esperado com a transação aberta: fica para depois do
+    commit e é tentado de novo, em novas transações, por até `espera_maxima`
+    segundos; depois disso é recusado.
+
+    `progresso` é chamado com o resumo após cada grupo gravado.
+    """
+
+    def __init__(
+        self,
+        repositorio: RepositorioEstoque,
+        registro: Optional[RegistroCupons] = None,
+        cupons_por_transacao: int = 1_000,
+        progresso: Optional[Callable[[ResumoImportacao], None]] = None,
+        ao_falhar: Optional[Callable[[ErroImportacao], None]] = None,
+        limite_erros: int = 1_000,
+        espera_maxima: float = 30.0,
+    ):
+        self.repositorio = repositorio
+        self.registro = registro
+        self.cupons_por_transacao = cupons_por_transacao
+        self.progresso = progresso
+        self.ao_falhar = ao_falhar
+        self.limite_erros = limite_erros
+        self.espera_maxima = espera_maxima
+
+    def importar_arquivo(self, caminho: str) -> ResumoImportacao:
+        """Importa um arquivo `.jsonl` ou `.xml` (ver `ler_cupons`)."""
+        return self.importar(ler_cupons(caminho))
+
+    def importar(self, cupons: Iterable[CupomLido]) -> ResumoImportacao:
+        resumo = ResumoImportacao()
+        restantes = iter(cupons)
+        while True:
+            grupo = list(islice(restantes, self.cupons_por_transacao))
+            if not grupo:
+                break
+            resumo.lidos += len(grupo)
+            adiados = self._importar_grupo(grupo, resumo)
+            # Em processamento por outro worker: espera-se fora da transação.
+            prazo = time.monotonic() + self.espera_maxima
+            intervalo = 0.001
+            while adiados:
+                if time.monotonic() >= prazo:
+                    for lido in adiados:
+                        self._recusar(resumo, lido.origem, "Cupom continua em processamento por outro worker.")
+                    break
+                time.sleep(intervalo)
+                intervalo = min(intervalo * 2, 0.1)
+                adiados = self._importar_grupo(adiados, resumo)
+            if self.progresso is not None:
+                self.progresso(resumo)
+        return resumo
+
+    def _importar_grupo(self, grupo: List[CupomLido], resumo: ResumoImportacao) -> List[CupomLido]:
+        """Importa o grupo em uma transação e retorna os cupons adiados."""
+        # Cupons processados no grupo, concluídos no registro só depois do commit.
+        pendentes: Dict[str, List[Tuple[Produto, ItemEstoque]]] = {}
+        adiados: List[CupomLido] = []
+        try:
+            with self.repositorio.transacao():
+                self.repositorio.precarregar_produtos(nomes=(
+                    detalhe.nome_produto_cupom
+                    for lido in grupo if lido.cupom is not None
+                    for detalhe in lido.cupom.detalhes_produtos_cupom
+                ))
+                for lido in grupo:
+                    self._importar_cupom(lido, resumo, pendentes, adiados)
+        except BaseException:
+            if self.registro is not None:
+                for chave in pendentes:
+                    self.registro.liberar(chave)
+            raise
+        if self.registro is not None:
+            for chave, resultados in pendentes.items():
+                self.registro.concluir(chave, resultados)
+        return adiados
+
+    def _importar_cupom(
+        self,
+        lido: CupomLido,
+        resumo: ResumoImportacao,
+        pendentes: Dict[str, List[Tuple[Produto, ItemEstoque]]],
+        adiados: List[CupomLido],
+    ) -> None:
+        cupom = lido.cupom
+        if cupom is None:
+            self._recusar(resumo, lido.origem, lido.erro or "Cupom ilegível.")
+            return
+        try:
+            if self.registro is None:
+                self.repositorio.adicionar_produtos_por_cupom_fiscal(cupom)
+            else:
+                chave = chave_natural_do_cupom(cupom)
+                # Um cupom repetido no mesmo grupo ainda está só reservado.
+                if chave is not None and (chave in pendentes or chave in self.registro):
+                    resumo.repetidos += 1
+                    return
+                self.registro.processar(cupom, self.repositorio, pendentes=pendentes)
+        except CupomEmProcessamento:
+            adiados.append(lido)
+            return
+        except (ValueError, TimeoutError) as erro:
+            self._recusar(resumo, lido.origem, str(erro))
+            return
+        resumo.importados += 1
+        resumo.itens += len(cupom.detalhes_produtos_cupom)
+
+    def _recusar(self, resumo: ResumoImportacao, origem: str, mensagem: str) -> None:
+        resumo.recusados += 1
+        erro = ErroImportacao(origem, mensagem)
+        if len(resumo.erros) < self.limite_erros:
+            resumo.erros.append(erro)
+        if self.ao_falhar is not None:
+            self.ao_falhar(erro)
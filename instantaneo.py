@@ -0,0 +1,270 @@
+import gc
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Generic, Iterable, List, Optional, TypeVar, Union, overload
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+from codificacao import EPOCA, codificar_texto, datetime_para_int, int_para_datetime, date_para_int, int_para_date, ler_texto
+
+MAGICA = b"INST"
+VERSAO = 2
+
+# Cabeçalho: mágica, versão, produtos, itens, ids referenciados, posições das
+# seções (produtos, itens, ids, textos) e momento da gravação.
+_CABECALHO = struct.Struct("<4sIIIIQQQQq")
+# Produto: id, posições na tabela de textos do nome, código de barras, marca,
+# unidade e URL da imagem, validade padrão (dia ordinal, 0 sem data),
+# criado_em e atualizado_em (microssegundos desde a época).
+_PRODUTO = struct.Struct("<16s5Iiqq")
+# Item: id, índice do produto na tabela de ids, quantidade, data da compra,
+# validade específica, índice do cupom de origem, adicionado_em e
+# ultima_atualizacao.
+_ITEM = struct.Struct("<16sIqiiIqq")
+_TAMANHO_ID = 16
+_NENHUM = 0xFFFFFFFF
+
+def gravar_instantaneo(caminho: str, produtos: Iterable[Produto], estoque: Iterable[ItemEstoque]) -> None:
+    """
+    Grava produtos e itens em um `Instantaneo`, de forma atômica.
+
+    Os textos repetidos (marcas e unidades, sobretudo) e os ids referenciados
+    pelos itens (produto e cupom de origem) são gravados uma vez só. O
+    arquivo é escrito ao lado, sincronizado e só então renomeado sobre o
+    anterior; uma queda no meio mantém o anterior válido.
+    """
+    textos = bytearray()
+    posicoes_textos: Dict[str, int] = {}
+    ids = bytearray()
+    indices_ids: Dict[UUID, int] = {}
+
+    def texto(valor: Optional[str]) -> int:
+        if valor is None:
+            return _NENHUM
+        posicao = posicoes_textos.get(valor)
+        if posicao is None:
+            posicao = posicoes_textos[valor] = len(textos)
+            textos.extend(codificar_texto(valor))
+        return posicao
+
+    def referencia(valor: Optional[UUID]) -> int:
+        if valor is None:
+            return _NENHUM
+        indice = indices_ids.get(valor)
+        if indice is None:
+            indice = indices_ids[valor] = len(indices_ids)
+            ids.extend(valor.bytes)
+        return indice
+
+    registros_produtos = [
+        _PRODUTO.pack(
+            produto.id.bytes, texto(produto.nome), texto(produto.codigo_de_barras), texto(produto.marca),
+            texto(produto.unidade), texto(produto.url_imagem), date_para_int(produto.data_de_validade_padrao),
+            datetime_para_int(produto.criado_em), datetime_para_int(produto.atualizado_em),
+        )
+        for produto in produtos
+    ]
+    registros_itens = [
+        _ITEM.pack(
+            item.id.bytes, referencia(item.produto_id), item.quantidade, date_para_int(item.data_compra),
+            date_para_int(item.data_validade_especifica), referencia(item.id_cupom_fiscal_origem),
+            datetime_para_int(item.adicionado_em), datetime_para_int(item.ultima_atualizacao),
+        )
+        for item in estoque
+    ]
+
+    inicio_produtos = _CABECALHO.size
+    inicio_itens = inicio_produtos + len(registros_produtos) * _PRODUTO.size
+    inicio_ids = inicio_itens + len(registros_itens) * _ITEM.size
+    inicio_textos = inicio_ids + len(ids)
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(_CABECALHO.pack(
+            MAGICA, VERSAO, len(registros_produtos), len(registros_itens), len(indices_ids),
+            inicio_produtos, inicio_itens, inicio_ids, inicio_textos, datetime_para_int(datetime.now()),
+        ))
+        arquivo.write(b"".join(registros_produtos))
+        arquivo.write(b"".join(registros_itens))
+        arquivo.write(ids)
+        arquivo.write(textos)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+T = TypeVar("T")
+
+class RegistrosSobDemanda(Sequence, Generic[T]):
+    """
+    Sequência somente leitura cujos objetos são criados no primeiro acesso.
+
+    Cada posição é criada uma vez e guardada: acessos repetidos devolvem o
+    mesmo objeto, que pode ser alterado no lugar como os de uma lista.
+    """
+
+    def __init__(self, total: int, criar: Callable[[int], T]):
+        self._criar = criar
+        self._objetos: List[Optional[T]] = [None] * total
+
+    def __len__(self) -> int:
+        return len(self._objetos)
+
+    @overload
+    def __getitem__(self, indice: int) -> T: ...
+    @overload
+    def __getitem__(self, indice: slice) -> List[T]: ...
+
+    def __getitem__(self, indice: Union[int, slice]) -> Union[T, List[T]]:
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self._objetos)))]
+        objeto = self._objetos[indice]
+        if objeto is None:
+            if indice < 0:
+                indice += len(self._objetos)
+            objeto = self._objetos[indice] = self._criar(indice)
+        return objeto
+
+    def criados(self) -> int:
+        """Quantos objetos já foram criados."""
+        return len(self._objetos) - self._objetos.count(None)
+
+class Instantaneo:
+    """
+    Produtos e itens de estoque gravados por `gravar_instantaneo`, lidos de um arquivo mapeado em memória.
+
+    O arquivo tem um cabeçalho versionado, um registro de largura fixa por
+    produto e por item (ids como 16 bytes, datas como dia ordinal e
+    instantes como microssegundos desde a época), uma tabela com os ids
+    referenciados pelos itens e uma tabela de textos sem repetições, gravados
+    inteiros com `codificacao.codificar_texto`. Abri-lo só mapeia o arquivo e
+    lê o cabeçalho, em tempo constante: `produtos` e `estoque` são
+    `RegistrosSobDemanda`, e cada objeto é criado no primeiro acesso por
+    `Produto.restaurar`/`ItemEstoque.restaurar`, com os ids e timestamps
+    gravados (o `__init__` geraria ids e horários novos).
+
+    `carregar` cria todos os objetos que faltam de uma vez, percorrendo os
+    registros com `struct.iter_unpack`, e monta um `Inventario`. Os ids
+    referenciados, os textos e as datas são convertidos uma vez cada e
+    compartilhados entre os objetos.
+
+    Raises:
+        ValueError: Se o arquivo não for um instantâneo desta versão.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        with open(caminho, "rb") as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mapa) < _CABECALHO.size:
+            self._mapa.close()
+            raise ValueError(f"{caminho} não é um instantâneo do estoque (versão {VERSAO}).")
+        (magica, versao, total_produtos, total_itens, total_ids,
+         self._inicio_produtos, self._inicio_itens, self._inicio_ids, self._inicio_textos,
+         gravado_em) = _CABECALHO.unpack_from(self._mapa)
+        if magica != MAGICA or versao != VERSAO:
+            self._mapa.close()
+            raise ValueError(f"{caminho} não é um instantâneo do estoque (versão {VERSAO}).")
+        self.gravado_em = int_para_datetime(gravado_em)
+        self._textos: Dict[int, Optional[str]] = {_NENHUM: None}
+        self._ids: List[Optional[UUID]] = [None] * total_ids
+        self.produtos: RegistrosSobDemanda[Produto] = RegistrosSobDemanda(total_produtos, self._produto)
+        self.estoque: RegistrosSobDemanda[ItemEstoque] = RegistrosSobDemanda(total_itens, self._item)
+
+    def fechar(self) -> None:
+        """Libera o arquivo; os objetos já criados continuam válidos."""
+        self._mapa.close()
+
+    # Criação sob demanda
+
+    def _texto(self, posicao: int) -> Optional[str]:
+        texto = self._textos.get(posicao)
+        if texto is None and posicao != _NENHUM:
+            texto, _ = ler_texto(self._mapa, self._inicio_textos + posicao) # type: ignore[arg-type]
+            self._textos[posicao] = texto
+        return texto
+
+    def _id(self, indice: int) -> Optional[UUID]:
+        if indice == _NENHUM:
+            return None
+        valor = self._ids[indice]
+        if valor is None:
+            inicio = self._inicio_ids + indice * _TAMANHO_ID
+            valor = self._ids[indice] = UUID(bytes=self._mapa[inicio:inicio + _TAMANHO_ID])
+        return valor
+
+    def _produto(self, indice: int) -> Produto:
+        id_, nome, codigo, marca, unidade, url, validade, criado_em, atualizado_em = _PRODUTO.unpack_from(
+            self._mapa, self._inicio_produtos + indice * _PRODUTO.size
+        )
+        return Produto.restaurar(
+            UUID(bytes=id_), self._texto(nome), self._texto(codigo), self._texto(marca), self._texto(unidade), # type: ignore[arg-type]
+            int_para_date(validade), self._texto(url), int_para_datetime(criado_em), int_para_datetime(atualizado_em),
+        )
+
+    def _item(self, indice: int) -> ItemEstoque:
+        id_, produto, quantidade, compra, validade, cupom, adicionado_em, atualizado_em = _ITEM.unpack_from(
+            self._mapa, self._inicio_itens + indice * _ITEM.size
+        )
+        return ItemEstoque.restaurar(
+            UUID(bytes=id_), self._id(produto), quantidade, int_para_date(compra), int_para_date(validade), # type: ignore[arg-type]
+            self._id(cupom), int_para_datetime(adicionado_em), int_para_datetime(atualizado_em),
+        )
+
+    # Carga completa
+
+    def carregar(self, **opcoes) -> Inventario:
+        """
+        Cria todos os produtos e itens e os entrega a um `Inventario`.
+
+        Args:
+            **opcoes: Repassadas ao `Inventario` (índices, lotes, catálogo...).
+        """
+        # Milhões de objetos sem ciclos: as coletas disparadas pelas alocações
+        # só custariam tempo (cerca de 40% da carga).
+        coletor_ligado = gc.isenabled()
+        gc.disable()
+        try:
+            self._criar_todos()
+            return Inventario(list(self.produtos._objetos), list(self.estoque._objetos), **opcoes) # type: ignore[arg-type]
+        finally:
+            if coletor_ligado:
+                gc.enable()
+
+    def _criar_todos(self) -> None:
+        epoca, delta, texto = EPOCA, timedelta, self._texto
+        datas: Dict[int, Optional[date]] = {0: None}
+
+        def data(valor: int) -> Optional[date]:
+            convertida = datas.get(valor)
+            if convertida is None and valor:
+                convertida = datas[valor] = int_para_date(valor)
+            return convertida
+
+        restaurar = Produto.restaurar
+        produtos = self.produtos._objetos
+        with memoryview(self._mapa)[self._inicio_produtos:self._inicio_itens] as registros:
+            for indice, (id_, nome, codigo, marca, unidade, url, validade, criado_em, atualizado_em) in enumerate(
+                _PRODUTO.iter_unpack(registros)
+            ):
+                if produtos[indice] is None:
+                    produtos[indice] = restaurar(
+                        UUID(bytes=id_), texto(nome), texto(codigo), texto(marca), texto(unidade), data(validade), # type: ignore[arg-type]
+                        texto(url), epoca + delta(0, 0, criado_em), epoca + delta(0, 0, atualizado_em),
+                    )
+
+        referencias = {indice: self._id(indice) for indice in range(len(self._ids))}
+        referencias[_NENHUM] = None
+        restaurar_item = ItemEstoque.restaurar
+        itens = self.estoque._objetos
+        with memoryview(self._mapa)[self._inicio_itens:self._inicio_ids] as registros:
+            for indice, (id_, produto, quantidade, compra, validade, cupom, adicionado_em, atualizado_em) in enumerate(
+                _ITEM.iter_unpack(registros)
+            ):
+                if itens[indice] is None:
+                    itens[indice] = restaurar_item(
+                        UUID(bytes=id_), referencias[produto], quantidade, data(compra), data(validade), # type: ignore[arg-type]
+                        referencias[cupom], epoca + delta(0, 0, adicionado_em), epoca + delta(0, 0, atualizado_em),
+                    )
@@ -0,0 +1,413 @@
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from correspondencia import IndiceCorrespondencia
+from lotes import FEFO, POLITICAS, LotesDoProduto, chave_de_consumo, chave_de_entrada
+from repositorio import RepositorioEstoque
+from validade import IndiceValidade
+
+if TYPE_CHECKING:
+    from catalogo_compartilhado import CatalogoCompartilhado
+
+# Campos de um produto do catálogo compartilhado que uma casa pode sobrescrever.
+CAMPOS_SOBRESCREVIVEIS = frozenset({"nome", "marca", "data_de_validade_padrao", "url_imagem"})
+
+class Inventario(RepositorioEstoque):
+    """
+    Repositório em memória de produtos e itens de estoque com índices por dicionário.
+
+    Mantém as mesmas listas usadas pelas funções de `stock_management` (elas são
+    modificadas no lugar), mas resolve as buscas em O(1) através de índices:
+    código de barras -> Produto, nome em minúsculas -> Produto e
+    produto_id -> ItemEstoque. Quando há duplicatas, prevalece o primeiro
+    registro da lista, como nas buscas lineares originais.
+
+    Os índices só refletem mudanças feitas pelos métodos desta classe; quem
+    alterar as listas diretamente deve chamar `reindexar()`.
+
+    Com `indexar=False` nenhum índice é construído e as buscas voltam a ser
+    lineares. É o modo usado pelas funções de `stock_management` que fazem uma
+    única operação: indexar as listas inteiras custaria mais que uma varredura.
+
+    Com `limiar_correspondencia` informado, itens de cupom fiscal sem nome
+    idêntico no catálogo são associados ao produto mais parecido (ver
+    `correspondencia.IndiceCorrespondencia`) se a pontuação atingir o limiar,
+    em vez de virarem um produto novo.
+
+    Com `indexar_validades=True` os itens também são mantidos em um
+    `validade.IndiceValidade`, e as consultas `itens_a_vencer` e
+    `itens_vencidos` deixam de varrer o estoque inteiro.
+
+    Com `lotes="fifo"` ou `lotes="fefo"` cada item de estoque é um lote:
+    entradas de compras diferentes não são mais somadas ao primeiro item do
+    produto (cada cupom e cada dia de leituras forma o seu lote), e as
+    remoções consomem o lote comprado primeiro (FIFO) ou o que vence primeiro
+    (FEFO). Os lotes de cada produto ficam em um `lotes.LotesDoProduto`, e
+    consumir uma unidade custa O(log lotes). Requer `indexar=True`.
+
+    Com `catalogo`, códigos de barras e ids que a casa não conhece são
+    procurados no `catalogo_compartilhado.CatalogoCompartilhado`, e a casa
+    passa a referenciar o `Produto` internado do catálogo, o mesmo objeto
+    para todas as casas do processo, em vez de criar o seu. Leituras não
+    alteram esse produto (`tocar_produto` o ignora); para mudar nome, marca,
+    validade padrão ou imagem, `sobrescrever_produto` faz uma cópia só desta
+    casa, com o mesmo id, que passa a valer no lugar do original.
+    """
+
+    def __init__(
+        self,
+        produtos: Optional[List[Produto]] = None,
+        estoque: Optional[List[ItemEstoque]] = None,
+        indexar: bool = True,
+        limiar_correspondencia: Optional[float] = None,
+        indexar_validades: bool = False,
+        lotes: Optional[str] = None,
+        catalogo: Optional["CatalogoCompartilhado"] = None,
+    ):
+        if lotes is not None and lotes not in POLITICAS:
+            raise ValueError(f"Política de lotes desconhecida: {lotes!r} (use {' ou '.join(POLITICAS)})")
+        self.produtos: List[Produto] = produtos if produtos is not None else []
+        self.estoque: List[ItemEstoque] = estoque if estoque is not None else []
+        self.limiar_correspondencia = limiar_correspondencia
+        self.indice_nomes: Optional[IndiceCorrespondencia[Produto]] = None
+        self.indexar_validades = indexar_validades
+        self.indice_validade: Optional[IndiceValidade] = None
+        self.lotes = lotes
+        self.catalogo = catalogo
+        self._lotes_por_produto: Optional[Dict[UUID, LotesDoProduto]] = None
+        self.indexado = False
+        if indexar:
+            self.reindexar()
+
+    def reindexar(self) -> None:
+        """Reconstrói todos os índices a partir das listas de produtos e estoque."""
+        self.indexado = True
+        self._produto_por_codigo: Dict[str, Produto] = {}
+        self._produto_por_id: Dict[UUID, Produto] = {}
+        self._produto_por_nome: Dict[str, Produto] = {}
+        # Itens de cada produto na ordem de inserção; o dicionário (item -> item)
+        # permite descartar em O(1) mesmo com muitos lotes.
+        self._itens_por_produto: Dict[UUID, Dict[ItemEstoque, ItemEstoque]] = {}
+        # Posição de cada item na lista de estoque, para remoção em O(1).
+        self._posicao_item: Dict[UUID, int] = {}
+        if self.limiar_correspondencia is not None:
+            self.indice_nomes = IndiceCorrespondencia(self.limiar_correspondencia)
+        if self.indexar_validades:
+            self.indice_validade = IndiceValidade()
+        if self.lotes is not None:
+            self._lotes_por_produto = {}
+
+        for produto in self.produtos:
+            self._indexar_produto(produto)
+        for posicao, item in enumerate(self.estoque):
+            self._posicao_item[item.id] = posicao
+            self._itens_por_produto.setdefault(item.produto_id, {})[item] = item
+            if self.indice_validade is not None:
+                self.indice_validade.definir(item, self.validade_efetiva(item))
+            if self._lotes_por_produto is not None:
+                self._definir_lote(item)
+
+    def _indexar_produto(self, produto: Produto) -> None:
+        self._produto_por_id[produto.id] = produto
+        self._produto_por_codigo.setdefault(produto.codigo_de_barras, produto)
+        self._produto_por_nome.setdefault(produto.nome.lower(), produto)
+        if self.indice_nomes is not None:
+            self.indice_nomes.adicionar(produto.nome, produto)
+
+    # Consultas
+
+    def buscar_produto_por_codigo_de_barras(self, codigo_de_barras: str) -> Optional[Produto]:
+        if self.indexado:
+            produto = self._produto_por_codigo.get(codigo_de_barras)
+            if produto is not None:
+                return produto
+        else:
+            for p in self.produtos:
+                if p.codigo_de_barras == codigo_de_barras:
+                    return p
+        if self.catalogo is None:
+            return None
+        produto = self.catalogo.buscar(codigo_de_barras)
+        if produto is None:
+            return None
+        # Outra grafia do mesmo GTIN que a casa já sobrescreveu: vale a cópia dela.
+        return self._produto_local(produto.id) or produto
+
+    def buscar_produto_por_id(self, produto_id: UUID) -> Optional[Produto]:
+        produto = self._produto_por_id.get(produto_id) if self.indexado else self._produto_local(produto_id)
+        if produto is None and self.catalogo is not None:
+            return self.catalogo.buscar_por_id(produto_id)
+        return produto
+
+    def _produto_local(self, produto_id: UUID) -> Optional[Produto]:
+        if self.indexado:
+            return self._produto_por_id.get(produto_id)
+        for p in self.produtos:
+            if p.id == produto_id:
+                return p
+        return None
+
+    def buscar_produto_por_nome(self, nome: str) -> Optional[Produto]:
+        """Busca um produto pelo nome, sem diferenciar maiúsculas de minúsculas."""
+        nome = nome.lower()
+        if self.indexado:
+            return self._produto_por_nome.get(nome)
+        for p in self.produtos:
+            if p.nome.lower() == nome:
+                return p
+        return None
+
+    def buscar_produto_parecido(self, nome: str) -> Optional[Produto]:
+        """
+        Busca o produto cujo nome normalizado mais se parece com `nome`.
+
+        Retorna None se a correspondência aproximada não estiver habilitada ou
+        se nenhum candidato atingir `limiar_correspondencia`.
+        """
+        if self.indice_nomes is None:
+            return None
+        resultado = self.indice_nomes.buscar(nome)
+        return resultado[0] if resultado else None
+
+    def buscar_item_do_produto(self, produto_id: UUID) -> Optional[ItemEstoque]:
+        if self.indexado:
+            itens = self._itens_por_produto.get(produto_id)
+            return next(iter(itens)) if itens else None
+        for item in self.estoque:
+            if item.produto_id == produto_id:
+                return item
+        return None
+
+    def buscar_item_por_id(self, item_id: UUID) -> Optional[ItemEstoque]:
+        if self.indexado:
+            posicao = self._posicao_item.get(item_id)
+            return self.estoque[posicao] if posicao is not None else None
+        for item in self.estoque:
+            if item.id == item_id:
+                return item
+        return None
+
+    def buscar_lote_para_entrada(
+        self, produto_id: UUID, data_compra: Optional[date], id_cupom: Optional[UUID]
+    ) -> Optional[ItemEstoque]:
+        if self._lotes_por_produto is None:
+            return self.buscar_item_do_produto(produto_id)
+        lotes = self._lotes_por_produto.get(produto_id)
+        return lotes.aberto(chave_de_entrada(data_compra, id_cupom, datetime.now())) if lotes else None
+
+    def buscar_lote_para_consumo(self, produto_id: UUID) -> Optional[ItemEstoque]:
+        if self._lotes_por_produto is None:
+            return self.buscar_item_do_produto(produto_id)
+        lotes = self._lotes_por_produto.get(produto_id)
+        return lotes.proximo() if lotes else None
+
+    def lotes_do_produto(self, produto_id: UUID) -> List[ItemEstoque]:
+        """Lotes do produto na ordem em que serão consumidos (requer `lotes`)."""
+        if self._lotes_por_produto is None:
+            raise ValueError("Inventário sem controle de lotes.")
+        return sorted(
+            self._lotes_por_produto.get(produto_id, ()),
+            key=lambda item: chave_de_consumo(self.lotes, item, self.validade_efetiva(item)), # type: ignore[arg-type]
+        )
+
+    def _definir_lote(self, item: ItemEstoque) -> None:
+        lotes = self._lotes_por_produto.get(item.produto_id) # type: ignore[union-attr]
+        if lotes is None:
+            lotes = self._lotes_por_produto[item.produto_id] = LotesDoProduto() # type: ignore[index]
+            if self.lotes == FEFO:
+                produto = self.buscar_produto_por_id(item.produto_id)
+                lotes.validade_padrao = produto.data_de_validade_padrao if produto is not None else None
+        lotes.definir(item, chave_de_consumo(self.lotes, item, self.validade_efetiva(item))) # type: ignore[arg-type]
+
+    def validade_efetiva(self, item: ItemEstoque) -> Optional[date]:
+        """Validade específica do item ou, na falta dela, a validade padrão do produto."""
+        if item.data_validade_especifica is not None:
+            return item.data_validade_especifica
+        produto = self.buscar_produto_por_id(item.produto_id)
+        return produto.data_de_validade_padrao if produto is not None else None
+
+    def itens_a_vencer(self, dias: int = 7, hoje: Optional[date] = None) -> List[Tuple[date, ItemEstoque]]:
+        """
+        Itens que vencem de hoje até `dias` dias depois, em ordem de validade.
+
+        Args:
+            dias: Tamanho da janela, em dias, contada a partir de `hoje`.
+            hoje: Data de referência; por padrão, a data atual.
+
+        Returns:
+            Pares (validade efetiva, item).
+        """
+        hoje = hoje or date.today()
+        return self._itens_com_validade_entre(hoje, hoje + timedelta(days=dias))
+
+    def itens_vencidos(self, hoje: Optional[date] = None) -> List[Tuple[date, ItemEstoque]]:
+        """Itens com validade efetiva anterior a `hoje` (por padrão, a data atual), em ordem de validade."""
+        hoje = hoje or date.today()
+        return self._itens_com_validade_entre(None, hoje - timedelta(days=1))
+
+    def _itens_com_validade_entre(
+        self, inicio: Optional[date], fim: Optional[date]
+    ) -> List[Tuple[date, ItemEstoque]]:
+        if self.indice_validade is not None:
+            return self.indice_validade.entre(inicio, fim)
+        resultado = []
+        for item in self.estoque:
+            validade = self.validade_efetiva(item)
+            if validade is not None and (inicio is None or validade >= inicio) and (fim is None or validade <= fim):
+                resultado.append((validade, item))
+        resultado.sort(key=lambda par: par[0])
+        return resultado
+
+    # Mutações primitivas
+
+    def registrar_produto(self, produto: Produto) -> None:
+        self.produtos.append(produto)
+        if self.indexado:
+            self._indexar_produto(produto)
+
+    def registrar_item(self, item: ItemEstoque) -> None:
+        if self.catalogo is not None and self._produto_local(item.produto_id) is None:
+            # Primeiro item de um produto do catálogo: a casa passa a listá-lo.
+            compartilhado = self.catalogo.buscar_por_id(item.produto_id)
+            if compartilhado is not None:
+                self.registrar_produto(compartilhado)
+        if self.indexado:
+            self._posicao_item[item.id] = len(self.estoque)
+            self._itens_por_produto.setdefault(item.produto_id, {})[item] = item
+            if self.indice_validade is not None:
+                self.indice_validade.definir(item, self.validade_efetiva(item))
+            if self._lotes_por_produto is not None:
+                self._definir_lote(item)
+        self.estoque.append(item)
+
+    def descartar_item(self, item: ItemEstoque) -> None:
+        """
+        Remove um item de estoque.
+
+        Com índices a remoção é O(1): o último item da lista ocupa a posição do
+        item removido, portanto a ordem da lista de estoque não é preservada.
+        Sem índices, o item é removido da lista mantendo a ordem.
+        """
+        if not self.indexado:
+            for i, outro in enumerate(self.estoque):
+                if outro is item:
+                    del self.estoque[i]
+                    return
+            return
+
+        posicao = self._posicao_item.pop(item.id)
+        ultimo = self.estoque.pop()
+        if ultimo is not item:
+            self.estoque[posicao] = ultimo
+            self._posicao_item[ultimo.id] = posicao
+
+        itens = self._itens_por_produto[item.produto_id]
+        del itens[item]
+        if not itens:
+            del self._itens_por_produto[item.produto_id]
+        if self.indice_validade is not None:
+            self.indice_validade.remover(item)
+        if self._lotes_por_produto is not None:
+            lotes = self._lotes_por_produto[item.produto_id]
+            lotes.remover(item)
+            if not lotes:
+                del self._lotes_por_produto[item.produto_id]
+
+    def atualizar_item(self, item: ItemEstoque) -> None:
+        if self.indice_validade is not None:
+            self.indice_validade.definir(item, self.validade_efetiva(item))
+        if self._lotes_por_produto is not None:
+            self._definir_lote(item)
+
+    def tocar_produto(self, produto: Produto, momento: datetime) -> None:
+        if self.catalogo is None or not self.catalogo.compartilhado(produto):
+            super().tocar_produto(produto, momento)
+
+    def sobrescrever_produto(self, produto_id: UUID, **campos) -> Optional[Produto]:
+        """
+        Altera nome, marca, validade padrão ou imagem de um produto desta casa.
+
+        Um produto do catálogo compartilhado é antes copiado (com o mesmo id)
+        e a cópia substitui o original nesta casa; as demais casas continuam
+        vendo o catálogo. Produtos próprios da casa são alterados no lugar.
+
+        Args:
+            produto_id: O produto a alterar.
+            **campos: Novos valores, entre `CAMPOS_SOBRESCREVIVEIS`.
+
+        Returns:
+            O produto da casa já alterado, ou None se não existir.
+
+        Raises:
+            ValueError: Se algum campo não puder ser sobrescrito.
+        """
+        desconhecidos = set(campos) - CAMPOS_SOBRESCREVIVEIS
+        if desconhecidos:
+            raise ValueError(f"Campos que não podem ser sobrescritos: {', '.join(sorted(desconhecidos))}")
+        produto = self.buscar_produto_por_id(produto_id)
+        if produto is None:
+            return None
+        if self.catalogo is not None and self.catalogo.compartilhado(produto):
+            produto = self._copiar_do_catalogo(produto)
+
+        nome = campos.pop("nome", None)
+        for campo, valor in campos.items():
+            setattr(produto, campo, valor)
+        produto.atualizado_em = datetime.now()
+        if nome is not None and nome != produto.nome:
+            self.renomear_produto(produto, nome)
+        else:
+            self.atualizar_produto(produto)
+            if self.autocompletar is not None:
+                self.autocompletar.produto_alterado(produto)
+        return produto
+
+    def _copiar_do_catalogo(self, compartilhado: Produto) -> Produto:
+        copia = Produto.restaurar(
+            compartilhado.id, compartilhado.nome, compartilhado.codigo_de_barras, compartilhado.marca,
+            compartilhado.unidade, compartilhado.data_de_validade_padrao, compartilhado.url_imagem,
+            compartilhado.criado_em, compartilhado.atualizado_em,
+        )
+        for posicao, produto in enumerate(self.produtos):
+            if produto is compartilhado:
+                self.produtos[posicao] = copia
+                break
+        else:
+            self.produtos.append(copia)
+        if self.indexado:
+            self._produto_por_id[copia.id] = copia
+            for indice, chave in (
+                (self._produto_por_codigo, copia.codigo_de_barras), (self._produto_por_nome, copia.nome.lower())
+            ):
+                if indice.get(chave, compartilhado) is compartilhado:
+                    indice[chave] = copia
+            if self.indice_nomes is not None:
+                self.indice_nomes.adicionar(copia.nome, copia)
+        return copia
+
+    def renomear_produto(self, produto: Produto, nome: str) -> None:
+        if self.indexado:
+            anterior = produto.nome.lower()
+            if self._produto_por_nome.get(anterior) is produto:
+                del self._produto_por_nome[anterior]
+            self._produto_por_nome.setdefault(nome.lower(), produto)
+            # O índice aproximado não remove nomes; o antigo continua levando ao produto.
+            if self.indice_nomes is not None:
+                self.indice_nomes.adicionar(nome, produto)
+        super().renomear_produto(produto, nome)
+
+    def atualizar_produto(self, produto: Produto) -> None:
+        # A validade padrão do produto vale para os itens sem validade específica.
+        if self.indice_validade is not None:
+            for item in self._itens_por_produto.get(produto.id, ()):
+                if item.data_validade_especifica is None:
+                    self.indice_validade.definir(item, produto.data_de_validade_padrao)
+        if self.lotes == FEFO and self._lotes_por_produto is not None:
+            lotes = self._lotes_por_produto.get(produto.id)
+            # Toda leitura toca o produto; a fila só é refeita se a validade padrão mudou.
+            if lotes is not None and lotes.validade_padrao != produto.data_de_validade_padrao:
+                lotes.validade_padrao = produto.data_de_validade_padrao
+                for item in list(lotes):
+                    self._definir_lote(item)
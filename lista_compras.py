@@ -0,0 +1,150 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+from uuid import UUID
+
+from models import ItemEstoque
+from repositorio import RepositorioEstoque
+
+class ItemListaCompras(NamedTuple):
+    """Produto abaixo do nível mínimo e quanto falta para atingi-lo."""
+    produto_id: UUID
+    saldo: int # Na unidade base do produto (ver `unidades`)
+    minimo: int
+    comprar: int # minimo - saldo
+
+class AlteracoesListaCompras(NamedTuple):
+    """O que mudou na lista de compras desde uma versão."""
+    versao: int # Versão atual; a próxima consulta parte dela
+    alterados: List[ItemListaCompras] # Entraram na lista ou mudaram de quantidade
+    removidos: List[UUID] # Saíram da lista
+
+class ListaDeCompras:
+    """
+    Lista de compras mantida incrementalmente a partir das operações de estoque.
+
+    Guarda o saldo de cada produto (a soma dos seus itens de estoque) e os
+    níveis mínimos definidos com `definir_minimo`. Um produto está na lista
+    quando tem mínimo e o saldo está abaixo dele. Ao ser criada com um
+    repositório, fica registrada em `repositorio.lista_de_compras`, e cada
+    operação de estoque informa a variação do saldo do produto afetado
+    (`estoque_alterado`), o que custa O(1), sem recalcular o catálogo.
+
+    Toda mudança na lista (produto que entra, sai ou muda a quantidade a
+    comprar) incrementa a versão. Os produtos ficam em ordem de última
+    alteração, então `alteracoes_desde(v)` percorre só os k produtos alterados
+    depois de `v`, do mais recente para trás, em O(k): é o que se envia aos
+    clientes que já têm a versão `v`.
+
+    Saldos e mínimos são inteiros na unidade base do produto (ver `unidades`).
+    O saldo inicial vem de `estoque` (por exemplo `Inventario.estoque` ou
+    `RepositorioSQLite.listar_estoque()`); alterações feitas fora das
+    operações do repositório não são vistas. As notificações chegam sob a
+    trava de cada produto, de qualquer thread, e são serializadas por uma
+    trava interna.
+    """
+
+    def __init__(
+        self,
+        repositorio: Optional[RepositorioEstoque] = None,
+        estoque: Iterable[ItemEstoque] = (),
+        minimos: Optional[Mapping[UUID, int]] = None,
+    ):
+        self.repositorio = repositorio
+        self._saldos: Dict[UUID, int] = {}
+        self._minimos: Dict[UUID, int] = {}
+        self._abaixo: Dict[UUID, ItemListaCompras] = {}
+        # Produto -> versão da sua última alteração na lista, da mais antiga à mais recente.
+        self._alteracoes: "OrderedDict[UUID, int]" = OrderedDict()
+        self._versao = 0
+        self._trava = threading.Lock()
+        for item in estoque:
+            self._saldos[item.produto_id] = self._saldos.get(item.produto_id, 0) + item.quantidade
+        for produto_id, minimo in (minimos or {}).items():
+            self.definir_minimo(produto_id, minimo)
+        if repositorio is not None:
+            repositorio.lista_de_compras = self
+
+    def desconectar(self) -> None:
+        """Deixa de receber as operações do repositório."""
+        if self.repositorio is not None and self.repositorio.lista_de_compras is self:
+            self.repositorio.lista_de_compras = None
+
+    @property
+    def versao(self) -> int:
+        return self._versao
+
+    def __len__(self) -> int:
+        return len(self._abaixo)
+
+    def __contains__(self, produto_id: object) -> bool:
+        return produto_id in self._abaixo
+
+    def saldo(self, produto_id: UUID) -> int:
+        return self._saldos.get(produto_id, 0)
+
+    def minimo(self, produto_id: UUID) -> Optional[int]:
+        return self._minimos.get(produto_id)
+
+    def itens(self) -> List[ItemListaCompras]:
+        """A lista completa, do que falta mais ao que falta menos."""
+        with self._trava:
+            itens = list(self._abaixo.values())
+        itens.sort(key=lambda item: -item.comprar)
+        return itens
+
+    def definir_minimo(self, produto_id: UUID, minimo: Optional[int]) -> None:
+        """Define o nível mínimo do produto; None deixa de acompanhá-lo."""
+        if minimo is not None and minimo < 0:
+            raise ValueError(f"Nível mínimo negativo: {minimo}")
+        with self._trava:
+            if minimo is None:
+                self._minimos.pop(produto_id, None)
+            else:
+                self._minimos[produto_id] = minimo
+            self._reavaliar(produto_id)
+
+    def estoque_alterado(self, produto_id: UUID, delta: int) -> None:
+        """Aplica a variação `delta` ao saldo do produto e atualiza a lista."""
+        with self._trava:
+            self._saldos[produto_id] = self._saldos.get(produto_id, 0) + delta
+            if produto_id in self._minimos:
+                self._reavaliar(produto_id)
+
+    def _reavaliar(self, produto_id: UUID) -> None:
+        minimo = self._minimos.get(produto_id)
+        saldo = self._saldos.get(produto_id, 0)
+        if minimo is not None and saldo < minimo:
+            item = ItemListaCompras(produto_id, saldo, minimo, minimo - saldo)
+            if self._abaixo.get(produto_id) == item:
+                return
+            self._abaixo[produto_id] = item
+        elif self._abaixo.pop(produto_id, None) is None:
+            return
+        self._versao += 1
+        self._alteracoes[produto_id] = self._versao
+        self._alteracoes.move_to_end(produto_id)
+
+    def alteracoes_desde(self, versao: int) -> AlteracoesListaCompras:
+        """
+        Alterações da lista depois da versão `versao`.
+
+        Args:
+            versao: A última versão que o cliente conhece; 0 para a lista inteira.
+
+        Returns:
+            Os produtos que entraram ou mudaram de quantidade e os que saíram,
+            cada um com seu estado atual, e a versão atual.
+        """
+        alterados: List[ItemListaCompras] = []
+        removidos: List[UUID] = []
+        with self._trava:
+            for produto_id, alterado_em in reversed(self._alteracoes.items()):
+                if alterado_em <= versao:
+                    break
+                item = self._abaixo.get(produto_id)
+                if item is not None:
+                    alterados.append(item)
+                elif versao > 0:
+                    removidos.append(produto_id)
+            return AlteracoesListaCompras(self._versao, alterados, removidos)
@@ -0,0 +1,121 @@
+import heapq
+from datetime import date, datetime
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from models import ItemEstoque
+
+FIFO = "fifo"
+FEFO = "fefo"
+POLITICAS = (FIFO, FEFO)
+
+# Itens sem validade vão para o fim da fila FEFO.
+_SEM_VALIDADE = date.max.toordinal() + 1
+
+ChaveEntrada = Tuple[Optional[date], Optional[UUID], date]
+
+def chave_de_consumo(politica: str, item: ItemEstoque, validade: Optional[date]) -> tuple:
+    """
+    Posição do lote na fila de consumo: menor sai primeiro.
+
+    FIFO ordena pela data de compra (ou, sem ela, pelo dia em que o lote
+    entrou) e FEFO pela validade efetiva, desempatando por FIFO. O momento
+    de entrada desempata lotes do mesmo dia.
+    """
+    compra = (item.data_compra or item.adicionado_em.date()).toordinal()
+    if politica == FEFO:
+        return (validade.toordinal() if validade is not None else _SEM_VALIDADE, compra, item.adicionado_em)
+    return (compra, item.adicionado_em)
+
+def chave_de_entrada(data_compra: Optional[date], id_cupom: Optional[UUID], momento: datetime) -> ChaveEntrada:
+    """
+    Identifica o lote que recebe novas unidades: mesma compra, mesmo cupom e
+    mesmo dia de entrada. Leituras de código de barras (sem compra nem cupom)
+    formam um lote por dia; cada cupom forma o seu.
+    """
+    return (data_compra, id_cupom, momento.date())
+
+class LotesDoProduto:
+    """
+    Lotes (itens de estoque) de um produto em ordem de consumo.
+
+    Os lotes ficam em um heap; achar o próximo a consumir é O(1) e inserir,
+    reordenar ou retirar um lote é O(log n). Reordenar e retirar são
+    preguiçosos: a entrada antiga fica no heap e é ignorada quando chega ao
+    topo, e o heap é reconstruído se as entradas obsoletas passarem das
+    válidas.
+
+    Também guarda, por `chave_de_entrada`, os lotes que ainda aceitam novas
+    unidades (os sem validade específica), para que uma entrada ache seu lote
+    em O(1).
+    """
+
+    __slots__ = ("_heap", "_entradas", "_abertos", "_chave_aberta", "validade_padrao")
+
+    _sequencia = count()
+
+    def __init__(self):
+        # Indexados pelo próprio item (hash por identidade), que é bem mais
+        # barato que o hash de um UUID.
+        self._heap: List[list] = []
+        self._entradas: Dict[ItemEstoque, list] = {}
+        self._abertos: Dict[ChaveEntrada, ItemEstoque] = {}
+        self._chave_aberta: Dict[ItemEstoque, ChaveEntrada] = {}
+        # Validade padrão do produto usada nas chaves atuais (só para FEFO).
+        self.validade_padrao: Optional[date] = None
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def __iter__(self):
+        return iter(self._entradas)
+
+    def definir(self, item: ItemEstoque, chave: tuple) -> None:
+        """Insere o lote ou o reposiciona sob uma nova chave de consumo."""
+        entrada = self._entradas.get(item)
+        if entrada is None or entrada[0] != chave:
+            entrada = [chave, next(self._sequencia), item]
+            self._entradas[item] = entrada
+            heapq.heappush(self._heap, entrada)
+            self._compactar()
+
+        anterior = self._chave_aberta.get(item)
+        atual = (
+            chave_de_entrada(item.data_compra, item.id_cupom_fiscal_origem, item.adicionado_em)
+            if item.data_validade_especifica is None else None
+        )
+        if anterior != atual:
+            if anterior is not None and self._abertos.get(anterior) is item:
+                del self._abertos[anterior]
+            if atual is not None:
+                self._abertos.setdefault(atual, item)
+                self._chave_aberta[item] = atual
+            else:
+                del self._chave_aberta[item]
+
+    def remover(self, item: ItemEstoque) -> None:
+        if self._entradas.pop(item, None) is None:
+            return
+        chave = self._chave_aberta.pop(item, None)
+        if chave is not None and self._abertos.get(chave) is item:
+            del self._abertos[chave]
+        self._compactar()
+
+    def proximo(self) -> Optional[ItemEstoque]:
+        """Lote a consumir primeiro, ou None se não houver lotes."""
+        heap = self._heap
+        while heap:
+            entrada = heap[0]
+            if self._entradas.get(entrada[2]) is entrada:
+                return entrada[2]
+            heapq.heappop(heap)
+        return None
+
+    def aberto(self, chave: ChaveEntrada) -> Optional[ItemEstoque]:
+        """Lote que recebe novas unidades com essa chave de entrada, se houver."""
+        return self._abertos.get(chave)
+
+    def _compactar(self) -> None:
+        if len(self._heap) > 2 * len(self._entradas) + 16:
+            self._heap = sorted(self._entradas.values())
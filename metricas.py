@@ -0,0 +1,445 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from repositorio import RepositorioEstoque
+
+# Limites (em segundos) das faixas dos histogramas de latência.
+LIMITES_PADRAO = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 0.1, 1.0,
+)
+
+OPERACOES = (
+    "adicionar_produto_por_codigo_de_barras",
+    "adicionar_produtos_por_codigos_de_barras",
+    "adicionar_produtos_por_cupom_fiscal",
+    "remover_produto_por_codigo_de_barras",
+    "definir_validade_do_item",
+)
+
+# Primitivas de busca medidas, com o nome usado no rótulo `busca`.
+BUSCAS = {
+    "buscar_produto_por_codigo_de_barras": "codigo_de_barras",
+    "buscar_produto_por_nome": "nome",
+    "buscar_produto_parecido": "parecido",
+    "buscar_lote_para_entrada": "lote_para_entrada",
+    "buscar_lote_para_consumo": "lote_para_consumo",
+}
+
+GRAVACOES = ("registrar_produto", "registrar_item", "descartar_item", "atualizar_item")
+
+PREFIXO_SEM_CODIGO = "SEM_COD_BARRAS_"
+
+_Rotulos = Tuple[Tuple[str, str], ...]
+
+class Histograma:
+    """Contagens cumulativas por faixa, como os histogramas do Prometheus."""
+
+    __slots__ = ("limites", "contagens", "soma", "total")
+
+    def __init__(self, limites: Sequence[float] = LIMITES_PADRAO):
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1) # A última faixa é +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumulado(self) -> List[Tuple[float, int]]:
+        """Pares (limite, observações até ele), terminando em (inf, total)."""
+        pares = []
+        acumulado = 0
+        for limite, contagem in zip(self.limites + (float("inf"),), self.contagens):
+            acumulado += contagem
+            pares.append((limite, acumulado))
+        return pares
+
+    def quantil(self, q: float) -> float:
+        """Estimativa do quantil `q`: o limite superior da faixa que o contém."""
+        alvo = q * self.total
+        for limite, acumulado in self.acumulado():
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+class Contador:
+    __slots__ = ("valor",)
+
+    def __init__(self):
+        self.valor = 0
+
+def _texto_rotulos(rotulos: _Rotulos, extra: str = "") -> str:
+    partes = [f'{nome}="{valor}"' for nome, valor in rotulos]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def _limite_prometheus(limite: float) -> str:
+    return "+Inf" if limite == float("inf") else repr(limite)
+
+class Metricas:
+    """
+    Contadores, histogramas de latência e tamanhos das operações de estoque.
+
+    `instrumentar(repositorio)` troca, só naquela instância, as operações de
+    estoque e as primitivas de busca e gravação por versões medidas: cada
+    operação conta erros e mede a latência (o histograma também conta as
+    chamadas); cada busca conta acertos e falhas (nos cupons, `nome` é a
+    correspondência exata, `parecido` a aproximada) e mede a latência; cada
+    gravação mede a latência; e produtos criados com o código
+    `SEM_COD_BARRAS_` são contados à parte. Buscas e gravações levam o
+    rótulo da operação em que ocorreram, e o tempo de uma operação fora
+    delas é o da lógica e da criação de objetos (ver `decomposicao`).
+    Repositórios não instrumentados não executam nada disto: as classes não
+    mudam, então desligado o custo é zero. Para as funções de
+    `stock_management`, basta atribuir uma instância a
+    `stock_management.metricas`.
+
+    Tamanhos de coleções são lidos só na exportação: os de repositórios
+    instrumentados com `nome` (as listas `produtos` e `estoque`, se houver)
+    e os registrados em `registrar_tamanho`.
+
+    A exportação é em texto do Prometheus (`para_prometheus`) ou JSON
+    (`para_json`), para um arquivo (`gravar`) ou por HTTP (`servir`).
+
+    Com `perfilar_a_cada=n`, uma a cada n chamadas de cada operação roda sob
+    o `cProfile`; o perfil da chamada vai para `ao_perfilar(operacao,
+    perfil)` ou, sem ele, é somado ao da operação (ver `perfil`).
+    """
+
+    def __init__(
+        self,
+        prefixo: str = "estoque",
+        limites: Sequence[float] = LIMITES_PADRAO,
+        perfilar_a_cada: Optional[int] = None,
+        ao_perfilar: Optional[Callable[[str, cProfile.Profile], None]] = None,
+    ):
+        self.prefixo = prefixo
+        self.limites = tuple(limites)
+        self.perfilar_a_cada = perfilar_a_cada
+        self.ao_perfilar = ao_perfilar
+        self._contadores: Dict[Tuple[str, _Rotulos], Contador] = {}
+        self._histogramas: Dict[Tuple[str, _Rotulos], Histograma] = {}
+        self._tamanhos: Dict[Tuple[str, _Rotulos], Callable[[], int]] = {}
+        self._perfis: Dict[str, pstats.Stats] = {}
+        self._trava = threading.Lock()
+        self._local = threading.local()
+
+    # Registro
+
+    def _serie_contador(self, nome: str, rotulos: _Rotulos) -> "Contador":
+        with self._trava:
+            contador = self._contadores.get((nome, rotulos))
+            if contador is None:
+                contador = self._contadores[(nome, rotulos)] = Contador()
+            return contador
+
+    def _serie_histograma(self, nome: str, rotulos: _Rotulos) -> Histograma:
+        with self._trava:
+            histograma = self._histogramas.get((nome, rotulos))
+            if histograma is None:
+                histograma = self._histogramas[(nome, rotulos)] = Histograma(self.limites)
+            return histograma
+
+    def contar(self, nome: str, rotulos: _Rotulos = (), quantidade: int = 1) -> None:
+        contador = self._serie_contador(nome, rotulos)
+        with self._trava:
+            contador.valor += quantidade
+
+    def observar(self, nome: str, rotulos: _Rotulos, valor: float) -> None:
+        histograma = self._serie_histograma(nome, rotulos)
+        with self._trava:
+            histograma.observar(valor)
+
+    def registrar_tamanho(self, nome: str, funcao: Callable[[], int], rotulos: _Rotulos = ()) -> None:
+        """Registra um tamanho de coleção, lido por `funcao` a cada exportação."""
+        self._tamanhos[(nome, rotulos)] = funcao
+
+    def contador(self, nome: str, **rotulos: str) -> int:
+        contador = self._contadores.get((nome, tuple(sorted(rotulos.items()))))
+        return contador.valor if contador is not None else 0
+
+    def histograma(self, nome: str, **rotulos: str) -> Optional[Histograma]:
+        return self._histogramas.get((nome, tuple(sorted(rotulos.items()))))
+
+    def decomposicao(self, operacao: str) -> Dict[str, float]:
+        """
+        Tempo total (em segundos) da operação dividido em buscas, gravações e o restante.
+
+        O restante (`logica`) é a criação de objetos e a lógica da própria
+        operação. Buscas e gravações feitas fora de uma operação medida não
+        entram em nenhuma.
+        """
+        with self._trava:
+            total = self._histogramas.get(("duracao_operacao_segundos", (("operacao", operacao),)))
+            buscas = sum(
+                h.soma for (nome, rotulos), h in self._histogramas.items()
+                if nome == "duracao_busca_segundos" and ("operacao", operacao) in rotulos
+            )
+            gravacoes = sum(
+                h.soma for (nome, rotulos), h in self._histogramas.items()
+                if nome == "duracao_gravacao_segundos" and ("operacao", operacao) in rotulos
+            )
+        soma = total.soma if total is not None else 0.0
+        return {"total": soma, "buscas": buscas, "gravacoes": gravacoes, "logica": max(0.0, soma - buscas - gravacoes)}
+
+    def perfil(self, operacao: str) -> Optional[pstats.Stats]:
+        """Soma dos perfis das chamadas amostradas da operação (sem `ao_perfilar`)."""
+        return self._perfis.get(operacao)
+
+    # Instrumentação
+
+    def instrumentar(
+        self, repositorio: RepositorioEstoque, nome: Optional[str] = None, primitivas: bool = True
+    ) -> RepositorioEstoque:
+        """
+        Mede as operações e primitivas desta instância do repositório.
+
+        Args:
+            repositorio: O repositório a medir.
+            nome: Se informado, os tamanhos das listas `produtos` e `estoque`
+                do repositório são exportados com o rótulo `repositorio=nome`.
+            primitivas: Se False, mede só as operações (latência e erros),
+                o que custa bem menos por chamada.
+
+        Returns:
+            O próprio repositório.
+        """
+        for operacao in OPERACOES:
+            setattr(repositorio, operacao, self._medir_operacao(operacao, getattr(repositorio, operacao)))
+        if primitivas:
+            for primitiva, busca in BUSCAS.items():
+                setattr(repositorio, primitiva, self._medir_busca(busca, getattr(repositorio, primitiva)))
+            for primitiva in GRAVACOES:
+                setattr(repositorio, primitiva, self._medir_gravacao(primitiva, getattr(repositorio, primitiva)))
+        repositorio.registrar_produto = self._contar_sem_codigo(repositorio.registrar_produto) # type: ignore[method-assign]
+        if nome is not None:
+            for colecao in ("produtos", "estoque"):
+                lista = getattr(repositorio, colecao, None)
+                if lista is not None:
+                    self.registrar_tamanho("tamanho", lista.__len__, (("colecao", colecao), ("repositorio", nome)))
+        return repositorio
+
+    @staticmethod
+    def desinstrumentar(repositorio: RepositorioEstoque) -> None:
+        """Volta a usar os métodos da classe."""
+        for metodo in (*OPERACOES, *BUSCAS, *GRAVACOES):
+            repositorio.__dict__.pop(metodo, None)
+
+    # As versões medidas guardam as séries que atualizam, para que cada
+    # chamada pegue a trava uma vez só e não monte chaves de dicionário.
+
+    def _medir_operacao(self, operacao: str, metodo: Callable) -> Callable:
+        rotulos = (("operacao", operacao),)
+        duracao = self._serie_histograma("duracao_operacao_segundos", rotulos)
+        erros = self._serie_contador("erros_total", rotulos)
+        trava, local, relogio = self._trava, self._local, time.perf_counter
+
+        @functools.wraps(metodo)
+        def medido(*argumentos, **nomeados):
+            externa = getattr(local, "operacao", "")
+            if not externa:
+                local.operacao = operacao
+            perfilar = (
+                self.perfilar_a_cada is not None and (duracao.total + 1) % self.perfilar_a_cada == 0
+                and not getattr(local, "perfilando", False)
+            )
+            inicio = relogio()
+            try:
+                if perfilar:
+                    return self._perfilar(operacao, metodo, argumentos, nomeados)
+                return metodo(*argumentos, **nomeados)
+            except Exception:
+                with trava:
+                    erros.valor += 1
+                raise
+            finally:
+                tempo = relogio() - inicio
+                with trava:
+                    duracao.observar(tempo)
+                local.operacao = externa
+        return medido
+
+    def _perfilar(self, operacao: str, metodo: Callable, argumentos: tuple, nomeados: dict) -> Any:
+        perfil = cProfile.Profile()
+        self._local.perfilando = True
+        try:
+            return perfil.runcall(metodo, *argumentos, **nomeados)
+        finally:
+            self._local.perfilando = False
+            if self.ao_perfilar is not None:
+                self.ao_perfilar(operacao, perfil)
+            else:
+                with self._trava:
+                    acumulado = self._perfis.get(operacao)
+                    if acumulado is None:
+                        self._perfis[operacao] = pstats.Stats(perfil)
+                    else:
+                        acumulado.add(perfil)
+
+    def _medir_busca(self, busca: str, metodo: Callable) -> Callable:
+        series: Dict[str, Tuple[Histograma, Contador, Contador]] = {}
+        trava, local, relogio = self._trava, self._local, time.perf_counter
+
+        def series_da_operacao(operacao: str) -> Tuple[Histograma, "Contador", "Contador"]:
+            rotulos = (("busca", busca), ("operacao", operacao))
+            series[operacao] = (
+                self._serie_histograma("duracao_busca_segundos", rotulos),
+                self._serie_contador("buscas_total", rotulos + (("resultado", "acerto"),)),
+                self._serie_contador("buscas_total", rotulos + (("resultado", "falha"),)),
+            )
+            return series[operacao]
+
+        @functools.wraps(metodo)
+        def medido(*argumentos, **nomeados):
+            inicio = relogio()
+            resultado = metodo(*argumentos, **nomeados)
+            tempo = relogio() - inicio
+            operacao = getattr(local, "operacao", "")
+            duracao, acertos, falhas = series.get(operacao) or series_da_operacao(operacao)
+            with trava:
+                duracao.observar(tempo)
+                if resultado is not None:
+                    acertos.valor += 1
+                else:
+                    falhas.valor += 1
+            return resultado
+        return medido
+
+    def _medir_gravacao(self, primitiva: str, metodo: Callable) -> Callable:
+        series: Dict[str, Histograma] = {}
+        trava, local, relogio = self._trava, self._local, time.perf_counter
+
+        @functools.wraps(metodo)
+        def medido(*argumentos, **nomeados):
+            inicio = relogio()
+            try:
+                return metodo(*argumentos, **nomeados)
+            finally:
+                tempo = relogio() - inicio
+                operacao = getattr(local, "operacao", "")
+                duracao = series.get(operacao)
+                if duracao is None:
+                    duracao = series[operacao] = self._serie_histograma(
+                        "duracao_gravacao_segundos", (("operacao", operacao), ("primitiva", primitiva))
+                    )
+                with trava:
+                    duracao.observar(tempo)
+        return medido
+
+    def _contar_sem_codigo(self, metodo: Callable) -> Callable:
+        sem_codigo = self._serie_contador("produtos_sem_codigo_total", ())
+
+        @functools.wraps(metodo)
+        def medido(produto, *argumentos, **nomeados):
+            if produto.codigo_de_barras.startswith(PREFIXO_SEM_CODIGO):
+                with self._trava:
+                    sem_codigo.valor += 1
+            return metodo(produto, *argumentos, **nomeados)
+        return medido
+
+    # Exportação
+
+    def para_json(self) -> Dict[str, Any]:
+        with self._trava:
+            contadores = [
+                {"nome": f"{self.prefixo}_{nome}", "rotulos": dict(rotulos), "valor": contador.valor}
+                for (nome, rotulos), contador in sorted(self._contadores.items(), key=lambda par: par[0])
+            ]
+            histogramas = [
+                {
+                    "nome": f"{self.prefixo}_{nome}", "rotulos": dict(rotulos),
+                    "total": h.total, "soma": h.soma,
+                    "p50": h.quantil(0.5), "p99": h.quantil(0.99),
+                    "faixas": [[None if limite == float("inf") else limite, n] for limite, n in h.acumulado()],
+                }
+                for (nome, rotulos), h in sorted(self._histogramas.items(), key=lambda par: par[0])
+            ]
+        tamanhos = [
+            {"nome": f"{self.prefixo}_{nome}", "rotulos": dict(rotulos), "valor": funcao()}
+            for (nome, rotulos), funcao in sorted(self._tamanhos.items(), key=lambda par: par[0])
+        ]
+        return {"contadores": contadores, "histogramas": histogramas, "tamanhos": tamanhos}
+
+    def para_prometheus(self) -> str:
+        """As métricas no formato de texto do Prometheus (versão 0.0.4)."""
+        linhas: List[str] = []
+        tipos_vistos = set()
+
+        def tipo(nome: str, tipo_metrica: str) -> None:
+            if nome not in tipos_vistos:
+                tipos_vistos.add(nome)
+                linhas.append(f"# TYPE {nome} {tipo_metrica}")
+
+        with self._trava:
+            for (nome, rotulos), contador in sorted(self._contadores.items(), key=lambda par: par[0]):
+                nome = f"{self.prefixo}_{nome}"
+                tipo(nome, "counter")
+                linhas.append(f"{nome}{_texto_rotulos(rotulos)} {contador.valor}")
+            for (nome, rotulos), histograma in sorted(self._histogramas.items(), key=lambda par: par[0]):
+                nome = f"{self.prefixo}_{nome}"
+                tipo(nome, "histogram")
+                for limite, acumulado in histograma.acumulado():
+                    le = f'le="{_limite_prometheus(limite)}"'
+                    linhas.append(f"{nome}_bucket{_texto_rotulos(rotulos, le)} {acumulado}")
+                linhas.append(f"{nome}_sum{_texto_rotulos(rotulos)} {histograma.soma!r}")
+                linhas.append(f"{nome}_count{_texto_rotulos(rotulos)} {histograma.total}")
+        for (nome, rotulos), funcao in sorted(self._tamanhos.items(), key=lambda par: par[0]):
+            nome = f"{self.prefixo}_{nome}"
+            tipo(nome, "gauge")
+            linhas.append(f"{nome}{_texto_rotulos(rotulos)} {funcao()}")
+        return "\n".join(linhas) + "\n"
+
+    def gravar(self, caminho: str) -> None:
+        """Grava as métricas em JSON (se o caminho terminar em `.json`) ou no texto do Prometheus."""
+        conteudo = (
+            json.dumps(self.para_json(), ensure_ascii=False, indent=1)
+            if caminho.endswith(".json") else self.para_prometheus()
+        )
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+
+    def servir(self, porta: int = 0, endereco: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve `/metrics` (Prometheus) e `/metrics.json` em uma thread.
+
+        Returns:
+            O servidor já em execução; `server_address` tem a porta escolhida
+            e `shutdown()` o encerra.
+        """
+        metricas = self
+
+        class _Manipulador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    corpo, tipo_conteudo = metricas.para_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    corpo, tipo_conteudo = json.dumps(metricas.para_json(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                dados = corpo.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{tipo_conteudo}; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, *argumentos):
+                pass
+
+        servidor = ThreadingHTTPServer((endereco, porta), _Manipulador)
+        threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+        return servidor
@@ -2,14 +2,23 @@ from datetime import date, datetime
 from typing import List, Optional
 from uuid import UUID, uuid4
 
+# As classes usam __slots__ para evitar um __dict__ por instância: o estoque
+# chega a milhões de objetos. Os padrões dos atributos opcionais ficam nos
+# parâmetros de __init__, pois __slots__ não admite valores na classe.
+
 class Produto:
+    __slots__ = (
+        "id", "nome", "codigo_de_barras", "marca", "unidade",
+        "data_de_validade_padrao", "url_imagem", "criado_em", "atualizado_em",
+    )
+
     id: UUID
     nome: str
     codigo_de_barras: str
-    marca: Optional[str] = None
-    unidade: Optional[str] = None
-    data_de_validade_padrao: Optional[date] = None
-    url_imagem: Optional[str] = None
+    marca: Optional[str]
+    unidade: Optional[str]
+    data_de_validade_padrao: Optional[date]
+    url_imagem: Optional[str]
     criado_em: datetime
     atualizado_em: datetime
 
@@ -32,13 +41,44 @@ class Produto:
         self.criado_em = datetime.now()
         self.atualizado_em = datetime.now()
 
+    @classmethod
+    def restaurar(
+        cls,
+        id: UUID,
+        nome: str,
+        codigo_de_barras: str,
+        marca: Optional[str],
+        unidade: Optional[str],
+        data_de_validade_padrao: Optional[date],
+        url_imagem: Optional[str],
+        criado_em: datetime,
+        atualizado_em: datetime,
+    ) -> "Produto":
+        """Recria um produto já persistido sem passar por __init__, mantendo id e timestamps."""
+        produto = cls.__new__(cls)
+        produto.id = id
+        produto.nome = nome
+        produto.codigo_de_barras = codigo_de_barras
+        produto.marca = marca
+        produto.unidade = unidade
+        produto.data_de_validade_padrao = data_de_validade_padrao
+        produto.url_imagem = url_imagem
+        produto.criado_em = criado_em
+        produto.atualizado_em = atualizado_em
+        return produto
+
 class ItemEstoque:
+    __slots__ = (
+        "id", "produto_id", "quantidade", "data_compra", "data_validade_especifica",
+        "id_cupom_fiscal_origem", "adicionado_em", "ultima_atualizacao",
+    )
+
     id: UUID
     produto_id: UUID
-    quantidade: int
-    data_compra: Optional[date] = None
-    data_validade_especifica: Optional[date] = None
-    id_cupom_fiscal_origem: Optional[UUID] = None
+    quantidade: int # Na unidade base do produto: mg, ml ou un (ver `unidades`)
+    data_compra: Optional[date]
+    data_validade_especifica: Optional[date]
+    id_cupom_fiscal_origem: Optional[UUID]
     adicionado_em: datetime
     ultima_atualizacao: datetime
 
@@ -59,25 +99,59 @@ class ItemEstoque:
         self.adicionado_em = datetime.now()
         self.ultima_atualizacao = datetime.now()
 
+    @classmethod
+    def restaurar(
+        cls,
+        id: UUID,
+        produto_id: UUID,
+        quantidade: int,
+        data_compra: Optional[date],
+        data_validade_especifica: Optional[date],
+        id_cupom_fiscal_origem: Optional[UUID],
+        adicionado_em: datetime,
+        ultima_atualizacao: datetime,
+    ) -> "ItemEstoque":
+        """Recria um item já persistido sem passar por __init__, mantendo id e timestamps."""
+        item = cls.__new__(cls)
+        item.id = id
+        item.produto_id = produto_id
+        item.quantidade = quantidade
+        item.data_compra = data_compra
+        item.data_validade_especifica = data_validade_especifica
+        item.id_cupom_fiscal_origem = id_cupom_fiscal_origem
+        item.adicionado_em = adicionado_em
+        item.ultima_atualizacao = ultima_atualizacao
+        return item
+
 class DetalheProdutoCupom:
+    __slots__ = ("nome_produto_cupom", "quantidade_cupom", "preco_unitario_cupom", "unidade_cupom")
+
     nome_produto_cupom: str
     quantidade_cupom: float # Pode ser float para casos como "0.5 kg"
-    preco_unitario_cupom: Optional[float] = None
+    preco_unitario_cupom: Optional[float]
+    unidade_cupom: Optional[str] # Ex.: "KG", "UN"; None usa a unidade do produto
 
     def __init__(
         self,
         nome_produto_cupom: str,
         quantidade_cupom: float,
         preco_unitario_cupom: Optional[float] = None,
+        unidade_cupom: Optional[str] = None,
     ):
         self.nome_produto_cupom = nome_produto_cupom
         self.quantidade_cupom = quantidade_cupom
         self.preco_unitario_cupom = preco_unitario_cupom
+        self.unidade_cupom = unidade_cupom
 
 class CupomFiscal:
+    __slots__ = (
+        "id", "dados_qr_code", "nome_loja", "data_compra_cupom",
+        "detalhes_produtos_cupom", "processado_em",
+    )
+
     id: UUID
     dados_qr_code: str
-    nome_loja: Optional[str] = None
+    nome_loja: Optional[str]
     data_compra_cupom: date
     detalhes_produtos_cupom: List[DetalheProdutoCupom]
     processado_em: datetime
@@ -0,0 +1,290 @@
+import hashlib
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from models import Produto, ItemEstoque, CupomFiscal
+from inventario import Inventario
+
+# Operações de `RepositorioEstoque` que podem ser encaminhadas às partições.
+OPERACOES = frozenset({
+    "adicionar_produto_por_codigo_de_barras",
+    "adicionar_produtos_por_codigos_de_barras",
+    "adicionar_produtos_por_cupom_fiscal",
+    "remover_produto_por_codigo_de_barras",
+})
+
+# (casa, nome da operação, argumentos)
+Comando = Tuple[str, str, tuple]
+Resposta = Tuple[Any, Optional[BaseException]]
+
+def _peso(particao: int, casa: str) -> bytes:
+    return hashlib.blake2b(f"{particao}:{casa}".encode(), digest_size=8).digest()
+
+def particao_da_casa(casa: str, particoes: int) -> int:
+    """
+    Partição dona da casa entre `particoes` partições (hash de rendezvous).
+
+    Cada casa fica com a partição de maior peso hash(partição, casa). Ao
+    passar de n para n + 1 partições, só as casas cujo maior peso passa a
+    ser o da partição nova mudam de dono, cerca de 1/(n + 1) delas.
+    """
+    return max(range(particoes), key=lambda particao: _peso(particao, casa))
+
+def _executar_particao(conexao: Connection, opcoes_inventario: Mapping[str, Any]) -> None:
+    """Laço de um processo de partição: um `Inventario` por casa, uma mensagem por vez."""
+    casas: Dict[str, Inventario] = {}
+    while True:
+        mensagem = conexao.recv()
+        if mensagem is None:
+            return
+        tipo, carga, com_resultados = mensagem
+        if tipo == "comandos":
+            respostas: List[Optional[Resposta]] = []
+            for casa, operacao, argumentos in carga:
+                inventario = casas.get(casa)
+                if inventario is None:
+                    inventario = casas[casa] = Inventario(**opcoes_inventario)
+                try:
+                    resultado = getattr(inventario, operacao)(*argumentos)
+                    respostas.append((resultado, None) if com_resultados else None)
+                except Exception as erro:
+                    respostas.append((None, erro))
+            conexao.send(respostas)
+        elif tipo == "exportar":
+            estados = {}
+            for casa in carga:
+                inventario = casas.pop(casa, None)
+                if inventario is not None:
+                    estados[casa] = (inventario.produtos, inventario.estoque)
+            conexao.send(estados)
+        elif tipo == "importar":
+            for casa, (produtos, estoque) in carga.items():
+                casas[casa] = Inventario(produtos, estoque, **opcoes_inventario)
+            conexao.send(len(carga))
+        elif tipo == "estado":
+            inventario = casas.get(carga)
+            conexao.send((inventario.produtos, inventario.estoque) if inventario is not None else ([], []))
+
+class EstoqueParticionado:
+    """
+    Estoque de muitas casas repartido entre processos.
+
+    Cada partição é um processo com um `inventario.Inventario` em memória por
+    casa; as casas são distribuídas por hash de rendezvous
+    (`particao_da_casa`), e cada operação é encaminhada, por um pipe, ao
+    processo dono da casa. Assim casas de partições diferentes são
+    atendidas em paralelo, sem disputar o GIL, e as operações de uma mesma
+    casa continuam aplicadas na ordem em que foram pedidas.
+
+    `executar` envia um lote de comandos de várias casas de uma vez: cada
+    partição recebe os seus em uma única mensagem e todas trabalham ao
+    mesmo tempo. Os métodos de operação individuais são atalhos para um lote
+    de um comando. Os objetos devolvidos são cópias; alterá-los não muda o
+    estoque da partição.
+
+    `redimensionar` muda o número de partições e migra só as casas que
+    mudaram de dono; `fixar_casa` prende uma casa em uma partição escolhida,
+    para tirar casas muito ativas de uma partição sobrecarregada.
+
+    Args:
+        particoes: Número de processos; por padrão, um por núcleo.
+        opcoes_inventario: Argumentos nomeados do `Inventario` de cada casa
+            (ex.: `{"lotes": "fefo"}`).
+    """
+
+    def __init__(self, particoes: Optional[int] = None, opcoes_inventario: Optional[Mapping[str, Any]] = None):
+        self.opcoes_inventario = dict(opcoes_inventario or {})
+        self._conexoes: List[Connection] = []
+        self._processos: List[multiprocessing.Process] = []
+        self._dono_da_casa: Dict[str, int] = {}
+        self._fixadas: Dict[str, int] = {}
+        self._iniciar(particoes or os.cpu_count() or 1)
+
+    def __enter__(self) -> "EstoqueParticionado":
+        return self
+
+    def __exit__(self, *excecao) -> None:
+        self.fechar()
+
+    @property
+    def particoes(self) -> int:
+        return len(self._processos)
+
+    def _iniciar(self, particoes: int) -> None:
+        while len(self._processos) < particoes:
+            local, remota = multiprocessing.Pipe()
+            processo = multiprocessing.Process(
+                target=_executar_particao,
+                args=(remota, self.opcoes_inventario),
+                name=f"particao-estoque-{len(self._processos)}",
+                daemon=True,
+            )
+            processo.start()
+            remota.close()
+            self._conexoes.append(local)
+            self._processos.append(processo)
+
+    def _encerrar(self, particoes: int) -> None:
+        while len(self._processos) > particoes:
+            conexao = self._conexoes.pop()
+            conexao.send(None)
+            conexao.close()
+            self._processos.pop().join()
+
+    def fechar(self) -> None:
+        """Encerra todos os processos; o estoque das casas é descartado."""
+        self._encerrar(0)
+
+    def particao(self, casa: str) -> int:
+        """Partição que atende a casa."""
+        dono = self._dono_da_casa.get(casa)
+        if dono is None:
+            dono = self._dono_da_casa[casa] = self._fixadas.get(casa, particao_da_casa(casa, self.particoes))
+        return dono
+
+    def casas_por_particao(self) -> List[int]:
+        """Quantas casas cada partição atende, para acompanhar o equilíbrio."""
+        contagens = [0] * self.particoes
+        for dono in self._dono_da_casa.values():
+            contagens[dono] += 1
+        return contagens
+
+    # Operações
+
+    def executar(self, comandos: Iterable[Comando], resultados: bool = True) -> List[Optional[Resposta]]:
+        """
+        Aplica um lote de comandos, cada um na partição da sua casa.
+
+        Comandos de uma mesma casa são aplicados na ordem do lote; partições
+        diferentes trabalham em paralelo.
+
+        Args:
+            comandos: Triplas (casa, operação, argumentos), com a operação
+                sendo um dos nomes em `OPERACOES`.
+            resultados: Com False, as partições não devolvem os objetos
+                resultantes (o que poupa a serialização) e só os comandos que
+                falharam têm resposta.
+
+        Returns:
+            Uma resposta por comando, na ordem do lote: o par (resultado,
+            None), ou (None, exceção) se o comando falhou; None para os
+            comandos bem-sucedidos quando `resultados=False`.
+
+        Raises:
+            ValueError: Se alguma operação não for uma das `OPERACOES`.
+        """
+        por_particao: List[List[Comando]] = [[] for _ in range(self.particoes)]
+        posicoes: List[List[int]] = [[] for _ in range(self.particoes)]
+        total = 0
+        for posicao, comando in enumerate(comandos):
+            if comando[1] not in OPERACOES:
+                raise ValueError(f"Operação desconhecida: {comando[1]!r}")
+            particao = self.particao(comando[0])
+            por_particao[particao].append(comando)
+            posicoes[particao].append(posicao)
+            total = posicao + 1
+
+        ocupadas = [particao for particao, lote in enumerate(por_particao) if lote]
+        for particao in ocupadas:
+            self._conexoes[particao].send(("comandos", por_particao[particao], resultados))
+        respostas: List[Optional[Resposta]] = [None] * total
+        for particao in ocupadas:
+            for posicao, resposta in zip(posicoes[particao], self._conexoes[particao].recv()):
+                respostas[posicao] = resposta
+        return respostas
+
+    def _executar_um(self, casa: str, operacao: str, *argumentos) -> Any:
+        resultado, erro = self.executar([(casa, operacao, argumentos)])[0] # type: ignore[misc]
+        if erro is not None:
+            raise erro
+        return resultado
+
+    def adicionar_produto_por_codigo_de_barras(
+        self,
+        casa: str,
+        codigo_de_barras: str,
+        nome_produto: Optional[str] = None,
+        marca_produto: Optional[str] = None,
+        unidade_produto: Optional[str] = None,
+    ) -> Tuple[Produto, ItemEstoque]:
+        """Ver `stock_management.adicionar_produto_por_codigo_de_barras`."""
+        return self._executar_um(
+            casa, "adicionar_produto_por_codigo_de_barras",
+            codigo_de_barras, nome_produto, marca_produto, unidade_produto,
+        )
+
+    def adicionar_produtos_por_cupom_fiscal(self, casa: str, cupom: CupomFiscal) -> List[Tuple[Produto, ItemEstoque]]:
+        """Ver `stock_management.adicionar_produtos_por_cupom_fiscal`."""
+        return self._executar_um(casa, "adicionar_produtos_por_cupom_fiscal", cupom)
+
+    def remover_produto_por_codigo_de_barras(self, casa: str, codigo_de_barras: str) -> Optional[ItemEstoque]:
+        """Ver `stock_management.remover_produto_por_codigo_de_barras`."""
+        return self._executar_um(casa, "remover_produto_por_codigo_de_barras", codigo_de_barras)
+
+    def estoque_da_casa(self, casa: str) -> Tuple[List[Produto], List[ItemEstoque]]:
+        """Cópia dos produtos e do estoque da casa (vazios se ela ainda não existe)."""
+        conexao = self._conexoes[self.particao(casa)]
+        conexao.send(("estado", casa, False))
+        return conexao.recv()
+
+    # Rebalanceamento
+
+    def fixar_casa(self, casa: str, particao: Optional[int]) -> None:
+        """Prende a casa na partição dada (None devolve-a ao hash), migrando seu estoque se preciso."""
+        if particao is not None and not 0 <= particao < self.particoes:
+            raise ValueError(f"Partição inexistente: {particao}")
+        if particao is None:
+            self._fixadas.pop(casa, None)
+        else:
+            self._fixadas[casa] = particao
+        self._migrar({casa: self._fixadas.get(casa, particao_da_casa(casa, self.particoes))})
+
+    def redimensionar(self, particoes: int) -> int:
+        """
+        Muda o número de partições, migrando as casas que mudam de dono.
+
+        Casas fixadas em partições que deixam de existir voltam ao hash.
+
+        Returns:
+            Quantas casas foram migradas.
+        """
+        if particoes < 1:
+            raise ValueError("É preciso ao menos uma partição.")
+        self._iniciar(particoes)
+        for casa, particao in list(self._fixadas.items()):
+            if particao >= particoes:
+                del self._fixadas[casa]
+        novos_donos = {
+            casa: self._fixadas.get(casa, particao_da_casa(casa, particoes)) for casa in self._dono_da_casa
+        }
+        migradas = self._migrar(novos_donos)
+        self._encerrar(particoes)
+        return migradas
+
+    def _migrar(self, novos_donos: Mapping[str, int]) -> int:
+        saindo: Dict[int, List[str]] = {}
+        for casa, novo in novos_donos.items():
+            atual = self._dono_da_casa.get(casa)
+            if atual is None:
+                self._dono_da_casa[casa] = novo
+            elif atual != novo:
+                saindo.setdefault(atual, []).append(casa)
+
+        # Todas as partições exportam ao mesmo tempo, depois todas importam.
+        for origem, casas in saindo.items():
+            self._conexoes[origem].send(("exportar", casas, False))
+        chegando: Dict[int, Dict[str, Tuple[List[Produto], List[ItemEstoque]]]] = {}
+        for origem, casas in saindo.items():
+            for casa, estado in self._conexoes[origem].recv().items():
+                chegando.setdefault(novos_donos[casa], {})[casa] = estado
+        for destino, estados in chegando.items():
+            self._conexoes[destino].send(("importar", estados, False))
+        for destino in chegando:
+            self._conexoes[destino].recv()
+
+        for casas in saindo.values():
+            for casa in casas:
+                self._dono_da_casa[casa] = novos_donos[casa]
+        return sum(len(casas) for casas in saindo.values())
@@ -0,0 +1,200 @@
+from datetime import date
+from functools import lru_cache
+from operator import mul
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from models import CupomFiscal
+
+# Códigos IBGE das unidades federativas, usados nos dois primeiros dígitos da chave.
+UF_POR_CODIGO: Dict[str, str] = {
+    "11": "RO", "12": "AC", "13": "AM", "14": "RR", "15": "PA", "16": "AP", "17": "TO",
+    "21": "MA", "22": "PI", "23": "CE", "24": "RN", "25": "PB", "26": "PE", "27": "AL",
+    "28": "SE", "29": "BA", "31": "MG", "32": "ES", "33": "RJ", "35": "SP", "41": "PR",
+    "42": "SC", "43": "RS", "50": "MS", "51": "MT", "52": "GO", "53": "DF",
+}
+
+MODELO_NFCE = "65"
+MODELO_CFE_SAT = "59"
+
+class QrCodeInvalido(ValueError):
+    """O conteúdo lido não é um QR Code de NFC-e ou CF-e SAT reconhecível."""
+
+class DadosQrCode(NamedTuple):
+    """
+    Campos extraídos do QR Code de um cupom fiscal, sem nenhuma consulta à SEFAZ.
+
+    Os campos derivados da chave de acesso estão sempre presentes; os demais
+    dependem da versão do QR Code e ficam None quando não vêm no conteúdo.
+    """
+    chave_acesso: str
+    uf: str
+    cnpj_emitente: str
+    ano_mes_emissao: date # AAMM da chave, com dia 1
+    modelo: str
+    serie: str
+    numero: str
+    tipo_emissao: str
+    versao_qr: Optional[str] = None
+    ambiente: Optional[int] = None # 1 = produção, 2 = homologação
+    data_emissao: Optional[date] = None
+    valor_total: Optional[float] = None
+    url_consulta: Optional[str] = None
+
+# Pesos do módulo 11 para os 43 dígitos, da esquerda para a direita
+# (o dígito mais à direita recebe peso 2, e os pesos ciclam de 2 a 9).
+_PESOS_CHAVE = tuple(2 + (i % 8) for i in range(43))[::-1]
+_AJUSTE_ASCII_CHAVE = ord("0") * sum(_PESOS_CHAVE)
+
+def digito_verificador_chave(chave_sem_dv: str) -> int:
+    """Calcula o dígito verificador (módulo 11, pesos 2 a 9) dos 43 primeiros dígitos da chave."""
+    # Soma direto sobre os códigos ASCII e desconta ord("0") de uma vez.
+    soma = sum(map(mul, chave_sem_dv.encode("ascii"), _PESOS_CHAVE)) - _AJUSTE_ASCII_CHAVE
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+def validar_chave_de_acesso(chave: str) -> bool:
+    """Verifica formato (44 dígitos), UF conhecida e dígito verificador da chave de acesso."""
+    return (
+        len(chave) == 44
+        and chave.isascii()
+        and chave.isdigit()
+        and chave[:2] in UF_POR_CODIGO
+        and digito_verificador_chave(chave[:43]) == int(chave[43])
+    )
+
+def _data_da_chave(chave: str) -> date:
+    mes = int(chave[4:6])
+    if not 1 <= mes <= 12:
+        raise QrCodeInvalido(f"Mês de emissão inválido na chave de acesso: {chave}")
+    return date(2000 + int(chave[2:4]), mes, 1)
+
+def _float_ou_none(valor: Optional[str]) -> Optional[float]:
+    try:
+        return float(valor) if valor else None
+    except ValueError:
+        return None
+
+def _dados_da_chave(chave: str, **campos) -> DadosQrCode:
+    chave = chave.strip()
+    if not validar_chave_de_acesso(chave):
+        raise QrCodeInvalido(f"Chave de acesso inválida: {chave!r}")
+    return DadosQrCode(
+        chave_acesso=chave,
+        uf=UF_POR_CODIGO[chave[:2]],
+        cnpj_emitente=chave[6:20],
+        ano_mes_emissao=_data_da_chave(chave),
+        modelo=chave[20:22],
+        serie=chave[22:25],
+        numero=chave[25:34],
+        tipo_emissao=chave[34],
+        **campos,
+    )
+
+def _interpretar_cfe_sat(partes: List[str]) -> DadosQrCode:
+    # chave|AAAAMMDDHHMMSS|valor|CPF/CNPJ do consumidor|assinatura
+    momento = partes[1] if len(partes) > 1 else ""
+    data_emissao = None
+    if len(momento) >= 8 and momento[:8].isdigit():
+        try:
+            data_emissao = date(int(momento[:4]), int(momento[4:6]), int(momento[6:8]))
+        except ValueError:
+            data_emissao = None
+    return _dados_da_chave(
+        partes[0],
+        data_emissao=data_emissao,
+        valor_total=_float_ou_none(partes[2] if len(partes) > 2 else None),
+    )
+
+def _interpretar_nfce_v2(p: str, url: str) -> DadosQrCode:
+    # Online: chave|versão|ambiente|cIdToken|hash
+    # Offline (contingência): chave|versão|ambiente|dia da emissão|vNF|digVal|cIdToken|hash
+    partes = p.split("|")
+    campos = {
+        "versao_qr": partes[1] if len(partes) > 1 else None,
+        "ambiente": int(partes[2]) if len(partes) > 2 and partes[2].isascii() and partes[2].isdigit() else None,
+        "url_consulta": url,
+    }
+    dados = _dados_da_chave(partes[0], **campos)
+    if len(partes) >= 8 and partes[3].isdigit():
+        try:
+            data_emissao: Optional[date] = dados.ano_mes_emissao.replace(day=int(partes[3]))
+        except ValueError:
+            data_emissao = None
+        dados = dados._replace(data_emissao=data_emissao, valor_total=_float_ou_none(partes[4]))
+    return dados
+
+def _interpretar_nfce_v1(parametros: Dict[str, str], url: str) -> DadosQrCode:
+    # chNFe=...&nVersao=100&tpAmb=1&dhEmi=<data ISO em hexadecimal>&vNF=...
+    data_emissao = None
+    dh_emi = parametros.get("dhEmi")
+    if dh_emi:
+        try:
+            data_emissao = date.fromisoformat(bytes.fromhex(dh_emi).decode("ascii")[:10])
+        except ValueError:
+            data_emissao = None
+    ambiente = parametros.get("tpAmb", "")
+    return _dados_da_chave(
+        parametros["chNFe"],
+        versao_qr=parametros.get("nVersao"),
+        ambiente=int(ambiente) if ambiente.isascii() and ambiente.isdigit() else None,
+        data_emissao=data_emissao,
+        valor_total=_float_ou_none(parametros.get("vNF")),
+        url_consulta=url,
+    )
+
+@lru_cache(maxsize=65_536)
+def interpretar_qr_code(dados_qr_code: str) -> DadosQrCode:
+    """
+    Extrai os campos de um QR Code de NFC-e (versões 1 e 2) ou CF-e SAT.
+
+    Função pura e sem acesso à rede; o resultado é memorizado por conteúdo, de
+    modo que releituras do mesmo cupom não repetem a interpretação.
+
+    Args:
+        dados_qr_code: A string lida do QR Code (URL da SEFAZ ou conteúdo do CF-e SAT).
+
+    Returns:
+        Os dados do cupom, com a chave de acesso já validada.
+
+    Raises:
+        QrCodeInvalido: Se o formato não for reconhecido ou a chave de acesso
+            for inválida (tamanho, UF ou dígito verificador).
+    """
+    dados_qr_code = dados_qr_code.strip()
+    if not dados_qr_code.lower().startswith(("http://", "https://")):
+        if "|" in dados_qr_code or len(dados_qr_code) == 44:
+            return _interpretar_cfe_sat(dados_qr_code.split("|"))
+        raise QrCodeInvalido("Conteúdo não é uma URL de consulta nem um QR Code de CF-e SAT.")
+
+    url = urlsplit(dados_qr_code)
+    parametros = dict(parse_qsl(url.query, keep_blank_values=True))
+    url_consulta = f"{url.scheme}://{url.netloc}{url.path}"
+    if "p" in parametros:
+        return _interpretar_nfce_v2(parametros["p"], url_consulta)
+    if "chNFe" in parametros:
+        return _interpretar_nfce_v1(parametros, url_consulta)
+    raise QrCodeInvalido(f"URL sem chave de acesso reconhecível: {url_consulta}")
+
+def chave_do_cupom(cupom: CupomFiscal) -> Optional[str]:
+    """Retorna a chave de acesso do cupom, ou None se o QR Code não puder ser interpretado."""
+    try:
+        return interpretar_qr_code(cupom.dados_qr_code).chave_acesso
+    except QrCodeInvalido:
+        return None
+
+def deduplicar_cupons(cupons: Iterable[CupomFiscal]) -> List[CupomFiscal]:
+    """
+    Remove releituras do mesmo cupom, mantendo a primeira ocorrência.
+
+    Cupons são comparados pela chave de acesso; os que não têm QR Code
+    reconhecível são comparados pelo conteúdo bruto do QR Code.
+    """
+    vistos = set()
+    unicos: List[CupomFiscal] = []
+    for cupom in cupons:
+        chave = chave_do_cupom(cupom) or cupom.dados_qr_code
+        if chave not in vistos:
+            vistos.add(chave)
+            unicos.append(cupom)
+    return unicos
@@ -0,0 +1,229 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from models import Produto, ItemEstoque, CupomFiscal
+from repositorio import RepositorioEstoque
+from qrcode_cupom import chave_do_cupom
+
+_PROCESSANDO = "processando"
+_CONCLUIDO = "concluido"
+
+class CupomEmProcessamento(TimeoutError):
+    """Outro worker está processando o cupom e quem chamou não pode esperar."""
+
+def chave_natural_do_cupom(cupom: CupomFiscal) -> Optional[str]:
+    """
+    Chave que identifica o mesmo cupom entre leituras diferentes.
+
+    É a chave de acesso quando o QR Code pode ser interpretado; caso contrário,
+    o próprio conteúdo do QR Code. Retorna None se o cupom não tiver QR Code.
+    """
+    return chave_do_cupom(cupom) or cupom.dados_qr_code.strip() or None
+
+class RegistroCupons:
+    """
+    Registro de cupons fiscais já processados, para tornar a ingestão idempotente.
+
+    Cada cupom é identificado por `chave_natural_do_cupom`. O registro fica em
+    SQLite (em memória por padrão, ou em arquivo para sobreviver a reinícios e
+    ser compartilhado entre processos), com a chave natural como chave primária:
+    a reserva é um `INSERT OR IGNORE`, atômico mesmo com dois processos
+    ingerindo o mesmo cupom. Os resultados recentes também ficam em um cache
+    LRU em memória, que devolve os mesmos objetos da primeira ingestão.
+
+    O registro é limitado a `capacidade` cupons; os mais antigos já
+    concluídos são descartados e, se relidos, voltam a ser processados.
+    Reservas em andamento não são descartadas antes de expirar.
+    """
+
+    def __init__(
+        self,
+        caminho: str = ":memory:",
+        capacidade: int = 100_000,
+        capacidade_memoria: int = 1_024,
+        expiracao_reserva: float = 60.0,
+    ):
+        self.capacidade = capacidade
+        self.capacidade_memoria = capacidade_memoria
+        self.expiracao_reserva = expiracao_reserva
+        self._trava = threading.RLock()
+        self._resultados: "OrderedDict[str, List[Tuple[Produto, ItemEstoque]]]" = OrderedDict()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cupons_processados (
+                chave TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                reservado_em REAL NOT NULL,
+                resultados TEXT NOT NULL DEFAULT ''
+            )
+            """
+        )
+
+    def fechar(self) -> None:
+        self._conexao.close()
+
+    def __len__(self) -> int:
+        with self._trava:
+            return self._conexao.execute("SELECT COUNT(*) FROM cupons_processados").fetchone()[0]
+
+    def __contains__(self, chave: str) -> bool:
+        """Verifica em O(1) (chave primária) se o cupom já foi processado."""
+        if chave in self._resultados:
+            return True
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT 1 FROM cupons_processados WHERE chave = ? AND estado = ?", (chave, _CONCLUIDO)
+            ).fetchone()
+        return linha is not None
+
+    def reservar(self, chave: str) -> bool:
+        """
+        Tenta reservar o processamento do cupom.
+
+        Retorna True se quem chamou deve processá-lo: a chave é nova ou a
+        reserva anterior expirou (o processo que a fez provavelmente morreu).
+        """
+        agora = time.time()
+        with self._trava:
+            cursor = self._conexao.execute(
+                "INSERT OR IGNORE INTO cupons_processados (chave, estado, reservado_em) VALUES (?, ?, ?)",
+                (chave, _PROCESSANDO, agora),
+            )
+            if cursor.rowcount == 1:
+                self._podar(agora)
+                return True
+            cursor = self._conexao.execute(
+                "UPDATE cupons_processados SET reservado_em = ? WHERE chave = ? AND estado = ? AND reservado_em < ?",
+                (agora, chave, _PROCESSANDO, agora - self.expiracao_reserva),
+            )
+            return cursor.rowcount == 1
+
+    def concluir(self, chave: str, resultados: List[Tuple[Produto, ItemEstoque]]) -> None:
+        """Marca o cupom como processado e guarda os ids dos resultados."""
+        serializados = ";".join(f"{produto.id.hex},{item.id.hex}" for produto, item in resultados)
+        with self._trava:
+            self._conexao.execute(
+                "UPDATE cupons_processados SET estado = ?, resultados = ? WHERE chave = ?",
+                (_CONCLUIDO, serializados, chave),
+            )
+            self._lembrar(chave, resultados)
+
+    def liberar(self, chave: str) -> None:
+        """Desfaz uma reserva cujo processamento falhou, permitindo nova tentativa."""
+        with self._trava:
+            self._conexao.execute(
+                "DELETE FROM cupons_processados WHERE chave = ? AND estado = ?", (chave, _PROCESSANDO)
+            )
+
+    def resultados(self, chave: str, repositorio: RepositorioEstoque) -> Optional[List[Tuple[Produto, ItemEstoque]]]:
+        """
+        Resultados da ingestão original do cupom, ou None se ele não foi concluído.
+
+        Resultados que não estão mais no cache em memória são reconstruídos a
+        partir dos ids salvos; itens que já saíram do estoque são omitidos.
+        """
+        with self._trava:
+            if chave in self._resultados:
+                self._resultados.move_to_end(chave)
+                return self._resultados[chave]
+            linha = self._conexao.execute(
+                "SELECT resultados FROM cupons_processados WHERE chave = ? AND estado = ?", (chave, _CONCLUIDO)
+            ).fetchone()
+        if linha is None:
+            return None
+
+        reconstruidos: List[Tuple[Produto, ItemEstoque]] = []
+        for par in filter(None, linha[0].split(";")):
+            produto_id, item_id = par.split(",")
+            produto = repositorio.buscar_produto_por_id(UUID(produto_id))
+            item = repositorio.buscar_item_por_id(UUID(item_id))
+            if produto is not None and item is not None:
+                reconstruidos.append((produto, item))
+        with self._trava:
+            self._lembrar(chave, reconstruidos)
+        return reconstruidos
+
+    def _lembrar(self, chave: str, resultados: List[Tuple[Produto, ItemEstoque]]) -> None:
+        self._resultados[chave] = resultados
+        self._resultados.move_to_end(chave)
+        while len(self._resultados) > self.capacidade_memoria:
+            self._resultados.popitem(last=False)
+
+    def _podar(self, agora: float) -> None:
+        # rowid cresce com as inserções, então os menores são os cupons mais
+        # antigos. Reservas em andamento ficam: apagá-las deixaria outro worker
+        # reservar e aplicar o mesmo cupom de novo. Só as já expiradas, que
+        # outro worker poderia retomar de qualquer forma, também saem.
+        self._conexao.execute(
+            """
+            DELETE FROM cupons_processados WHERE rowid <= (
+                SELECT MAX(rowid) FROM cupons_processados
+            ) - ? AND (estado = ? OR reservado_em < ?)
+            """,
+            (self.capacidade, _CONCLUIDO, agora - self.expiracao_reserva),
+        )
+
+    def processar(
+        self,
+        cupom: CupomFiscal,
+        repositorio: RepositorioEstoque,
+        espera_maxima: float = 30.0,
+        pendentes: Optional[Dict[str, List[Tuple[Produto, ItemEstoque]]]] = None,
+    ) -> List[Tuple[Produto, ItemEstoque]]:
+        """
+        Adiciona os produtos do cupom ao repositório uma única vez.
+
+        Se o cupom já foi processado, não altera o estoque e retorna os
+        resultados da primeira ingestão. Se outro worker estiver processando o
+        mesmo cupom neste momento, aguarda até `espera_maxima` segundos pelo
+        resultado dele.
+
+        Com `pendentes`, o cupom processado continua reservado e os seus
+        resultados são guardados no dicionário, pela chave, em vez de
+        concluídos: é o caso de quem chama dentro de uma transação maior do
+        repositório, que deve chamar `concluir` depois do commit e `liberar`
+        se ele falhar. Concluir antes marcaria como processado um cupom cujo
+        estoque o rollback desfez. Nesse caso também não há espera: com a
+        transação aberta, esperar travaria os outros escritores (e dois
+        importadores esperando um pelo outro só sairiam no prazo).
+
+        Raises:
+            CupomEmProcessamento: Com `pendentes`, se outro worker estiver
+                processando o cupom; quem chama tenta de novo depois do commit.
+            TimeoutError: Se o outro worker não concluir dentro do prazo.
+        """
+        chave = chave_natural_do_cupom(cupom)
+        if chave is None:
+            return repositorio.adicionar_produtos_por_cupom_fiscal(cupom)
+
+        prazo = time.monotonic() + espera_maxima
+        intervalo = 0.001
+        while True:
+            anteriores = self.resultados(chave, repositorio)
+            if anteriores is not None:
+                return anteriores
+            if self.reservar(chave):
+                break
+            if pendentes is not None:
+                raise CupomEmProcessamento(f"Cupom {chave} está em processamento por outro worker.")
+            if time.monotonic() >= prazo:
+                raise TimeoutError(f"Cupom {chave} continua em processamento por outro worker.")
+            time.sleep(intervalo)
+            intervalo = min(intervalo * 2, 0.1)
+
+        try:
+            resultados = repositorio.adicionar_produtos_por_cupom_fiscal(cupom)
+        except BaseException:
+            self.liberar(chave)
+            raise
+        if pendentes is not None:
+            pendentes[chave] = resultados
+        else:
+            self.concluir(chave, resultados)
+        return resultados
@@ -0,0 +1,432 @@
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from typing import TYPE_CHECKING, ContextManager, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from uuid import UUID, uuid4
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from unidades import fator_da_unidade, normalizar_unidade, para_unidade_base, unidade_base
+
+if TYPE_CHECKING:
+    from catalogo_gtin import EnriquecedorProdutos
+    from lista_compras import ListaDeCompras
+    from autocompletar import IndiceAutocompletar
+
+class RepositorioEstoque(ABC):
+    """
+    Base dos armazenamentos de produtos e itens de estoque.
+
+    As operações de estoque (adicionar por código de barras, por lote de
+    leituras e por cupom fiscal, e remover por código de barras) são escritas
+    aqui uma única vez sobre um pequeno conjunto de primitivas de busca e
+    gravação, que cada backend implementa: `inventario.Inventario` em memória
+    e `repositorio_sqlite.RepositorioSQLite` em arquivo.
+
+    Objetos alterados no lugar são informados ao backend por
+    `atualizar_produto`/`atualizar_item`, e cada operação roda dentro de
+    `transacao()`, o que permite a backends persistentes agrupar as gravações.
+    `travar_chave`/`travar_produto` delimitam os trechos de ler-alterar-gravar,
+    para que backends compartilhados entre threads os protejam (ver
+    `concorrencia.InventarioConcorrente`).
+
+    Quantidades são inteiros na unidade base do produto (ver `unidades`): uma
+    leitura de código de barras vale uma unidade de medida do produto (1 un,
+    1 kg...), e as quantidades do cupom são convertidas na entrada.
+    """
+
+    # Recebe os códigos de barras de produtos criados sem nome, para completá-los
+    # depois, fora do caminho da leitura (ver `catalogo_gtin.EnriquecedorProdutos`).
+    enriquecedor: Optional["EnriquecedorProdutos"] = None
+
+    # Recebe a variação do saldo de cada produto a cada operação de estoque (ver
+    # `lista_compras.ListaDeCompras`).
+    lista_de_compras: Optional["ListaDeCompras"] = None
+
+    # Recebe a mesma variação e os produtos renomeados, para as sugestões por
+    # prefixo (ver `autocompletar.IndiceAutocompletar`).
+    autocompletar: Optional["IndiceAutocompletar"] = None
+
+    # Primitivas de busca
+
+    @abstractmethod
+    def buscar_produto_por_codigo_de_barras(self, codigo_de_barras: str) -> Optional[Produto]: ...
+
+    @abstractmethod
+    def buscar_produto_por_id(self, produto_id: UUID) -> Optional[Produto]: ...
+
+    @abstractmethod
+    def buscar_produto_por_nome(self, nome: str) -> Optional[Produto]:
+        """Busca um produto pelo nome, sem diferenciar maiúsculas de minúsculas."""
+
+    def buscar_produto_parecido(self, nome: str) -> Optional[Produto]:
+        """Busca aproximada por nome; backends sem esse recurso retornam None."""
+        return None
+
+    @abstractmethod
+    def buscar_item_do_produto(self, produto_id: UUID) -> Optional[ItemEstoque]:
+        """Primeiro item de estoque do produto, na ordem de inserção."""
+
+    @abstractmethod
+    def buscar_item_por_id(self, item_id: UUID) -> Optional[ItemEstoque]: ...
+
+    def buscar_lote_para_entrada(
+        self, produto_id: UUID, data_compra: Optional[date], id_cupom: Optional[UUID]
+    ) -> Optional[ItemEstoque]:
+        """
+        Item que recebe novas unidades do produto, ou None para criar outro.
+
+        Por padrão todas as entradas vão para o primeiro item do produto;
+        backends com lotes (ver `Inventario(lotes=...)`) devolvem só o lote da
+        mesma compra.
+        """
+        return self.buscar_item_do_produto(produto_id)
+
+    def buscar_lote_para_consumo(self, produto_id: UUID) -> Optional[ItemEstoque]:
+        """Item de onde sai a próxima unidade removida; por padrão, o primeiro do produto."""
+        return self.buscar_item_do_produto(produto_id)
+
+    # Primitivas de gravação
+
+    @abstractmethod
+    def registrar_produto(self, produto: Produto) -> None: ...
+
+    @abstractmethod
+    def registrar_item(self, item: ItemEstoque) -> None: ...
+
+    @abstractmethod
+    def descartar_item(self, item: ItemEstoque) -> None: ...
+
+    def atualizar_produto(self, produto: Produto) -> None:
+        """Informa que um produto já registrado foi alterado no lugar."""
+
+    def atualizar_item(self, item: ItemEstoque) -> None:
+        """Informa que um item já registrado foi alterado no lugar."""
+
+    def tocar_produto(self, produto: Produto, momento: datetime) -> None:
+        """Marca o uso de um produto já registrado por uma operação de estoque."""
+        produto.atualizado_em = momento
+        self.atualizar_produto(produto)
+
+    def renomear_produto(self, produto: Produto, nome: str) -> None:
+        """Troca o nome de um produto já registrado; backends com índice por nome o atualizam."""
+        produto.nome = nome
+        self.atualizar_produto(produto)
+        if self.autocompletar is not None:
+            self.autocompletar.produto_alterado(produto)
+
+    def precarregar_produtos(self, codigos_de_barras: Iterable[str] = (), nomes: Iterable[str] = ()) -> None:
+        """
+        Antecipa, em lote, as buscas por código de barras e por nome que uma
+        operação vai fazer, junto com os itens de estoque dos produtos achados.
+
+        Só tem efeito dentro de uma transação de backends persistentes; em
+        memória as buscas já são O(1) e não há o que fazer.
+        """
+
+    @contextmanager
+    def transacao(self) -> Iterator[None]:
+        """Agrupa as gravações de uma operação; em memória não há o que fazer."""
+        yield
+
+    def travar_chave(self, chave: str) -> ContextManager:
+        """
+        Trava usada enquanto um produto é procurado (e, se preciso, criado)
+        por código de barras ou nome. Sem concorrência, não trava nada.
+        """
+        return nullcontext()
+
+    def travar_produto(self, produto_id: UUID) -> ContextManager:
+        """
+        Trava usada enquanto os itens de estoque de um produto são lidos e
+        alterados. É sempre adquirida depois de `travar_chave`, nunca antes.
+        """
+        return nullcontext()
+
+    def _estoque_alterado(self, produto_id: UUID, delta: int) -> None:
+        if self.lista_de_compras is not None and delta:
+            self.lista_de_compras.estoque_alterado(produto_id, delta)
+        if self.autocompletar is not None:
+            self.autocompletar.estoque_alterado(produto_id, delta)
+
+    # Operações de estoque
+
+    def adicionar_produto_por_codigo_de_barras(
+        self,
+        codigo_de_barras: str,
+        nome_produto: Optional[str] = None,
+        marca_produto: Optional[str] = None,
+        unidade_produto: Optional[str] = None,
+    ) -> Tuple[Produto, ItemEstoque]:
+        """Ver `stock_management.adicionar_produto_por_codigo_de_barras`."""
+        with self.transacao(), self.travar_chave(codigo_de_barras):
+            produto_existente = self.buscar_produto_por_codigo_de_barras(codigo_de_barras)
+
+            if produto_existente:
+                now = datetime.now()
+                self.tocar_produto(produto_existente, now)
+
+                with self.travar_produto(produto_existente.id):
+                    item_estoque_existente = self.buscar_lote_para_entrada(produto_existente.id, None, None)
+
+                    fator = fator_da_unidade(produto_existente.unidade)
+                    if item_estoque_existente:
+                        item_estoque_existente.quantidade += fator
+                        item_estoque_existente.ultima_atualizacao = now
+                        self.atualizar_item(item_estoque_existente)
+                        self._estoque_alterado(produto_existente.id, fator)
+                        return produto_existente, item_estoque_existente
+
+                    novo_item_estoque = ItemEstoque(produto_id=produto_existente.id, quantidade=fator)
+                    self.registrar_item(novo_item_estoque)
+                    self._estoque_alterado(produto_existente.id, fator)
+                    return produto_existente, novo_item_estoque
+
+            novo_produto = Produto(
+                nome=nome_produto if nome_produto else f"Produto {codigo_de_barras}",
+                codigo_de_barras=codigo_de_barras,
+                marca=marca_produto,
+                unidade=unidade_produto
+            )
+            novo_item_estoque = ItemEstoque(produto_id=novo_produto.id, quantidade=fator_da_unidade(unidade_produto))
+            with self.travar_produto(novo_produto.id):
+                self.registrar_produto(novo_produto)
+                self.registrar_item(novo_item_estoque)
+                self._estoque_alterado(novo_produto.id, novo_item_estoque.quantidade)
+            if not nome_produto and self.enriquecedor is not None:
+                self.enriquecedor.enfileirar(codigo_de_barras)
+            return novo_produto, novo_item_estoque
+
+    def adicionar_produtos_por_codigos_de_barras(
+        self,
+        codigos_de_barras: Iterable[str],
+        metadados: Optional[Mapping[str, Mapping[str, Optional[str]]]] = None,
+    ) -> Dict[str, Tuple[Produto, ItemEstoque]]:
+        """
+        Aplica uma rajada de leituras de código de barras de uma só vez.
+
+        As leituras são agrupadas por código e cada código é aplicado uma única
+        vez com a contagem total, usando um só timestamp para todo o lote. O
+        estado final é o mesmo de chamar `adicionar_produto_por_codigo_de_barras`
+        para cada leitura, na mesma ordem.
+
+        Args:
+            codigos_de_barras: Códigos lidos, com repetições.
+            metadados: Dados opcionais por código de barras, usados apenas para
+                produtos novos. Aceita as chaves `nome_produto`, `marca_produto`
+                e `unidade_produto`.
+
+        Returns:
+            Um dicionário, na ordem da primeira leitura de cada código, com o
+            Produto e o ItemEstoque resultantes, os mesmos que a última chamada
+            individual para aquele código teria retornado.
+        """
+        contagens = Counter(codigos_de_barras)
+        metadados = metadados or {}
+        resultados: Dict[str, Tuple[Produto, ItemEstoque]] = {}
+        now = datetime.now()
+
+        with self.transacao():
+            self.precarregar_produtos(codigos_de_barras=contagens)
+            for codigo_de_barras, quantidade in contagens.items():
+                with self.travar_chave(codigo_de_barras):
+                    produto = self.buscar_produto_por_codigo_de_barras(codigo_de_barras)
+                    if produto:
+                        self.tocar_produto(produto, now)
+                    else:
+                        dados = metadados.get(codigo_de_barras, {})
+                        nome_produto = dados.get("nome_produto")
+                        produto = Produto(
+                            nome=nome_produto if nome_produto else f"Produto {codigo_de_barras}",
+                            codigo_de_barras=codigo_de_barras,
+                            marca=dados.get("marca_produto"),
+                            unidade=dados.get("unidade_produto")
+                        )
+                        produto.criado_em = produto.atualizado_em = now
+                        self.registrar_produto(produto)
+                        if not nome_produto and self.enriquecedor is not None:
+                            self.enriquecedor.enfileirar(codigo_de_barras)
+
+                    with self.travar_produto(produto.id):
+                        quantidade *= fator_da_unidade(produto.unidade)
+                        item = self.buscar_lote_para_entrada(produto.id, None, None)
+                        if item:
+                            item.quantidade += quantidade
+                            item.ultima_atualizacao = now
+                            self.atualizar_item(item)
+                        else:
+                            item = ItemEstoque(produto_id=produto.id, quantidade=quantidade)
+                            item.adicionado_em = item.ultima_atualizacao = now
+                            self.registrar_item(item)
+                        self._estoque_alterado(produto.id, quantidade)
+
+                resultados[codigo_de_barras] = (produto, item)
+
+        return resultados
+
+    def adicionar_produtos_por_cupom_fiscal(
+        self, cupom: CupomFiscal
+    ) -> List[Tuple[Produto, ItemEstoque]]:
+        """Ver `stock_management.adicionar_produtos_por_cupom_fiscal`."""
+        resultados: List[Tuple[Produto, ItemEstoque]] = []
+        now = datetime.now()
+
+        with self.transacao():
+            self.precarregar_produtos(nomes=(d.nome_produto_cupom for d in cupom.detalhes_produtos_cupom))
+            # Todas as linhas são convertidas antes de alterar o estoque: uma
+            # unidade incompatível recusa o cupom inteiro sem deixar as linhas
+            # anteriores aplicadas (o Inventario não desfaz alterações).
+            linhas = self._conferir_cupom(cupom)
+            for detalhe_cupom, (produto, quantidade) in zip(cupom.detalhes_produtos_cupom, linhas):
+                with self.travar_chave(detalhe_cupom.nome_produto_cupom.lower()):
+                    resultados.append(self._adicionar_detalhe_do_cupom(cupom, detalhe_cupom, produto, quantidade, now))
+
+        return resultados
+
+    def _conferir_cupom(self, cupom: CupomFiscal) -> List[Tuple[Optional[Produto], int]]:
+        """
+        Produto encontrado (None para um produto novo) e quantidade na unidade
+        base de cada linha do cupom, sem alterar nada.
+
+        Raises:
+            ValueError: Se alguma linha tiver quantidade inválida ou de
+                grandeza diferente da unidade cadastrada no produto.
+        """
+        linhas: List[Tuple[Optional[Produto], int]] = []
+        # Unidade dos produtos que o próprio cupom vai criar, para conferir
+        # linhas repetidas antes de o produto existir.
+        novos: Dict[str, Optional[str]] = {}
+        for detalhe_cupom in cupom.detalhes_produtos_cupom:
+            nome = detalhe_cupom.nome_produto_cupom.lower()
+            produto = None
+            if nome in novos:
+                unidade = novos[nome]
+            else:
+                produto = (
+                    self.buscar_produto_por_nome(detalhe_cupom.nome_produto_cupom)
+                    or self.buscar_produto_parecido(detalhe_cupom.nome_produto_cupom)
+                )
+                if produto is not None:
+                    unidade = produto.unidade
+                else:
+                    unidade = novos[nome] = (
+                        normalizar_unidade(detalhe_cupom.unidade_cupom) if detalhe_cupom.unidade_cupom else None
+                    )
+            linhas.append((produto, self._quantidade_do_cupom(detalhe_cupom, unidade)))
+        return linhas
+
+    @staticmethod
+    def _quantidade_do_cupom(detalhe_cupom: DetalheProdutoCupom, unidade_do_produto: Optional[str]) -> int:
+        # Um produto sem unidade cadastrada é contado em embalagens: uma linha
+        # pesada ou medida (ex.: "0,5 KG" de banana) entra como uma embalagem,
+        # como a leitura do código de barras, em vez de recusar o cupom.
+        if unidade_do_produto is None and unidade_base(detalhe_cupom.unidade_cupom) != "un":
+            return 1
+        return para_unidade_base(detalhe_cupom.quantidade_cupom, detalhe_cupom.unidade_cupom, unidade_do_produto)
+
+    def _adicionar_detalhe_do_cupom(
+        self,
+        cupom: CupomFiscal,
+        detalhe_cupom: DetalheProdutoCupom,
+        produto_encontrado: Optional[Produto],
+        quantidade: int,
+        now: datetime,
+    ) -> Tuple[Produto, ItemEstoque]:
+        if produto_encontrado is None:
+            # Criado por uma linha anterior do cupom ou por outra thread desde a conferência.
+            produto_encontrado = self.buscar_produto_por_nome(detalhe_cupom.nome_produto_cupom)
+            if produto_encontrado is not None:
+                quantidade = self._quantidade_do_cupom(detalhe_cupom, produto_encontrado.unidade)
+
+        if produto_encontrado:
+            self.tocar_produto(produto_encontrado, now)
+
+            with self.travar_produto(produto_encontrado.id):
+                item_estoque_existente = self.buscar_lote_para_entrada(
+                    produto_encontrado.id, cupom.data_compra_cupom, cupom.id
+                )
+
+                if item_estoque_existente:
+                    item_estoque_existente.quantidade += quantidade
+                    item_estoque_existente.id_cupom_fiscal_origem = cupom.id
+                    item_estoque_existente.ultima_atualizacao = now
+                    item_estoque_existente.data_compra = cupom.data_compra_cupom
+                    self.atualizar_item(item_estoque_existente)
+                    self._estoque_alterado(produto_encontrado.id, quantidade)
+                    return produto_encontrado, item_estoque_existente
+
+                novo_item_estoque = ItemEstoque(
+                    produto_id=produto_encontrado.id,
+                    quantidade=quantidade,
+                    id_cupom_fiscal_origem=cupom.id,
+                    data_compra=cupom.data_compra_cupom
+                )
+                self.registrar_item(novo_item_estoque)
+                self._estoque_alterado(produto_encontrado.id, quantidade)
+                return produto_encontrado, novo_item_estoque
+
+        unidade = normalizar_unidade(detalhe_cupom.unidade_cupom) if detalhe_cupom.unidade_cupom else None
+        novo_produto = Produto(
+            nome=detalhe_cupom.nome_produto_cupom,
+            codigo_de_barras=f"SEM_COD_BARRAS_{uuid4()}",
+            unidade=unidade,
+        )
+        novo_item_estoque = ItemEstoque(
+            produto_id=novo_produto.id,
+            quantidade=quantidade,
+            id_cupom_fiscal_origem=cupom.id,
+            data_compra=cupom.data_compra_cupom
+        )
+        with self.travar_produto(novo_produto.id):
+            self.registrar_produto(novo_produto)
+            self.registrar_item(novo_item_estoque)
+            self._estoque_alterado(novo_produto.id, novo_item_estoque.quantidade)
+        return novo_produto, novo_item_estoque
+
+    def remover_produto_por_codigo_de_barras(self, codigo_de_barras: str) -> Optional[ItemEstoque]:
+        """Ver `stock_management.remover_produto_por_codigo_de_barras`."""
+        with self.transacao():
+            produto_alvo = self.buscar_produto_por_codigo_de_barras(codigo_de_barras)
+            if not produto_alvo:
+                return None # Produto não encontrado
+
+            with self.travar_produto(produto_alvo.id):
+                item_estoque_alvo = self.buscar_lote_para_consumo(produto_alvo.id)
+                if not item_estoque_alvo:
+                    return None # Item de estoque não encontrado para este produto
+
+                now = datetime.now()
+                self.tocar_produto(produto_alvo, now)
+                fator = restante = fator_da_unidade(produto_alvo.unidade)
+                while True:
+                    item_estoque_alvo.quantidade -= restante
+                    item_estoque_alvo.ultima_atualizacao = now
+                    if item_estoque_alvo.quantidade > 0:
+                        self.atualizar_item(item_estoque_alvo)
+                        self._estoque_alterado(produto_alvo.id, -fator)
+                        return item_estoque_alvo
+                    self.descartar_item(item_estoque_alvo)
+                    # Um lote fracionado menor que a unidade removida: o que
+                    # faltou sai do próximo lote.
+                    restante = -item_estoque_alvo.quantidade
+                    proximo = self.buscar_lote_para_consumo(produto_alvo.id) if restante else None
+                    if not proximo:
+                        self._estoque_alterado(produto_alvo.id, restante - fator)
+                        return None # Item removido do estoque
+                    item_estoque_alvo = proximo
+
+    def definir_validade_do_item(self, item_id: UUID, data_validade: Optional[date]) -> Optional[ItemEstoque]:
+        """Ver `stock_management.definir_validade_do_item`."""
+        with self.transacao():
+            item = self.buscar_item_por_id(item_id)
+            if not item:
+                return None
+            with self.travar_produto(item.produto_id):
+                # Busca de novo: o item pode ter sido descartado antes da trava.
+                item = self.buscar_item_por_id(item_id)
+                if not item:
+                    return None
+                item.data_validade_especifica = data_validade
+                item.ultima_atualizacao = datetime.now()
+                self.atualizar_item(item)
+                return item
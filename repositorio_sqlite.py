@@ -0,0 +1,435 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from repositorio import RepositorioEstoque
+from unidades import fator_da_unidade
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    id BLOB PRIMARY KEY,
+    nome TEXT NOT NULL,
+    nome_normalizado TEXT NOT NULL,
+    codigo_de_barras TEXT NOT NULL,
+    marca TEXT,
+    unidade TEXT,
+    data_de_validade_padrao TEXT,
+    url_imagem TEXT,
+    criado_em TEXT NOT NULL,
+    atualizado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS produtos_codigo_de_barras ON produtos (codigo_de_barras);
+CREATE INDEX IF NOT EXISTS produtos_nome_normalizado ON produtos (nome_normalizado);
+
+CREATE TABLE IF NOT EXISTS itens_estoque (
+    id BLOB PRIMARY KEY,
+    produto_id BLOB NOT NULL,
+    quantidade INTEGER NOT NULL,
+    data_compra TEXT,
+    data_validade_especifica TEXT,
+    id_cupom_fiscal_origem BLOB,
+    adicionado_em TEXT NOT NULL,
+    ultima_atualizacao TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS itens_estoque_produto_id ON itens_estoque (produto_id);
+"""
+
+# Versão do esquema, em `PRAGMA user_version`. Na versão 0, a quantidade dos
+# itens estava na própria unidade do produto (2 para 2 kg); desde a 1, está
+# na unidade base (2000000 mg, ver `unidades`).
+VERSAO_ESQUEMA = 1
+
+_COLUNAS_PRODUTO = (
+    "id, nome, codigo_de_barras, marca, unidade, data_de_validade_padrao, url_imagem, criado_em, atualizado_em"
+)
+_COLUNAS_ITEM = (
+    "id, produto_id, quantidade, data_compra, data_validade_especifica, "
+    "id_cupom_fiscal_origem, adicionado_em, ultima_atualizacao"
+)
+
+# As consultas são constantes para que o cache de statements do sqlite3 as reaproveite já preparadas.
+_SQL_PRODUTO_POR_CODIGO = f"SELECT {_COLUNAS_PRODUTO} FROM produtos WHERE codigo_de_barras = ? ORDER BY rowid LIMIT 1"
+_SQL_PRODUTO_POR_NOME = f"SELECT {_COLUNAS_PRODUTO} FROM produtos WHERE nome_normalizado = ? ORDER BY rowid LIMIT 1"
+_SQL_PRODUTO_POR_ID = f"SELECT {_COLUNAS_PRODUTO} FROM produtos WHERE id = ?"
+_SQL_ITENS_DO_PRODUTO = f"SELECT {_COLUNAS_ITEM} FROM itens_estoque WHERE produto_id = ? ORDER BY rowid"
+_SQL_ITEM_POR_ID = f"SELECT {_COLUNAS_ITEM} FROM itens_estoque WHERE id = ?"
+_SQL_GRAVAR_PRODUTO = f"""
+    INSERT INTO produtos (nome_normalizado, {_COLUNAS_PRODUTO}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        nome = excluded.nome,
+        nome_normalizado = excluded.nome_normalizado,
+        codigo_de_barras = excluded.codigo_de_barras,
+        marca = excluded.marca,
+        unidade = excluded.unidade,
+        data_de_validade_padrao = excluded.data_de_validade_padrao,
+        url_imagem = excluded.url_imagem,
+        atualizado_em = excluded.atualizado_em
+"""
+# UPSERT em vez de INSERT OR REPLACE: o rowid (ordem de inserção) é preservado.
+_SQL_GRAVAR_ITEM = f"""
+    INSERT INTO itens_estoque ({_COLUNAS_ITEM}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        quantidade = excluded.quantidade,
+        data_compra = excluded.data_compra,
+        data_validade_especifica = excluded.data_validade_especifica,
+        id_cupom_fiscal_origem = excluded.id_cupom_fiscal_origem,
+        ultima_atualizacao = excluded.ultima_atualizacao
+"""
+_SQL_DESCARTAR_ITEM = "DELETE FROM itens_estoque WHERE id = ?"
+
+# Chaves por consulta no pré-carregamento em lote, abaixo do limite de parâmetros do SQLite.
+_LOTE_CONSULTA = 500
+# Posição de cada coluna de busca em `SELECT {_COLUNAS_PRODUTO}, nome_normalizado`.
+_POSICAO_NA_LINHA = {"codigo_de_barras": 2, "nome_normalizado": 9}
+
+def _marcadores(quantidade: int) -> str:
+    return ", ".join("?" * quantidade)
+
+def _texto_data(valor: Optional[date]) -> Optional[str]:
+    return valor.isoformat() if valor is not None else None
+
+def _data(valor: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(valor) if valor is not None else None
+
+def _bytes_uuid(valor: Optional[UUID]) -> Optional[bytes]:
+    return valor.bytes if valor is not None else None
+
+def _uuid(valor: Optional[bytes]) -> Optional[UUID]:
+    return UUID(bytes=valor) if valor is not None else None
+
+class RepositorioSQLite(RepositorioEstoque):
+    """
+    Repositório persistente em SQLite, com as mesmas operações de `Inventario`.
+
+    Código de barras, nome normalizado (minúsculas) e produto_id são indexados.
+    O banco usa WAL e as consultas são constantes, reaproveitadas já preparadas
+    pelo cache de statements do módulo sqlite3.
+
+    Cada operação (uma leitura, um cupom ou um lote de leituras) roda em uma
+    única transação. Dentro dela, os objetos lidos ou criados ficam em um mapa
+    de identidade, de modo que buscas repetidas não voltam ao banco e as
+    alterações são acumuladas e gravadas de uma vez, com `executemany`, no
+    commit. Fora de uma transação, objetos devolvidos por chamadas diferentes
+    são cópias independentes das mesmas linhas.
+
+    Bancos de versões anteriores do esquema são migrados ao abrir (ver
+    `VERSAO_ESQUEMA`).
+
+    Busca aproximada por nome (`buscar_produto_parecido`) não é suportada.
+    """
+
+    def __init__(self, caminho: str = ":memory:"):
+        self._conexao = sqlite3.connect(
+            caminho, isolation_level=None, check_same_thread=False, cached_statements=256
+        )
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.executescript(_ESQUEMA)
+        self._trava = threading.RLock()
+        self._profundidade = 0
+        self._limpar_estado_da_transacao()
+        try:
+            self._migrar()
+        except BaseException:
+            self._conexao.close()
+            raise
+
+    def _versao(self) -> int:
+        return self._conexao.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrar(self) -> None:
+        """
+        Atualiza um banco de versão anterior a `VERSAO_ESQUEMA`.
+
+        Raises:
+            ValueError: Se o banco for de uma versão mais nova que esta.
+        """
+        if self._versao() == VERSAO_ESQUEMA:
+            return
+        with self.transacao():
+            # Relida dentro da transação: outra conexão pode ter migrado antes.
+            versao = self._versao()
+            if versao > VERSAO_ESQUEMA:
+                raise ValueError(f"Banco na versão {versao} do esquema; esta aceita até a {VERSAO_ESQUEMA}.")
+            if versao < 1:
+                unidades = self._conexao.execute("SELECT DISTINCT unidade FROM produtos").fetchall()
+                for (unidade,) in unidades:
+                    if fator_da_unidade(unidade) != 1:
+                        self._conexao.execute(
+                            "UPDATE itens_estoque SET quantidade = quantidade * ? "
+                            "WHERE produto_id IN (SELECT id FROM produtos WHERE unidade IS ?)",
+                            (fator_da_unidade(unidade), unidade),
+                        )
+            self._conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+
+    def fechar(self) -> None:
+        self._conexao.close()
+
+    def _limpar_estado_da_transacao(self) -> None:
+        self._produto_por_codigo: Dict[str, Optional[Produto]] = {}
+        self._produto_por_nome: Dict[str, Optional[Produto]] = {}
+        self._produto_por_id: Dict[UUID, Optional[Produto]] = {}
+        self._itens_do_produto: Dict[UUID, List[ItemEstoque]] = {}
+        self._item_por_id: Dict[UUID, Optional[ItemEstoque]] = {}
+        self._produtos_alterados: Dict[UUID, Produto] = {}
+        self._itens_alterados: Dict[UUID, ItemEstoque] = {}
+        self._itens_descartados: Set[UUID] = set()
+
+    @contextmanager
+    def transacao(self) -> Iterator[None]:
+        """
+        Abre (ou reaproveita, se aninhada) uma transação.
+
+        As gravações acumuladas são enviadas em lote no commit da transação
+        mais externa; em caso de exceção, nada é gravado.
+        """
+        with self._trava:
+            if self._profundidade == 0:
+                self._conexao.execute("BEGIN IMMEDIATE")
+            self._profundidade += 1
+            try:
+                yield
+            except BaseException:
+                self._profundidade -= 1
+                if self._profundidade == 0:
+                    self._conexao.execute("ROLLBACK")
+                    self._limpar_estado_da_transacao()
+                raise
+            self._profundidade -= 1
+            if self._profundidade == 0:
+                try:
+                    self._gravar_alteracoes()
+                    self._conexao.execute("COMMIT")
+                except BaseException:
+                    self._conexao.execute("ROLLBACK")
+                    raise
+                finally:
+                    self._limpar_estado_da_transacao()
+
+    def _gravar_alteracoes(self) -> None:
+        if self._produtos_alterados:
+            self._conexao.executemany(
+                _SQL_GRAVAR_PRODUTO, [self._linha_produto(p) for p in self._produtos_alterados.values()]
+            )
+        if self._itens_alterados:
+            self._conexao.executemany(
+                _SQL_GRAVAR_ITEM, [self._linha_item(i) for i in self._itens_alterados.values()]
+            )
+        if self._itens_descartados:
+            self._conexao.executemany(_SQL_DESCARTAR_ITEM, [(i.bytes,) for i in self._itens_descartados])
+
+    # Conversão entre linhas e objetos
+
+    @staticmethod
+    def _linha_produto(produto: Produto) -> Tuple:
+        return (
+            produto.nome.lower(),
+            produto.id.bytes,
+            produto.nome,
+            produto.codigo_de_barras,
+            produto.marca,
+            produto.unidade,
+            _texto_data(produto.data_de_validade_padrao),
+            produto.url_imagem,
+            produto.criado_em.isoformat(),
+            produto.atualizado_em.isoformat(),
+        )
+
+    @staticmethod
+    def _linha_item(item: ItemEstoque) -> Tuple:
+        return (
+            item.id.bytes,
+            item.produto_id.bytes,
+            item.quantidade,
+            _texto_data(item.data_compra),
+            _texto_data(item.data_validade_especifica),
+            _bytes_uuid(item.id_cupom_fiscal_origem),
+            item.adicionado_em.isoformat(),
+            item.ultima_atualizacao.isoformat(),
+        )
+
+    def _carregar_produto(self, linha: Optional[Tuple]) -> Optional[Produto]:
+        if linha is None:
+            return None
+        produto_id = UUID(bytes=linha[0])
+        carregado = self._produto_por_id.get(produto_id)
+        if carregado is not None:
+            return carregado
+        produto = Produto.restaurar(
+            produto_id, linha[1], linha[2], linha[3], linha[4], _data(linha[5]), linha[6],
+            datetime.fromisoformat(linha[7]), datetime.fromisoformat(linha[8]),
+        )
+        self._produto_por_id[produto_id] = produto
+        return produto
+
+    def _carregar_item(self, linha: Tuple) -> ItemEstoque:
+        item_id = UUID(bytes=linha[0])
+        carregado = self._item_por_id.get(item_id)
+        if carregado is not None:
+            return carregado
+        item = ItemEstoque.restaurar(
+            item_id, UUID(bytes=linha[1]), linha[2], _data(linha[3]), _data(linha[4]), _uuid(linha[5]),
+            datetime.fromisoformat(linha[6]), datetime.fromisoformat(linha[7]),
+        )
+        self._item_por_id[item_id] = item
+        return item
+
+    # Primitivas de busca
+
+    def buscar_produto_por_codigo_de_barras(self, codigo_de_barras: str) -> Optional[Produto]:
+        with self.transacao():
+            if codigo_de_barras not in self._produto_por_codigo:
+                linha = self._conexao.execute(_SQL_PRODUTO_POR_CODIGO, (codigo_de_barras,)).fetchone()
+                self._produto_por_codigo[codigo_de_barras] = self._carregar_produto(linha)
+            return self._produto_por_codigo[codigo_de_barras]
+
+    def buscar_produto_por_id(self, produto_id: UUID) -> Optional[Produto]:
+        with self.transacao():
+            if produto_id not in self._produto_por_id:
+                linha = self._conexao.execute(_SQL_PRODUTO_POR_ID, (produto_id.bytes,)).fetchone()
+                if linha is None:
+                    self._produto_por_id[produto_id] = None
+                else:
+                    self._carregar_produto(linha)
+            return self._produto_por_id[produto_id]
+
+    def buscar_produto_por_nome(self, nome: str) -> Optional[Produto]:
+        nome = nome.lower()
+        with self.transacao():
+            if nome not in self._produto_por_nome:
+                linha = self._conexao.execute(_SQL_PRODUTO_POR_NOME, (nome,)).fetchone()
+                self._produto_por_nome[nome] = self._carregar_produto(linha)
+            return self._produto_por_nome[nome]
+
+    def _itens(self, produto_id: UUID) -> List[ItemEstoque]:
+        itens = self._itens_do_produto.get(produto_id)
+        if itens is None:
+            linhas = self._conexao.execute(_SQL_ITENS_DO_PRODUTO, (produto_id.bytes,)).fetchall()
+            itens = self._itens_do_produto[produto_id] = [self._carregar_item(linha) for linha in linhas]
+        return itens
+
+    def buscar_item_do_produto(self, produto_id: UUID) -> Optional[ItemEstoque]:
+        with self.transacao():
+            itens = self._itens(produto_id)
+            return itens[0] if itens else None
+
+    def buscar_item_por_id(self, item_id: UUID) -> Optional[ItemEstoque]:
+        with self.transacao():
+            if item_id not in self._item_por_id:
+                linha = self._conexao.execute(_SQL_ITEM_POR_ID, (item_id.bytes,)).fetchone()
+                if linha is None:
+                    self._item_por_id[item_id] = None
+                else:
+                    self._carregar_item(linha)
+            return self._item_por_id[item_id]
+
+    def precarregar_produtos(self, codigos_de_barras: Iterable[str] = (), nomes: Iterable[str] = ()) -> None:
+        """
+        Carrega em poucas consultas `IN (...)` os produtos de uma rajada ou
+        cupom e seus itens, em vez de uma consulta por linha.
+        """
+        with self.transacao():
+            achados = self._precarregar("codigo_de_barras", codigos_de_barras, self._produto_por_codigo)
+            achados += self._precarregar("nome_normalizado", (n.lower() for n in nomes), self._produto_por_nome)
+            faltantes = list(dict.fromkeys(p.id for p in achados if p.id not in self._itens_do_produto))
+            for inicio in range(0, len(faltantes), _LOTE_CONSULTA):
+                lote = faltantes[inicio:inicio + _LOTE_CONSULTA]
+                for produto_id in lote:
+                    self._itens_do_produto[produto_id] = []
+                linhas = self._conexao.execute(
+                    f"SELECT {_COLUNAS_ITEM} FROM itens_estoque WHERE produto_id IN ({_marcadores(len(lote))}) "
+                    "ORDER BY rowid",
+                    [produto_id.bytes for produto_id in lote],
+                )
+                for linha in linhas:
+                    item = self._carregar_item(linha)
+                    self._itens_do_produto[item.produto_id].append(item)
+
+    def _precarregar(self, coluna: str, chaves: Iterable[str], mapa: Dict[str, Optional[Produto]]) -> List[Produto]:
+        faltantes = [chave for chave in dict.fromkeys(chaves) if chave not in mapa]
+        achados: List[Produto] = []
+        for inicio in range(0, len(faltantes), _LOTE_CONSULTA):
+            lote = faltantes[inicio:inicio + _LOTE_CONSULTA]
+            linhas = self._conexao.execute(
+                f"SELECT {_COLUNAS_PRODUTO}, nome_normalizado FROM produtos "
+                f"WHERE {coluna} IN ({_marcadores(len(lote))}) ORDER BY rowid",
+                lote,
+            ).fetchall()
+            for chave in lote:
+                mapa[chave] = None
+            indice_chave = _POSICAO_NA_LINHA[coluna]
+            for linha in linhas:
+                # Em ordem de rowid, o primeiro produto de cada chave é o que a busca individual retornaria.
+                if mapa[linha[indice_chave]] is None:
+                    produto = self._carregar_produto(linha)
+                    mapa[linha[indice_chave]] = produto
+                    achados.append(produto)
+        return achados
+
+    # Primitivas de gravação
+
+    def registrar_produto(self, produto: Produto) -> None:
+        with self.transacao():
+            self._produto_por_id[produto.id] = produto
+            if self._produto_por_codigo.get(produto.codigo_de_barras) is None:
+                self._produto_por_codigo[produto.codigo_de_barras] = produto
+            if self._produto_por_nome.get(produto.nome.lower()) is None:
+                self._produto_por_nome[produto.nome.lower()] = produto
+            self._produtos_alterados[produto.id] = produto
+
+    def registrar_item(self, item: ItemEstoque) -> None:
+        with self.transacao():
+            self._itens(item.produto_id).append(item)
+            self._item_por_id[item.id] = item
+            self._itens_alterados[item.id] = item
+
+    def descartar_item(self, item: ItemEstoque) -> None:
+        with self.transacao():
+            itens = self._itens(item.produto_id)
+            if item in itens:
+                itens.remove(item)
+            self._item_por_id[item.id] = None
+            self._itens_alterados.pop(item.id, None)
+            self._itens_descartados.add(item.id)
+
+    def atualizar_produto(self, produto: Produto) -> None:
+        with self.transacao():
+            self._produtos_alterados[produto.id] = produto
+
+    def atualizar_item(self, item: ItemEstoque) -> None:
+        with self.transacao():
+            self._itens_alterados[item.id] = item
+
+    def renomear_produto(self, produto: Produto, nome: str) -> None:
+        """
+        Troca o nome e tira do mapa de identidade os dois nomes, o antigo e o
+        novo, para que as próximas buscas por nome nesta transação voltem ao
+        banco. Os produtos pendentes são gravados já (o commit os regrava),
+        senão o banco ainda acharia o produto pelo nome antigo.
+        """
+        with self.transacao():
+            anterior = produto.nome.lower()
+            super().renomear_produto(produto, nome)
+            self._conexao.executemany(
+                _SQL_GRAVAR_PRODUTO, [self._linha_produto(p) for p in self._produtos_alterados.values()]
+            )
+            self._produto_por_nome.pop(anterior, None)
+            self._produto_por_nome.pop(nome.lower(), None)
+
+    # Consultas de conveniência
+
+    def listar_produtos(self) -> List[Produto]:
+        """Todos os produtos, na ordem de inserção."""
+        with self.transacao():
+            linhas = self._conexao.execute(f"SELECT {_COLUNAS_PRODUTO} FROM produtos ORDER BY rowid").fetchall()
+            return [self._carregar_produto(linha) for linha in linhas] # type: ignore
+
+    def listar_estoque(self) -> List[ItemEstoque]:
+        """Todos os itens de estoque, na ordem de inserção."""
+        with self.transacao():
+            linhas = self._conexao.execute(f"SELECT {_COLUNAS_ITEM} FROM itens_estoque ORDER BY rowid").fetchall()
+            return [self._carregar_item(linha) for linha in linhas]
@@ -0,0 +1,161 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models import Produto, ItemEstoque, CupomFiscal
+from repositorio import RepositorioEstoque
+
+LOTE_MAXIMO_PADRAO = 256
+
+# (nome do método do repositório, argumentos, futuro de quem pediu)
+_Comando = Tuple[str, tuple, asyncio.Future]
+
+class _Casa:
+    __slots__ = ("repositorio", "fila", "tarefa")
+
+    def __init__(self, repositorio: RepositorioEstoque):
+        self.repositorio = repositorio
+        self.fila: "asyncio.Queue[Optional[_Comando]]" = asyncio.Queue()
+        self.tarefa: Optional[asyncio.Task] = None
+
+class ServicoEstoque:
+    """
+    Camada asyncio sobre as operações de estoque, uma fila de escrita por casa.
+
+    Cada casa (identificada por uma string) tem seu próprio repositório, criado
+    sob demanda por `fabrica_repositorio`, e uma única tarefa que consome sua
+    fila: as escritas de uma casa são aplicadas exatamente na ordem em que
+    chegaram, e casas diferentes não esperam umas pelas outras.
+
+    A tarefa junta tudo o que já estiver na fila (até `lote_maximo` comandos)
+    e aplica o lote dentro de uma única `transacao()` do repositório, de modo
+    que rajadas de requisições viram um único commit. Com `em_thread=True`
+    (o padrão) o lote roda em uma thread auxiliar e o event loop nunca
+    bloqueia em I/O do armazenamento; para repositórios só em memória,
+    `em_thread=False` evita o custo da troca de thread.
+
+    Um comando que falha devolve a exceção apenas para quem o pediu; os
+    demais comandos do lote seguem normalmente e, como nas funções
+    síncronas, o que o comando já tinha alterado antes da falha permanece.
+    """
+
+    def __init__(
+        self,
+        fabrica_repositorio: Callable[[str], RepositorioEstoque],
+        lote_maximo: int = LOTE_MAXIMO_PADRAO,
+        em_thread: bool = True,
+    ):
+        self.fabrica_repositorio = fabrica_repositorio
+        self.lote_maximo = lote_maximo
+        self.em_thread = em_thread
+        self._casas: Dict[str, _Casa] = {}
+        self._fechado = False
+
+    async def __aenter__(self) -> "ServicoEstoque":
+        return self
+
+    async def __aexit__(self, *excecao) -> None:
+        await self.fechar()
+
+    def repositorio(self, casa: str) -> RepositorioEstoque:
+        """Repositório da casa, criado na primeira vez que é pedido."""
+        return self._casa(casa).repositorio
+
+    def _casa(self, casa: str) -> _Casa:
+        estado = self._casas.get(casa)
+        if estado is None:
+            estado = self._casas[casa] = _Casa(self.fabrica_repositorio(casa))
+        return estado
+
+    async def fechar(self) -> None:
+        """Aplica o que já está nas filas e encerra as tarefas de todas as casas."""
+        self._fechado = True
+        for estado in self._casas.values():
+            if estado.tarefa is not None:
+                estado.fila.put_nowait(None)
+        await asyncio.gather(*(e.tarefa for e in self._casas.values() if e.tarefa is not None))
+
+    # Operações
+
+    async def adicionar_produto_por_codigo_de_barras(
+        self,
+        casa: str,
+        codigo_de_barras: str,
+        nome_produto: Optional[str] = None,
+        marca_produto: Optional[str] = None,
+        unidade_produto: Optional[str] = None,
+    ) -> Tuple[Produto, ItemEstoque]:
+        """Versão assíncrona de `stock_management.adicionar_produto_por_codigo_de_barras`."""
+        return await self._enfileirar(
+            casa,
+            "adicionar_produto_por_codigo_de_barras",
+            codigo_de_barras, nome_produto, marca_produto, unidade_produto,
+        )
+
+    async def adicionar_produtos_por_cupom_fiscal(
+        self, casa: str, cupom: CupomFiscal
+    ) -> List[Tuple[Produto, ItemEstoque]]:
+        """Versão assíncrona de `stock_management.adicionar_produtos_por_cupom_fiscal`."""
+        return await self._enfileirar(casa, "adicionar_produtos_por_cupom_fiscal", cupom)
+
+    async def remover_produto_por_codigo_de_barras(self, casa: str, codigo_de_barras: str) -> Optional[ItemEstoque]:
+        """Versão assíncrona de `stock_management.remover_produto_por_codigo_de_barras`."""
+        return await self._enfileirar(casa, "remover_produto_por_codigo_de_barras", codigo_de_barras)
+
+    # Fila por casa
+
+    async def _enfileirar(self, casa: str, operacao: str, *argumentos) -> Any:
+        if self._fechado:
+            raise RuntimeError("Serviço de estoque já foi fechado.")
+        estado = self._casa(casa)
+        if estado.tarefa is None:
+            estado.tarefa = asyncio.get_running_loop().create_task(self._consumir(estado))
+        futuro = asyncio.get_running_loop().create_future()
+        estado.fila.put_nowait((operacao, argumentos, futuro))
+        return await futuro
+
+    async def _consumir(self, estado: _Casa) -> None:
+        while True:
+            lote: List[_Comando] = []
+            comando = await estado.fila.get()
+            encerrar = comando is None
+            if not encerrar:
+                lote.append(comando)
+            while not encerrar and len(lote) < self.lote_maximo and not estado.fila.empty():
+                comando = estado.fila.get_nowait()
+                if comando is None:
+                    encerrar = True
+                else:
+                    lote.append(comando)
+
+            if lote:
+                try:
+                    if self.em_thread:
+                        respostas = await asyncio.to_thread(self._aplicar_lote, estado.repositorio, lote)
+                    else:
+                        respostas = self._aplicar_lote(estado.repositorio, lote)
+                except Exception as erro:
+                    # Falha no commit do lote: nenhum comando dele foi gravado.
+                    respostas = [(None, erro)] * len(lote)
+                # Os futuros só podem ser resolvidos na thread do event loop.
+                for (_, _, futuro), (resultado, erro) in zip(lote, respostas):
+                    if futuro.cancelled():
+                        continue
+                    if erro is not None:
+                        futuro.set_exception(erro)
+                    else:
+                        futuro.set_result(resultado)
+            if encerrar:
+                return
+
+    @staticmethod
+    def _aplicar_lote(
+        repositorio: RepositorioEstoque, lote: List[_Comando]
+    ) -> List[Tuple[Any, Optional[BaseException]]]:
+        respostas: List[Tuple[Any, Optional[BaseException]]] = []
+        with repositorio.transacao():
+            for operacao, argumentos, _ in lote:
+                try:
+                    respostas.append((getattr(repositorio, operacao)(*argumentos), None))
+                except Exception as erro:
+                    respostas.append((None, erro))
+        return respostas
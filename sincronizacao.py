@@ -0,0 +1,422 @@
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+from codificacao import datetime_para_int, int_para_datetime, date_para_int, int_para_date, dados_do_produto
+
+# Relógio lógico híbrido: (microssegundos do relógio, contador, réplica). Os
+# carimbos de uma réplica só crescem e carimbos de réplicas diferentes nunca
+# empatam, então a comparação de tuplas decide qualquer conflito.
+Carimbo = Tuple[int, int, str]
+
+class RegistroAlterado(NamedTuple):
+    """Estado atual de um produto ou item alterado, só com as partes que mudaram."""
+    id: UUID
+    carimbo: Optional[Carimbo] # Da última gravação dos dados; None se só o momento mudou
+    dados: Optional[tuple]
+    momento: Optional[datetime] # atualizado_em / ultima_atualizacao; None se não mudou
+
+class Contribuicao(NamedTuple):
+    """O quanto uma réplica somou (entradas menos saídas) à quantidade de um item."""
+    item_id: UUID
+    replica: str
+    valor: int # Na unidade base do produto (ver `unidades`)
+    carimbo: Carimbo
+
+class Alteracoes(NamedTuple):
+    """O que mudou em uma réplica desde uma versão."""
+    replica: str # Quem enviou
+    versao: int # Versão atual de quem enviou; a próxima consulta parte dela
+    produtos: List[RegistroAlterado]
+    itens: List[RegistroAlterado]
+    quantidades: List[Contribuicao]
+
+_PRODUTO, _ITEM = 0, 1
+_DADOS, _MOMENTO = 0, 1 # As contribuições são indexadas pelo nome da réplica
+
+class _EstadoProduto:
+    __slots__ = ("carimbo", "dados", "momento")
+
+    def __init__(self) -> None:
+        self.carimbo: Optional[Carimbo] = None
+        self.dados: Optional[tuple] = None
+        self.momento: Optional[datetime] = None
+
+class _EstadoItem(_EstadoProduto):
+    __slots__ = ("contribuicoes", "quantidade")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.contribuicoes: Dict[str, Tuple[int, Carimbo]] = {}
+        self.quantidade = 0 # Soma das contribuições
+
+def _dados_do_item(item: ItemEstoque) -> tuple:
+    return (
+        item.produto_id, item.data_compra, item.data_validade_especifica,
+        item.id_cupom_fiscal_origem, item.adicionado_em,
+    )
+
+class InventarioSincronizado(Inventario):
+    """
+    `Inventario` que troca só as alterações com outras réplicas (celular e servidor).
+
+    Cada produto e cada item é versionado em partes que se combinam sem
+    coordenação:
+
+    - os dados (nome, marca, validade...) são um registro em que vale a
+      última gravação, pelo carimbo de um relógio lógico híbrido: o horário
+      da gravação, um contador para desempatar e o nome da réplica. Assim
+      vence a edição mais recente mesmo entre aparelhos que ficaram offline,
+      sem que um relógio atrasado desfaça a causalidade;
+    - `atualizado_em`/`ultima_atualizacao` ficam com o maior valor visto,
+      então as leituras que só tocam o produto não disputam com as edições;
+    - a quantidade de um item é um contador: cada réplica mantém o quanto ela
+      somou (entradas menos saídas), e a quantidade é a soma das
+      contribuições. Duas casas que adicionam uma unidade offline terminam
+      com duas a mais, não com uma. O item existe enquanto a soma é
+      positiva; uma réplica que zerou um item enquanto outra o repunha vê o
+      item voltar.
+
+    Cada parte alterada (localmente ou recebida) recebe a próxima versão
+    local e vai para o fim de uma `OrderedDict`, como em
+    `lista_compras.ListaDeCompras`: `alteracoes_desde(v)` percorre só as k
+    partes alteradas depois de `v`, em O(k), e envia o estado atual de cada
+    registro uma única vez. Quem recebe aplica o lote inteiro em uma
+    passagem com `aplicar`, na ordem que for: a combinação é comutativa e
+    idempotente, então lotes repetidos ou cruzados convergem ao mesmo estado.
+    Com `para`, ficam de fora as partes que vieram dessa réplica, que não
+    precisam voltar.
+
+    As alterações locais são capturadas nas primitivas de gravação, como em
+    `historico.InventarioComHistorico`. O conteúdo inicial (`produtos` e
+    `estoque`) conta como alteração desta réplica: as demais devem começar
+    vazias e recebê-lo pela sincronização, senão as quantidades iniciais
+    seriam somadas duas vezes. Produtos com o mesmo código de barras criados
+    offline em duas réplicas continuam sendo dois produtos, com ids
+    diferentes.
+    """
+
+    def __init__(
+        self,
+        replica: str,
+        produtos: Optional[List[Produto]] = None,
+        estoque: Optional[List[ItemEstoque]] = None,
+        **opcoes,
+    ):
+        super().__init__(produtos, estoque, **opcoes)
+        self.replica = replica
+        self._fisico = 0
+        self._logico = 0
+        self._produtos_versionados: Dict[UUID, _EstadoProduto] = {}
+        self._itens_versionados: Dict[UUID, _EstadoItem] = {}
+        # (tipo, id, parte) -> (versão da última alteração, réplica de onde veio),
+        # da mais antiga à mais recente.
+        self._alteracoes: "OrderedDict[Tuple[int, UUID, Union[int, str]], Tuple[int, str]]" = OrderedDict()
+        self._versao = 0
+        self._aplicando = False
+        for produto in self.produtos:
+            self._versionar_produto(produto)
+        for item in self.estoque:
+            self._versionar_item(item, item.quantidade)
+
+    @property
+    def versao(self) -> int:
+        return self._versao
+
+    # Relógio
+
+    def _carimbar(self) -> Carimbo:
+        agora = datetime_para_int(datetime.now())
+        if agora > self._fisico:
+            self._fisico, self._logico = agora, 0
+        else:
+            self._logico += 1
+        return (self._fisico, self._logico, self.replica)
+
+    def _receber(self, carimbo: Carimbo) -> None:
+        fisico, logico, _ = carimbo
+        if fisico > self._fisico:
+            self._fisico, self._logico = fisico, logico
+        elif fisico == self._fisico and logico > self._logico:
+            self._logico = logico
+
+    def _marcar(self, chave: Tuple[int, UUID, Union[int, str]], origem: str) -> None:
+        self._versao += 1
+        self._alteracoes[chave] = (self._versao, origem)
+        self._alteracoes.move_to_end(chave)
+
+    # Alterações locais
+
+    def _versionar_produto(self, produto: Produto) -> None:
+        estado = self._produtos_versionados.get(produto.id)
+        if estado is None:
+            estado = self._produtos_versionados[produto.id] = _EstadoProduto()
+        dados = dados_do_produto(produto)
+        if dados != estado.dados:
+            estado.carimbo, estado.dados = self._carimbar(), dados
+            self._marcar((_PRODUTO, produto.id, _DADOS), self.replica)
+        if estado.momento is None or produto.atualizado_em > estado.momento:
+            estado.momento = produto.atualizado_em
+            self._marcar((_PRODUTO, produto.id, _MOMENTO), self.replica)
+
+    def _versionar_item(self, item: ItemEstoque, quantidade: int) -> None:
+        estado = self._itens_versionados.get(item.id)
+        if estado is None:
+            estado = self._itens_versionados[item.id] = _EstadoItem()
+        dados = _dados_do_item(item)
+        if dados != estado.dados:
+            estado.carimbo, estado.dados = self._carimbar(), dados
+            self._marcar((_ITEM, item.id, _DADOS), self.replica)
+        delta = quantidade - estado.quantidade
+        if delta:
+            valor = estado.contribuicoes[self.replica][0] if self.replica in estado.contribuicoes else 0
+            estado.contribuicoes[self.replica] = (valor + delta, self._carimbar())
+            estado.quantidade = quantidade
+            self._marcar((_ITEM, item.id, self.replica), self.replica)
+        if estado.momento is None or item.ultima_atualizacao > estado.momento:
+            estado.momento = item.ultima_atualizacao
+            self._marcar((_ITEM, item.id, _MOMENTO), self.replica)
+
+    def registrar_produto(self, produto: Produto) -> None:
+        super().registrar_produto(produto)
+        if not self._aplicando:
+            self._versionar_produto(produto)
+
+    def atualizar_produto(self, produto: Produto) -> None:
+        super().atualizar_produto(produto)
+        if not self._aplicando:
+            self._versionar_produto(produto)
+
+    def registrar_item(self, item: ItemEstoque) -> None:
+        super().registrar_item(item)
+        if not self._aplicando:
+            self._versionar_item(item, item.quantidade)
+
+    def atualizar_item(self, item: ItemEstoque) -> None:
+        super().atualizar_item(item)
+        if not self._aplicando:
+            self._versionar_item(item, item.quantidade)
+
+    def descartar_item(self, item: ItemEstoque) -> None:
+        super().descartar_item(item)
+        if not self._aplicando:
+            # A remoção deixa a quantidade em zero ou abaixo (o que faltou sai do próximo lote).
+            self._versionar_item(item, min(item.quantidade, 0))
+
+    # Sincronização
+
+    def alteracoes_desde(self, versao: int, para: Optional[str] = None) -> Alteracoes:
+        """
+        Alterações desta réplica depois da versão `versao`.
+
+        Args:
+            versao: A última versão desta réplica que o destino conhece; 0
+                para tudo.
+            para: O nome da réplica de destino, para não lhe devolver o que
+                veio dela.
+
+        Returns:
+            Cada produto e item alterado uma única vez, com os dados se eles
+            mudaram e o momento se ele mudou, as contribuições alteradas às
+            quantidades e a versão atual.
+        """
+        produtos: Dict[UUID, List] = {}
+        itens: Dict[UUID, List] = {}
+        quantidades: List[Contribuicao] = []
+        for (tipo, id_, parte), (alterado_em, origem) in reversed(self._alteracoes.items()):
+            if alterado_em <= versao:
+                break
+            if origem == para:
+                continue
+            if tipo == _PRODUTO:
+                estado: _EstadoProduto = self._produtos_versionados[id_]
+                registro = produtos.setdefault(id_, [None, None, None])
+            else:
+                estado = self._itens_versionados[id_]
+                if isinstance(parte, str):
+                    valor, carimbo = estado.contribuicoes[parte] # type: ignore[attr-defined]
+                    quantidades.append(Contribuicao(id_, parte, valor, carimbo))
+                    continue
+                registro = itens.setdefault(id_, [None, None, None])
+            if parte == _DADOS:
+                registro[0], registro[1] = estado.carimbo, estado.dados
+            else:
+                registro[2] = estado.momento
+        return Alteracoes(
+            self.replica, self._versao,
+            [RegistroAlterado(id_, *registro) for id_, registro in produtos.items()],
+            [RegistroAlterado(id_, *registro) for id_, registro in itens.items()],
+            quantidades,
+        )
+
+    def aplicar(self, alteracoes: Alteracoes) -> int:
+        """
+        Combina as alterações de outra réplica com as desta, em uma passagem.
+
+        Primeiro as partes recebidas são combinadas com as versionadas aqui
+        (dados pelo carimbo mais recente, momentos pelo maior, contribuições
+        pela mais recente de cada réplica); depois cada registro afetado é
+        materializado uma vez no inventário, avisando a lista de compras e o
+        autocompletar das variações de saldo.
+
+        Returns:
+            Quantos produtos e itens mudaram nesta réplica.
+        """
+        origem = alteracoes.replica
+        produtos_alterados: Set[UUID] = set()
+        itens_alterados: Set[UUID] = set()
+
+        for registros, versionados, tipo, alterados, novo in (
+            (alteracoes.produtos, self._produtos_versionados, _PRODUTO, produtos_alterados, _EstadoProduto),
+            (alteracoes.itens, self._itens_versionados, _ITEM, itens_alterados, _EstadoItem),
+        ):
+            for id_, carimbo, dados, momento in registros:
+                estado = versionados.get(id_)
+                if estado is None:
+                    estado = versionados[id_] = novo()
+                if carimbo is not None:
+                    self._receber(carimbo)
+                    if estado.carimbo is None or carimbo > estado.carimbo:
+                        estado.carimbo, estado.dados = carimbo, dados
+                        self._marcar((tipo, id_, _DADOS), origem)
+                        alterados.add(id_)
+                if momento is not None and (estado.momento is None or momento > estado.momento):
+                    estado.momento = momento
+                    self._marcar((tipo, id_, _MOMENTO), origem)
+                    alterados.add(id_)
+
+        for item_id, replica, valor, carimbo in alteracoes.quantidades:
+            self._receber(carimbo)
+            estado_item = self._itens_versionados.get(item_id)
+            if estado_item is None:
+                estado_item = self._itens_versionados[item_id] = _EstadoItem()
+            atual = estado_item.contribuicoes.get(replica)
+            if atual is None or carimbo > atual[1]:
+                estado_item.quantidade += valor - (atual[0] if atual is not None else 0)
+                estado_item.contribuicoes[replica] = (valor, carimbo)
+                self._marcar((_ITEM, item_id, replica), origem)
+                itens_alterados.add(item_id)
+
+        with self.transacao():
+            self._aplicando = True
+            try:
+                for produto_id in produtos_alterados:
+                    self._materializar_produto(produto_id, self._produtos_versionados[produto_id])
+                for item_id in itens_alterados:
+                    self._materializar_item(item_id, self._itens_versionados[item_id])
+            finally:
+                self._aplicando = False
+        return len(produtos_alterados) + len(itens_alterados)
+
+    def _materializar_produto(self, produto_id: UUID, estado: _EstadoProduto) -> None:
+        if estado.dados is None:
+            return # Só o momento chegou; os dados virão de quem os tem
+        nome, codigo_de_barras, marca, unidade, validade_padrao, url_imagem, criado_em = estado.dados
+        momento = estado.momento or criado_em
+        produto = self.buscar_produto_por_id(produto_id)
+        if produto is None:
+            self.registrar_produto(Produto.restaurar(
+                produto_id, nome, codigo_de_barras, marca, unidade, validade_padrao, url_imagem, criado_em, momento,
+            ))
+            return
+        if self.catalogo is not None and self.catalogo.compartilhado(produto):
+            produto = self._copiar_do_catalogo(produto)
+        produto.atualizado_em = max(produto.atualizado_em, momento)
+        if dados_do_produto(produto) == estado.dados:
+            self.atualizar_produto(produto)
+            return
+        (produto.codigo_de_barras, produto.marca, produto.unidade,
+         produto.data_de_validade_padrao, produto.url_imagem, produto.criado_em) = estado.dados[1:]
+        if nome != produto.nome:
+            self.renomear_produto(produto, nome)
+        else:
+            self.atualizar_produto(produto)
+            if self.autocompletar is not None:
+                self.autocompletar.produto_alterado(produto)
+
+    def _materializar_item(self, item_id: UUID, estado: _EstadoItem) -> None:
+        item = self.buscar_item_por_id(item_id)
+        if item is None:
+            if estado.quantidade > 0 and estado.dados is not None:
+                produto_id, data_compra, validade, cupom, adicionado_em = estado.dados
+                self.registrar_item(ItemEstoque.restaurar(
+                    item_id, produto_id, estado.quantidade, data_compra, validade, cupom,
+                    adicionado_em, estado.momento or adicionado_em,
+                ))
+                self._estoque_alterado(produto_id, estado.quantidade)
+            return
+        if estado.quantidade <= 0:
+            self.descartar_item(item)
+            self._estoque_alterado(item.produto_id, -item.quantidade)
+            return
+        delta = estado.quantidade - item.quantidade
+        item.quantidade = estado.quantidade
+        if estado.dados is not None:
+            _, item.data_compra, item.data_validade_especifica, item.id_cupom_fiscal_origem, item.adicionado_em = estado.dados
+        if estado.momento is not None and estado.momento > item.ultima_atualizacao:
+            item.ultima_atualizacao = estado.momento
+        self.atualizar_item(item)
+        if delta:
+            self._estoque_alterado(item.produto_id, delta)
+
+# Transporte
+
+def _momento(valor: Optional[datetime]) -> Optional[int]:
+    return datetime_para_int(valor) if valor is not None else None
+
+def _de_momento(valor: Optional[int]) -> Optional[datetime]:
+    return int_para_datetime(valor) if valor is not None else None
+
+def _carimbo(valor: Optional[Carimbo]) -> Optional[list]:
+    return list(valor) if valor is not None else None
+
+def _de_carimbo(valor: Optional[list]) -> Optional[Carimbo]:
+    return (valor[0], valor[1], valor[2]) if valor is not None else None
+
+def codificar_alteracoes(alteracoes: Alteracoes) -> bytes:
+    """
+    Serializa as alterações em JSON compacto, para enviar pela rede.
+
+    Ids viram hexadecimal, datas o dia ordinal (0 sem data) e instantes
+    microssegundos desde a época, cada registro uma lista posicional.
+    """
+    produtos = []
+    for id_, carimbo, dados, momento in alteracoes.produtos:
+        if dados is not None:
+            nome, codigo_de_barras, marca, unidade, validade_padrao, url_imagem, criado_em = dados
+            dados = [nome, codigo_de_barras, marca, unidade, date_para_int(validade_padrao), url_imagem, _momento(criado_em)]
+        produtos.append([id_.hex, _carimbo(carimbo), dados, _momento(momento)])
+    itens = []
+    for id_, carimbo, dados, momento in alteracoes.itens:
+        if dados is not None:
+            produto_id, data_compra, validade, cupom, adicionado_em = dados
+            dados = [produto_id.hex, date_para_int(data_compra), date_para_int(validade), cupom.hex if cupom else None, _momento(adicionado_em)]
+        itens.append([id_.hex, _carimbo(carimbo), dados, _momento(momento)])
+    quantidades = [[item_id.hex, replica, valor, list(carimbo)] for item_id, replica, valor, carimbo in alteracoes.quantidades]
+    return json.dumps(
+        [alteracoes.replica, alteracoes.versao, produtos, itens, quantidades], ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+def decodificar_alteracoes(dados: bytes) -> Alteracoes:
+    """Inverso de `codificar_alteracoes`."""
+    replica, versao, produtos, itens, quantidades = json.loads(dados)
+    return Alteracoes(
+        replica, versao,
+        [
+            RegistroAlterado(UUID(id_), _de_carimbo(carimbo), (
+                d[0], d[1], d[2], d[3], int_para_date(d[4]), d[5], _de_momento(d[6])
+            ) if d is not None else None, _de_momento(momento))
+            for id_, carimbo, d, momento in produtos
+        ],
+        [
+            RegistroAlterado(UUID(id_), _de_carimbo(carimbo), (
+                UUID(d[0]), int_para_date(d[1]), int_para_date(d[2]), UUID(d[3]) if d[3] else None, _de_momento(d[4])
+            ) if d is not None else None, _de_momento(momento))
+            for id_, carimbo, d, momento in itens
+        ],
+        [Contribuicao(UUID(item_id), replica_, valor, _de_carimbo(carimbo)) for item_id, replica_, valor, carimbo in quantidades], # type: ignore[misc]
+    )
@@ -1,8 +1,27 @@
-from typing import List, Tuple, Optional
-from uuid import uuid4, UUID
-from datetime import datetime
-
-from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, Tuple, Optional
+from uuid import UUID
+
+from models import Produto, ItemEstoque, CupomFiscal
+from inventario import Inventario
+from registro_cupons import RegistroCupons
+from metricas import Metricas
+
+# As funções abaixo mantêm a API baseada em listas e delegam para `Inventario`.
+# Sem estado entre chamadas, operações com um único código de barras continuam
+# lineares; quem faz muitas operações sobre o mesmo estoque deve manter uma
+# instância de `Inventario` e usar seus métodos, que buscam em O(1).
+
+# Se definido, as operações abaixo são medidas por ele (ver `metricas.Metricas`).
+# Os tamanhos exportados com `repositorio="stock_management"` são os das
+# listas recebidas na chamada mais recente.
+metricas: Optional[Metricas] = None
+
+def _inventario(produtos_cadastrados: List[Produto], estoque: List[ItemEstoque], **opcoes) -> Inventario:
+    inventario = Inventario(produtos_cadastrados, estoque, **opcoes)
+    if metricas is not None:
+        metricas.instrumentar(inventario, nome="stock_management")
+    return inventario
 
 def adicionar_produto_por_codigo_de_barras(
     codigo_de_barras: str,
@@ -16,7 +35,8 @@ def adicionar_produto_por_codigo_de_barras(
     Adiciona um produto ao estoque utilizando seu código de barras.
 
     Se o produto já estiver cadastrado, incrementa a quantidade do item de estoque
-    correspondente ou cria um novo item de estoque se não existir.
+    correspondente em uma unidade de medida do produto (1 un, 1 kg...) ou cria
+    um novo item de estoque se não existir.
     Se o produto não estiver cadastrado, cria um novo produto e um novo item de estoque.
 
     Args:
@@ -30,149 +50,73 @@ def adicionar_produto_por_codigo_de_barras(
     Returns:
         Uma tupla contendo o objeto Produto e o objeto ItemEstoque (novo ou atualizado).
     """
-    produto_existente: Optional[Produto] = None
-    for p in produtos_cadastrados:
-        if p.codigo_de_barras == codigo_de_barras:
-            produto_existente = p
-            break
-
-    item_estoque_existente: Optional[ItemEstoque] = None
-    now = datetime.now()
-
-    if produto_existente:
-        produto_existente.atualizado_em = now
-        # Produto já cadastrado, procurar no estoque
-        for item in estoque:
-            if item.produto_id == produto_existente.id:
-                item_estoque_existente = item
-                break
-        
-        if item_estoque_existente:
-            item_estoque_existente.quantidade += 1
-            item_estoque_existente.ultima_atualizacao = now
-            return produto_existente, item_estoque_existente
-        else:
-            # Produto cadastrado, mas não há item de estoque para ele
-            novo_item_estoque = ItemEstoque(
-                produto_id=produto_existente.id,
-                quantidade=1
-            )
-            # novo_item_estoque.ultima_atualizacao já é now() pelo construtor
-            estoque.append(novo_item_estoque)
-            return produto_existente, novo_item_estoque
-    else:
-        # Produto não cadastrado, criar novo produto e novo item de estoque
-        # novo_produto e novo_item_estoque terão seus timestamps definidos por seus construtores
-        novo_produto = Produto(
-            nome=nome_produto if nome_produto else f"Produto {codigo_de_barras}",
-            codigo_de_barras=codigo_de_barras,
-            marca=marca_produto,
-            unidade=unidade_produto
-        )
-        produtos_cadastrados.append(novo_produto)
-
-        novo_item_estoque = ItemEstoque(
-            produto_id=novo_produto.id,
-            quantidade=1
-        )
-        estoque.append(novo_item_estoque)
-        return novo_produto, novo_item_estoque
+    return _inventario(produtos_cadastrados, estoque, indexar=False).adicionar_produto_por_codigo_de_barras(
+        codigo_de_barras, nome_produto, marca_produto, unidade_produto
+    )
+
+def adicionar_produtos_por_codigos_de_barras(
+    codigos_de_barras: Iterable[str],
+    produtos_cadastrados: List[Produto],
+    estoque: List[ItemEstoque],
+    metadados: Optional[Mapping[str, Mapping[str, Optional[str]]]] = None,
+) -> Dict[str, Tuple[Produto, ItemEstoque]]:
+    """
+    Adiciona ao estoque um lote de leituras de código de barras.
+
+    Leituras repetidas são agrupadas e aplicadas de uma vez, com um único
+    timestamp. O resultado final equivale a chamar
+    `adicionar_produto_por_codigo_de_barras` para cada leitura.
+
+    Args:
+        codigos_de_barras: Códigos lidos, com repetições.
+        produtos_cadastrados: Lista de produtos já cadastrados.
+        estoque: Lista de itens em estoque.
+        metadados: Dados opcionais por código (`nome_produto`, `marca_produto`,
+            `unidade_produto`), usados apenas para produtos novos.
+
+    Returns:
+        Um dicionário do código de barras para a tupla (Produto, ItemEstoque)
+        resultante, na ordem da primeira leitura de cada código.
+    """
+    return _inventario(produtos_cadastrados, estoque).adicionar_produtos_por_codigos_de_barras(
+        codigos_de_barras, metadados
+    )
 
 def adicionar_produtos_por_cupom_fiscal(
     cupom: CupomFiscal,
     produtos_cadastrados: List[Produto],
-    estoque: List[ItemEstoque]
+    estoque: List[ItemEstoque],
+    registro: Optional[RegistroCupons] = None,
 ) -> List[Tuple[Produto, ItemEstoque]]:
     """
     Adiciona produtos ao estoque com base nos itens de um cupom fiscal.
 
     Para cada item no cupom, tenta encontrar um produto correspondente.
     Se encontrado, atualiza o estoque. Caso contrário, cria um novo produto e
-    um novo item de estoque.
+    um novo item de estoque. Quantidades fracionárias (ex.: 0,5 kg) são
+    convertidas para a unidade base do produto (ver `unidades`); em um produto
+    sem unidade cadastrada, uma linha em kg ou litros conta como uma embalagem.
 
     Args:
         cupom: O objeto CupomFiscal contendo os detalhes dos produtos.
         produtos_cadastrados: Lista de produtos já cadastrados.
         estoque: Lista de itens em estoque.
+        registro: Registro de cupons já processados. Se informado, um cupom
+            repetido (mesma chave de acesso) não altera o estoque e retorna os
+            resultados da primeira ingestão.
 
     Returns:
         Uma lista de tuplas, cada uma contendo o Produto e o ItemEstoque
         adicionado/atualizado.
+
+    Raises:
+        ValueError: Se alguma linha tiver quantidade inválida ou incompatível
+            com a unidade do produto. Nenhuma linha do cupom é aplicada.
     """
-    resultados: List[Tuple[Produto, ItemEstoque]] = []
-    now = datetime.now()
-
-    for detalhe_cupom in cupom.detalhes_produtos_cupom:
-        produto_encontrado: Optional[Produto] = None
-        # Lógica simples de correspondência pelo nome do produto no cupom
-        # Em um sistema real, isso seria mais robusto (ex: por código de barras se disponível no cupom,
-        # ou uma busca mais inteligente por nome/marca)
-        for p_cadastrado in produtos_cadastrados:
-            # Simplificação: considera que o nome no cupom é igual ao nome cadastrado
-            # Em um cenário real, pode ser necessário normalizar strings, usar correspondência parcial, etc.
-            if p_cadastrado.nome.lower() == detalhe_cupom.nome_produto_cupom.lower():
-                produto_encontrado = p_cadastrado
-                break
-        
-        item_estoque_processado: Optional[ItemEstoque] = None
-
-        if produto_encontrado:
-            produto_encontrado.atualizado_em = now
-            # Produto já existe, verificar item de estoque
-            item_estoque_existente: Optional[ItemEstoque] = None
-            for item in estoque:
-                if item.produto_id == produto_encontrado.id:
-                    item_estoque_existente = item
-                    break
-            
-            if item_estoque_existente:
-                # Nota: ItemEstoque.quantidade é int. Se detalhe_cupom.quantidade_cupom for float (ex: 0.5 kg),
-                # a conversão para int truncará (0.5 se tornará 0).
-                # Se o sistema precisar de quantidades fracionadas, ItemEstoque.quantidade deve ser float.
-                item_estoque_existente.quantidade += int(detalhe_cupom.quantidade_cupom)
-                item_estoque_existente.id_cupom_fiscal_origem = cupom.id
-                item_estoque_existente.ultima_atualizacao = now
-                item_estoque_existente.data_compra = cupom.data_compra_cupom # Atualiza data da compra com a do cupom
-                item_estoque_processado = item_estoque_existente
-            else:
-                # Produto cadastrado, mas não há item de estoque para ele
-                novo_item_estoque = ItemEstoque(
-                    produto_id=produto_encontrado.id,
-                    quantidade=int(detalhe_cupom.quantidade_cupom), # Mesma nota sobre conversão para int
-                    id_cupom_fiscal_origem=cupom.id,
-                    data_compra=cupom.data_compra_cupom
-                )
-                # novo_item_estoque.ultima_atualizacao já é now() pelo construtor
-                estoque.append(novo_item_estoque)
-                item_estoque_processado = novo_item_estoque
-            
-            resultados.append((produto_encontrado, item_estoque_processado))
-
-        else:
-            # Produto não encontrado, criar novo Produto e novo ItemEstoque
-            # novo_produto e novo_item_estoque terão seus timestamps definidos por seus construtores
-            placeholder_barcode = f"SEM_COD_BARRAS_{uuid4()}"
-
-            novo_produto = Produto(
-                nome=detalhe_cupom.nome_produto_cupom,
-                codigo_de_barras=placeholder_barcode,
-                # marca e unidade podem ser desconhecidos ou extraídos se disponíveis no nome
-            )
-            # novo_produto.criado_em e atualizado_em são definidos no construtor
-            produtos_cadastrados.append(novo_produto)
-
-            novo_item_estoque = ItemEstoque(
-                produto_id=novo_produto.id,
-                quantidade=int(detalhe_cupom.quantidade_cupom), # Mesma nota sobre conversão para int
-                id_cupom_fiscal_origem=cupom.id,
-                data_compra=cupom.data_compra_cupom
-            )
-            # novo_item_estoque.adicionado_em e ultima_atualizacao são definidos no construtor
-            estoque.append(novo_item_estoque)
-            resultados.append((novo_produto, novo_item_estoque))
-            item_estoque_processado = novo_item_estoque # Atribuído para consistência, embora não usado depois
-
-    return resultados
+    inventario = _inventario(produtos_cadastrados, estoque)
+    if registro is not None:
+        return registro.processar(cupom, inventario)
+    return inventario.adicionar_produtos_por_cupom_fiscal(cupom)
 
 def remover_produto_por_codigo_de_barras(
     codigo_de_barras: str,
@@ -180,7 +124,7 @@ def remover_produto_por_codigo_de_barras(
     estoque: List[ItemEstoque]
 ) -> Optional[ItemEstoque]:
     """
-    Remove uma unidade de um produto do estoque utilizando seu código de barras.
+    Remove uma unidade de medida de um produto do estoque utilizando seu código de barras.
 
     Encontra o produto pelo código de barras, depois o item de estoque correspondente.
     Decrementa a quantidade do item de estoque. Se a quantidade chegar a zero,
@@ -196,34 +140,27 @@ def remover_produto_por_codigo_de_barras(
         None se o item de estoque for removido (quantidade se tornou 0),
         ou se o produto ou o item de estoque não forem encontrados.
     """
-    produto_alvo: Optional[Produto] = None
-    for p in produtos_cadastrados:
-        if p.codigo_de_barras == codigo_de_barras:
-            produto_alvo = p
-            break
-
-    if not produto_alvo:
-        return None # Produto não encontrado
-
-    item_estoque_alvo: Optional[ItemEstoque] = None
-    item_estoque_index: Optional[int] = None
-    for i, item in enumerate(estoque):
-        if item.produto_id == produto_alvo.id:
-            item_estoque_alvo = item
-            item_estoque_index = i
-            break
-    
-    if not item_estoque_alvo:
-        return None # Item de estoque não encontrado para este produto
-
-    # Decrementar quantidade
-    item_estoque_alvo.quantidade -= 1
-    item_estoque_alvo.ultima_atualizacao = datetime.now()
-    produto_alvo.atualizado_em = datetime.now() # Embora não seja estritamente necessário pela docstring, é bom manter o produto atualizado.
-
-    if item_estoque_alvo.quantidade <= 0:
-        if item_estoque_index is not None: # Sempre será, se item_estoque_alvo foi encontrado
-            estoque.pop(item_estoque_index)
-        return None # Item removido do estoque
-    else:
-        return item_estoque_alvo
+    return _inventario(produtos_cadastrados, estoque, indexar=False).remover_produto_por_codigo_de_barras(codigo_de_barras)
+
+def definir_validade_do_item(
+    item_id: UUID,
+    produtos_cadastrados: List[Produto],
+    estoque: List[ItemEstoque],
+    data_validade: Optional[date],
+) -> Optional[ItemEstoque]:
+    """
+    Define a data de validade específica de um item de estoque.
+
+    A validade específica tem precedência sobre a `data_de_validade_padrao`
+    do produto; com None, o item volta a usar a validade padrão.
+
+    Args:
+        item_id: O id do item de estoque.
+        produtos_cadastrados: Lista de produtos cadastrados (não é modificada).
+        estoque: Lista de itens em estoque.
+        data_validade: A nova validade específica, ou None para removê-la.
+
+    Returns:
+        O ItemEstoque atualizado, ou None se o item não for encontrado.
+    """
+    return _inventario(produtos_cadastrados, estoque, indexar=False).definir_validade_do_item(item_id, data_validade)
@@ -0,0 +1,109 @@
+import random
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+import analise_consumo
+from analise_consumo import AnaliseConsumo, MICROSSEGUNDOS_POR_DIA
+from codificacao import datetime_para_int
+from historico import InventarioComHistorico
+
+AGORA = datetime(2024, 6, 30, 12, 0)
+
+class TestAnaliseConsumo(unittest.TestCase):
+
+    def setUp(self):
+        self.analise = AnaliseConsumo()
+        self.leite, self.cafe = uuid4(), uuid4()
+        # Leite: 30 un compradas há 20 dias, 1 consumida por dia desde então.
+        self.analise.registrar("casa", self.leite, AGORA - timedelta(days=20), 30)
+        for dia in range(20, 0, -1):
+            self.analise.registrar("casa", self.leite, AGORA - timedelta(days=dia, hours=-1), -1)
+        # Café: estoque parado.
+        self.analise.registrar("casa", self.cafe, AGORA - timedelta(days=40), 3)
+
+    def test_previsao_de_esgotamento(self):
+        """Testa taxa e data prevista: 10 restantes a 1 por dia acabam em 10 dias."""
+        leite, cafe = self.analise.prever(AGORA)
+        self.assertEqual((leite.produto_id, leite.saldo), (self.leite, 10))
+        self.assertAlmostEqual(leite.taxa_diaria, 1.0)
+        self.assertEqual(leite.esgota_em, date(2024, 7, 10))
+        self.assertEqual((cafe.produto_id, cafe.taxa_diaria, cafe.esgota_em), (self.cafe, 0.0, None))
+        self.assertEqual([p.produto_id for p in self.analise.a_repor(date(2024, 7, 15), AGORA)], [self.leite])
+        self.assertEqual(self.analise.prever(AGORA, casas=["outra"]), [])
+
+    def test_janela_considera_so_o_consumo_recente(self):
+        leite = self.analise.prever(AGORA, janela_dias=5)[0]
+        self.assertAlmostEqual(leite.taxa_diaria, 1.0)
+        self.analise.registrar("casa", self.leite, AGORA - timedelta(hours=1), -5)
+        leite = self.analise.prever(AGORA, janela_dias=5)[0]
+        self.assertAlmostEqual(leite.taxa_diaria, 2.0)
+
+    def test_eventos_fora_de_ordem(self):
+        analise = AnaliseConsumo()
+        produto = uuid4()
+        for dias in (1, 3, 2):
+            analise.registrar("casa", produto, AGORA - timedelta(days=dias), -1)
+        self.assertEqual(analise.consumo_diario("casa", produto, AGORA.date(), 4), [1, 1, 1, 0])
+
+    def test_taxas_moveis(self):
+        taxas = self.analise.taxas_moveis("casa", self.leite, AGORA.date(), dias=3, janela=2)
+        self.assertEqual(taxas, [1.0, 1.0, 0.5])
+
+    def series_aleatorias(self):
+        aleatorio = random.Random(7)
+        analise = AnaliseConsumo()
+        fim = datetime_para_int(AGORA)
+        for casa in range(20):
+            for _ in range(10):
+                serie = analise.serie(f"casa{casa}", uuid4())
+                for _ in range(aleatorio.randrange(30)):
+                    serie.registrar(fim - aleatorio.randrange(60 * MICROSSEGUNDOS_POR_DIA), aleatorio.choice((3, -1, -2)))
+        return analise, fim - 28 * MICROSSEGUNDOS_POR_DIA, fim
+
+    def test_lote_igual_ao_calculo_por_serie(self):
+        """Testa `prever` contra a conta de cada série com `SerieConsumo.consumo_entre`."""
+        analise, inicio, fim = self.series_aleatorias()
+        previsoes = analise.prever(AGORA)
+        self.assertEqual(len(previsoes), sum(1 for serie in analise._series.values() if serie.saldo > 0))
+        self.assertEqual(previsoes, sorted(previsoes, key=lambda previsao: previsao.esgota_em or date.max))
+        ate = AGORA.date() + timedelta(days=5)
+        self.assertEqual(analise.a_repor(ate, AGORA), [p for p in previsoes if p.esgota_em is not None and p.esgota_em <= ate])
+        for previsao in previsoes:
+            serie = analise.serie(previsao.casa, previsao.produto_id)
+            consumo = serie.consumo_entre(inicio, fim + 1)
+            self.assertEqual(previsao.saldo, serie.saldo)
+            self.assertEqual(previsao.esgota_em is None, consumo == 0)
+            if consumo:
+                observado = max(fim - max(inicio, serie.primeiro), MICROSSEGUNDOS_POR_DIA) # type: ignore[type-var]
+                self.assertAlmostEqual(previsao.taxa_diaria, consumo * MICROSSEGUNDOS_POR_DIA / observado)
+
+    @unittest.skipIf(analise_consumo.numpy is None, "numpy não instalado")
+    def test_lote_com_numpy_igual_ao_calculo_por_serie(self):
+        analise, inicio, fim = self.series_aleatorias()
+        maximo = (date.max - AGORA.date()).days
+        self.assertEqual(
+            analise_consumo._prever_com_numpy(analise.colunas(), inicio, fim, maximo),
+            analise_consumo._prever_por_serie([serie for _, serie in analise._selecionadas(None)], inicio, fim, maximo),
+        )
+
+    def test_importa_log_do_historico(self):
+        """Testa que entradas, remoções e descartes do log viram a mesma série."""
+        with tempfile.TemporaryDirectory() as diretorio:
+            inventario = InventarioComHistorico(diretorio, intervalo_fsync=None)
+            inventario.adicionar_produtos_por_codigos_de_barras(["111"] * 3)
+            for _ in range(3):
+                inventario.remover_produto_por_codigo_de_barras("111")
+            inventario.adicionar_produto_por_codigo_de_barras("111")
+            produto = inventario.buscar_produto_por_codigo_de_barras("111")
+            inventario.fechar()
+
+            analise = AnaliseConsumo()
+            self.assertEqual(analise.importar_historico(f"{diretorio}/{InventarioComHistorico.ARQUIVO_LOG}", "casa"), 5)
+        serie = analise.serie("casa", produto.id) # type: ignore[union-attr]
+        self.assertEqual(serie.saldo, 1)
+        self.assertEqual(sum(serie.consumos), 3)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,83 @@
+import unittest
+from datetime import date, datetime
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from autocompletar import IndiceAutocompletar, tokens_de_busca
+
+class TestAutocompletar(unittest.TestCase):
+
+    def setUp(self):
+        self.leite = Produto(nome="Leite Integral", codigo_de_barras="111", marca="Itambé")
+        self.condensado = Produto(nome="Leite Condensado", codigo_de_barras="222", marca="Moça")
+        self.lenco = Produto(nome="Lenço de Papel", codigo_de_barras="333")
+        for dia, produto in enumerate((self.leite, self.condensado, self.lenco), start=1):
+            produto.atualizado_em = datetime(2024, 1, dia)
+        estoque = [ItemEstoque(self.leite.id, 2), ItemEstoque(self.lenco.id, 1)]
+        self.inventario = Inventario([self.leite, self.condensado, self.lenco], estoque)
+        self.indice = IndiceAutocompletar(self.inventario, self.inventario.produtos, self.inventario.estoque)
+
+    def test_tokens_sem_acentos(self):
+        self.assertEqual(tokens_de_busca("Lenço de PAPEL, Moça"), ["lenco", "de", "papel", "moca"])
+
+    def test_prefixos_e_ranking(self):
+        """Testa que os produtos com estoque vêm antes e, entre eles, o mais recente."""
+        self.assertEqual(self.indice.sugerir("le"), [self.lenco, self.leite, self.condensado])
+        self.assertEqual(self.indice.sugerir("LEI"), [self.leite, self.condensado])
+        self.assertEqual(self.indice.sugerir("lei co"), [self.condensado])
+        self.assertEqual(self.indice.sugerir("moça"), [self.condensado])
+        self.assertEqual(self.indice.sugerir("itambe lei"), [self.leite])
+        self.assertEqual(self.indice.sugerir("le", k=1), [self.lenco])
+        self.assertEqual(self.indice.sugerir("leite x"), [])
+        self.assertEqual(self.indice.sugerir("  "), [])
+
+    def test_acompanha_as_operacoes(self):
+        self.inventario.adicionar_produto_por_codigo_de_barras("222")
+        self.assertEqual(self.indice.sugerir("le"), [self.condensado, self.lenco, self.leite])
+        self.inventario.remover_produto_por_codigo_de_barras("333")
+        self.assertEqual(self.indice.sugerir("le")[-1], self.lenco)
+        self.assertEqual(self.indice.saldo(self.lenco.id), 0)
+
+        novo, _ = self.inventario.adicionar_produto_por_codigo_de_barras("444", "Leite em Pó")
+        cupom = CupomFiscal("qr", date(2024, 1, 1), [DetalheProdutoCupom("LEITE DESNATADO", 1)])
+        ((do_cupom, _),) = self.inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+        self.assertEqual(self.indice.sugerir("leite", k=2), [do_cupom, novo])
+        self.assertEqual(self.indice.sugerir("po"), [novo])
+        self.assertEqual(len(self.indice), 5)
+
+    def test_renomear_e_sobrescrever_reindexam(self):
+        self.inventario.renomear_produto(self.lenco, "Guardanapo")
+        self.assertEqual(self.indice.sugerir("lenc"), [])
+        self.assertEqual(self.indice.sugerir("guard"), [self.lenco])
+        self.inventario.sobrescrever_produto(self.leite.id, marca="Piracanjuba")
+        self.assertEqual(self.indice.sugerir("pira"), [self.leite])
+        self.assertEqual(self.indice.sugerir("itambe"), [])
+
+    def test_muitos_candidatos_percorre_o_ranking(self):
+        """Testa que um prefixo comum dá o mesmo resultado pelo caminho do ranking."""
+        inventario = Inventario()
+        indice = IndiceAutocompletar(inventario)
+        indice.LIMITE_CANDIDATOS = 2
+        for i in range(6):
+            inventario.adicionar_produto_por_codigo_de_barras(str(i), f"Arroz {i}")
+        inventario.remover_produto_por_codigo_de_barras("5")
+        inventario.adicionar_produto_por_codigo_de_barras("0")
+        self.assertEqual([p.codigo_de_barras for p in indice.sugerir("arr", k=4)], ["0", "4", "3", "2"])
+        self.assertEqual([p.codigo_de_barras for p in indice.sugerir("arr 5")], ["5"])
+        self.assertEqual(indice.sugerir("arr", k=6)[-1].codigo_de_barras, "5")
+        # Sem achar k no começo do ranking, volta à interseção com o mesmo resultado.
+        indice.LIMITE_VARREDURA = 1
+        self.assertEqual([p.codigo_de_barras for p in indice.sugerir("arr", k=4)], ["0", "4", "3", "2"])
+
+    def test_sqlite(self):
+        repositorio = RepositorioSQLite(":memory:")
+        indice = IndiceAutocompletar(repositorio)
+        produto, _ = repositorio.adicionar_produto_por_codigo_de_barras("789", "Açúcar Refinado")
+        self.assertEqual([p.id for p in indice.sugerir("acu")], [produto.id])
+        indice.desconectar()
+        repositorio.adicionar_produto_por_codigo_de_barras("790", "Açaí")
+        self.assertEqual(len(indice), 1)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from uuid import uuid4
+
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from concorrencia import InventarioConcorrente
+from catalogo_gtin import MetadadosGTIN
+from catalogo_compartilhado import CatalogoCompartilhado, gravar_catalogo, gtin_do_id, id_do_gtin
+
+REGISTROS = [
+    ("7891000100103", MetadadosGTIN("Leite Condensado", "Moça", "un")),
+    ("036000291452", MetadadosGTIN("Lenço de Papel", "Kleenex")),
+    ("96385074", MetadadosGTIN("Chiclete", "Moça")),
+    ("7891000100104", MetadadosGTIN("DV errado")),
+]
+
+class TestCatalogoCompartilhado(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        caminho = os.path.join(self.diretorio.name, "catalogo.bin")
+        self.assertEqual(gravar_catalogo(caminho, REGISTROS), 3)
+        self.catalogo = CatalogoCompartilhado(caminho)
+
+    def tearDown(self):
+        self.catalogo.fechar()
+        self.diretorio.cleanup()
+
+    def test_busca_e_internamento(self):
+        produto = self.catalogo.buscar("7891000100103")
+        self.assertEqual((produto.nome, produto.marca, produto.unidade), ("Leite Condensado", "Moça", "un")) # type: ignore[union-attr]
+        self.assertIs(self.catalogo.buscar("7891000100103"), produto)
+        self.assertIs(self.catalogo.buscar_por_id(produto.id), produto) # type: ignore[union-attr]
+        self.assertIs(self.catalogo.buscar("0036000291452"), self.catalogo.buscar("036000291452"))
+        self.assertIsNone(self.catalogo.buscar("7891000100110"))
+        self.assertIsNone(self.catalogo.buscar_por_id(uuid4()))
+        self.assertEqual(len(self.catalogo), 3)
+
+    def test_id_deriva_do_gtin(self):
+        self.assertEqual(gtin_do_id(id_do_gtin(7891000100103)), 7891000100103)
+        self.assertIsNone(gtin_do_id(uuid4()))
+
+    def test_arquivo_invalido(self):
+        caminho = os.path.join(self.diretorio.name, "outro.bin")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            CatalogoCompartilhado(caminho)
+
+    def test_regravar_nao_afeta_quem_tem_o_arquivo_aberto(self):
+        """Testa que a regravação substitui o arquivo em vez de truncar o que está mapeado."""
+        caminho = os.path.join(self.diretorio.name, "catalogo.bin")
+        gravar_catalogo(caminho, [("96385074", MetadadosGTIN("Ç" * 40_000))])
+        self.assertEqual(self.catalogo.buscar("036000291452").nome, "Lenço de Papel") # type: ignore[union-attr]
+        novo = CatalogoCompartilhado(caminho)
+        try:
+            self.assertEqual(len(novo), 1)
+            # O nome passa do limite de 0xFFFF bytes e é cortado sem partir o "Ç" (2 bytes).
+            self.assertEqual(novo.buscar("96385074").nome, "Ç" * (0xFFFF // 2)) # type: ignore[union-attr]
+        finally:
+            novo.fechar()
+
+    def test_casas_compartilham_o_produto(self):
+        """Testa que duas casas usam o mesmo objeto sem que as leituras o alterem."""
+        casa_a, casa_b = Inventario(catalogo=self.catalogo), Inventario(catalogo=self.catalogo)
+        produto_a, item_a = casa_a.adicionar_produto_por_codigo_de_barras("7891000100103")
+        casa_a.adicionar_produto_por_codigo_de_barras("7891000100103")
+        produto_b, _ = casa_b.adicionar_produto_por_codigo_de_barras("7891000100103")
+        self.assertIs(produto_a, produto_b)
+        self.assertEqual(item_a.quantidade, 2)
+        self.assertEqual(produto_a.atualizado_em, self.catalogo.gerado_em)
+        self.assertEqual(casa_a.produtos, [produto_a])
+        self.assertIs(casa_a.buscar_produto_por_nome("leite condensado"), produto_a)
+        cupom = CupomFiscal("qr", date(2024, 1, 1), [DetalheProdutoCupom("Leite Condensado", 1)])
+        self.assertIs(casa_a.adicionar_produtos_por_cupom_fiscal(cupom)[0][1], item_a)
+        self.assertIsNone(casa_a.remover_produto_por_codigo_de_barras("036000291452"))
+
+        # Códigos fora do catálogo continuam gerando produtos da casa.
+        proprio, _ = casa_a.adicionar_produto_por_codigo_de_barras("123")
+        self.assertFalse(self.catalogo.compartilhado(proprio))
+
+    def test_sobrescrever_copia_so_para_a_casa(self):
+        for classe in (Inventario, InventarioConcorrente):
+            with self.subTest(classe=classe.__name__):
+                casa_a, casa_b = classe(catalogo=self.catalogo), classe(catalogo=self.catalogo, indexar_validades=True)
+                compartilhado, _ = casa_a.adicionar_produto_por_codigo_de_barras("036000291452")
+                _, item_b = casa_b.adicionar_produto_por_codigo_de_barras("036000291452")
+
+                copia = casa_b.sobrescrever_produto(
+                    compartilhado.id, nome="Lenço", data_de_validade_padrao=date(2030, 1, 1)
+                )
+                self.assertIsNot(copia, compartilhado)
+                self.assertEqual((copia.id, copia.nome, copia.marca), (compartilhado.id, "Lenço", "Kleenex")) # type: ignore[union-attr]
+                self.assertEqual(compartilhado.nome, "Lenço de Papel")
+                self.assertIs(casa_b.buscar_produto_por_codigo_de_barras("0036000291452"), copia)
+                self.assertIs(casa_b.buscar_produto_por_nome("lenço"), copia)
+                self.assertIsNone(casa_b.buscar_produto_por_nome("lenço de papel"))
+                self.assertEqual(casa_b.produtos, [copia])
+                self.assertEqual(casa_b.validade_efetiva(item_b), date(2030, 1, 1))
+                self.assertEqual(casa_b.itens_vencidos(date(2031, 1, 1)), [(date(2030, 1, 1), item_b)])
+                self.assertIs(casa_a.buscar_produto_por_codigo_de_barras("036000291452"), compartilhado)
+
+                # A cópia já é da casa: é alterada no lugar.
+                self.assertIs(casa_b.sobrescrever_produto(copia.id, marca=None), copia) # type: ignore[union-attr]
+                self.assertIsNone(copia.marca) # type: ignore[union-attr]
+                with self.assertRaises(ValueError):
+                    casa_b.sobrescrever_produto(copia.id, unidade="kg") # type: ignore[union-attr]
+                self.assertIsNone(casa_b.sobrescrever_produto(uuid4(), nome="x"))
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
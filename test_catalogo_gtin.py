@@ -0,0 +1,114 @@
+import io
+import os
+import tempfile
+import unittest
+
+from models import Produto
+from inventario import Inventario
+from concorrencia import InventarioConcorrente
+from repositorio_sqlite import RepositorioSQLite
+from catalogo_gtin import (
+    CacheGTIN, EnriquecedorProdutos, MetadadosGTIN, digito_verificador_gtin, gtin_como_inteiro, validar_gtin,
+)
+
+CSV = """gtin,nome,marca,unidade,url_imagem
+7891000100103,Leite Condensado,Moça,un,
+96385074,Chiclete,,,
+036000291452,Lenço de Papel,Kleenex,,
+7891000100104,Código com DV errado,,,
+,Sem código,,,
+"""
+
+class TestGTIN(unittest.TestCase):
+
+    def test_digitos_verificadores(self):
+        """Testa EAN-13, EAN-8, UPC-A e GTIN-14 válidos e inválidos."""
+        self.assertEqual(digito_verificador_gtin("789100010010"), 3)
+        self.assertTrue(validar_gtin("7891000100103"))
+        self.assertTrue(validar_gtin("96385074"))
+        self.assertTrue(validar_gtin("036000291452"))
+        self.assertTrue(validar_gtin("17891000100100"))
+        self.assertFalse(validar_gtin("7891000100104"))
+        self.assertFalse(validar_gtin("789100010010"))
+        self.assertFalse(validar_gtin("78910001001O3"))
+
+    def test_upc_e_ean_equivalente_tem_a_mesma_chave(self):
+        self.assertEqual(gtin_como_inteiro("036000291452"), gtin_como_inteiro("0036000291452"))
+
+class TestCacheGTIN(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CacheGTIN()
+        self.resultado = self.cache.importar_csv(io.StringIO(CSV))
+
+    def tearDown(self):
+        self.cache.fechar()
+
+    def test_importacao_recusa_invalidos(self):
+        self.assertEqual(self.resultado, (3, 2))
+        self.assertEqual(len(self.cache), 3)
+
+    def test_buscas(self):
+        self.assertEqual(self.cache.buscar("7891000100103"), MetadadosGTIN("Leite Condensado", "Moça", "un"))
+        self.assertEqual(self.cache.buscar("0036000291452").nome, "Lenço de Papel") # type: ignore[union-attr]
+        self.assertIsNone(self.cache.buscar("7891000100104"))
+        self.assertIsNone(self.cache.buscar("7891000100110"))
+        self.assertEqual(set(self.cache.buscar_varios(["96385074", "7891000100104", "7891000100110"])), {"96385074"})
+
+    def test_importacao_jsonl_em_arquivo(self):
+        """Testa a importação de JSONL e a persistência do cache entre aberturas."""
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "gtin.db")
+            cache = CacheGTIN(caminho)
+            cache.importar_jsonl(io.StringIO('{"ean": "96385074", "nome": "Chiclete"}\n\n{"gtin": 123, "nome": "x"}\n'))
+            cache.fechar()
+            reaberto = CacheGTIN(caminho)
+            self.assertEqual(reaberto.buscar("96385074"), MetadadosGTIN("Chiclete"))
+            self.assertEqual(len(reaberto), 1)
+            reaberto.fechar()
+
+class TestEnriquecedorProdutos(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CacheGTIN()
+        self.cache.importar_csv(io.StringIO(CSV))
+
+    def tearDown(self):
+        self.cache.fechar()
+
+    def test_enriquece_em_lote_depois_da_leitura(self):
+        """Testa que a leitura só enfileira e o lote aplica os metadados depois."""
+        inventario = Inventario()
+        enriquecedor = EnriquecedorProdutos(inventario, self.cache, em_thread=False)
+        produto, _ = inventario.adicionar_produto_por_codigo_de_barras("7891000100103")
+        inventario.adicionar_produtos_por_codigos_de_barras(["96385074", "7891000100110"])
+        self.assertEqual(produto.nome, "Produto 7891000100103")
+
+        self.assertEqual(enriquecedor.processar_pendentes(), 2)
+        self.assertEqual((produto.nome, produto.marca, produto.unidade), ("Leite Condensado", "Moça", "un"))
+        self.assertIs(inventario.buscar_produto_por_nome("leite condensado"), produto)
+        self.assertIsNone(inventario.buscar_produto_por_nome("Produto 7891000100103"))
+        self.assertEqual(inventario.buscar_produto_por_codigo_de_barras("96385074").nome, "Chiclete") # type: ignore[union-attr]
+
+    def test_nao_sobrescreve_dados_do_usuario(self):
+        produto = Produto(nome="Meu leite", codigo_de_barras="7891000100103")
+        inventario = Inventario([produto], [])
+        enriquecedor = EnriquecedorProdutos(inventario, self.cache, em_thread=False)
+        enriquecedor.enfileirar("7891000100103")
+        self.assertEqual(enriquecedor.processar_pendentes(), 0)
+        self.assertEqual(produto.nome, "Meu leite")
+
+    def test_thread_em_segundo_plano(self):
+        for repositorio in (InventarioConcorrente(), RepositorioSQLite()):
+            with self.subTest(repositorio=type(repositorio).__name__):
+                enriquecedor = EnriquecedorProdutos(repositorio, self.cache, intervalo=0.01)
+                for _ in range(3):
+                    repositorio.adicionar_produto_por_codigo_de_barras("036000291452")
+                enriquecedor.fechar()
+                self.assertIsNone(repositorio.enriquecedor)
+                produto = repositorio.buscar_produto_por_codigo_de_barras("036000291452")
+                self.assertEqual((produto.nome, produto.marca), ("Lenço de Papel", "Kleenex")) # type: ignore[union-attr]
+                self.assertEqual(repositorio.buscar_produto_por_nome("lenço de papel").id, produto.id) # type: ignore[union-attr]
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
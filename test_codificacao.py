@@ -0,0 +1,19 @@
+import unittest
+from datetime import date, datetime
+from uuid import uuid4
+
+from codificacao import bytes_para_uuid, date_para_int, datetime_para_int, int_para_date, int_para_datetime, uuid_para_bytes
+
+class TestCodificacao(unittest.TestCase):
+
+    def test_ida_e_volta(self):
+        momento = datetime(2024, 1, 10, 8, 30, 0, 123456)
+        self.assertEqual(int_para_datetime(datetime_para_int(momento)), momento)
+        self.assertEqual(int_para_date(date_para_int(date(2024, 1, 10))), date(2024, 1, 10))
+        self.assertIsNone(int_para_date(date_para_int(None)))
+        valor = uuid4()
+        self.assertEqual(bytes_para_uuid(uuid_para_bytes(valor)), valor)
+        self.assertIsNone(bytes_para_uuid(uuid_para_bytes(None)))
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,122 @@
+import sys
+import threading
+import time
+import unittest
+from collections import Counter
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom
+from concorrencia import InventarioConcorrente
+
+THREADS = 8
+OPERACOES_POR_THREAD = 1_000
+
+class InventarioComTrocas(InventarioConcorrente):
+    """Cede a vez a outra thread logo após cada busca, alargando as janelas de corrida."""
+
+    def buscar_produto_por_codigo_de_barras(self, codigo_de_barras):
+        produto = super().buscar_produto_por_codigo_de_barras(codigo_de_barras)
+        time.sleep(0)
+        return produto
+
+    def buscar_item_do_produto(self, produto_id):
+        item = super().buscar_item_do_produto(produto_id)
+        time.sleep(0)
+        return item
+
+class TestInventarioConcorrente(unittest.TestCase):
+
+    def setUp(self):
+        # Trocas de thread bem mais frequentes, para expor condições de corrida.
+        self.intervalo_original = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.intervalo_original)
+
+    def executar_em_threads(self, alvo) -> None:
+        barreira = threading.Barrier(THREADS)
+        erros = []
+
+        def executar(indice):
+            barreira.wait()
+            try:
+                alvo(indice)
+            except BaseException as erro:
+                erros.append(erro)
+
+        threads = [threading.Thread(target=executar, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if erros:
+            raise erros[0]
+
+    def test_quantidades_finais_sem_atualizacoes_perdidas(self):
+        """Testa que adições e remoções simultâneas nos mesmos produtos resultam nas contagens exatas."""
+        inventario = InventarioComTrocas(listras=4)
+        codigos = [f"COD{i}" for i in range(10)]
+        esperado = Counter()
+        for i in range(THREADS):
+            for j in range(OPERACOES_POR_THREAD):
+                esperado[codigos[(i + j) % len(codigos)]] += 1
+        for i in range(THREADS):
+            for j in range(0, OPERACOES_POR_THREAD, 4):
+                esperado[codigos[(i + j) % len(codigos)]] -= 1
+
+        def trabalhar(indice):
+            for j in range(OPERACOES_POR_THREAD):
+                inventario.adicionar_produto_por_codigo_de_barras(codigos[(indice + j) % len(codigos)])
+                if j % 4 == 0:
+                    inventario.remover_produto_por_codigo_de_barras(codigos[(indice + j) % len(codigos)])
+
+        self.executar_em_threads(trabalhar)
+
+        # Nenhum código novo virou dois produtos, e cada produto tem um único item.
+        self.assertEqual(sorted(p.codigo_de_barras for p in inventario.produtos), sorted(codigos))
+        self.assertEqual(len(inventario.estoque), len(codigos))
+        for codigo in codigos:
+            produto = inventario.buscar_produto_por_codigo_de_barras(codigo)
+            self.assertEqual(inventario.buscar_item_do_produto(produto.id).quantidade, esperado[codigo])
+
+    def test_remocoes_ate_zerar_descartam_os_itens_certos(self):
+        """Testa que remoções concorrentes que zeram itens não removem itens de outros produtos."""
+        inventario = InventarioComTrocas()
+        codigos = [f"Z{i}" for i in range(200)]
+        inventario.adicionar_produtos_por_codigos_de_barras(codigos * THREADS)
+
+        def trabalhar(indice):
+            deslocamento = indice * len(codigos) // THREADS
+            for codigo in codigos[deslocamento:] + codigos[:deslocamento]:
+                inventario.remover_produto_por_codigo_de_barras(codigo)
+
+        self.executar_em_threads(trabalhar)
+
+        # Cada código foi removido THREADS vezes, exatamente sua quantidade.
+        self.assertEqual(inventario.estoque, [])
+        self.assertEqual(inventario._posicao_item, {})
+
+    def test_cupons_e_leituras_no_mesmo_produto(self):
+        """Testa que cupons (por nome) e leituras (por código) no mesmo produto não perdem quantidades."""
+        inventario = InventarioComTrocas()
+        produto, _ = inventario.adicionar_produto_por_codigo_de_barras("CAFE", "Café")
+        cupom = CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[DetalheProdutoCupom("CAFÉ", 2)],
+        )
+
+        def trabalhar(indice):
+            for _ in range(500):
+                if indice % 2:
+                    inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+                else:
+                    inventario.adicionar_produto_por_codigo_de_barras("CAFE")
+
+        self.executar_em_threads(trabalhar)
+
+        self.assertEqual(inventario.buscar_item_do_produto(produto.id).quantidade, 1 + 500 * (THREADS // 2) * 3)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,77 @@
+import unittest
+from datetime import date
+
+from models import Produto, CupomFiscal, DetalheProdutoCupom
+from correspondencia import IndiceCorrespondencia, normalizar_nome
+from inventario import Inventario
+
+class TestNormalizacao(unittest.TestCase):
+
+    def test_remove_acentos_e_caixa(self):
+        self.assertEqual(normalizar_nome("Feijão Carioca"), "feijao carioca")
+
+    def test_converte_medidas_para_unidade_base(self):
+        """Testa que medidas equivalentes geram o mesmo token."""
+        self.assertEqual(normalizar_nome("Sabão em pó 0,5KG"), normalizar_nome("SABAO PO 500G"))
+        self.assertEqual(normalizar_nome("Leite 1L"), normalizar_nome("LEITE 1 LT"))
+        self.assertEqual(normalizar_nome("Refrig 2,5L"), "refrigerante 2500ml")
+
+    def test_expande_abreviacoes_de_nfce(self):
+        self.assertEqual(normalizar_nome("LTE INT UHT"), "leite integral uht")
+        self.assertEqual(normalizar_nome("ARROZ TP1"), "arroz tipo 1")
+
+class TestIndiceCorrespondencia(unittest.TestCase):
+
+    def setUp(self):
+        self.indice: IndiceCorrespondencia[str] = IndiceCorrespondencia(limiar=0.6)
+        for nome in (
+            "Arroz Tipo 1 5kg",
+            "Arroz Tipo 1 1kg",
+            "Leite Integral 1L",
+            "Leite Desnatado 1L",
+            "Macarrão Espaguete 500g",
+        ):
+            self.indice.adicionar(nome, nome)
+
+    def test_encontra_descricao_abreviada(self):
+        self.assertEqual(self.indice.buscar("LTE INT 1LT")[0], "Leite Integral 1L") # type: ignore
+        self.assertEqual(self.indice.buscar("ARR TIPO 1 1KG")[0], "Arroz Tipo 1 1kg") # type: ignore
+
+    def test_encontra_descricao_truncada(self):
+        """Testa que tokens cortados pelo layout do cupom casam por prefixo."""
+        self.assertEqual(self.indice.buscar("MACARR ESPAG 500G")[0], "Macarrão Espaguete 500g") # type: ignore
+
+    def test_respeita_limiar(self):
+        self.assertIsNone(self.indice.buscar("Chocolate ao leite"))
+        self.assertIsNone(self.indice.buscar("LTE INT 1LT", limiar=1.01))
+
+    def test_candidatos_ordenados(self):
+        candidatos = self.indice.candidatos("Arroz 5kg", k=2)
+        self.assertEqual([valor for valor, _ in candidatos], ["Arroz Tipo 1 5kg", "Arroz Tipo 1 1kg"])
+        self.assertGreater(candidatos[0][1], candidatos[1][1])
+
+class TestInventarioComCorrespondencia(unittest.TestCase):
+
+    def test_cupom_reaproveita_produto_parecido(self):
+        """Testa que o cupom não cria produto duplicado quando há um nome parecido no catálogo."""
+        produto = Produto(nome="Leite Integral 1L", codigo_de_barras="789")
+        inventario = Inventario([produto], [], limiar_correspondencia=0.6)
+        cupom = CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=date(2024, 5, 2),
+            detalhes_produtos_cupom=[DetalheProdutoCupom("LTE INT UHT 1LT", 6)],
+        )
+
+        [(produto_encontrado, item)] = inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+
+        self.assertIs(produto_encontrado, produto)
+        self.assertEqual(item.quantidade, 6)
+        self.assertEqual(len(inventario.produtos), 1)
+
+    def test_sem_limiar_mantem_correspondencia_exata(self):
+        produto = Produto(nome="Leite Integral 1L", codigo_de_barras="789")
+        inventario = Inventario([produto], [])
+        self.assertIsNone(inventario.buscar_produto_parecido("LTE INT 1LT"))
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
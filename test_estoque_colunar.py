@@ -0,0 +1,83 @@
+import unittest
+from datetime import date, datetime
+from uuid import uuid4
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from estoque_colunar import EstoqueColunar, ItemEstoqueView
+
+class TestModelosCompactos(unittest.TestCase):
+
+    def test_modelos_nao_tem_dict_por_instancia(self):
+        """Testa que os modelos usam __slots__ e mantêm os padrões dos opcionais."""
+        produto = Produto(nome="Arroz", codigo_de_barras="1")
+        item = ItemEstoque(produto_id=produto.id, quantidade=1)
+        detalhe = DetalheProdutoCupom("Arroz", 1)
+        cupom = CupomFiscal("qr", date.today(), [detalhe])
+
+        for objeto in (produto, item, detalhe, cupom):
+            self.assertFalse(hasattr(objeto, "__dict__"))
+        self.assertIsNone(produto.marca)
+        self.assertIsNone(item.data_validade_especifica)
+        self.assertIsNone(cupom.nome_loja)
+        with self.assertRaises(AttributeError):
+            produto.atributo_inexistente = 1 # type: ignore
+
+class TestEstoqueColunar(unittest.TestCase):
+
+    def test_de_itens_preserva_atributos(self):
+        """Testa que a cópia colunar expõe os mesmos valores dos itens originais."""
+        cupom_id = uuid4()
+        original = ItemEstoque(
+            produto_id=uuid4(),
+            quantidade=7,
+            data_compra=date(2024, 3, 1),
+            data_validade_especifica=date(2024, 9, 30),
+            id_cupom_fiscal_origem=cupom_id,
+        )
+        original.ultima_atualizacao = datetime(2024, 3, 2, 10, 30, 15, 123456)
+
+        estoque = EstoqueColunar.de_itens([original])
+        view = next(iter(estoque))
+
+        for atributo in (
+            "id", "produto_id", "quantidade", "data_compra", "data_validade_especifica",
+            "id_cupom_fiscal_origem", "adicionado_em", "ultima_atualizacao",
+        ):
+            self.assertEqual(getattr(view, atributo), getattr(original, atributo), atributo)
+
+    def test_escrita_pela_view(self):
+        """Testa que atribuições na visão alteram as colunas, como em ItemEstoque."""
+        estoque = EstoqueColunar()
+        view = estoque.adicionar(uuid4(), 1)
+
+        view.quantidade += 2
+        view.data_validade_especifica = date(2025, 1, 1)
+        view.id_cupom_fiscal_origem = None
+
+        self.assertEqual(estoque._quantidade[0], 3)
+        self.assertEqual(ItemEstoqueView(estoque, 0).data_validade_especifica, date(2025, 1, 1))
+        self.assertIsNone(view.data_compra)
+        self.assertIsNone(view.id_cupom_fiscal_origem)
+
+    def test_remover_reaproveita_linha(self):
+        """Testa que linhas removidas saem da iteração e são reaproveitadas."""
+        estoque = EstoqueColunar()
+        produto_id = uuid4()
+        primeira = estoque.adicionar(produto_id, 1)
+        segunda = estoque.adicionar(produto_id, 2)
+
+        estoque.remover(primeira)
+        self.assertEqual(len(estoque), 1)
+        self.assertEqual(list(estoque), [segunda])
+        with self.assertRaises(ValueError):
+            estoque.remover(primeira)
+
+        terceira = estoque.adicionar(uuid4(), 3)
+        self.assertEqual(len(estoque), 2)
+        self.assertEqual(terceira, ItemEstoqueView(estoque, 0))
+        self.assertEqual(segunda.quantidade, 2)
+        # Produtos repetidos compartilham a mesma entrada na tabela de UUIDs.
+        self.assertEqual(len(estoque._produto_ids), 2)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
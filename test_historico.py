@@ -0,0 +1,148 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom, Produto
+from historico import (
+    HistoricoCorrompido, InventarioComHistorico, ler_eventos, PRODUTO, PRODUTO_TOCADO, ITEM, ITEM_ALTERADO, DESCARTE,
+)
+
+def estado(inventario):
+    produtos = [
+        (p.id, p.nome, p.codigo_de_barras, p.marca, p.criado_em, p.atualizado_em) for p in inventario.produtos
+    ]
+    itens = [
+        (i.id, i.produto_id, i.quantidade, i.data_compra, i.id_cupom_fiscal_origem, i.adicionado_em, i.ultima_atualizacao)
+        for i in inventario.estoque
+    ]
+    return produtos, itens
+
+class TestInventarioComHistorico(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.caminho_log = os.path.join(self.diretorio.name, InventarioComHistorico.ARQUIVO_LOG)
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def abrir(self, **opcoes) -> InventarioComHistorico:
+        return InventarioComHistorico(self.diretorio.name, intervalo_fsync=None, **opcoes)
+
+    def operar(self, inventario, sufixo=""):
+        inventario.adicionar_produto_por_codigo_de_barras("111" + sufixo, "Café", "Marca")
+        inventario.adicionar_produtos_por_codigos_de_barras(["222" + sufixo, "111" + sufixo, "333" + sufixo])
+        inventario.adicionar_produtos_por_cupom_fiscal(CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[DetalheProdutoCupom("CAFÉ", 2), DetalheProdutoCupom("Sabão" + sufixo, 1)],
+        ))
+        inventario.remover_produto_por_codigo_de_barras("222" + sufixo)
+
+    def test_reproducao_recria_o_mesmo_estado(self):
+        """Testa que reabrir reconstrói produtos e itens com ids, quantidades, datas e ordem."""
+        inventario = self.abrir()
+        self.operar(inventario)
+        esperado = estado(inventario)
+        inventario.fechar()
+
+        reaberto = self.abrir()
+        self.assertEqual(estado(reaberto), esperado)
+        self.assertIsNotNone(reaberto.buscar_produto_por_nome("sabão"))
+        reaberto.fechar()
+
+    def test_eventos_compactos_por_operacao(self):
+        """Testa os eventos gravados: completos na criação e só os campos mutáveis depois."""
+        inventario = self.abrir()
+        inventario.adicionar_produto_por_codigo_de_barras("111")
+        inventario.adicionar_produto_por_codigo_de_barras("111")
+        inventario.remover_produto_por_codigo_de_barras("111")
+        inventario.remover_produto_por_codigo_de_barras("111")
+        inventario.fechar()
+
+        tipos = [evento[0] for evento in ler_eventos(self.caminho_log)]
+        self.assertEqual(tipos, [
+            PRODUTO, ITEM,
+            PRODUTO_TOCADO, ITEM_ALTERADO,
+            PRODUTO_TOCADO, ITEM_ALTERADO,
+            PRODUTO_TOCADO, DESCARTE,
+        ])
+
+    def test_instantaneo_e_cauda_do_log(self):
+        """Testa que, com instantâneo, a abertura combina o estado salvo com a cauda do log."""
+        inventario = self.abrir()
+        self.operar(inventario, "a")
+        inventario.salvar_instantaneo()
+        tamanho_no_instantaneo = os.path.getsize(self.caminho_log)
+        self.operar(inventario, "b")
+        esperado = estado(inventario)
+        inventario.fechar()
+
+        # Se a abertura relesse o log inteiro, o prefixo corrompido seria notado.
+        with open(self.caminho_log, "r+b") as arquivo:
+            arquivo.write(b"\0" * tamanho_no_instantaneo)
+
+        reaberto = self.abrir()
+        self.assertEqual(estado(reaberto), esperado)
+        reaberto.fechar()
+
+    def test_instantaneo_automatico(self):
+        """Testa que um instantâneo é salvo sozinho a cada N operações."""
+        inventario = self.abrir(operacoes_por_instantaneo=3)
+        self.operar(inventario)
+        inventario.fechar()
+        self.assertTrue(os.path.exists(os.path.join(self.diretorio.name, InventarioComHistorico.ARQUIVO_INSTANTANEO)))
+
+    def test_escrita_interrompida_no_fim_do_log(self):
+        """Testa que um quadro incompleto no fim é descartado e o log continua utilizável."""
+        inventario = self.abrir()
+        self.operar(inventario)
+        esperado = estado(inventario)
+        inventario.fechar()
+        with open(self.caminho_log, "ab") as arquivo:
+            arquivo.write(b"\x40\x00\x00\x00lixo")
+
+        reaberto = self.abrir()
+        self.assertEqual(estado(reaberto), esperado)
+        reaberto.adicionar_produto_por_codigo_de_barras("444")
+        reaberto.fechar()
+
+        reaberto = self.abrir()
+        self.assertIsNotNone(reaberto.buscar_produto_por_codigo_de_barras("444"))
+        reaberto.fechar()
+
+    def test_quantidades_e_textos_grandes(self):
+        """Testa quantidades além de 32 bits e textos de 0xFFFF bytes ou mais, no log e no instantâneo."""
+        inventario = self.abrir()
+        inventario.adicionar_produto_por_codigo_de_barras("111", "Areia", unidade_produto="kg")
+        inventario.adicionar_produtos_por_cupom_fiscal(CupomFiscal(
+            dados_qr_code="qr", data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[DetalheProdutoCupom("Areia", 5_000, unidade_cupom="kg")],
+        ))
+        inventario.registrar_produto(Produto(nome="a" * 0xFFFF, codigo_de_barras="222", url_imagem="ç" * 40_000))
+        esperado = estado(inventario)
+        inventario.fechar()
+
+        for instantaneo in (False, True):
+            with self.subTest(instantaneo=instantaneo):
+                reaberto = self.abrir()
+                self.assertEqual(estado(reaberto), esperado)
+                areia = reaberto.buscar_produto_por_codigo_de_barras("111")
+                self.assertEqual(reaberto.buscar_item_do_produto(areia.id).quantidade, 5_001_000_000) # type: ignore[union-attr]
+                grande = reaberto.buscar_produto_por_codigo_de_barras("222")
+                self.assertEqual((grande.nome, grande.marca, grande.url_imagem), ("a" * 0xFFFF, None, "ç" * 40_000)) # type: ignore[union-attr]
+                if not instantaneo:
+                    reaberto.salvar_instantaneo()
+                reaberto.fechar()
+
+    def test_log_de_versao_antiga_e_recusado(self):
+        with open(self.caminho_log, "wb") as arquivo:
+            arquivo.write(b"\x10\x00\x00\x00\x00\x00\x00\x00")
+        with self.assertRaises(HistoricoCorrompido):
+            self.abrir()
+        with self.assertRaises(HistoricoCorrompido):
+            list(ler_eventos(self.caminho_log))
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
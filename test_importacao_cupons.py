@@ -0,0 +1,182 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+from datetime import date
+
+from models import Produto
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from registro_cupons import RegistroCupons
+from importacao_cupons import CupomLido, ImportadorCupons, ler_cupons, ler_cupons_jsonl, ler_cupons_xml
+
+def linha(qr, itens, data="2024-01-10"):
+    return json.dumps({"dados_qr_code": qr, "data_compra": data, "nome_loja": "Mercado", "itens": itens})
+
+JSONL = "\n".join([
+    linha("qr1", [{"nome": "Leite", "quantidade": 2, "preco_unitario": 4.5}, {"nome": "Arroz", "quantidade": "0,5", "unidade": "kg"}]),
+    "{nao e json",
+    linha("qr2", [{"nome": "Leite", "quantidade": 0}]),
+    "",
+    linha("qr3", [{"nome": "Café", "quantidade": 1}], data="ontem"),
+    linha("qr4", [{"nome": "Leite", "quantidade": 1}]),
+]) + "\n"
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<lote xmlns="http://www.portalfiscal.inf.br/nfe">
+  <nfeProc><NFe>
+    <infNFe Id="NFe35240112345678000190650010000000011000000010">
+      <ide><dhEmi>2024-01-10T10:15:00-03:00</dhEmi></ide>
+      <emit><xNome>Mercado LTDA</xNome><xFant>Mercado</xFant></emit>
+      <det nItem="1"><prod><xProd>Leite</xProd><qCom>3.0000</qCom><uCom>UN</uCom><vUnCom>4.50</vUnCom></prod></det>
+      <det nItem="2"><prod><xProd>Banana</xProd><qCom>1.250</qCom><uCom>KG</uCom></prod></det>
+    </infNFe>
+    <infNFeSupl><qrCode><![CDATA[https://www.nfce.fazenda.sp.gov.br/qrcode?p=35240112345678000190650010000000011000000010|2|1|1|abc]]></qrCode></infNFeSupl>
+  </NFe></nfeProc>
+  <NFe><infNFe Id="NFe1"><ide><dhEmi>2024-01-11T09:00:00-03:00</dhEmi></ide></infNFe></NFe>
+</lote>
+"""
+
+class TestLeitura(unittest.TestCase):
+
+    def test_jsonl_com_erros_por_linha(self):
+        lidos = list(ler_cupons_jsonl(io.StringIO(JSONL)))
+        self.assertEqual([l.origem.rpartition(":")[2] for l in lidos], ["1", "2", "3", "5", "6"])
+        self.assertEqual([l.cupom is not None for l in lidos], [True, False, False, False, True])
+        cupom = lidos[0].cupom
+        self.assertEqual((cupom.dados_qr_code, cupom.data_compra_cupom, cupom.nome_loja), ("qr1", date(2024, 1, 10), "Mercado")) # type: ignore[union-attr]
+        arroz = cupom.detalhes_produtos_cupom[1] # type: ignore[union-attr]
+        self.assertEqual((arroz.quantidade_cupom, arroz.unidade_cupom), (0.5, "kg"))
+        self.assertIn("Leite", lidos[2].erro) # type: ignore[arg-type]
+
+    def test_xml_de_nfce(self):
+        lidos = list(ler_cupons_xml(io.BytesIO(XML.encode())))
+        self.assertEqual(len(lidos), 2)
+        cupom = lidos[0].cupom
+        self.assertTrue(cupom.dados_qr_code.startswith("https://")) # type: ignore[union-attr]
+        self.assertEqual((cupom.data_compra_cupom, cupom.nome_loja), (date(2024, 1, 10), "Mercado")) # type: ignore[union-attr]
+        self.assertEqual(
+            [(d.nome_produto_cupom, d.quantidade_cupom, d.unidade_cupom, d.preco_unitario_cupom) for d in cupom.detalhes_produtos_cupom], # type: ignore[union-attr]
+            [("Leite", 3.0, "UN", 4.5), ("Banana", 1.25, "KG", None)],
+        )
+        self.assertEqual(lidos[1].erro, "Cupom sem itens.")
+
+    def test_xml_malformado_e_arquivo_compactado(self):
+        lidos = list(ler_cupons_xml(io.BytesIO(XML.encode()[:-30])))
+        self.assertIsNotNone(lidos[0].cupom)
+        self.assertTrue(lidos[-1].erro.startswith("XML malformado")) # type: ignore[union-attr]
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "cupons.jsonl.gz")
+            with gzip.open(caminho, "wt", encoding="utf-8") as arquivo:
+                arquivo.write(JSONL)
+            self.assertEqual(sum(1 for l in ler_cupons(caminho) if l.cupom), 2)
+            with self.assertRaises(ValueError):
+                ler_cupons(os.path.join(diretorio, "cupons.csv"))
+
+class TestImportadorCupons(unittest.TestCase):
+
+    def test_importa_em_grupos_com_progresso(self):
+        for repositorio in (Inventario(), RepositorioSQLite()):
+            with self.subTest(repositorio=type(repositorio).__name__):
+                progresso, falhas = [], []
+                importador = ImportadorCupons(
+                    repositorio, cupons_por_transacao=2,
+                    progresso=lambda r: progresso.append(r.lidos), ao_falhar=falhas.append,
+                )
+                resumo = importador.importar(ler_cupons_jsonl(io.StringIO(JSONL)))
+                self.assertEqual((resumo.lidos, resumo.importados, resumo.recusados, resumo.itens), (5, 2, 3, 3))
+                self.assertEqual(progresso, [2, 4, 5])
+                self.assertEqual([e.origem for e in resumo.erros], [e.origem for e in falhas])
+                leite = repositorio.buscar_produto_por_nome("leite")
+                self.assertEqual(repositorio.buscar_item_do_produto(leite.id).quantidade, 3) # type: ignore[union-attr]
+                arroz = repositorio.buscar_produto_por_nome("arroz")
+                self.assertEqual((arroz.unidade, repositorio.buscar_item_do_produto(arroz.id).quantidade), ("kg", 500_000)) # type: ignore[union-attr]
+
+    def test_unidade_incompativel_recusa_o_cupom_inteiro(self):
+        inventario = Inventario([Produto(nome="Arroz", codigo_de_barras="1", unidade="un")], [])
+        cupom = next(ler_cupons_jsonl(io.StringIO(linha("qr", [
+            {"nome": "Leite", "quantidade": 1}, {"nome": "Arroz", "quantidade": 1, "unidade": "kg"},
+        ])))).cupom
+        resumo = ImportadorCupons(inventario).importar([CupomLido("x", cupom)])
+        self.assertEqual((resumo.importados, resumo.recusados), (0, 1))
+        self.assertIsNone(inventario.buscar_produto_por_nome("Leite"))
+
+    def test_registro_pula_cupons_ja_importados(self):
+        inventario, registro = Inventario(), RegistroCupons()
+        importador = ImportadorCupons(inventario, registro=registro)
+        importador.importar(ler_cupons_jsonl(io.StringIO(JSONL)))
+        resumo = importador.importar(ler_cupons_jsonl(io.StringIO(JSONL)))
+        self.assertEqual((resumo.importados, resumo.repetidos), (0, 2))
+        leite = inventario.buscar_produto_por_nome("leite")
+        self.assertEqual(inventario.buscar_item_do_produto(leite.id).quantidade, 3) # type: ignore[union-attr]
+        registro.fechar()
+
+    def test_commit_que_falha_libera_os_cupons_do_grupo(self):
+        """Testa que um grupo desfeito não fica marcado no registro e é importado na nova tentativa."""
+        repositorio, registro = RepositorioSQLite(), RegistroCupons()
+        importador = ImportadorCupons(repositorio, registro=registro)
+        cupons = [CupomLido("x", next(ler_cupons_jsonl(io.StringIO(linha("qrA", [{"nome": "Leite", "quantidade": 2}])))).cupom)]
+
+        def falhar():
+            raise RuntimeError("disco cheio")
+
+        repositorio._gravar_alteracoes = falhar # type: ignore[method-assign]
+        with self.assertRaises(RuntimeError):
+            importador.importar(cupons)
+        del repositorio._gravar_alteracoes
+        self.assertIsNone(repositorio.buscar_produto_por_nome("leite"))
+        self.assertNotIn("qrA", registro)
+
+        resumo = importador.importar(cupons + cupons)
+        self.assertEqual((resumo.importados, resumo.repetidos), (1, 1))
+        leite = repositorio.buscar_produto_por_nome("leite")
+        self.assertEqual(repositorio.buscar_item_do_produto(leite.id).quantidade, 2) # type: ignore[union-attr]
+        self.assertIn("qrA", registro)
+        registro.fechar()
+
+    def test_cupom_de_outro_worker_e_esperado_fora_da_transacao(self):
+        """Testa que o cupom reservado por outro worker fica para depois do commit do grupo."""
+
+        class InventarioObservado(Inventario):
+            transacoes_abertas = 0
+
+            @contextmanager
+            def transacao(self):
+                self.transacoes_abertas += 1
+                try:
+                    with super().transacao():
+                        yield
+                finally:
+                    self.transacoes_abertas -= 1
+
+        inventario, registro = InventarioObservado(), RegistroCupons()
+        lidos = [
+            CupomLido(str(numero), next(ler_cupons_jsonl(io.StringIO(linha(qr, [{"nome": "Leite", "quantidade": 1}])))).cupom)
+            for numero, qr in enumerate(["qrA", "qrB", "qrC"])
+        ]
+        self.assertTrue(registro.reservar("qrA"))
+        self.assertTrue(registro.reservar("qrC"))
+        abertas_ao_concluir = []
+
+        def outro_worker():
+            abertas_ao_concluir.append(inventario.transacoes_abertas)
+            registro.concluir("qrA", [])
+
+        outro = threading.Timer(0.05, outro_worker)
+        outro.start()
+        resumo = ImportadorCupons(inventario, registro=registro, espera_maxima=0.5).importar(lidos)
+        outro.join()
+
+        # qrA foi concluído pelo outro worker; qrC nunca foi e é recusado no prazo.
+        self.assertEqual(abertas_ao_concluir, [0])
+        self.assertEqual((resumo.lidos, resumo.importados, resumo.repetidos, resumo.recusados), (3, 1, 1, 1))
+        leite = inventario.buscar_produto_por_nome("leite")
+        self.assertEqual(inventario.buscar_item_do_produto(leite.id).quantidade, 1) # type: ignore[union-attr]
+        registro.fechar()
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+import uuid
+from datetime import date, datetime
+
+from models import Produto, ItemEstoque
+from instantaneo import Instantaneo, gravar_instantaneo
+
+def campos(objeto):
+    return tuple(getattr(objeto, campo) for campo in type(objeto).__slots__)
+
+class TestInstantaneo(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.diretorio.name, "estoque.inst")
+        self.leite = Produto("Leite Integral", "111", "Itambé", "l", date(2024, 5, 1), "http://img/leite.png")
+        self.arroz = Produto("Arroz", "222", unidade="kg", url_imagem="http://img/" + "ç" * 40_000)
+        self.arroz.criado_em = datetime(2020, 1, 1, 12, 30, 15, 123456)
+        cupom = uuid.uuid4()
+        self.estoque = [
+            ItemEstoque(self.leite.id, 2, date(2024, 1, 10), date(2024, 2, 1), cupom),
+            ItemEstoque(self.arroz.id, 5_000_000, id_cupom_fiscal_origem=cupom),
+            ItemEstoque(self.leite.id, -1),
+            ItemEstoque(uuid.uuid4(), 3), # Produto que não está no instantâneo
+        ]
+        gravar_instantaneo(self.caminho, [self.leite, self.arroz], self.estoque)
+        self.instantaneo = Instantaneo(self.caminho)
+
+    def tearDown(self):
+        self.instantaneo.fechar()
+        self.diretorio.cleanup()
+
+    def test_objetos_criados_sob_demanda(self):
+        """Testa que abrir não cria objetos e que cada um é criado uma vez, com ids e timestamps gravados."""
+        self.assertEqual((len(self.instantaneo.produtos), len(self.instantaneo.estoque)), (2, 4))
+        self.assertEqual(self.instantaneo.estoque.criados(), 0)
+        item = self.instantaneo.estoque[-1]
+        self.assertEqual(campos(item), campos(self.estoque[-1]))
+        self.assertIs(self.instantaneo.estoque[3], item)
+        self.assertEqual(self.instantaneo.estoque.criados(), 1)
+        self.assertEqual(campos(self.instantaneo.produtos[0]), campos(self.leite))
+        # Textos acima de 0xFFFF bytes são gravados inteiros.
+        self.assertEqual(self.instantaneo.produtos[1].url_imagem, "http://img/" + "ç" * 40_000)
+        self.assertEqual([campos(i) for i in self.instantaneo.estoque[:2]], [campos(i) for i in self.estoque[:2]])
+
+    def test_carregar(self):
+        primeiro = self.instantaneo.estoque[0]
+        inventario = self.instantaneo.carregar(indexar_validades=True)
+        self.assertEqual([p.id for p in inventario.produtos], [self.leite.id, self.arroz.id])
+        self.assertEqual(campos(inventario.produtos[0]), campos(self.leite))
+        self.assertEqual([campos(i) for i in inventario.estoque], [campos(i) for i in self.estoque])
+        self.assertIs(inventario.estoque[0], primeiro)
+        # Ids referenciados são um objeto só.
+        self.assertIs(inventario.estoque[0].id_cupom_fiscal_origem, inventario.estoque[1].id_cupom_fiscal_origem)
+        self.assertIs(inventario.buscar_produto_por_codigo_de_barras("111"), inventario.produtos[0])
+        self.assertEqual(len(inventario.itens_a_vencer(30, hoje=date(2024, 1, 15))), 1)
+        self.assertEqual(self.instantaneo.estoque.criados(), 4)
+
+    def test_arquivo_invalido(self):
+        outro = os.path.join(self.diretorio.name, "outro.inst")
+        with open(outro, "wb") as arquivo:
+            arquivo.write(b"CATG" + bytes(100))
+        with self.assertRaises(ValueError):
+            Instantaneo(outro)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,96 @@
+import unittest
+from datetime import date
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+
+class TestInventario(unittest.TestCase):
+
+    def setUp(self):
+        self.produtos_cadastrados: list[Produto] = []
+        self.estoque: list[ItemEstoque] = []
+        self.inventario = Inventario(self.produtos_cadastrados, self.estoque)
+
+    def test_indexa_listas_existentes(self):
+        """Testa que o construtor indexa produtos e itens já presentes nas listas."""
+        produto = Produto(nome="Café 500g", codigo_de_barras="111")
+        item = ItemEstoque(produto_id=produto.id, quantidade=2)
+        inventario = Inventario([produto], [item])
+
+        self.assertIs(inventario.buscar_produto_por_codigo_de_barras("111"), produto)
+        self.assertIs(inventario.buscar_produto_por_nome("CAFÉ 500G"), produto)
+        self.assertIs(inventario.buscar_item_do_produto(produto.id), item)
+        self.assertIsNone(inventario.buscar_produto_por_codigo_de_barras("999"))
+
+    def test_duplicatas_preservam_primeiro_registro(self):
+        """Testa que, com códigos repetidos, o índice aponta para o primeiro produto da lista."""
+        primeiro = Produto(nome="Leite", codigo_de_barras="222")
+        segundo = Produto(nome="Leite", codigo_de_barras="222")
+        inventario = Inventario([primeiro, segundo], [])
+
+        self.assertIs(inventario.buscar_produto_por_codigo_de_barras("222"), primeiro)
+        self.assertIs(inventario.buscar_produto_por_nome("leite"), primeiro)
+
+    def test_operacoes_modificam_as_listas_recebidas(self):
+        """Testa que as operações mantêm as listas do chamador e os índices em sincronia."""
+        produto, item = self.inventario.adicionar_produto_por_codigo_de_barras("333", "Açúcar")
+        self.inventario.adicionar_produto_por_codigo_de_barras("333")
+
+        self.assertEqual(self.produtos_cadastrados, [produto])
+        self.assertEqual(self.estoque, [item])
+        self.assertEqual(item.quantidade, 2)
+
+        self.inventario.remover_produto_por_codigo_de_barras("333")
+        self.assertIsNone(self.inventario.remover_produto_por_codigo_de_barras("333"))
+        self.assertEqual(self.estoque, [])
+        self.assertIsNone(self.inventario.buscar_item_do_produto(produto.id))
+
+    def test_descartar_item_mantem_posicoes(self):
+        """Testa que remover um item do meio do estoque mantém os demais acessíveis."""
+        itens = [
+            self.inventario.adicionar_produto_por_codigo_de_barras(codigo)[1]
+            for codigo in ("A", "B", "C")
+        ]
+
+        self.inventario.remover_produto_por_codigo_de_barras("A")
+        self.assertCountEqual(self.estoque, itens[1:])
+
+        # Os itens deslocados continuam removíveis pelo índice de posição.
+        self.inventario.remover_produto_por_codigo_de_barras("C")
+        self.inventario.remover_produto_por_codigo_de_barras("B")
+        self.assertEqual(self.estoque, [])
+
+    def test_modo_sem_indices_preserva_ordem(self):
+        """Testa que, sem índices, as buscas são lineares e a remoção mantém a ordem do estoque."""
+        inventario = Inventario(self.produtos_cadastrados, self.estoque, indexar=False)
+        itens = [inventario.adicionar_produto_por_codigo_de_barras(codigo)[1] for codigo in ("A", "B", "C")]
+
+        inventario.remover_produto_por_codigo_de_barras("A")
+
+        self.assertFalse(inventario.indexado)
+        self.assertEqual(self.estoque, itens[1:])
+        self.assertIs(inventario.buscar_item_do_produto(itens[2].produto_id), itens[2])
+
+    def test_cupom_fiscal_usa_indice_por_nome(self):
+        """Testa que itens do cupom são associados a produtos pelo nome sem diferenciar caixa."""
+        produto, item = self.inventario.adicionar_produto_por_codigo_de_barras("444", "Arroz 1kg")
+        cupom = CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[
+                DetalheProdutoCupom("ARROZ 1KG", 2),
+                DetalheProdutoCupom("Sabão", 1),
+            ],
+        )
+
+        resultados = self.inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+
+        self.assertEqual(resultados[0], (produto, item))
+        self.assertEqual(item.quantidade, 3)
+        self.assertEqual(item.data_compra, date(2024, 1, 10))
+        novo_produto, _ = resultados[1]
+        self.assertTrue(novo_produto.codigo_de_barras.startswith("SEM_COD_BARRAS_"))
+        self.assertIs(self.inventario.buscar_produto_por_nome("sabão"), novo_produto)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
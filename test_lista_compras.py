@@ -0,0 +1,69 @@
+import unittest
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from lista_compras import ItemListaCompras, ListaDeCompras
+
+class TestListaDeCompras(unittest.TestCase):
+
+    def setUp(self):
+        self.leite = Produto(nome="Leite", codigo_de_barras="111")
+        self.cafe = Produto(nome="Café", codigo_de_barras="222")
+        estoque = [ItemEstoque(self.leite.id, 2), ItemEstoque(self.cafe.id, 1)]
+        self.inventario = Inventario([self.leite, self.cafe], estoque)
+        self.lista = ListaDeCompras(self.inventario, self.inventario.estoque, {self.leite.id: 3, self.cafe.id: 1})
+
+    def test_acompanha_leituras_e_remocoes(self):
+        """Testa que cada operação move o produto para dentro ou para fora da lista."""
+        self.assertEqual(self.lista.itens(), [ItemListaCompras(self.leite.id, 2, 3, 1)])
+        self.inventario.adicionar_produto_por_codigo_de_barras("111")
+        self.assertNotIn(self.leite.id, self.lista)
+        self.inventario.remover_produto_por_codigo_de_barras("222")
+        self.inventario.remover_produto_por_codigo_de_barras("222") # Sem estoque: nada muda
+        self.assertEqual(self.lista.itens(), [ItemListaCompras(self.cafe.id, 0, 1, 1)])
+        self.inventario.adicionar_produtos_por_codigos_de_barras(["222", "333"])
+        self.assertEqual(len(self.lista), 0)
+        self.assertEqual(self.lista.saldo(self.leite.id), 3)
+
+    def test_alteracoes_desde_uma_versao(self):
+        versao = self.lista.versao
+        self.inventario.remover_produto_por_codigo_de_barras("111") # Leite: falta 2
+        self.inventario.remover_produto_por_codigo_de_barras("222") # Café entra
+        self.inventario.adicionar_produto_por_codigo_de_barras("111") # Leite: falta 1
+        self.inventario.adicionar_produto_por_codigo_de_barras("111") # Leite sai
+        alteracoes = self.lista.alteracoes_desde(versao)
+        self.assertEqual(alteracoes.alterados, [ItemListaCompras(self.cafe.id, 0, 1, 1)])
+        self.assertEqual(alteracoes.removidos, [self.leite.id])
+        self.assertEqual(alteracoes.versao, versao + 4)
+        self.assertEqual(self.lista.alteracoes_desde(alteracoes.versao), (alteracoes.versao, [], []))
+        # Da versão 0 vem a lista inteira, sem os removidos.
+        self.assertEqual(self.lista.alteracoes_desde(0), (alteracoes.versao, alteracoes.alterados, []))
+
+    def test_definir_minimo(self):
+        self.lista.definir_minimo(self.leite.id, None)
+        self.assertEqual(len(self.lista), 0)
+        self.lista.definir_minimo(self.cafe.id, 5)
+        self.assertEqual([(item.produto_id, item.comprar) for item in self.lista.itens()], [(self.cafe.id, 4)])
+        with self.assertRaises(ValueError):
+            self.lista.definir_minimo(self.cafe.id, -1)
+        self.lista.desconectar()
+        self.inventario.remover_produto_por_codigo_de_barras("222")
+        self.assertEqual(self.lista.saldo(self.cafe.id), 1)
+
+    def test_remocao_fracionada_no_sqlite(self):
+        """Testa o saldo na unidade base com lotes menores que a unidade removida."""
+        repositorio = RepositorioSQLite()
+        produto, _ = repositorio.adicionar_produto_por_codigo_de_barras("333", "Arroz", unidade_produto="kg")
+        lista = ListaDeCompras(repositorio, repositorio.listar_estoque(), {produto.id: 2_000_000})
+        self.assertEqual(lista.itens()[0].comprar, 1_000_000)
+        item = repositorio.buscar_item_do_produto(produto.id)
+        item.quantidade = 400_000 # type: ignore[union-attr]
+        repositorio.atualizar_item(item) # type: ignore[arg-type]
+        lista.estoque_alterado(produto.id, -600_000)
+        repositorio.remover_produto_por_codigo_de_barras("333")
+        self.assertEqual(lista.saldo(produto.id), 0)
+        self.assertEqual(lista.itens()[0].comprar, 2_000_000)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,113 @@
+import unittest
+from datetime import date
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from concorrencia import InventarioConcorrente
+from lotes import FIFO, LotesDoProduto
+
+def cupom(data_compra, *detalhes):
+    return CupomFiscal(dados_qr_code="qr", data_compra_cupom=data_compra, detalhes_produtos_cupom=list(detalhes))
+
+class TestLotesDoProduto(unittest.TestCase):
+
+    def test_ordem_e_reposicionamento(self):
+        """Testa que o heap devolve o menor lote e ignora entradas obsoletas."""
+        lotes = LotesDoProduto()
+        itens = [ItemEstoque(produto_id=None, quantidade=1) for _ in range(3)] # type: ignore[arg-type]
+        for chave, item in zip((3, 1, 2), itens):
+            lotes.definir(item, (chave,))
+        self.assertIs(lotes.proximo(), itens[1])
+
+        lotes.definir(itens[1], (9,))
+        self.assertIs(lotes.proximo(), itens[2])
+        lotes.remover(itens[2])
+        self.assertIs(lotes.proximo(), itens[0])
+        self.assertEqual(len(lotes), 2)
+
+    def test_compacta_entradas_obsoletas(self):
+        lotes = LotesDoProduto()
+        item = ItemEstoque(produto_id=None, quantidade=1) # type: ignore[arg-type]
+        for chave in range(1000):
+            lotes.definir(item, (chave,))
+        self.assertLess(len(lotes._heap), 20)
+        self.assertIs(lotes.proximo(), item)
+
+class TestInventarioComLotes(unittest.TestCase):
+
+    def setUp(self):
+        self.produto = Produto(nome="Leite", codigo_de_barras="111")
+
+    def test_cupons_diferentes_formam_lotes(self):
+        """Testa que compras diferentes não são mais somadas ao primeiro item."""
+        inventario = Inventario([self.produto], [], lotes=FIFO)
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom(date(2024, 1, 10), DetalheProdutoCupom("Leite", 2)))
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom(date(2024, 1, 3), DetalheProdutoCupom("Leite", 3)))
+
+        lotes = inventario.lotes_do_produto(self.produto.id)
+        self.assertEqual([(lote.data_compra, lote.quantidade) for lote in lotes], [
+            (date(2024, 1, 3), 3), (date(2024, 1, 10), 2),
+        ])
+
+    def test_leituras_do_mesmo_dia_somam_no_mesmo_lote(self):
+        inventario = Inventario([self.produto], [], lotes=FIFO)
+        for _ in range(3):
+            inventario.adicionar_produto_por_codigo_de_barras("111")
+        inventario.adicionar_produtos_por_codigos_de_barras(["111", "111"])
+        [lote] = inventario.lotes_do_produto(self.produto.id)
+        self.assertEqual(lote.quantidade, 5)
+
+    def test_fifo_consome_a_compra_mais_antiga(self):
+        inventario = Inventario([self.produto], [], lotes="fifo")
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom(date(2024, 2, 1), DetalheProdutoCupom("Leite", 1)))
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom(date(2024, 1, 1), DetalheProdutoCupom("Leite", 2)))
+
+        restante = inventario.remover_produto_por_codigo_de_barras("111")
+        self.assertEqual((restante.data_compra, restante.quantidade), (date(2024, 1, 1), 1))
+        self.assertIsNone(inventario.remover_produto_por_codigo_de_barras("111"))
+        [lote] = inventario.lotes_do_produto(self.produto.id)
+        self.assertEqual(lote.data_compra, date(2024, 2, 1))
+
+    def test_fefo_consome_o_que_vence_primeiro(self):
+        """Testa FEFO com validade específica, validade padrão do produto e mudança de validade."""
+        self.produto.data_de_validade_padrao = date(2024, 3, 1)
+        antigo = ItemEstoque(produto_id=self.produto.id, quantidade=1, data_compra=date(2024, 1, 1))
+        vence_antes = ItemEstoque(
+            produto_id=self.produto.id, quantidade=1, data_compra=date(2024, 1, 5),
+            data_validade_especifica=date(2024, 2, 1),
+        )
+        inventario = Inventario([self.produto], [antigo, vence_antes], lotes="fefo")
+        self.assertIs(inventario.buscar_lote_para_consumo(self.produto.id), vence_antes)
+
+        inventario.definir_validade_do_item(vence_antes.id, date(2024, 6, 1))
+        self.assertIs(inventario.buscar_lote_para_consumo(self.produto.id), antigo)
+
+        self.produto.data_de_validade_padrao = date(2024, 12, 1)
+        inventario.atualizar_produto(self.produto)
+        self.assertIs(inventario.buscar_lote_para_consumo(self.produto.id), vence_antes)
+
+    def test_remocao_fracionada_atravessa_lotes(self):
+        """Testa que remover 1 kg com um lote de 300 g consome o resto do lote seguinte."""
+        self.produto.unidade = "kg"
+        parcial = ItemEstoque(produto_id=self.produto.id, quantidade=300_000, data_compra=date(2024, 1, 1))
+        seguinte = ItemEstoque(produto_id=self.produto.id, quantidade=2_000_000, data_compra=date(2024, 1, 2))
+        inventario = Inventario([self.produto], [parcial, seguinte], lotes="fifo")
+        restante = inventario.remover_produto_por_codigo_de_barras("111")
+        self.assertIs(restante, seguinte)
+        self.assertEqual(restante.quantidade, 1_300_000)
+        self.assertEqual(inventario.estoque, [seguinte])
+
+    def test_politica_invalida(self):
+        with self.assertRaises(ValueError):
+            Inventario(lotes="lifo")
+
+    def test_inventario_concorrente_com_lotes(self):
+        inventario = InventarioConcorrente([self.produto], [], lotes="fefo")
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom(date(2024, 1, 1), DetalheProdutoCupom("Leite", 2)))
+        inventario.adicionar_produto_por_codigo_de_barras("111")
+        self.assertEqual(len(inventario.lotes_do_produto(self.produto.id)), 2)
+        inventario.remover_produto_por_codigo_de_barras("111")
+        self.assertEqual(sum(lote.quantidade for lote in inventario.estoque), 2)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from datetime import date
+
+import stock_management
+from models import Produto, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from metricas import Histograma, Metricas
+
+class TestHistograma(unittest.TestCase):
+
+    def test_faixas_cumulativas(self):
+        histograma = Histograma((1.0, 2.0))
+        for valor in (0.5, 1.0, 1.5, 3.0):
+            histograma.observar(valor)
+        self.assertEqual(histograma.acumulado(), [(1.0, 2), (2.0, 3), (float("inf"), 4)])
+        self.assertEqual(histograma.soma, 6.0)
+        self.assertEqual(histograma.quantil(0.5), 1.0)
+        self.assertEqual(histograma.quantil(1.0), float("inf"))
+
+class TestMetricas(unittest.TestCase):
+
+    def setUp(self):
+        self.metricas = Metricas()
+
+    def test_instrumentar_conta_operacoes_buscas_e_sem_codigo(self):
+        inventario = self.metricas.instrumentar(Inventario(), nome="casa")
+        inventario.adicionar_produto_por_codigo_de_barras("789")
+        inventario.adicionar_produto_por_codigo_de_barras("789")
+        cupom = CupomFiscal("qr", date(2024, 1, 1), [DetalheProdutoCupom("Arroz", 1), DetalheProdutoCupom("arroz", 1)])
+        inventario.adicionar_produtos_por_cupom_fiscal(cupom)
+
+        m = self.metricas
+        self.assertEqual(m.histograma("duracao_operacao_segundos", operacao="adicionar_produto_por_codigo_de_barras").total, 2) # type: ignore[union-attr]
+        self.assertEqual(m.contador(
+            "buscas_total", busca="codigo_de_barras", operacao="adicionar_produto_por_codigo_de_barras", resultado="falha"
+        ), 1)
+        self.assertEqual(m.contador(
+            "buscas_total", busca="codigo_de_barras", operacao="adicionar_produto_por_codigo_de_barras", resultado="acerto"
+        ), 1)
+        # No cupom: a primeira linha cria um produto sem código, a segunda o encontra pelo nome.
+        self.assertEqual(m.contador(
+            "buscas_total", busca="nome", operacao="adicionar_produtos_por_cupom_fiscal", resultado="acerto"
+        ), 1)
+        self.assertEqual(m.contador("produtos_sem_codigo_total"), 1)
+
+        decomposicao = m.decomposicao("adicionar_produtos_por_cupom_fiscal")
+        self.assertGreater(decomposicao["total"], 0)
+        self.assertGreater(decomposicao["buscas"], 0)
+        self.assertGreater(decomposicao["gravacoes"], 0)
+        self.assertAlmostEqual(
+            decomposicao["total"], decomposicao["buscas"] + decomposicao["gravacoes"] + decomposicao["logica"]
+        )
+
+        self.assertIn('estoque_tamanho{colecao="produtos",repositorio="casa"} 2', m.para_prometheus())
+
+    def test_desinstrumentar(self):
+        inventario = self.metricas.instrumentar(Inventario())
+        Metricas.desinstrumentar(inventario)
+        inventario.adicionar_produto_por_codigo_de_barras("789")
+        self.assertEqual(self.metricas.histograma(
+            "duracao_operacao_segundos", operacao="adicionar_produto_por_codigo_de_barras"
+        ).total, 0) # type: ignore[union-attr]
+        self.assertNotIn("adicionar_produto_por_codigo_de_barras", vars(inventario))
+
+    def test_erros_sao_contados(self):
+        repositorio = self.metricas.instrumentar(RepositorioSQLite(":memory:"))
+        repositorio.adicionar_produto_por_codigo_de_barras("789", "Arroz", unidade_produto="kg")
+        cupom = CupomFiscal("qr", date(2024, 1, 1), [DetalheProdutoCupom("Arroz", 1, None, "un")])
+        with self.assertRaises(ValueError):
+            repositorio.adicionar_produtos_por_cupom_fiscal(cupom)
+        self.assertEqual(self.metricas.contador("erros_total", operacao="adicionar_produtos_por_cupom_fiscal"), 1)
+        self.assertEqual(self.metricas.histograma("duracao_operacao_segundos", operacao="adicionar_produtos_por_cupom_fiscal").total, 1) # type: ignore[union-attr]
+
+    def test_stock_management(self):
+        """Testa que as funções de lista são medidas só com `stock_management.metricas` definido."""
+        produtos, estoque = [], []
+        stock_management.adicionar_produto_por_codigo_de_barras("789", produtos, estoque)
+        stock_management.metricas = self.metricas
+        try:
+            stock_management.adicionar_produto_por_codigo_de_barras("789", produtos, estoque)
+            stock_management.remover_produto_por_codigo_de_barras("789", produtos, estoque)
+        finally:
+            stock_management.metricas = None
+        for operacao in ("adicionar_produto_por_codigo_de_barras", "remover_produto_por_codigo_de_barras"):
+            self.assertEqual(self.metricas.histograma("duracao_operacao_segundos", operacao=operacao).total, 1) # type: ignore[union-attr]
+        # O tamanho acompanha as listas do chamador, inclusive depois da chamada.
+        produtos.append(Produto(nome="Café", codigo_de_barras="123"))
+        exportado = self.metricas.para_prometheus()
+        self.assertIn('estoque_tamanho{colecao="produtos",repositorio="stock_management"} 2', exportado)
+        self.assertIn('estoque_tamanho{colecao="estoque",repositorio="stock_management"} 1', exportado)
+
+    def test_perfil_amostrado(self):
+        metricas = Metricas(perfilar_a_cada=2)
+        inventario = metricas.instrumentar(Inventario())
+        for _ in range(4):
+            inventario.adicionar_produto_por_codigo_de_barras("789")
+        perfil = metricas.perfil("adicionar_produto_por_codigo_de_barras")
+        self.assertIsNotNone(perfil)
+        self.assertGreater(perfil.total_calls, 0) # type: ignore[union-attr]
+
+        perfis = []
+        metricas = Metricas(perfilar_a_cada=1, ao_perfilar=lambda operacao, perfil: perfis.append(operacao))
+        inventario = metricas.instrumentar(Inventario())
+        inventario.adicionar_produtos_por_codigos_de_barras(["1", "2"])
+        self.assertEqual(perfis, ["adicionar_produtos_por_codigos_de_barras"])
+        self.assertIsNone(metricas.perfil("adicionar_produtos_por_codigos_de_barras"))
+
+    def test_exportacao(self):
+        inventario = self.metricas.instrumentar(Inventario())
+        inventario.adicionar_produto_por_codigo_de_barras("789")
+        texto = self.metricas.para_prometheus()
+        self.assertIn("# TYPE estoque_erros_total counter", texto)
+        self.assertIn('estoque_erros_total{operacao="adicionar_produto_por_codigo_de_barras"} 0', texto)
+        self.assertIn("# TYPE estoque_duracao_operacao_segundos histogram", texto)
+        self.assertIn('estoque_duracao_operacao_segundos_count{operacao="adicionar_produto_por_codigo_de_barras"} 1', texto)
+        self.assertIn(
+            'estoque_duracao_operacao_segundos_bucket{operacao="adicionar_produto_por_codigo_de_barras",le="+Inf"} 1',
+            texto,
+        )
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "metricas.json")
+            self.metricas.gravar(caminho)
+            with open(caminho, encoding="utf-8") as arquivo:
+                dados = json.load(arquivo)
+        self.assertEqual(dados["histogramas"][0]["faixas"][-1], [None, 1])
+
+        servidor = self.metricas.servir()
+        try:
+            endereco = f"http://127.0.0.1:{servidor.server_address[1]}"
+            with urllib.request.urlopen(f"{endereco}/metrics") as resposta:
+                self.assertEqual(resposta.read().decode("utf-8"), self.metricas.para_prometheus())
+            with urllib.request.urlopen(f"{endereco}/metrics.json") as resposta:
+                self.assertEqual(json.load(resposta), self.metricas.para_json())
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
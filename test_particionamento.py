@@ -0,0 +1,71 @@
+import unittest
+from collections import Counter
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom
+from particionamento import EstoqueParticionado, particao_da_casa
+
+class TestParticaoDaCasa(unittest.TestCase):
+
+    def test_crescer_migra_so_para_a_particao_nova(self):
+        """Testa que ao passar de 3 para 4 partições nenhuma casa troca entre as antigas."""
+        casas = [f"casa{i}" for i in range(2_000)]
+        antes = {casa: particao_da_casa(casa, 3) for casa in casas}
+        depois = {casa: particao_da_casa(casa, 4) for casa in casas}
+        movidas = [casa for casa in casas if antes[casa] != depois[casa]]
+        self.assertTrue(all(depois[casa] == 3 for casa in movidas))
+        self.assertLess(abs(len(movidas) - 500), 100)
+        self.assertLess(max(Counter(antes.values()).values()), 800)
+
+class TestEstoqueParticionado(unittest.TestCase):
+
+    def setUp(self):
+        self.estoque = EstoqueParticionado(2)
+
+    def tearDown(self):
+        self.estoque.fechar()
+
+    def test_operacoes_roteadas_por_casa(self):
+        produto, item = self.estoque.adicionar_produto_por_codigo_de_barras("a", "111", "Leite")
+        self.estoque.adicionar_produto_por_codigo_de_barras("a", "111")
+        self.estoque.adicionar_produto_por_codigo_de_barras("b", "111")
+        self.assertEqual(self.estoque.remover_produto_por_codigo_de_barras("a", "111").quantidade, 1) # type: ignore[union-attr]
+        cupom = CupomFiscal("qr", date(2024, 1, 1), [DetalheProdutoCupom("Leite", 2)])
+        self.assertEqual(self.estoque.adicionar_produtos_por_cupom_fiscal("a", cupom)[0][0].id, produto.id)
+
+        produtos, estoque = self.estoque.estoque_da_casa("a")
+        self.assertEqual(([p.nome for p in produtos], [i.quantidade for i in estoque]), (["Leite"], [3]))
+        self.assertEqual(self.estoque.estoque_da_casa("b")[0][0].nome, "Produto 111")
+        self.assertEqual(self.estoque.estoque_da_casa("c"), ([], []))
+
+    def test_lote_com_erros_por_comando(self):
+        respostas = self.estoque.executar([
+            ("a", "adicionar_produto_por_codigo_de_barras", ("111",)),
+            ("b", "adicionar_produtos_por_cupom_fiscal", (None,)),
+            ("c", "remover_produto_por_codigo_de_barras", ("999",)),
+        ], resultados=False)
+        self.assertIsNone(respostas[0])
+        self.assertIsInstance(respostas[1][1], AttributeError) # type: ignore[index]
+        self.assertIsNone(respostas[2])
+        with self.assertRaises(ValueError):
+            self.estoque.executar([("a", "reindexar", ())])
+
+    def test_redimensionar_e_fixar_preservam_o_estoque(self):
+        casas = [f"casa{i}" for i in range(30)]
+        self.estoque.executar([(casa, "adicionar_produto_por_codigo_de_barras", ("111",)) for casa in casas])
+        migradas = self.estoque.redimensionar(3)
+        self.assertEqual(migradas, sum(1 for casa in casas if particao_da_casa(casa, 3) == 2))
+        self.assertEqual(sum(self.estoque.casas_por_particao()), 30)
+
+        self.estoque.fixar_casa("casa0", 2)
+        self.assertEqual(self.estoque.particao("casa0"), 2)
+        self.estoque.redimensionar(1)
+        self.assertEqual(self.estoque.particoes, 1)
+        self.estoque.executar([(casa, "adicionar_produto_por_codigo_de_barras", ("111",)) for casa in casas])
+        for casa in casas:
+            self.assertEqual([i.quantidade for i in self.estoque.estoque_da_casa(casa)[1]], [2])
+        with self.assertRaises(ValueError):
+            self.estoque.fixar_casa("casa0", 1)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
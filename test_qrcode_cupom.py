@@ -0,0 +1,117 @@
+import unittest
+from datetime import date
+
+from models import CupomFiscal
+from qrcode_cupom import (
+    QrCodeInvalido,
+    chave_do_cupom,
+    deduplicar_cupons,
+    digito_verificador_chave,
+    interpretar_qr_code,
+    validar_chave_de_acesso,
+)
+
+def montar_chave(uf="35", aamm="2401", cnpj="12345678000195", modelo="65", serie="001", numero="000004321", tipo_emissao="1", codigo="87654321"):
+    sem_dv = uf + aamm + cnpj + modelo + serie + numero + tipo_emissao + codigo
+    return sem_dv + str(digito_verificador_chave(sem_dv))
+
+class TestChaveDeAcesso(unittest.TestCase):
+
+    def test_digito_verificador(self):
+        # Exemplo do Manual de Orientação do Contribuinte da NF-e.
+        self.assertEqual(digito_verificador_chave("5206043300991100250655012000000780026730161"), 5)
+
+    def test_validar_chave(self):
+        chave = montar_chave()
+        self.assertTrue(validar_chave_de_acesso(chave))
+        digito_errado = chave[:43] + str((int(chave[43]) + 1) % 10)
+        self.assertFalse(validar_chave_de_acesso(digito_errado))
+        self.assertFalse(validar_chave_de_acesso(chave[:43]))
+        self.assertFalse(validar_chave_de_acesso("99" + chave[2:]))
+        # Dígitos fora do ASCII passam em str.isdigit(), mas não são uma chave.
+        self.assertFalse(validar_chave_de_acesso(chave[:10] + "٣" + chave[11:]))
+        self.assertFalse(validar_chave_de_acesso(chave[:43] + "５"))
+
+class TestInterpretarQrCode(unittest.TestCase):
+
+    def test_nfce_versao_2_online(self):
+        chave = montar_chave(uf="31")
+        dados = interpretar_qr_code(
+            f"https://portalsped.fazenda.mg.gov.br/portalnfce/sistema/qrcode.xhtml?p={chave}|2|1|1|ABCDEF0123"
+        )
+
+        self.assertEqual(dados.chave_acesso, chave)
+        self.assertEqual(dados.uf, "MG")
+        self.assertEqual(dados.cnpj_emitente, "12345678000195")
+        self.assertEqual(dados.ano_mes_emissao, date(2024, 1, 1))
+        self.assertEqual(dados.modelo, "65")
+        self.assertEqual(dados.numero, "000004321")
+        self.assertEqual(dados.versao_qr, "2")
+        self.assertEqual(dados.ambiente, 1)
+        self.assertIsNone(dados.data_emissao)
+        self.assertEqual(dados.url_consulta, "https://portalsped.fazenda.mg.gov.br/portalnfce/sistema/qrcode.xhtml")
+
+    def test_nfce_versao_2_offline(self):
+        chave = montar_chave(tipo_emissao="9")
+        # Alguns leitores entregam os separadores codificados como %7C.
+        dados = interpretar_qr_code(f"http://www.nfce.fazenda.sp.gov.br/qrcode?p={chave}%7C2%7C1%7C15%7C45.90%7C6a7b%7C1%7CHASH")
+
+        self.assertEqual(dados.data_emissao, date(2024, 1, 15))
+        self.assertEqual(dados.valor_total, 45.90)
+        self.assertEqual(dados.tipo_emissao, "9")
+
+    def test_nfce_versao_1(self):
+        chave = montar_chave(uf="43")
+        dh_emi = "2024-01-20T10:15:00-03:00".encode("ascii").hex()
+        dados = interpretar_qr_code(
+            f"https://www.sefaz.rs.gov.br/NFCE/NFCE-COM.aspx?chNFe={chave}&nVersao=100&tpAmb=2&dhEmi={dh_emi}&vNF=12.50"
+        )
+
+        self.assertEqual(dados.uf, "RS")
+        self.assertEqual(dados.ambiente, 2)
+        self.assertEqual(dados.data_emissao, date(2024, 1, 20))
+        self.assertEqual(dados.valor_total, 12.5)
+
+    def test_cfe_sat(self):
+        chave = montar_chave(modelo="59")
+        dados = interpretar_qr_code(f"{chave}|20240131183000|30.90||assinatura==")
+
+        self.assertEqual(dados.modelo, "59")
+        self.assertEqual(dados.data_emissao, date(2024, 1, 31))
+        self.assertEqual(dados.valor_total, 30.9)
+        self.assertIsNone(dados.url_consulta)
+
+    def test_conteudo_invalido(self):
+        chave = montar_chave()
+        digito_errado = chave[:43] + str((int(chave[43]) + 1) % 10)
+        for conteudo in (
+            "texto qualquer",
+            "https://exemplo.com/sem-chave",
+            f"https://sefaz/qrcode?p={digito_errado}|2|1|1|HASH",
+            f"{chave[:40]}|20240131183000|30.90",
+        ):
+            with self.subTest(conteudo=conteudo):
+                with self.assertRaises(QrCodeInvalido):
+                    interpretar_qr_code(conteudo)
+
+    def test_resultado_memorizado(self):
+        conteudo = f"https://sefaz/qrcode?p={montar_chave()}|2|1|1|HASH"
+        self.assertIs(interpretar_qr_code(conteudo), interpretar_qr_code(conteudo))
+
+class TestDeduplicarCupons(unittest.TestCase):
+
+    def test_releituras_do_mesmo_cupom(self):
+        chave = montar_chave()
+        primeiro = CupomFiscal(f"https://sefaz/qrcode?p={chave}|2|1|1|HASH", date(2024, 1, 5), [])
+        mesma_chave_outra_url = CupomFiscal(f"http://outra.sefaz/consulta?p={chave}|2|1|1|HASH", date(2024, 1, 5), [])
+        outro = CupomFiscal(f"https://sefaz/qrcode?p={montar_chave(numero='000000001')}|2|1|1|H", date(2024, 1, 5), [])
+        sem_qr = CupomFiscal("ilegivel", date(2024, 1, 5), [])
+        nao_ascii = CupomFiscal(f"https://sefaz/qrcode?p={chave[:10]}٣{chave[11:]}|2|1|1|HASH", date(2024, 1, 5), [])
+
+        unicos = deduplicar_cupons([primeiro, mesma_chave_outra_url, outro, sem_qr, sem_qr, nao_ascii])
+
+        self.assertEqual(unicos, [primeiro, outro, sem_qr, nao_ascii])
+        self.assertIsNone(chave_do_cupom(nao_ascii))
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
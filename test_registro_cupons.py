@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from qrcode_cupom import digito_verificador_chave
+from registro_cupons import RegistroCupons, chave_natural_do_cupom
+from stock_management import adicionar_produtos_por_cupom_fiscal
+
+def qr_code(numero: int) -> str:
+    sem_dv = f"3524011234567800019565001{numero:09d}1{numero:08d}"
+    return f"https://www.nfce.fazenda.sp.gov.br/qrcode?p={sem_dv}{digito_verificador_chave(sem_dv)}|2|1|1|HASH"
+
+def novo_cupom(numero: int = 1, dados_qr_code: str = "") -> CupomFiscal:
+    # Cada leitura gera um CupomFiscal novo (e um uuid novo), como no app.
+    return CupomFiscal(
+        dados_qr_code=dados_qr_code or qr_code(numero),
+        data_compra_cupom=date(2024, 1, 10),
+        detalhes_produtos_cupom=[DetalheProdutoCupom("Arroz 1kg", 2), DetalheProdutoCupom("Feijão 1kg", 1)],
+    )
+
+class TestRegistroCupons(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = RegistroCupons()
+        self.produtos_cadastrados: list[Produto] = []
+        self.estoque: list[ItemEstoque] = []
+
+    def tearDown(self):
+        self.registro.fechar()
+
+    def test_chave_natural(self):
+        self.assertEqual(chave_natural_do_cupom(novo_cupom(7)), qr_code(7).split("p=")[1][:44])
+        self.assertEqual(chave_natural_do_cupom(novo_cupom(dados_qr_code=" conteudo bruto ")), "conteudo bruto")
+
+    def test_cupom_repetido_nao_soma_duas_vezes(self):
+        """Testa que reprocessar o mesmo cupom retorna os resultados originais sem alterar o estoque."""
+        primeiro = adicionar_produtos_por_cupom_fiscal(
+            novo_cupom(1), self.produtos_cadastrados, self.estoque, registro=self.registro
+        )
+        repetido = adicionar_produtos_por_cupom_fiscal(
+            novo_cupom(1), self.produtos_cadastrados, self.estoque, registro=self.registro
+        )
+
+        self.assertEqual(repetido, primeiro)
+        self.assertEqual([item.quantidade for item in self.estoque], [2, 1])
+        self.assertEqual(len(self.produtos_cadastrados), 2)
+        self.assertIn(chave_natural_do_cupom(novo_cupom(1)), self.registro)
+
+        adicionar_produtos_por_cupom_fiscal(novo_cupom(2), self.produtos_cadastrados, self.estoque, registro=self.registro)
+        self.assertEqual([item.quantidade for item in self.estoque], [4, 2])
+
+    def test_sem_registro_mantem_comportamento(self):
+        adicionar_produtos_por_cupom_fiscal(novo_cupom(1), self.produtos_cadastrados, self.estoque)
+        adicionar_produtos_por_cupom_fiscal(novo_cupom(1), self.produtos_cadastrados, self.estoque)
+        self.assertEqual([item.quantidade for item in self.estoque], [4, 2])
+
+    def test_capacidade_limitada(self):
+        registro = RegistroCupons(capacidade=2, capacidade_memoria=1)
+        inventario = Inventario()
+        for numero in range(4):
+            registro.processar(novo_cupom(numero), inventario)
+
+        self.assertEqual(len(registro), 2)
+        self.assertNotIn(chave_natural_do_cupom(novo_cupom(0)), registro)
+        self.assertIn(chave_natural_do_cupom(novo_cupom(3)), registro)
+        registro.fechar()
+
+    def test_poda_mantem_reservas_em_andamento(self):
+        """Testa que a poda não apaga a reserva de um worker lento, que seria aplicada duas vezes."""
+        registro = RegistroCupons(capacidade=2, capacidade_memoria=1)
+        inventario = Inventario()
+        lento = chave_natural_do_cupom(novo_cupom(0))
+        self.assertTrue(registro.reservar(lento)) # type: ignore[arg-type]
+        for numero in range(1, 5):
+            registro.processar(novo_cupom(numero), inventario)
+
+        self.assertFalse(registro.reservar(lento)) # type: ignore[arg-type]
+        self.assertNotIn(chave_natural_do_cupom(novo_cupom(1)), registro)
+        self.assertIn(chave_natural_do_cupom(novo_cupom(4)), registro)
+        registro.fechar()
+
+    def test_falha_libera_reserva(self):
+        inventario = Inventario()
+        cupom = novo_cupom(5)
+        cupom.detalhes_produtos_cupom = [DetalheProdutoCupom("Quebrado", "não numérico")] # type: ignore
+
+        with self.assertRaises(ValueError):
+            self.registro.processar(cupom, inventario)
+        self.assertTrue(self.registro.reservar(chave_natural_do_cupom(cupom))) # type: ignore
+
+    def test_persistencia_entre_instancias(self):
+        """Testa que, após reiniciar, o cupom continua registrado e os resultados são reconstruídos."""
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "cupons.db")
+            inventario = Inventario()
+            registro = RegistroCupons(caminho)
+            originais = registro.processar(novo_cupom(1), inventario)
+            registro.fechar()
+
+            reaberto = RegistroCupons(caminho)
+            repetido = reaberto.processar(novo_cupom(1), inventario)
+            reaberto.fechar()
+
+        self.assertEqual(repetido, originais)
+        self.assertEqual([item.quantidade for item in inventario.estoque], [2, 1])
+
+    def test_workers_concorrentes(self):
+        """Testa que vários workers ingerindo o mesmo cupom aplicam o estoque uma única vez."""
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, "cupons.db")
+            trava_inventario = threading.Lock()
+            resultados = []
+
+            class InventarioSincronizado(Inventario):
+                def adicionar_produtos_por_cupom_fiscal(self, cupom):
+                    with trava_inventario:
+                        return super().adicionar_produtos_por_cupom_fiscal(cupom)
+
+            inventario = InventarioSincronizado()
+
+            def worker():
+                # Cada worker com sua própria conexão, como processos distintos.
+                registro = RegistroCupons(caminho)
+                resultados.append(registro.processar(novo_cupom(9), inventario))
+                registro.fechar()
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(resultados), 8)
+        self.assertEqual([item.quantidade for item in inventario.estoque], [2, 1])
+        for resultado in resultados:
+            self.assertEqual(resultado, resultados[0])
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
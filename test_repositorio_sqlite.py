@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom, ItemEstoque, Produto
+from inventario import Inventario
+from repositorio_sqlite import VERSAO_ESQUEMA, RepositorioSQLite
+
+class TestRepositorioSQLite(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.diretorio.name, "estoque.db")
+        self.repositorio = RepositorioSQLite(self.caminho)
+
+    def tearDown(self):
+        self.repositorio.fechar()
+        self.diretorio.cleanup()
+
+    def reabrir(self) -> RepositorioSQLite:
+        self.repositorio.fechar()
+        self.repositorio = RepositorioSQLite(self.caminho)
+        return self.repositorio
+
+    def test_mesmo_resultado_que_o_inventario_em_memoria(self):
+        """Testa que a mesma sequência de operações deixa os dois backends no mesmo estado."""
+        cupom = CupomFiscal(
+            dados_qr_code="qr",
+            data_compra_cupom=date(2024, 1, 10),
+            detalhes_produtos_cupom=[DetalheProdutoCupom("CAFÉ", 2), DetalheProdutoCupom("Sabão", 1)],
+        )
+        inventario = Inventario()
+        for repositorio in (inventario, self.repositorio):
+            repositorio.adicionar_produto_por_codigo_de_barras("111", "Café")
+            repositorio.adicionar_produtos_por_codigos_de_barras(["222", "111", "222", "333"])
+            repositorio.adicionar_produtos_por_cupom_fiscal(cupom)
+            repositorio.remover_produto_por_codigo_de_barras("333")
+            repositorio.remover_produto_por_codigo_de_barras("222")
+
+        def estado(produtos, estoque):
+            nomes = {produto.id: produto.nome for produto in produtos}
+            return sorted((nomes[item.produto_id], item.quantidade, item.data_compra) for item in estoque)
+
+        self.reabrir()
+        self.assertEqual(
+            estado(self.repositorio.listar_produtos(), self.repositorio.listar_estoque()),
+            estado(inventario.produtos, inventario.estoque),
+        )
+
+    def test_dados_persistem_entre_aberturas(self):
+        """Testa que produtos e itens, com ids e datas, sobrevivem ao reinício."""
+        produto, item = self.repositorio.adicionar_produto_por_codigo_de_barras("444", "Arroz 1kg", "Marca", "kg")
+
+        repositorio = self.reabrir()
+        recarregado = repositorio.buscar_produto_por_codigo_de_barras("444")
+
+        self.assertEqual(recarregado.id, produto.id)
+        self.assertEqual(recarregado.marca, "Marca")
+        self.assertEqual(recarregado.criado_em, produto.criado_em)
+        self.assertEqual(repositorio.buscar_produto_por_nome("ARROZ 1KG").id, produto.id)
+        self.assertEqual(repositorio.buscar_item_do_produto(produto.id).id, item.id)
+        self.assertEqual(repositorio.buscar_item_por_id(item.id).quantidade, 1_000_000) # 1 kg em mg
+
+        repositorio.adicionar_produto_por_codigo_de_barras("444")
+        self.assertEqual(self.reabrir().buscar_item_por_id(item.id).quantidade, 2_000_000)
+
+    def test_lote_de_leituras_e_remocao(self):
+        """Testa que o lote grava as contagens e que zerar o item o apaga do banco."""
+        resultados = self.repositorio.adicionar_produtos_por_codigos_de_barras(["555"] * 3)
+        produto, item = resultados["555"]
+        self.assertEqual(self.reabrir().buscar_item_por_id(item.id).quantidade, 3)
+
+        for _ in range(3):
+            self.repositorio.remover_produto_por_codigo_de_barras("555")
+
+        repositorio = self.reabrir()
+        self.assertIsNone(repositorio.buscar_item_por_id(item.id))
+        self.assertIsNone(repositorio.buscar_item_do_produto(produto.id))
+        self.assertIsNotNone(repositorio.buscar_produto_por_id(produto.id))
+
+    def test_transacao_desfeita_em_caso_de_erro(self):
+        """Testa que uma exceção dentro da transação descarta todas as gravações dela."""
+        with self.assertRaises(RuntimeError):
+            with self.repositorio.transacao():
+                self.repositorio.adicionar_produto_por_codigo_de_barras("666")
+                self.repositorio.adicionar_produto_por_codigo_de_barras("777")
+                raise RuntimeError("falha no meio do lote")
+
+        self.assertIsNone(self.repositorio.buscar_produto_por_codigo_de_barras("666"))
+        self.assertEqual(self.repositorio.listar_produtos(), [])
+
+    def test_mapa_de_identidade_dentro_da_transacao(self):
+        """Testa que buscas repetidas na mesma transação devolvem o mesmo objeto."""
+        self.repositorio.adicionar_produto_por_codigo_de_barras("888", "Feijão")
+        with self.repositorio.transacao():
+            produto = self.repositorio.buscar_produto_por_codigo_de_barras("888")
+            self.assertIs(self.repositorio.buscar_produto_por_nome("feijão"), produto)
+            self.assertIs(self.repositorio.buscar_produto_por_id(produto.id), produto)
+
+    def test_migra_quantidades_da_versao_0(self):
+        """Testa que itens gravados na unidade do produto (2 para 2 kg) passam para a unidade base uma só vez."""
+        self.repositorio.registrar_produto(Produto(nome="Café", codigo_de_barras="111", unidade="KG"))
+        self.repositorio.registrar_produto(Produto(nome="Leite", codigo_de_barras="222", unidade="l"))
+        self.repositorio.registrar_produto(Produto(nome="Sabão", codigo_de_barras="333", unidade="un"))
+        for codigo in ("111", "222", "333"):
+            produto = self.repositorio.buscar_produto_por_codigo_de_barras(codigo)
+            self.repositorio.registrar_item(ItemEstoque(produto_id=produto.id, quantidade=2))
+        self.repositorio.fechar()
+        with sqlite3.connect(self.caminho) as conexao:
+            conexao.execute("PRAGMA user_version = 0")
+
+        for _ in range(2):
+            repositorio = self.reabrir()
+            quantidades = [
+                repositorio.buscar_item_do_produto(repositorio.buscar_produto_por_codigo_de_barras(codigo).id).quantidade
+                for codigo in ("111", "222", "333")
+            ]
+            self.assertEqual(quantidades, [2_000_000, 2_000, 2])
+
+    def test_recusa_banco_de_versao_mais_nova(self):
+        self.repositorio.fechar()
+        with sqlite3.connect(self.caminho) as conexao:
+            conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA + 1}")
+        with self.assertRaises(ValueError):
+            RepositorioSQLite(self.caminho)
+        self.repositorio = RepositorioSQLite(":memory:")
+
+    def test_renomear_dentro_da_transacao(self):
+        """Testa que as buscas por nome seguem a troca de nome já na mesma transação, e não depois do rollback."""
+        self.repositorio.adicionar_produto_por_codigo_de_barras("888", "Feijão")
+        self.repositorio.adicionar_produto_por_codigo_de_barras("999", "Arroz")
+        with self.assertRaises(RuntimeError):
+            with self.repositorio.transacao():
+                produto = self.repositorio.buscar_produto_por_nome("feijão")
+                self.assertIsNone(self.repositorio.buscar_produto_por_nome("feijão preto"))
+                self.repositorio.renomear_produto(produto, "Feijão Preto")
+                self.assertIs(self.repositorio.buscar_produto_por_nome("FEIJÃO PRETO"), produto)
+                self.assertIsNone(self.repositorio.buscar_produto_por_nome("feijão"))
+
+                arroz = self.repositorio.buscar_produto_por_nome("arroz")
+                self.repositorio.renomear_produto(arroz, "Feijão")
+                self.assertIs(self.repositorio.buscar_produto_por_nome("feijão"), arroz)
+                self.assertIsNone(self.repositorio.buscar_produto_por_nome("arroz"))
+                raise RuntimeError
+        self.assertEqual(self.repositorio.buscar_produto_por_nome("feijão").codigo_de_barras, "888")
+        self.assertIsNone(self.repositorio.buscar_produto_por_nome("feijão preto"))
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
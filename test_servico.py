@@ -0,0 +1,82 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from models import CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from repositorio_sqlite import RepositorioSQLite
+from servico import ServicoEstoque
+
+class TestServicoEstoque(unittest.IsolatedAsyncioTestCase):
+
+    async def test_escritas_concorrentes_na_mesma_casa(self):
+        """Testa que requisições simultâneas da mesma casa são aplicadas sem perdas e em ordem."""
+        async with ServicoEstoque(lambda casa: Inventario(), em_thread=False) as servico:
+            respostas = await asyncio.gather(
+                *(servico.adicionar_produto_por_codigo_de_barras("casa", "111") for _ in range(100))
+            )
+            quantidades = [item.quantidade for _, item in respostas]
+            # O item é o mesmo objeto, então todas as respostas veem a quantidade final.
+            self.assertEqual(quantidades, [100] * 100)
+
+            resultado = await servico.remover_produto_por_codigo_de_barras("casa", "111")
+            self.assertEqual(resultado.quantidade, 99)
+
+    async def test_casas_isoladas(self):
+        """Testa que cada casa tem seu próprio repositório."""
+        async with ServicoEstoque(lambda casa: Inventario(), em_thread=False) as servico:
+            await servico.adicionar_produto_por_codigo_de_barras("a", "111", "Café")
+            self.assertIsNone(await servico.remover_produto_por_codigo_de_barras("b", "111"))
+            self.assertEqual(len(servico.repositorio("a").estoque), 1)
+            self.assertEqual(servico.repositorio("b").estoque, [])
+
+    async def test_lote_em_thread_com_sqlite(self):
+        """Testa o caminho persistente: lote aplicado fora do event loop e gravado em um commit."""
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminhos = {}
+
+            def fabrica(casa):
+                caminhos[casa] = os.path.join(diretorio, f"{casa}.db")
+                return RepositorioSQLite(caminhos[casa])
+
+            cupom = CupomFiscal(
+                dados_qr_code="qr",
+                data_compra_cupom=date(2024, 1, 10),
+                detalhes_produtos_cupom=[DetalheProdutoCupom("Café", 2)],
+            )
+            async with ServicoEstoque(fabrica) as servico:
+                await asyncio.gather(
+                    servico.adicionar_produto_por_codigo_de_barras("casa", "111", "Café"),
+                    *(servico.adicionar_produto_por_codigo_de_barras("casa", "111") for _ in range(9)),
+                    servico.adicionar_produtos_por_cupom_fiscal("casa", cupom),
+                )
+            servico.repositorio("casa").fechar()
+
+            reaberto = RepositorioSQLite(caminhos["casa"])
+            produto = reaberto.buscar_produto_por_codigo_de_barras("111")
+            self.assertEqual(reaberto.buscar_item_do_produto(produto.id).quantidade, 12)
+            reaberto.fechar()
+
+    async def test_erro_em_um_comando_nao_afeta_os_demais(self):
+        """Testa que a exceção de um comando vai só para quem o pediu."""
+        async with ServicoEstoque(lambda casa: Inventario(), em_thread=False) as servico:
+            respostas = await asyncio.gather(
+                servico.adicionar_produto_por_codigo_de_barras("casa", "111"),
+                servico.adicionar_produtos_por_cupom_fiscal("casa", None),
+                servico.adicionar_produto_por_codigo_de_barras("casa", "111"),
+                return_exceptions=True,
+            )
+        self.assertIsInstance(respostas[1], AttributeError)
+        self.assertEqual(respostas[2][1].quantidade, 2)
+
+    async def test_servico_fechado_recusa_requisicoes(self):
+        """Testa que, depois de fechado, o serviço não aceita novas escritas."""
+        servico = ServicoEstoque(lambda casa: Inventario())
+        await servico.fechar()
+        with self.assertRaises(RuntimeError):
+            await servico.adicionar_produto_por_codigo_de_barras("casa", "111")
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,99 @@
+import unittest
+from datetime import date
+
+from models import Produto, ItemEstoque
+from autocompletar import IndiceAutocompletar
+from sincronizacao import InventarioSincronizado, codificar_alteracoes, decodificar_alteracoes
+
+def estado(inventario):
+    produtos = {p.id: (p.nome, p.codigo_de_barras, p.marca, p.atualizado_em) for p in inventario.produtos}
+    itens = {i.id: (i.produto_id, i.quantidade, i.data_validade_especifica, i.ultima_atualizacao) for i in inventario.estoque}
+    return produtos, itens
+
+class TestSincronizacao(unittest.TestCase):
+
+    def setUp(self):
+        self.leite = Produto(nome="Leite", codigo_de_barras="111")
+        self.arroz = Produto(nome="Arroz", codigo_de_barras="222", marca="Tio João")
+        self.servidor = InventarioSincronizado(
+            "servidor", [self.leite, self.arroz], [ItemEstoque(self.leite.id, 2), ItemEstoque(self.arroz.id, 1)],
+        )
+        self.celular = InventarioSincronizado("celular")
+        # Última versão de cada lado que o outro já recebeu.
+        self.cursores = {"servidor": 0, "celular": 0}
+        self.sincronizar()
+
+    def enviar(self, origem, destino):
+        alteracoes = origem.alteracoes_desde(self.cursores[origem.replica], para=destino.replica)
+        self.cursores[origem.replica] = alteracoes.versao
+        return destino.aplicar(decodificar_alteracoes(codificar_alteracoes(alteracoes)))
+
+    def sincronizar(self):
+        self.enviar(self.celular, self.servidor)
+        self.enviar(self.servidor, self.celular)
+        self.assertEqual(estado(self.celular), estado(self.servidor))
+
+    def test_primeira_sincronizacao_e_incremental(self):
+        self.assertEqual(len(self.celular.produtos), 2)
+        self.assertEqual(sorted(i.quantidade for i in self.celular.estoque), [1, 2])
+        vazio = self.servidor.alteracoes_desde(self.cursores["servidor"], para="celular")
+        self.assertEqual((vazio.produtos, vazio.itens, vazio.quantidades), ([], [], []))
+
+        # Uma leitura envia só o produto tocado, sem dados, e o item alterado.
+        self.celular.adicionar_produto_por_codigo_de_barras("111")
+        alteracoes = self.celular.alteracoes_desde(self.cursores["celular"], para="servidor")
+        self.assertEqual([(p.id, p.carimbo, p.dados) for p in alteracoes.produtos], [(self.leite.id, None, None)])
+        self.assertEqual(len(alteracoes.itens), 1)
+        self.assertEqual([(c.replica, c.valor) for c in alteracoes.quantidades], [("celular", 1)])
+        self.sincronizar()
+        self.assertEqual(self.servidor.buscar_item_do_produto(self.leite.id).quantidade, 3)
+        # O que veio do celular não volta para ele.
+        self.assertEqual(self.enviar(self.servidor, self.celular), 0)
+
+    def test_quantidades_concorrentes_somam(self):
+        indice = IndiceAutocompletar(self.servidor, self.servidor.produtos, self.servidor.estoque)
+        self.servidor.adicionar_produto_por_codigo_de_barras("111")
+        self.celular.adicionar_produto_por_codigo_de_barras("111")
+        self.celular.remover_produto_por_codigo_de_barras("222")
+        self.servidor.adicionar_produto_por_codigo_de_barras("222")
+        self.sincronizar()
+        self.assertEqual(self.celular.buscar_item_do_produto(self.leite.id).quantidade, 4)
+        # O celular zerou o arroz enquanto o servidor repunha uma unidade: sobra uma.
+        self.assertEqual(self.celular.buscar_item_do_produto(self.arroz.id).quantidade, 1)
+        self.assertEqual(indice.saldo(self.leite.id), 4)
+
+        self.celular.remover_produto_por_codigo_de_barras("222")
+        self.sincronizar()
+        self.assertIsNone(self.servidor.buscar_item_do_produto(self.arroz.id))
+        self.assertEqual(indice.saldo(self.arroz.id), 0)
+
+    def test_edicao_mais_recente_vence(self):
+        self.celular.renomear_produto(self.celular.buscar_produto_por_id(self.arroz.id), "Arroz Agulhinha")
+        self.servidor.sobrescrever_produto(self.arroz.id, nome="Arroz Parboilizado", marca="Camil")
+        # Leituras posteriores no celular só tocam o produto; não desfazem a edição do servidor.
+        self.celular.adicionar_produto_por_codigo_de_barras("222")
+        item = self.celular.buscar_item_do_produto(self.arroz.id)
+        self.celular.definir_validade_do_item(item.id, date(2030, 1, 1))
+        self.sincronizar()
+        arroz = self.celular.buscar_produto_por_codigo_de_barras("222")
+        self.assertEqual((arroz.nome, arroz.marca), ("Arroz Parboilizado", "Camil"))
+        self.assertIs(self.celular.buscar_produto_por_nome("arroz parboilizado"), arroz)
+        self.assertIsNone(self.celular.buscar_produto_por_nome("arroz agulhinha"))
+        self.assertEqual(self.servidor.buscar_item_por_id(item.id).data_validade_especifica, date(2030, 1, 1))
+
+    def test_aplicar_e_idempotente_e_comutativo(self):
+        self.celular.adicionar_produto_por_codigo_de_barras("333", "Café")
+        self.servidor.adicionar_produto_por_codigo_de_barras("111")
+        do_celular = self.celular.alteracoes_desde(0)
+        do_servidor = self.servidor.alteracoes_desde(0)
+        terceiro = InventarioSincronizado("tablet")
+        terceiro.aplicar(do_servidor)
+        terceiro.aplicar(do_celular)
+        self.assertEqual(terceiro.aplicar(do_celular), 0)
+        self.servidor.aplicar(do_celular)
+        self.assertEqual(estado(terceiro), estado(self.servidor))
+        self.assertEqual(terceiro.buscar_item_do_produto(self.leite.id).quantidade, 3)
+        self.assertEqual(decodificar_alteracoes(codificar_alteracoes(do_celular)), do_celular)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
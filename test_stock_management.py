@@ -7,6 +7,8 @@ from stock_management import (
     adicionar_produto_por_codigo_de_barras,
     adicionar_produtos_por_cupom_fiscal,
     remover_produto_por_codigo_de_barras,
+    adicionar_produtos_por_codigos_de_barras,
+    definir_validade_do_item,
 )
 
 class TestStockManagement(unittest.TestCase):
@@ -205,6 +207,48 @@ class TestStockManagement(unittest.TestCase):
         self.assertTrue(ts_antes_add <= i_macarrao.adicionado_em <= ts_depois_add)
 
 
+    def test_adicionar_produtos_por_codigos_de_barras_em_lote(self):
+        """Testa que o lote produz o mesmo estado que chamadas individuais por leitura."""
+        produto_existente = Produto(nome="Produto Existente", codigo_de_barras="LOTE1")
+        self.produtos_cadastrados.append(produto_existente)
+        item_existente = ItemEstoque(produto_id=produto_existente.id, quantidade=2)
+        self.estoque.append(item_existente)
+        leituras = ["LOTE2", "LOTE1", "LOTE2", "LOTE3", "LOTE2", "LOTE1"]
+
+        ts_antes = datetime.now() - timedelta(seconds=1)
+        resultados = adicionar_produtos_por_codigos_de_barras(
+            leituras, self.produtos_cadastrados, self.estoque,
+            metadados={"LOTE3": {"nome_produto": "Detergente", "marca_produto": "Marca X"}},
+        )
+
+        self.assertEqual(list(resultados), ["LOTE2", "LOTE1", "LOTE3"])
+        self.assertEqual(len(self.produtos_cadastrados), 3)
+        self.assertEqual(len(self.estoque), 3)
+        self.assertEqual(resultados["LOTE1"], (produto_existente, item_existente))
+        self.assertEqual(item_existente.quantidade, 4)
+        self.assertEqual(resultados["LOTE2"][1].quantidade, 3)
+        self.assertEqual(resultados["LOTE2"][0].nome, "Produto LOTE2")
+        detergente, item_detergente = resultados["LOTE3"]
+        self.assertEqual((detergente.nome, detergente.marca), ("Detergente", "Marca X"))
+        self.assertEqual(item_detergente.quantidade, 1)
+        # Um único timestamp para todo o lote.
+        self.assertTrue(ts_antes <= item_existente.ultima_atualizacao)
+        self.assertEqual(item_existente.ultima_atualizacao, detergente.criado_em)
+
+        # Mesmo estado final das chamadas individuais.
+        produtos_individuais: list[Produto] = []
+        estoque_individual: list[ItemEstoque] = []
+        for codigo in leituras:
+            adicionar_produto_por_codigo_de_barras(codigo, produtos_individuais, estoque_individual)
+        self.assertEqual(
+            sorted((p.codigo_de_barras for p in produtos_individuais)),
+            sorted(resultados),
+        )
+        self.assertEqual(
+            sorted(i.quantidade for i in estoque_individual),
+            sorted([2, 3, 1]),
+        )
+
     def test_remover_produto_em_estoque(self):
         """Testa remover um produto que está em estoque."""
         barcode = "REM123"
@@ -262,5 +306,18 @@ class TestStockManagement(unittest.TestCase):
         self.assertIsNone(item_retornado)
         self.assertEqual(len(self.estoque), 0)
 
+    def test_definir_validade_do_item(self):
+        """Testa definir e depois remover a validade específica de um item."""
+        _, item = adicionar_produto_por_codigo_de_barras("VAL", self.produtos_cadastrados, self.estoque)
+        validade = date(2024, 5, 1)
+
+        item_retornado = definir_validade_do_item(item.id, self.produtos_cadastrados, self.estoque, validade)
+        self.assertIs(item_retornado, item)
+        self.assertEqual(item.data_validade_especifica, validade)
+
+        definir_validade_do_item(item.id, self.produtos_cadastrados, self.estoque, None)
+        self.assertIsNone(item.data_validade_especifica)
+        self.assertIsNone(definir_validade_do_item(uuid4(), self.produtos_cadastrados, self.estoque, validade))
+
 if __name__ == '__main__':
     unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,99 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+
+from models import Produto, ItemEstoque, CupomFiscal, DetalheProdutoCupom
+from inventario import Inventario
+from unidades import em_unidade, fator_da_unidade, formatar_quantidade, normalizar_unidade, para_unidade_base
+
+class TestConversao(unittest.TestCase):
+
+    def test_normaliza_grafias(self):
+        self.assertEqual(normalizar_unidade("KG"), "kg")
+        self.assertEqual(normalizar_unidade("Lt"), "l")
+        self.assertEqual(normalizar_unidade("UND"), "un")
+        self.assertEqual(normalizar_unidade("pacote"), "un")
+        self.assertEqual(normalizar_unidade(None), "un")
+
+    def test_converte_para_inteiro_na_unidade_base(self):
+        """Testa que massas viram miligramas e volumes mililitros, sem erro de ponto flutuante."""
+        self.assertEqual(para_unidade_base(0.5, "kg", "kg"), 500_000)
+        self.assertEqual(para_unidade_base(250, "g", "kg"), 250_000)
+        self.assertEqual(para_unidade_base("1,5", "L", "ml"), 1_500)
+        self.assertEqual(para_unidade_base(0.1, None, "kg") * 3, para_unidade_base(0.3, None, "kg"))
+        self.assertEqual(para_unidade_base(3, None, None), 3)
+
+    def test_unidades_incompativeis_ou_valor_invalido(self):
+        with self.assertRaises(ValueError):
+            para_unidade_base(1, "kg", "l")
+        with self.assertRaises(ValueError):
+            para_unidade_base("meio", "kg", "kg")
+
+    def test_exibicao(self):
+        self.assertEqual(em_unidade(1_250_000, "kg"), Decimal("1.25"))
+        self.assertEqual(formatar_quantidade(500_000, "KG"), "0,5 kg")
+        self.assertEqual(formatar_quantidade(3, None), "3 un")
+        self.assertEqual(fator_da_unidade("ml"), 1)
+
+class TestEstoqueFracionado(unittest.TestCase):
+
+    def cupom(self, *detalhes):
+        return CupomFiscal(dados_qr_code="qr", data_compra_cupom=date(2024, 1, 10), detalhes_produtos_cupom=list(detalhes))
+
+    def test_cupom_com_quantidade_fracionaria(self):
+        """Testa que "0,5 kg" no cupom não é mais truncado para zero."""
+        inventario = Inventario()
+        [(produto, item)] = inventario.adicionar_produtos_por_cupom_fiscal(
+            self.cupom(DetalheProdutoCupom("Queijo Minas", 0.5, unidade_cupom="KG"))
+        )
+        self.assertEqual(produto.unidade, "kg")
+        self.assertEqual(item.quantidade, 500_000)
+
+        [(_, item)] = inventario.adicionar_produtos_por_cupom_fiscal(
+            self.cupom(DetalheProdutoCupom("Queijo Minas", 250, unidade_cupom="g"))
+        )
+        self.assertEqual(formatar_quantidade(item.quantidade, produto.unidade), "0,75 kg")
+
+    def test_codigo_de_barras_soma_uma_unidade_de_medida(self):
+        """Testa que ler e remover um produto vendido a granel soma e subtrai 1 kg."""
+        produto = Produto(nome="Café", codigo_de_barras="111", unidade="kg")
+        item = ItemEstoque(produto_id=produto.id, quantidade=500_000)
+        inventario = Inventario([produto], [item])
+
+        inventario.adicionar_produtos_por_codigos_de_barras(["111", "111"])
+        self.assertEqual(item.quantidade, 2_500_000)
+        inventario.remover_produto_por_codigo_de_barras("111")
+        self.assertEqual(item.quantidade, 1_500_000)
+        inventario.remover_produto_por_codigo_de_barras("111")
+        self.assertEqual(item.quantidade, 500_000)
+        self.assertIsNone(inventario.remover_produto_por_codigo_de_barras("111"))
+        self.assertEqual(inventario.estoque, [])
+
+    def test_produto_contado_recusa_massa(self):
+        inventario = Inventario([Produto(nome="Sabão", codigo_de_barras="222", unidade="un")], [])
+        with self.assertRaises(ValueError):
+            inventario.adicionar_produtos_por_cupom_fiscal(self.cupom(DetalheProdutoCupom("Sabão", 1, unidade_cupom="kg")))
+
+    def test_cupom_com_unidades_misturadas(self):
+        """Testa que uma linha recusada não deixa as anteriores aplicadas e que um produto sem unidade aceita kg."""
+        inventario = Inventario([Produto(nome="Detergente", codigo_de_barras="456", unidade="un")], [])
+        banana, _ = inventario.adicionar_produto_por_codigo_de_barras("789", nome_produto="Banana")
+
+        with self.assertRaises(ValueError):
+            inventario.adicionar_produtos_por_cupom_fiscal(self.cupom(
+                DetalheProdutoCupom("Arroz", 1, unidade_cupom="UN"), DetalheProdutoCupom("Detergente", 0.5, unidade_cupom="L"),
+            ))
+        self.assertIsNone(inventario.buscar_produto_por_nome("Arroz"))
+
+        resultados = inventario.adicionar_produtos_por_cupom_fiscal(self.cupom(
+            DetalheProdutoCupom("Arroz", 1, unidade_cupom="UN"), DetalheProdutoCupom("banana", 0.5, unidade_cupom="KG"),
+            DetalheProdutoCupom("ARROZ", 2, unidade_cupom="UN"),
+        ))
+        (arroz, item_arroz), (produto_banana, item_banana), (_, mesmo_item) = resultados
+        self.assertIs(produto_banana, banana)
+        self.assertIs(mesmo_item, item_arroz)
+        self.assertEqual((arroz.unidade, item_arroz.quantidade, item_banana.quantidade), ("un", 3, 2))
+        self.assertIsNone(banana.unidade)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
@@ -0,0 +1,81 @@
+import unittest
+from datetime import date, timedelta
+
+from models import Produto, ItemEstoque
+from inventario import Inventario
+from validade import IndiceValidade
+
+HOJE = date(2024, 3, 10)
+
+class TestIndiceValidade(unittest.TestCase):
+
+    def test_consulta_por_intervalo_em_ordem(self):
+        """Testa que o intervalo é fechado e os itens vêm ordenados pela validade."""
+        indice = IndiceValidade()
+        itens = [ItemEstoque(produto_id=None, quantidade=1) for _ in range(4)]
+        for item, dias in zip(itens, (5, 1, 3, 9)):
+            indice.definir(item, HOJE + timedelta(days=dias))
+
+        resultado = indice.entre(HOJE + timedelta(days=1), HOJE + timedelta(days=5))
+
+        self.assertEqual([item for _, item in resultado], [itens[1], itens[2], itens[0]])
+        self.assertEqual(resultado[0][0], HOJE + timedelta(days=1))
+        self.assertEqual(len(indice.entre()), 4)
+
+    def test_mover_e_remover(self):
+        """Testa que redefinir a validade move o item e que datas vazias deixam o índice."""
+        indice = IndiceValidade()
+        item = ItemEstoque(produto_id=None, quantidade=1)
+        indice.definir(item, HOJE)
+        indice.definir(item, HOJE + timedelta(days=2))
+
+        self.assertEqual(indice.entre(HOJE, HOJE), [])
+        self.assertEqual(indice.validade(item), HOJE + timedelta(days=2))
+
+        indice.definir(item, None)
+        self.assertEqual(len(indice), 0)
+        self.assertEqual(indice._datas, [])
+
+        indice.definir(item, HOJE)
+        indice.remover(item)
+        indice.remover(item)
+        self.assertEqual(indice.entre(), [])
+
+class TestInventarioValidades(unittest.TestCase):
+
+    def setUp(self):
+        self.leite = Produto(nome="Leite", codigo_de_barras="1", data_de_validade_padrao=HOJE + timedelta(days=3))
+        self.arroz = Produto(nome="Arroz", codigo_de_barras="2")
+        self.item_leite = ItemEstoque(produto_id=self.leite.id, quantidade=2)
+        self.item_arroz = ItemEstoque(produto_id=self.arroz.id, quantidade=1, data_validade_especifica=HOJE - timedelta(days=1))
+        self.produtos = [self.leite, self.arroz]
+        self.estoque = [self.item_leite, self.item_arroz]
+
+    def test_indice_e_varredura_concordam(self):
+        """Testa que as consultas dão o mesmo resultado com e sem o índice de validade."""
+        for indexar_validades in (False, True):
+            with self.subTest(indexar_validades=indexar_validades):
+                inventario = Inventario(self.produtos, self.estoque, indexar_validades=indexar_validades)
+                self.assertEqual(inventario.itens_a_vencer(7, HOJE), [(HOJE + timedelta(days=3), self.item_leite)])
+                self.assertEqual(inventario.itens_vencidos(HOJE), [(HOJE - timedelta(days=1), self.item_arroz)])
+                self.assertEqual(inventario.itens_a_vencer(2, HOJE), [])
+
+    def test_indice_acompanha_as_operacoes(self):
+        """Testa que adicionar, editar validades e remover itens mantém o índice atualizado."""
+        inventario = Inventario(self.produtos, self.estoque, indexar_validades=True)
+
+        inventario.definir_validade_do_item(self.item_arroz.id, HOJE + timedelta(days=1))
+        self.assertEqual(inventario.itens_vencidos(HOJE), [])
+        self.assertEqual([i for _, i in inventario.itens_a_vencer(7, HOJE)], [self.item_arroz, self.item_leite])
+
+        # Validade padrão do produto alterada: vale para os itens sem validade específica.
+        self.leite.data_de_validade_padrao = HOJE - timedelta(days=5)
+        inventario.adicionar_produto_por_codigo_de_barras("1")
+        self.assertEqual(inventario.itens_vencidos(HOJE), [(HOJE - timedelta(days=5), self.item_leite)])
+
+        inventario.remover_produto_por_codigo_de_barras("2")
+        self.assertEqual(inventario.itens_a_vencer(7, HOJE), [])
+        self.assertEqual(len(inventario.indice_validade), 1)
+
+if __name__ == '__main__':
+    unittest.main(argv=['first-arg-is-ignored'], exit=False)
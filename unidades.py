@@ -0,0 +1,101 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+from typing import Dict, Optional, Tuple, Union
+
+# `ItemEstoque.quantidade` é sempre um inteiro na unidade base da grandeza do
+# produto: miligramas para massa, mililitros para volume e unidades para
+# contagem. Assim 0,5 kg é guardado como 500000 e as somas e subtrações das
+# operações de estoque continuam sendo aritmética de inteiros, exata e rápida.
+# A conversão (com Decimal) acontece só na entrada, ao ler o cupom.
+
+# Unidade canônica -> (unidade base, unidades base por unidade).
+UNIDADES: Dict[str, Tuple[str, int]] = {
+    "kg": ("mg", 1_000_000),
+    "g": ("mg", 1_000),
+    "mg": ("mg", 1),
+    "l": ("ml", 1_000),
+    "ml": ("ml", 1),
+    "un": ("un", 1),
+}
+
+# Grafias comuns em cadastros e cupons (NFC-e usa "KG", "LT", "UND"...).
+_SINONIMOS: Dict[str, str] = {
+    "kilo": "kg", "quilo": "kg", "kgs": "kg",
+    "gr": "g", "grs": "g", "gramas": "g",
+    "lt": "l", "lts": "l", "litro": "l", "litros": "l",
+    "und": "un", "unid": "un", "unidade": "un", "unidades": "un",
+}
+
+# Fator já calculado por grafia exata, para que o caminho quente seja um
+# único acesso a dicionário.
+_FATOR_POR_GRAFIA: Dict[Optional[str], int] = {None: 1}
+
+Numero = Union[int, float, str, Decimal]
+
+def normalizar_unidade(unidade: Optional[str]) -> str:
+    """
+    Unidade canônica (`kg`, `g`, `mg`, `l`, `ml` ou `un`) de uma grafia livre.
+
+    Unidades ausentes ou desconhecidas (ex.: "pacote") contam como `un`.
+    """
+    if not unidade:
+        return "un"
+    chave = unidade.strip().lower().rstrip(".")
+    chave = _SINONIMOS.get(chave, chave)
+    return chave if chave in UNIDADES else "un"
+
+def unidade_base(unidade: Optional[str]) -> str:
+    """Unidade em que as quantidades de um produto nessa unidade são guardadas."""
+    return UNIDADES[normalizar_unidade(unidade)][0]
+
+def fator_da_unidade(unidade: Optional[str]) -> int:
+    """Quantas unidades base valem uma unidade (ex.: 1000000 para `kg`)."""
+    fator = _FATOR_POR_GRAFIA.get(unidade)
+    if fator is None:
+        fator = _FATOR_POR_GRAFIA[unidade] = UNIDADES[normalizar_unidade(unidade)][1]
+    return fator
+
+def para_unidade_base(
+    quantidade: Numero, unidade: Optional[str], unidade_do_produto: Optional[str]
+) -> int:
+    """
+    Converte uma quantidade informada em `unidade` para o inteiro guardado em
+    um produto medido em `unidade_do_produto`.
+
+    Args:
+        quantidade: O valor informado, como int, float, Decimal ou texto
+            (aceita vírgula decimal, como em "0,5").
+        unidade: A unidade do valor. Se None, é a própria unidade do produto.
+        unidade_do_produto: A unidade cadastrada no produto.
+
+    Returns:
+        A quantidade na unidade base, arredondada para o inteiro mais próximo.
+
+    Raises:
+        ValueError: Se a quantidade não for numérica ou se as unidades forem
+            de grandezas diferentes (ex.: kg em um produto contado em un).
+    """
+    destino = normalizar_unidade(unidade_do_produto)
+    origem = normalizar_unidade(unidade) if unidade else destino
+    base, fator = UNIDADES[origem]
+    if base != UNIDADES[destino][0]:
+        raise ValueError(f"Quantidade em {origem} não é compatível com um produto medido em {destino}")
+    if type(quantidade) is int:
+        return quantidade * fator
+    try:
+        if isinstance(quantidade, str):
+            valor = Decimal(quantidade.strip().replace(",", "."))
+        else:
+            valor = Decimal(str(quantidade))
+        return int((valor * fator).to_integral_value(ROUND_HALF_EVEN))
+    except (InvalidOperation, TypeError, OverflowError) as erro:
+        raise ValueError(f"Quantidade inválida: {quantidade!r}") from erro
+
+def em_unidade(quantidade: int, unidade: Optional[str]) -> Decimal:
+    """Valor exato de uma quantidade guardada, expresso em `unidade` (ex.: 500000 -> 0.5 kg)."""
+    return Decimal(quantidade) / fator_da_unidade(unidade)
+
+def formatar_quantidade(quantidade: int, unidade: Optional[str]) -> str:
+    """Texto para exibição, como "0,5 kg" ou "3 un"."""
+    valor = em_unidade(quantidade, unidade).normalize()
+    texto = f"{valor:f}".replace(".", ",")
+    return f"{texto} {normalizar_unidade(unidade)}"
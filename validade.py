@@ -0,0 +1,83 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from models import ItemEstoque
+
+class IndiceValidade:
+    """
+    Índice de itens de estoque ordenado pela data de validade efetiva.
+
+    Os itens ficam agrupados por data (ordinal do dia) e só as datas distintas
+    são mantidas ordenadas, em uma lista pesquisada com `bisect`. Como há muito
+    menos datas distintas que itens, inserir, mover ou remover um item custa
+    O(1) amortizado mais, quando a data é nova ou some, O(log d) na busca e um
+    deslocamento de d inteiros na lista de datas. Uma consulta por intervalo
+    custa O(log d + k) para k itens devolvidos.
+
+    A data efetiva é calculada por quem usa o índice (ver
+    `Inventario.validade_efetiva`); itens sem validade não são indexados.
+    """
+
+    def __init__(self):
+        self._datas: List[int] = []
+        self._itens_por_data: Dict[int, Dict[UUID, ItemEstoque]] = {}
+        self._data_do_item: Dict[UUID, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._data_do_item)
+
+    def validade(self, item: ItemEstoque) -> Optional[date]:
+        """Data sob a qual o item está indexado, ou None se não estiver."""
+        ordinal = self._data_do_item.get(item.id)
+        return date.fromordinal(ordinal) if ordinal is not None else None
+
+    def definir(self, item: ItemEstoque, validade: Optional[date]) -> None:
+        """Indexa o item sob `validade`, movendo-o se já estava em outra data; None o retira."""
+        ordinal = validade.toordinal() if validade is not None else None
+        anterior = self._data_do_item.get(item.id)
+        if anterior is not None and anterior != ordinal:
+            self._retirar(item.id, anterior)
+        if ordinal is None:
+            self._data_do_item.pop(item.id, None)
+            return
+
+        self._data_do_item[item.id] = ordinal
+        itens = self._itens_por_data.get(ordinal)
+        if itens is None:
+            itens = self._itens_por_data[ordinal] = {}
+            insort(self._datas, ordinal)
+        itens[item.id] = item
+
+    def remover(self, item: ItemEstoque) -> None:
+        ordinal = self._data_do_item.pop(item.id, None)
+        if ordinal is not None:
+            self._retirar(item.id, ordinal)
+
+    def _retirar(self, item_id: UUID, ordinal: int) -> None:
+        itens = self._itens_por_data[ordinal]
+        del itens[item_id]
+        if not itens:
+            del self._itens_por_data[ordinal]
+            del self._datas[bisect_left(self._datas, ordinal)]
+
+    def entre(self, inicio: Optional[date] = None, fim: Optional[date] = None) -> List[Tuple[date, ItemEstoque]]:
+        """
+        Itens com validade no intervalo fechado [inicio, fim], em ordem de validade.
+
+        Args:
+            inicio: Primeira data do intervalo; None para não limitar.
+            fim: Última data do intervalo; None para não limitar.
+
+        Returns:
+            Pares (validade, item); itens com a mesma validade vêm na ordem em
+            que foram indexados.
+        """
+        baixo = bisect_left(self._datas, inicio.toordinal()) if inicio is not None else 0
+        alto = bisect_right(self._datas, fim.toordinal()) if fim is not None else len(self._datas)
+        resultado: List[Tuple[date, ItemEstoque]] = []
+        for ordinal in self._datas[baixo:alto]:
+            validade = date.fromordinal(ordinal)
+            resultado.extend((validade, item) for item in self._itens_por_data[ordinal].values())
+        return resultado